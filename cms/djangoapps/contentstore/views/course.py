@@ -108,6 +108,9 @@ __all__ = ['course_info_handler', 'course_handler', 'course_listing',
 
 WAFFLE_NAMESPACE = 'studio_home'
 
+# The block types shown in the course outline, whose definitions are prefetched in bulk when it's loaded.
+COURSE_OUTLINE_BLOCK_TYPES = ('course', 'chapter', 'sequential', 'vertical')
+
 
 class AccessListFallback(Exception):
     """
@@ -117,14 +120,14 @@ class AccessListFallback(Exception):
     pass
 
 
-def get_course_and_check_access(course_key, user, depth=0):
+def get_course_and_check_access(course_key, user, depth=0, **kwargs):
     """
     Internal method used to calculate and return the locator and course module
     for the view functions in this file.
     """
     if not has_studio_read_access(user, course_key):
         raise PermissionDenied()
-    course_module = modulestore().get_course(course_key, depth=depth)
+    course_module = modulestore().get_course(course_key, depth=depth, **kwargs)
     return course_module
 
 
@@ -614,7 +617,9 @@ def course_index(request, course_key):
     # A depth of None implies the whole course. The course outline needs this in order to compute has_changes.
     # A unit may not have a draft version, but one of its components could, and hence the unit itself has changes.
     with modulestore().bulk_operations(course_key):
-        course_module = get_course_and_check_access(course_key, request.user, depth=None)
+        course_module = get_course_and_check_access(
+            course_key, request.user, depth=None, prefetch_block_types=COURSE_OUTLINE_BLOCK_TYPES
+        )
         if not course_module:
             raise Http404
         lms_link = get_lms_link_for_item(course_module.location)
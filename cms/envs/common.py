@@ -50,7 +50,8 @@ import lms.envs.common
 # Although this module itself may not use these imported variables, other dependent modules may.
 from lms.envs.common import (
     USE_TZ, TECH_SUPPORT_EMAIL, PLATFORM_NAME, PLATFORM_DESCRIPTION, BUGS_EMAIL, DOC_STORE_CONFIG, DATA_DIR,
-    ALL_LANGUAGES, WIKI_ENABLED, update_module_store_settings, ASSET_IGNORE_REGEX,
+    ALL_LANGUAGES, WIKI_ENABLED, update_module_store_settings, ASSET_IGNORE_REGEX, COURSE_ASSETS_DISK_CACHE,
+    COURSE_ASSETS_CHUNK_CACHE,
     PARENTAL_CONSENT_AGE_LIMIT, REGISTRATION_EMAIL_PATTERNS_ALLOWED,
     # The following PROFILE_IMAGE_* settings are included as they are
     # indirectly accessed through the email opt-in API, which is
@@ -509,6 +510,7 @@ MIDDLEWARE_CLASSES = [
     'django.middleware.locale.LocaleMiddleware',
 
     'codejail.django_integration.ConfigureCodeJailMiddleware',
+    'xmodule.util.sandboxing.ConfigureSandboxPoolMiddleware',
 
     # catches any uncaught RateLimitExceptions and returns a 403 instead of a 500
     'ratelimitbackend.middleware.RateLimitMiddleware',
@@ -599,6 +601,17 @@ MODULESTORE = {
     }
 }
 
+# Directory on the local node in which split course structures are cached
+# in memory-mapped files, shared amongst the processes on the node.  It is
+# preferably on a memory-backed filesystem, such as /dev/shm.  If
+# DIRECTORY is None, structures are not cached there.
+COURSE_STRUCTURE_SHARED_CACHE = {
+    'DIRECTORY': None,
+    # Size, in bytes, above which the least recently used structures are
+    # removed from the directory.
+    'MAX_SIZE': 1024 * 1024 * 1024,
+}
+
 # Modulestore-level field override providers. These field override providers don't
 # require student context.
 MODULESTORE_FIELD_OVERRIDE_PROVIDERS = ()
@@ -616,6 +629,16 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # A pool of warm sandboxed processes, which each run jobs in forked
+    # children with the limits above.  A size of 0 means each execution
+    # starts a new sandboxed process instead.
+    'pool': {
+        # The number of idle processes to keep in each server process.
+        'size': 0,
+        # The number of executions after which a process is replaced.
+        'max_jobs': 100,
+    },
 }
 
 ############################ DJANGO_BUILTINS ################################
@@ -1201,10 +1224,12 @@ EVENT_TRACKING_BACKENDS = {
         'OPTIONS': {
             'backends': {
                 'logger': {
-                    'ENGINE': 'eventtracking.backends.logger.LoggerBackend',
+                    'ENGINE': 'track.backends.logger.LoggerBackend',
                     'OPTIONS': {
                         'name': 'tracking',
                         'max_event_size': TRACK_MAX_EVENT,
+                        # Drop large events, as eventtracking's logger backend does.
+                        'truncate': False,
                     }
                 }
             },
@@ -8,11 +8,13 @@ from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_noop
+from edx_django_utils.cache import RequestCache
 from jsonfield.fields import JSONField
 from opaque_keys.edx.django.models import CourseKeyField
 from six import text_type
 
 from openedx.core.djangoapps.xmodule_django.models import NoneToEmptyManager
+from openedx.core.lib.cache_utils import request_cached
 from student.models import CourseEnrollment
 from student.roles import GlobalStaff
 from xmodule.modulestore.django import modulestore
@@ -24,6 +26,9 @@ FORUM_ROLE_GROUP_MODERATOR = ugettext_noop('Group Moderator')
 FORUM_ROLE_COMMUNITY_TA = ugettext_noop('Community TA')
 FORUM_ROLE_STUDENT = ugettext_noop('Student')
 
+# The namespace of the request cache of ForumsConfig.cached_current.
+FORUMS_CONFIG_CACHE_NAMESPACE = 'django_comment_common.forums_config'
+
 
 @receiver(post_save, sender=CourseEnrollment)
 def assign_default_role_on_enrollment(sender, instance, **kwargs):
@@ -176,6 +181,15 @@ class ForumsConfig(ConfigurationModel):
         help_text="Seconds to wait when trying to connect to the comment service.",
     )
 
+    @classmethod
+    @request_cached(namespace=FORUMS_CONFIG_CACHE_NAMESPACE)
+    def cached_current(cls):
+        """
+        Returns the current config, which is only read once per request, as
+        each request may make many calls to the comments service.
+        """
+        return cls.current()
+
     @property
     def api_key(self):
         """The API key used to authenticate to the comments service."""
@@ -186,6 +200,14 @@ class ForumsConfig(ConfigurationModel):
         return u"ForumsConfig: timeout={}".format(self.connection_timeout)
 
 
+@receiver(post_save, sender=ForumsConfig)
+def clear_cached_forums_config(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Clears the config cached by ForumsConfig.cached_current when it changes.
+    """
+    RequestCache(FORUMS_CONFIG_CACHE_NAMESPACE).clear()
+
+
 class CourseDiscussionSettings(models.Model):
     course_id = CourseKeyField(
         unique=True,
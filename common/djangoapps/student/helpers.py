@@ -26,7 +26,8 @@ from lms.djangoapps.certificates.api import (
 )
 from lms.djangoapps.certificates.models import (
     CertificateStatuses,
-    certificate_status_for_student
+    certificate_status_for_student,
+    certificate_statuses_for_student
 )
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
 from lms.djangoapps.verify_student.models import VerificationDeadline
@@ -127,6 +128,9 @@ def check_verify_status_by_course(user, course_enrollments):
 
     recent_verification_datetime = None
 
+    # Whether the user is verified, retrieved for the first enrollment that needs it
+    user_is_verified = None
+
     for enrollment in course_enrollments:
 
         # If the user hasn't enrolled as verified, then the course
@@ -177,12 +181,14 @@ def check_verify_status_by_course(user, course_enrollments):
             )
             if status is None and not submitted:
                 if deadline is None or deadline > datetime.now(UTC):
-                    if IDVerificationService.user_is_verified(user) and verification_expiring_soon:
+                    if user_is_verified is None:
+                        user_is_verified = IDVerificationService.user_is_verified(user)
+                    if user_is_verified and verification_expiring_soon:
                         # The user has an active verification, but the verification
                         # is set to expire within "EXPIRING_SOON_WINDOW" days (default is 4 weeks).
                         # Tell the student to reverify.
                         status = VERIFY_STATUS_NEED_TO_REVERIFY
-                    elif not IDVerificationService.user_is_verified(user):
+                    elif not user_is_verified:
                         status = VERIFY_STATUS_NEED_TO_VERIFY
                 else:
                     # If a user currently has an active or pending verification,
@@ -457,6 +463,25 @@ def cert_info(user, course_overview):
     )
 
 
+def cert_info_by_course(user, course_overviews):
+    """
+    Get the certificate info of cert_info for each of the given courses,
+    with one query for the user's certificates.
+
+    Arguments:
+        user (User): A user.
+        course_overviews (list[CourseOverview]): The courses.
+
+    Returns:
+        dict: Mapping of course keys to the dictionaries of cert_info.
+    """
+    cert_statuses = certificate_statuses_for_student(user, [course_overview.id for course_overview in course_overviews])
+    return {
+        course_overview.id: _cert_info(user, course_overview, cert_statuses[course_overview.id])
+        for course_overview in course_overviews
+    }
+
+
 def _cert_info(user, course_overview, cert_status):
     """
     Implements the logic for cert_info -- split out for testing.
@@ -7,7 +7,10 @@ import logging
 from abc import ABCMeta, abstractmethod
 from collections import defaultdict
 
+from crum import get_current_request
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from opaque_keys.edx.django.models import CourseKeyField
 
 from openedx.core.lib.cache_utils import get_cache
@@ -59,25 +62,68 @@ class BulkRoleCache(object):
 class RoleCache(object):
     """
     A cache of the CourseAccessRoles held by a particular user
+
+    The roles are loaded once per request for each user, however many User
+    objects of the user the request gets, and are indexed by the role,
+    course_id and org which has_role looks up.
+
+    The roles are only kept until the end of the request. Saving or deleting
+    a CourseAccessRole forgets its user's roles, but changes which don't
+    send the model's signals, such as QuerySet.update() or bulk_create(),
+    aren't seen within the request unless their users' roles are forgotten
+    with RoleCache.forget.
     """
+    CACHE_NAMESPACE = u"student.roles.RoleCache"
+
     def __init__(self, user):
         try:
             self._roles = BulkRoleCache.get_user_roles(user)
         except KeyError:
-            self._roles = set(
-                CourseAccessRole.objects.filter(user=user).all()
-            )
+            self._roles = self._get_user_roles(user)
+
+        self._role_keys = set(
+            (access_role.role, access_role.course_id, access_role.org)
+            for access_role in self._roles
+        )
+
+    @classmethod
+    def _get_user_roles(cls, user):
+        """
+        Return the set of CourseAccessRoles of the user, from the request
+        cache when there is a request.
+        """
+        if user.id is None or get_current_request() is None:
+            return set(CourseAccessRole.objects.filter(user=user).all())
+
+        roles_by_user = get_cache(cls.CACHE_NAMESPACE)
+        if user.id not in roles_by_user:
+            roles_by_user[user.id] = set(CourseAccessRole.objects.filter(user=user).all())
+        return roles_by_user[user.id]
+
+    @classmethod
+    def forget(cls, *user_ids):
+        """
+        Forget the roles of the users, which the request cache holds.
+        """
+        roles_by_user = get_cache(cls.CACHE_NAMESPACE)
+        for user_id in user_ids:
+            roles_by_user.pop(user_id, None)
 
     def has_role(self, role, course_id, org):
         """
         Return whether this RoleCache contains a role with the specified role, course_id, and org
         """
-        return any(
-            access_role.role == role and
-            access_role.course_id == course_id and
-            access_role.org == org
-            for access_role in self._roles
-        )
+        return (role, course_id, org) in self._role_keys
+
+
+@receiver(post_save, sender=CourseAccessRole)
+@receiver(post_delete, sender=CourseAccessRole)
+def _clear_cached_user_roles(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Forget the roles of the user whose roles changed, which the request
+    cache of RoleCache holds.
+    """
+    RoleCache.forget(instance.user_id)
 
 
 class AccessRole(object):
@@ -200,6 +246,7 @@ class RoleBase(AccessRole):
             user__in=users, role=self._role_name, org=self.org, course_id=self.course_key
         )
         entries.delete()
+        RoleCache.forget(*[user.id for user in users])
         for user in users:
             if hasattr(user, '_roles'):
                 del user._roles
@@ -400,6 +447,7 @@ class UserBasedRole(object):
         """
         entries = CourseAccessRole.objects.filter(user=self.user, role=self.role, course_id__in=course_keys)
         entries.delete()
+        RoleCache.forget(self.user.id)
         if hasattr(self.user, '_roles'):
             del self.user._roles
 
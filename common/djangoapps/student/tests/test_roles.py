@@ -2,10 +2,14 @@
 Tests of student.roles
 """
 import ddt
+from django.contrib.auth.models import User
 from django.test import TestCase
+from edx_django_utils.cache import RequestCache
+from mock import Mock, patch
 from opaque_keys.edx.keys import CourseKey
 
 from courseware.tests.factories import InstructorFactory, StaffFactory, UserFactory
+from student.models import CourseAccessRole
 from student.roles import (
     CourseBetaTesterRole,
     CourseInstructorRole,
@@ -198,3 +202,39 @@ class RoleCacheTestCase(TestCase):
     def test_empty_cache(self, role, target):
         cache = RoleCache(self.user)
         self.assertFalse(cache.has_role(*target))
+
+    @patch('student.roles.get_current_request', Mock())
+    def test_cached_for_request(self):
+        self.addCleanup(RequestCache.clear_all_namespaces)
+        CourseStaffRole(self.IN_KEY).add_users(self.user)
+
+        RoleCache(self.user)
+        with self.assertNumQueries(0):
+            cache = RoleCache(User.objects.get(id=self.user.id))
+        self.assertTrue(cache.has_role('staff', self.IN_KEY, 'edX'))
+
+    @patch('student.roles.get_current_request', Mock())
+    def test_changed_in_request(self):
+        self.addCleanup(RequestCache.clear_all_namespaces)
+        self.assertFalse(RoleCache(self.user).has_role('staff', self.IN_KEY, 'edX'))
+
+        CourseStaffRole(self.IN_KEY).add_users(self.user)
+        self.assertTrue(RoleCache(self.user).has_role('staff', self.IN_KEY, 'edX'))
+
+        CourseStaffRole(self.IN_KEY).remove_users(self.user)
+        self.assertFalse(RoleCache(self.user).has_role('staff', self.IN_KEY, 'edX'))
+
+    @patch('student.roles.get_current_request', Mock())
+    def test_forget(self):
+        self.addCleanup(RequestCache.clear_all_namespaces)
+        CourseStaffRole(self.IN_KEY).add_users(self.user)
+        self.assertTrue(RoleCache(self.user).has_role('staff', self.IN_KEY, 'edX'))
+
+        # QuerySet.update() doesn't send the signals which forget the roles.
+        CourseAccessRole.objects.filter(user=self.user).update(role='instructor')
+        self.assertTrue(RoleCache(self.user).has_role('staff', self.IN_KEY, 'edX'))
+
+        RoleCache.forget(self.user.id)
+        cache = RoleCache(self.user)
+        self.assertFalse(cache.has_role('staff', self.IN_KEY, 'edX'))
+        self.assertTrue(cache.has_role('instructor', self.IN_KEY, 'edX'))
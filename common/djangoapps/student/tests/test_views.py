@@ -10,16 +10,20 @@ from datetime import timedelta
 import ddt
 from completion.test_utils import submit_completions_for_testing, CompletionWaffleTestMixin
 from django.conf import settings
+from django.db import connection
 from django.urls import reverse
 from django.test import RequestFactory, TestCase
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.utils.timezone import now
 from mock import patch
 from opaque_keys import InvalidKeyError
 
-from bulk_email.models import BulkEmailFlag
+from bulk_email.models import BulkEmailFlag, CourseAuthorization
 from course_modes.models import CourseMode
+from course_modes.tests.factories import CourseModeFactory
 from entitlements.tests.factories import CourseEntitlementFactory
+from lms.djangoapps.certificates.models import CertificateStatuses
+from lms.djangoapps.certificates.tests.factories import GeneratedCertificateFactory
 from milestones.tests.utils import MilestonesTestCaseMixin
 from opaque_keys.edx.keys import CourseKey
 from openedx.core.djangoapps.catalog.tests.factories import ProgramFactory
@@ -32,6 +36,7 @@ from student.helpers import DISABLE_UNENROLL_CERT_STATES
 from student.models import CourseEnrollment, UserProfile
 from student.signals import REFUND_ORDER
 from student.tests.factories import CourseEnrollmentFactory, UserFactory
+from student.views.dashboard import get_dashboard_course_data
 from util.milestones_helpers import (get_course_milestones,
                                      remove_prerequisite_course,
                                      set_prerequisite_courses)
@@ -75,6 +80,10 @@ class TestStudentDashboardUnenrollments(SharedModuleStoreTestCase):
             'show_survey_button': False
         }
 
+    def mock_cert_info_by_course(self, user, course_overviews):
+        """ Return a preset certificate status for each course. """
+        return {course_overview.id: self.mock_cert(user, course_overview) for course_overview in course_overviews}
+
     @ddt.data(
         ('notpassing', 1),
         ('restricted', 1),
@@ -87,7 +96,7 @@ class TestStudentDashboardUnenrollments(SharedModuleStoreTestCase):
         """ Assert that the unenroll action is shown or not based on the cert status."""
         self.cert_status = cert_status
 
-        with patch('student.views.dashboard.cert_info', side_effect=self.mock_cert):
+        with patch('student.views.dashboard.cert_info_by_course', side_effect=self.mock_cert_info_by_course):
             response = self.client.get(reverse('dashboard'))
 
             self.assertEqual(pq(response.content)(self.UNENROLL_ELEMENT_ID).length, unenroll_action_count)
@@ -830,6 +839,99 @@ class StudentDashboardTests(SharedModuleStoreTestCase, MilestonesTestCaseMixin,
             )
 
 
+@ddt.ddt
+@unittest.skipUnless(settings.ROOT_URLCONF == 'lms.urls', 'Test only valid in lms')
+class DashboardCourseDataTests(TestCase):
+    """
+    Tests of the assembly of the dashboard data of the user's enrollments.
+    """
+
+    def setUp(self):
+        super(DashboardCourseDataTests, self).setUp()
+        BulkEmailFlag.objects.create(enabled=True, require_course_email_auth=True)
+
+    def tearDown(self):
+        super(DashboardCourseDataTests, self).tearDown()
+        BulkEmailFlag.objects.all().delete()
+
+    def get_course_data(self, user):
+        """
+        Returns the dashboard data of the user's enrollments, loaded as the
+        dashboard loads them.
+        """
+        enrollments = CourseEnrollment.enrollments_for_user_with_overviews_preload(user)
+        __, unexpired_course_modes = CourseMode.all_and_unexpired_modes_for_courses(
+            [enrollment.course_id for enrollment in enrollments]
+        )
+        course_modes_by_course = {
+            course_id: {mode.slug: mode for mode in modes}
+            for course_id, modes in unexpired_course_modes.items()
+        }
+        request = RequestFactory().get(reverse('dashboard'))
+        request.user = user
+        return get_dashboard_course_data(request, enrollments, course_modes_by_course)
+
+    def get_num_queries(self, num_enrollments):
+        """
+        Returns the number of queries to load the dashboard data of a user
+        with the number of enrollments, in a mix of modes.
+        """
+        user = UserFactory.create()
+        modes = [CourseMode.AUDIT, CourseMode.VERIFIED, CourseMode.HONOR]
+        for index in range(num_enrollments):
+            mode = modes[index % len(modes)]
+            enrollment = CourseEnrollmentFactory.create(user=user, mode=mode)
+            CourseModeFactory.create(course_id=enrollment.course_id, mode_slug=CourseMode.AUDIT)
+            CourseModeFactory.create(
+                course_id=enrollment.course_id,
+                mode_slug=CourseMode.VERIFIED,
+                expiration_datetime=now() + timedelta(days=1)
+            )
+            CourseAuthorization.objects.create(course_id=enrollment.course_id, email_enabled=bool(index % 2))
+            if mode != CourseMode.AUDIT:
+                GeneratedCertificateFactory.create(
+                    user=user,
+                    course_id=enrollment.course_id,
+                    mode=mode,
+                    status=CertificateStatuses.unavailable
+                )
+
+        # Load the configuration models into the cache first.
+        self.get_course_data(user)
+        with CaptureQueriesContext(connection) as queries:
+            self.get_course_data(user)
+        return len(queries)
+
+    def test_course_data(self):
+        user = UserFactory.create()
+        paid_enrollment = CourseEnrollmentFactory.create(user=user, mode=CourseMode.HONOR)
+        CourseModeFactory.create(course_id=paid_enrollment.course_id, mode_slug=CourseMode.HONOR, min_price=10)
+        CourseModeFactory.create(course_id=paid_enrollment.course_id, mode_slug=CourseMode.CREDIT_MODE)
+        email_enrollment = CourseEnrollmentFactory.create(user=user, mode=CourseMode.AUDIT)
+        CourseAuthorization.objects.create(course_id=email_enrollment.course_id, email_enabled=True)
+        course_ids = {paid_enrollment.course_id, email_enrollment.course_id}
+
+        course_data = self.get_course_data(user)
+        self.assertEqual(
+            course_data['enrolled_courses_either_paid'],
+            {enrollment.course_id for enrollment in CourseEnrollment.enrollments_for_user(user)
+             if enrollment.is_paid_course()}
+        )
+        self.assertEqual(course_data['enrolled_courses_either_paid'], {paid_enrollment.course_id})
+        self.assertEqual(course_data['show_email_settings_for'], {email_enrollment.course_id})
+        self.assertEqual(course_data['block_courses'], set())
+        self.assertEqual(set(course_data['cert_statuses']), course_ids)
+        self.assertEqual(set(course_data['all_course_modes']), course_ids)
+        self.assertEqual(set(course_data['show_courseware_links_for']), course_ids)
+
+    @ddt.data(1, 10, 100)
+    def test_num_queries(self, num_enrollments):
+        """
+        Verify that the number of queries doesn't grow with the number of enrollments.
+        """
+        self.assertEqual(self.get_num_queries(num_enrollments), self.get_num_queries(1))
+
+
 @unittest.skipUnless(settings.ROOT_URLCONF == 'lms.urls', 'Test only valid in lms')
 @override_settings(BRANCH_IO_KEY='test_key')
 class TextMeTheAppViewTests(UrlResetMixin, TestCase):
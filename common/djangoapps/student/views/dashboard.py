@@ -23,7 +23,7 @@ from six import text_type, iteritems
 import track.views
 from bulk_email.models import BulkEmailFlag, Optout  # pylint: disable=import-error
 from course_modes.models import CourseMode
-from courseware.access import has_access
+from courseware.access import has_access, has_access_many
 from edxmako.shortcuts import render_to_response, render_to_string
 from entitlements.models import CourseEntitlement
 from lms.djangoapps.commerce.utils import EcommerceService  # pylint: disable=import-error
@@ -45,7 +45,7 @@ from openedx.features.journals.api import journals_enabled
 from shoppingcart.api import order_history
 from shoppingcart.models import CourseRegistrationCode, DonationConfiguration
 from openedx.core.djangoapps.user_authn.cookies import set_deprecated_user_info_cookie
-from student.helpers import cert_info, check_verify_status_by_course
+from student.helpers import cert_info_by_course, check_verify_status_by_course
 from student.models import (
     CourseEnrollment,
     CourseEnrollmentAttribute,
@@ -512,6 +512,103 @@ def _credit_statuses(user, course_enrollments):
     return statuses
 
 
+def get_dashboard_course_data(request, course_enrollments, course_modes_by_course):
+    """
+    Assembles the data of the dashboard for each of the user's enrollments.
+
+    Each source of the data is retrieved once for all of the enrollments,
+    rather than once for each enrollment, so that the number of queries
+    doesn't grow with the number of enrollments.
+
+    Arguments:
+        request: The request object.
+        course_enrollments (list[CourseEnrollment]): The user's enrollments,
+            with their course overviews.
+        course_modes_by_course (dict): Mapping of course keys to dictionaries
+            of the unexpired course modes of the courses, by slug.
+
+    Returns:
+        dict: The context of the dashboard template for the enrollments:
+            * show_courseware_links_for (dict): Whether the user can load each course.
+            * all_course_modes (dict): The mode info of complete_course_mode_info for each course.
+            * cert_statuses (dict): The certificate info of cert_info for each course.
+            * verification_status_by_course (dict): See check_verify_status_by_course.
+            * show_email_settings_for (frozenset): The courses with bulk email.
+            * block_courses (frozenset): The courses blocked by an unpaid invoice.
+            * enrolled_courses_either_paid (frozenset): The paid courses.
+    """
+    user = request.user
+    course_ids = [enrollment.course_id for enrollment in course_enrollments]
+    course_overviews = [enrollment.course_overview for enrollment in course_enrollments]
+
+    # Construct a dictionary of course mode information
+    # used to render the course list.  We re-use the course modes dict
+    # we loaded earlier to avoid hitting the database.
+    course_mode_info = {
+        enrollment.course_id: complete_course_mode_info(
+            enrollment.course_id, enrollment,
+            modes=course_modes_by_course[enrollment.course_id]
+        )
+        for enrollment in course_enrollments
+    }
+
+    # Determine the per-course verification status
+    # This is a dictionary in which the keys are course locators
+    # and the values are one of:
+    #
+    # VERIFY_STATUS_NEED_TO_VERIFY
+    # VERIFY_STATUS_SUBMITTED
+    # VERIFY_STATUS_APPROVED
+    # VERIFY_STATUS_MISSED_DEADLINE
+    #
+    # Each of which correspond to a particular message to display
+    # next to the course on the dashboard.
+    #
+    # If a course is not included in this dictionary,
+    # there is no verification messaging to display.
+    verify_status_by_course = check_verify_status_by_course(user, course_enrollments)
+
+    # only show email settings for Mongo course and when bulk email is turned on
+    show_email_settings_for = frozenset(BulkEmailFlag.feature_enabled_for_courses(course_ids))
+
+    # Retrieve the registration codes the user redeemed in all of the courses
+    # at once, with their invoices, to check which courses are blocked.
+    redeemed_registration_codes = defaultdict(list)
+    for registration_code in CourseRegistrationCode.objects.filter(
+        course_id__in=course_ids,
+        registrationcoderedemption__redeemed_by=user
+    ).select_related('invoice_item__invoice'):
+        redeemed_registration_codes[registration_code.course_id].append(registration_code)
+
+    block_courses = frozenset(
+        course_id for course_id in course_ids
+        if is_course_blocked(request, redeemed_registration_codes[course_id], course_id)
+    )
+
+    # A course is paid if it's white label, which is judged by its selectable
+    # modes, as CourseEnrollment.is_paid_course does.
+    enrolled_courses_either_paid = frozenset(
+        enrollment.course_id for enrollment in course_enrollments
+        if CourseMode.is_professional_slug(enrollment.mode) or CourseMode.is_white_label(
+            enrollment.course_id,
+            modes_dict={
+                slug: mode for slug, mode in iteritems(course_modes_by_course[enrollment.course_id])
+                if slug not in CourseMode.CREDIT_MODES
+            }
+        )
+    )
+
+    return {
+        'show_courseware_links_for': dict(zip(course_ids, has_access_many(user, 'load', course_overviews))),
+        'all_course_modes': course_mode_info,
+        'cert_statuses': cert_info_by_course(user, course_overviews),
+        'verification_status_by_course': verify_status_by_course,
+        'show_email_settings_for': show_email_settings_for,
+        'block_courses': block_courses,
+        'enrolled_courses_either_paid': enrolled_courses_either_paid,
+    }
+
+
 def _get_urls_for_resume_buttons(user, enrollments):
     '''
     Checks whether a user has made progress in any of a list of enrollments.
@@ -647,11 +744,6 @@ def student_dashboard(request):
         staff_access = True
         errored_courses = modulestore().get_errored_courses()
 
-    show_courseware_links_for = {
-        enrollment.course_id: has_access(request.user, 'load', enrollment.course_overview)
-        for enrollment in course_enrollments
-    }
-
     # Find programs associated with course runs being displayed. This information
     # is passed in the template context to allow rendering of program-related
     # information on the dashboard.
@@ -677,43 +769,7 @@ def student_dashboard(request):
                 except:  # pylint: disable=bare-except
                     pass
 
-    # Construct a dictionary of course mode information
-    # used to render the course list.  We re-use the course modes dict
-    # we loaded earlier to avoid hitting the database.
-    course_mode_info = {
-        enrollment.course_id: complete_course_mode_info(
-            enrollment.course_id, enrollment,
-            modes=course_modes_by_course[enrollment.course_id]
-        )
-        for enrollment in course_enrollments
-    }
-
-    # Determine the per-course verification status
-    # This is a dictionary in which the keys are course locators
-    # and the values are one of:
-    #
-    # VERIFY_STATUS_NEED_TO_VERIFY
-    # VERIFY_STATUS_SUBMITTED
-    # VERIFY_STATUS_APPROVED
-    # VERIFY_STATUS_MISSED_DEADLINE
-    #
-    # Each of which correspond to a particular message to display
-    # next to the course on the dashboard.
-    #
-    # If a course is not included in this dictionary,
-    # there is no verification messaging to display.
-    verify_status_by_course = check_verify_status_by_course(user, course_enrollments)
-    cert_statuses = {
-        enrollment.course_id: cert_info(request.user, enrollment.course_overview)
-        for enrollment in course_enrollments
-    }
-
-    # only show email settings for Mongo course and when bulk email is turned on
-    show_email_settings_for = frozenset(
-        enrollment.course_id for enrollment in course_enrollments if (
-            BulkEmailFlag.feature_enabled(enrollment.course_id)
-        )
-    )
+    course_data = get_dashboard_course_data(request, course_enrollments, course_modes_by_course)
 
     # Verification Attempts
     # Used to generate the "you must reverify for course x" banner
@@ -724,23 +780,6 @@ def student_dashboard(request):
     statuses = ["approved", "denied", "pending", "must_reverify"]
     reverifications = reverification_info(statuses)
 
-    block_courses = frozenset(
-        enrollment.course_id for enrollment in course_enrollments
-        if is_course_blocked(
-            request,
-            CourseRegistrationCode.objects.filter(
-                course_id=enrollment.course_id,
-                registrationcoderedemption__redeemed_by=request.user
-            ),
-            enrollment.course_id
-        )
-    )
-
-    enrolled_courses_either_paid = frozenset(
-        enrollment.course_id for enrollment in course_enrollments
-        if enrollment.is_paid_course()
-    )
-
     # If there are *any* denied reverifications that have not been toggled off,
     # we'll display the banner
     denied_banner = any(item.display for item in reverifications["denied"])
@@ -798,23 +837,16 @@ def student_dashboard(request):
         'course_optouts': course_optouts,
         'staff_access': staff_access,
         'errored_courses': errored_courses,
-        'show_courseware_links_for': show_courseware_links_for,
-        'all_course_modes': course_mode_info,
-        'cert_statuses': cert_statuses,
         'credit_statuses': _credit_statuses(user, course_enrollments),
-        'show_email_settings_for': show_email_settings_for,
         'reverifications': reverifications,
         'verification_display': verification_status['should_display'],
         'verification_status': verification_status['status'],
-        'verification_status_by_course': verify_status_by_course,
         'verification_errors': verification_errors,
-        'block_courses': block_courses,
         'denied_banner': denied_banner,
         'billing_email': settings.PAYMENT_SUPPORT_EMAIL,
         'user': user,
         'logout_url': reverse('logout'),
         'platform_name': platform_name,
-        'enrolled_courses_either_paid': enrolled_courses_either_paid,
         'provider_states': [],
         'order_history_list': order_history_list,
         'courses_requirements_not_met': courses_requirements_not_met,
@@ -831,6 +863,8 @@ def student_dashboard(request):
         'empty_dashboard_message': empty_dashboard_message,
     }
 
+    context.update(course_data)
+
     if ecommerce_service.is_enabled(request.user):
         context.update({
             'use_ecommerce_payment_flow': True,
@@ -0,0 +1,199 @@
+"""
+Event tracker backend that sends events to another backend from a
+background thread, in batches.
+
+Sending events to a backend in the request, as track.tracker.send does,
+adds the time they take to serialize and store to the request's latency.
+The BufferedBackend only puts events on a bounded queue, which a background
+thread drains, sending them in batches to the backend it wraps.  When the
+queue is full, events are dropped, and counted, rather than slowing down
+requests.  The queued events are sent when the process exits, and events
+sent after the backend is closed are sent to the backend it wraps directly.
+
+Any backend can be wrapped with it in TRACKING_BACKENDS::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.buffered.BufferedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {
+                      'database': 'track',
+                  },
+              },
+              'max_queue_size': 10000,
+              'batch_size': 100,
+              'flush_interval': 1,
+          },
+      },
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import threading
+from Queue import Empty, Full, Queue
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+log = logging.getLogger(__name__)
+
+
+class BufferedBackend(BaseBackend):
+    """
+    Event tracker backend that sends events to another backend, in batches,
+    from a background thread.
+    """
+
+    def __init__(self, backend, max_queue_size=10000, batch_size=100, flush_interval=1, **kwargs):
+        """
+        Event tracker backend that sends events to another backend, in
+        batches, from a background thread.
+
+        :Parameters:
+
+          - `backend`: the configuration of the backend to send the events
+            to, with its `ENGINE` and `OPTIONS`, as in TRACKING_BACKENDS
+          - `max_queue_size`: the number of events which may wait to be sent,
+            beyond which events are dropped
+          - `batch_size`: the largest number of events sent at once
+          - `flush_interval`: the most seconds that an event waits to be
+            sent, when there are fewer than `batch_size` events
+
+        """
+        super(BufferedBackend, self).__init__(**kwargs)
+
+        # Imported here, as the tracker initializes the backends when it's imported.
+        from track.tracker import _instantiate_backend_from_name  # pylint: disable=protected-access
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+        self.backend_name = type(self.backend).__name__
+
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped_count = 0
+
+        # The queue, the locks and the thread of the process that created
+        # them, which are created again in each process forked from it.
+        self._pid = None
+        self._queue = None
+        self._flush_lock = None
+        self._wakeup = None
+        self._thread = None
+        self._closed = False
+        self._start_lock = threading.Lock()
+        self._start()
+
+        atexit.register(self.close)
+
+    def send(self, event):
+        """
+        Queue the event to be sent to the backend, or send it in the current
+        thread if the backend is closed.
+        """
+        if self._closed:
+            self._send_batch([event])
+            return
+
+        if self._pid != os.getpid():
+            # The threads of the process may all send their first event at once.
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._start()
+
+        try:
+            self._queue.put_nowait(event)
+        except Full:
+            self.dropped_count += 1
+            dog_stats_api.increment('track.buffered.dropped', tags=[u'backend:{}'.format(self.backend_name)])
+            return
+
+        if self._closed:
+            # The backend was closed after the event was queued, and may
+            # have flushed the queue already.
+            self.flush()
+        elif self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def send_batch(self, events):
+        """Queue the events to be sent to the backend."""
+        for event in events:
+            self.send(event)
+
+    def flush(self):
+        """
+        Send all of the queued events to the backend, in the current thread.
+        """
+        if self._pid != os.getpid():
+            return
+
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except Empty:
+                        break
+                if not batch:
+                    return
+                self._send_batch(batch)
+
+    def close(self):
+        """
+        Stop the background thread, and send the queued events to the
+        backend.  The events sent afterwards are sent in the current thread.
+        """
+        self._closed = True
+        if self._pid == os.getpid():
+            self._wakeup.set()
+        self.flush()
+
+    def _send_batch(self, batch):
+        """
+        Send the batch of events to the backend, in the current thread.
+        """
+        dog_stats_api.histogram(
+            'track.buffered.batch_size', len(batch), tags=[u'backend:{}'.format(self.backend_name)]
+        )
+        try:
+            self.backend.send_batch(batch)
+        except Exception:  # pylint: disable=broad-except
+            # The events are lost, but the following ones may still be sent.
+            log.exception(
+                u'Error sending %d events to the %s event tracker backend', len(batch), self.backend_name
+            )
+
+    def _start(self):
+        """
+        Create the queue, the locks and the background thread of the current
+        process.  Must be called with the start lock, unless the backend is
+        being created.
+        """
+        self._pid = os.getpid()
+        self._queue = Queue(maxsize=self.max_queue_size)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._pid, self._wakeup), name='BufferedBackend-{}'.format(self.backend_name)
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, pid, wakeup):
+        """
+        Send the queued events to the backend every flush_interval seconds,
+        or whenever the wakeup event is set, until the backend is closed or
+        started again by another process.
+        """
+        while not self._closed and self._pid == pid:
+            wakeup.wait(self.flush_interval)
+            wakeup.clear()
+            self.flush()
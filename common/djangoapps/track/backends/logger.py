@@ -2,13 +2,12 @@
 
 from __future__ import absolute_import
 
-import json
 import logging
 
 from django.conf import settings
 
 from track.backends import BaseBackend
-from track.utils import DateTimeJSONEncoder
+from track.encoding import EventEncoder
 
 log = logging.getLogger('track.backends.logger')
 application_log = logging.getLogger('track.backends.application_log')  # pylint: disable=invalid-name
@@ -21,30 +20,39 @@ class LoggerBackend(BaseBackend):
 
     """
 
-    def __init__(self, name, **kwargs):
+    def __init__(self, name, max_event_size=None, truncate=True, **kwargs):
         """Event tracker backend that uses a python logger.
 
         :Parameters:
           - `name`: identifier of the logger, which should have
             been configured using the default python mechanisms.
+          - `max_event_size`: the most characters of an event's JSON,
+            TRACK_MAX_EVENT by default.
+          - `truncate`: whether the payload of larger events is truncated
+            to fit, as it is by default, rather than the events not being
+            logged.
 
         """
         super(LoggerBackend, self).__init__(**kwargs)
 
         self.event_logger = logging.getLogger(name)
+        self.encoder = EventEncoder(max_event_size or settings.TRACK_MAX_EVENT, truncate=truncate)
 
     def send(self, event):
         try:
-            event_str = json.dumps(event, cls=DateTimeJSONEncoder)
+            event_str = self.encoder.encode(event)
         except UnicodeDecodeError:
             application_log.exception(
                 "UnicodeDecodeError Event_data: %r", event
             )
             raise
 
-        # TODO: remove trucation of the serialized event, either at a
-        # higher level during the emittion of the event, or by
-        # providing warnings when the events exceed certain size.
-        event_str = event_str[:settings.TRACK_MAX_EVENT]
+        if event_str is None:
+            application_log.warning(
+                "Event of type %r is larger than %d characters%s",
+                event.get('event_type', event.get('name')), self.encoder.max_event_size,
+                " without its payload" if self.encoder.truncate else "",
+            )
+            return
 
         self.event_logger.info(event_str)
@@ -0,0 +1,129 @@
+"""Tests for the buffered event tracker backend."""
+from __future__ import absolute_import
+
+import threading
+from unittest import TestCase
+
+from mock import patch
+
+from track.backends import BaseBackend
+from track.backends.buffered import BufferedBackend
+
+
+class InMemoryBackend(BaseBackend):
+    """A backend which keeps the batches of events it gets, for testing."""
+
+    def __init__(self, fail=False, **kwargs):
+        super(InMemoryBackend, self).__init__(**kwargs)
+        self.fail = fail
+        self.batches = []
+        self.sent = threading.Event()
+
+    def send(self, event):
+        self.send_batch([event])
+
+    def send_batch(self, events):
+        self.batches.append(events)
+        self.sent.set()
+        if self.fail:
+            raise ValueError('Failed to send')
+
+
+class TestBufferedBackend(TestCase):
+    """Tests of BufferedBackend."""
+
+    def new_backend(self, **options):
+        """Returns a BufferedBackend of an InMemoryBackend."""
+        backend = {
+            'ENGINE': 'track.backends.tests.test_buffered.InMemoryBackend',
+            'OPTIONS': options.pop('backend_options', {}),
+        }
+        options.setdefault('flush_interval', 60)
+        buffered_backend = BufferedBackend(backend=backend, **options)
+        self.addCleanup(buffered_backend.close)
+        return buffered_backend
+
+    def test_flush(self):
+        backend = self.new_backend(batch_size=2)
+        with patch.object(backend, '_wakeup'):
+            for index in range(5):
+                backend.send({'index': index})
+            self.assertEqual(backend.backend.batches, [])
+
+            backend.flush()
+        self.assertEqual(
+            backend.backend.batches,
+            [[{'index': 0}, {'index': 1}], [{'index': 2}, {'index': 3}], [{'index': 4}]]
+        )
+
+    def test_sent_in_background(self):
+        backend = self.new_backend(batch_size=2)
+        backend.send({'index': 0})
+        backend.send({'index': 1})
+        self.assertTrue(backend.backend.sent.wait(5))
+        self.assertEqual(backend.backend.batches, [[{'index': 0}, {'index': 1}]])
+
+    def test_sent_after_interval(self):
+        backend = self.new_backend(batch_size=100, flush_interval=0.01)
+        backend.send({'index': 0})
+        self.assertTrue(backend.backend.sent.wait(5))
+        self.assertEqual(backend.backend.batches, [[{'index': 0}]])
+
+    def test_full_queue(self):
+        backend = self.new_backend(max_queue_size=2)
+        with patch('track.backends.buffered.dog_stats_api') as mock_dog_stats_api:
+            for index in range(5):
+                backend.send({'index': index})
+        self.assertEqual(backend.dropped_count, 3)
+        self.assertEqual(mock_dog_stats_api.increment.call_count, 3)
+
+        backend.flush()
+        self.assertEqual(backend.backend.batches, [[{'index': 0}, {'index': 1}]])
+
+    def test_backend_error(self):
+        backend = self.new_backend(batch_size=1, backend_options={'fail': True})
+        with patch.object(backend, '_wakeup'):
+            backend.send({'index': 0})
+            backend.send({'index': 1})
+            backend.flush()
+        self.assertEqual(backend.backend.batches, [[{'index': 0}], [{'index': 1}]])
+
+    def test_forked(self):
+        backend = self.new_backend()
+        with patch('track.backends.buffered.os.getpid', return_value=-1):
+            backend.send({'index': 0})
+            self.assertEqual(backend._pid, -1)  # pylint: disable=protected-access
+            backend.close()
+        self.assertEqual(backend.backend.batches, [[{'index': 0}]])
+
+    def test_forked_started_once(self):
+        backend = self.new_backend()
+        with patch('track.backends.buffered.os.getpid', return_value=-1):
+            with patch.object(backend, '_start', wraps=backend._start) as mock_start:  # pylint: disable=protected-access
+                threads = [
+                    threading.Thread(target=backend.send, args=({'index': index},)) for index in range(10)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            self.assertEqual(mock_start.call_count, 1)
+            backend.close()
+        self.assertEqual(sorted(event['index'] for batch in backend.backend.batches for event in batch), range(10))
+
+    def test_send_after_close(self):
+        backend = self.new_backend()
+        backend.close()
+        backend.send({'index': 0})
+        self.assertEqual(backend.backend.batches, [[{'index': 0}]])
+
+    def test_close(self):
+        with patch('track.backends.buffered.atexit.register') as mock_register:
+            backend = self.new_backend()
+        mock_register.assert_called_once_with(backend.close)
+
+        backend.send({'index': 0})
+        backend.close()
+        self.assertEqual(backend.backend.batches, [[{'index': 0}]])
+        backend._thread.join(5)  # pylint: disable=protected-access
+        self.assertFalse(backend._thread.is_alive())  # pylint: disable=protected-access
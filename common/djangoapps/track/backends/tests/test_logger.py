@@ -36,3 +36,38 @@ def test_logger_backend(caplog):
 
     assert saved_events[0] == unpacked_event
     assert saved_events[1] == unpacked_event
+
+
+def test_logger_backend_max_event_size(caplog):
+    """
+    The payload of events larger than the maximum size is truncated,
+    and events which are too large without it aren't logged.
+    """
+    caplog.set_level(logging.INFO)
+    logger_name = 'track.backends.logger.test'
+    backend = LoggerBackend(name=logger_name, max_event_size=100)
+
+    backend.send({'event_type': 'test', 'event': {'answer': 'x' * 200}})
+    backend.send({'event_type': 'x' * 200, 'event': {}})
+
+    saved_events = [json.loads(e[2]) for e in caplog.record_tuples if e[0] == logger_name]
+
+    assert len(saved_events) == 1
+    assert saved_events[0]['event_type'] == 'test'
+    assert saved_events[0]['event'].startswith('{"answer": "xxx')
+
+
+def test_logger_backend_max_event_size_dropped(caplog):
+    """
+    Events larger than the maximum size aren't logged if they aren't truncated.
+    """
+    caplog.set_level(logging.INFO)
+    logger_name = 'track.backends.logger.test'
+    backend = LoggerBackend(name=logger_name, max_event_size=100, truncate=False)
+
+    backend.send({'event_type': 'test', 'event': {'answer': 'x' * 200}})
+    backend.send({'event_type': 'test', 'event': {'answer': 'x'}})
+
+    saved_events = [json.loads(e[2]) for e in caplog.record_tuples if e[0] == logger_name]
+
+    assert saved_events == [{'event_type': 'test', 'event': {'answer': 'x'}}]
@@ -0,0 +1,131 @@
+"""
+Serialization of tracking log events to JSON.
+
+The logger backends write each event as a line of JSON.  Rather than
+building a DateTimeJSONEncoder for each event, and slicing the JSON of
+large events, which leaves them as invalid JSON, the EventEncoder:
+
+* reuses the C encoder of the json module for all events;
+* converts datetimes, dates and opaque keys by a lookup of their type, rather
+  than a chain of isinstance checks in JSONEncoder.default;
+* keeps events within the size limit, either by dropping the larger ones,
+  or, if it's asked to, by truncating their `event` payload to a JSON
+  string, so that what's logged is always valid JSON.
+"""
+import json
+from datetime import date, datetime
+from json.encoder import c_make_encoder, encode_basestring_ascii
+
+from opaque_keys import OpaqueKey
+from pytz import UTC
+from six import text_type
+
+
+def _datetime_to_json(value):
+    """Returns the ISO format of the datetime, in UTC."""
+    if value.tzinfo is None:
+        # Naive datetimes are in UTC.
+        return value.isoformat() + '+00:00'
+    return value.astimezone(UTC).isoformat()
+
+
+def _date_to_json(value):
+    """Returns the ISO format of the date."""
+    return value.isoformat()
+
+
+class EventEncoder(object):
+    """
+    Serializes events to JSON, within a maximum size.
+    """
+
+    def __init__(self, max_event_size=None, truncate=False):
+        """
+        Arguments:
+            max_event_size (int) - The most characters of an event's JSON,
+                or None for no limit.
+
+            truncate (bool) - Whether the payload of larger events is
+                truncated to fit, rather than the events being dropped.
+        """
+        self.max_event_size = max_event_size
+        self.truncate = truncate
+
+        # The functions which convert the values json can't serialize, by
+        # their types.  The types of subclasses are added as they're seen.
+        self._converters = {
+            datetime: _datetime_to_json,
+            date: _date_to_json,
+        }
+
+        if c_make_encoder is not None:
+            # The arguments are those json.dumps passes by default, without
+            # the check for circular references, which events don't have.
+            self._iterencode = c_make_encoder(
+                None, self._default, encode_basestring_ascii, None, ': ', ', ', False, False, True
+            )
+        else:
+            self._iterencode = json.JSONEncoder(default=self._default, check_circular=False).iterencode
+
+    def encode(self, event):
+        """
+        Returns the JSON of the event, or None if the event can't be
+        serialized within the maximum size, without truncating its payload
+        if the encoder doesn't truncate, or even without it if it does.
+        """
+        event_str = ''.join(self._iterencode(event, 0))
+        if self.max_event_size is None or len(event_str) <= self.max_event_size:
+            return event_str
+        if not self.truncate:
+            return None
+        return self._encode_truncated(event)
+
+    def _encode_truncated(self, event):
+        """
+        Returns the JSON of the event, whose JSON is too large, with its
+        payload truncated to fit, or None if it doesn't fit.
+        """
+        if 'event' not in event:
+            return None
+
+        payload = event['event']
+        if not isinstance(payload, basestring):
+            payload = ''.join(self._iterencode(payload, 0))
+        if isinstance(payload, str):
+            # Truncate the characters of UTF-8 byte strings, not their bytes.
+            payload = payload.decode('utf-8', 'replace')
+
+        truncated_event = dict(event, event='')
+        available_size = self.max_event_size - len(''.join(self._iterencode(truncated_event, 0)))
+        if available_size < 0:
+            return None
+
+        # Find the longest prefix of the payload whose escaped characters fit.
+        shortest, longest = 0, min(len(payload), available_size)
+        while shortest < longest:
+            size = (shortest + longest + 1) // 2
+            if len(encode_basestring_ascii(payload[:size])) - 2 <= available_size:
+                shortest = size
+            else:
+                longest = size - 1
+
+        truncated_event['event'] = payload[:shortest]
+        return ''.join(self._iterencode(truncated_event, 0))
+
+    def _default(self, value):
+        """
+        Returns a value that json can serialize in place of the given one.
+        """
+        value_type = type(value)
+        converter = self._converters.get(value_type)
+        if converter is None:
+            if isinstance(value, OpaqueKey):
+                converter = text_type
+            elif isinstance(value, datetime):
+                converter = _datetime_to_json
+            elif isinstance(value, date):
+                converter = _date_to_json
+            else:
+                raise TypeError(repr(value) + ' is not JSON serializable')
+            self._converters[value_type] = converter
+        return converter(value)
@@ -0,0 +1,133 @@
+"""
+Benchmark of the serialization of typical tracking log events to JSON, by
+the EventEncoder and by json.dumps with the DateTimeJSONEncoder.
+
+Run from common/djangoapps with any Django settings, for instance:
+
+    DJANGO_SETTINGS_MODULE=lms.envs.test python -m track.tests.benchmark_encoding
+"""
+import json
+import timeit
+from datetime import datetime
+
+from pytz import UTC
+
+from track.encoding import EventEncoder
+from track.utils import DateTimeJSONEncoder
+
+REQUEST_FIELDS = {
+    'username': 'learner',
+    'session': 'a7b6c5d4e3f2a1b0c9d8e7f6a5b4c3d2',
+    'ip': '203.0.113.42',
+    'agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_13_4) AppleWebKit/537.36 (KHTML, like Gecko) '
+             'Chrome/66.0.3359.139 Safari/537.36',
+    'host': 'courses.example.com',
+    'referer': 'https://courses.example.com/courses/course-v1:edX+DemoX+Demo_Course/courseware/intro/video/',
+    'accept_language': 'en-US,en;q=0.9',
+}
+
+CONTEXT = {
+    'course_id': 'course-v1:edX+DemoX+Demo_Course',
+    'org_id': 'edX',
+    'user_id': 42,
+    'path': '/event',
+}
+
+# A play_video event from the browser, after track.shim.
+VIDEO_EVENT = dict(
+    REQUEST_FIELDS,
+    name='play_video',
+    event_type='play_video',
+    event_source='browser',
+    page='https://courses.example.com/courses/course-v1:edX+DemoX+Demo_Course/courseware/intro/video/',
+    time=datetime(2018, 5, 1, 7, 27, 10, 20000, tzinfo=UTC),
+    context=CONTEXT,
+    event='{"id": "block-v1:edX+DemoX+Demo_Course+type@video+block@0b9e39477cf34507a7a48f74be381fdd", '
+          '"currentTime": 12.4, "code": "html5"}',
+)
+
+# A problem_check event from the server, after track.shim.
+PROBLEM_EVENT = dict(
+    REQUEST_FIELDS,
+    name='problem_check',
+    event_type='problem_check',
+    event_source='server',
+    page='x_module',
+    time=datetime(2018, 5, 1, 7, 27, 10, 20000, tzinfo=UTC),
+    context=dict(
+        CONTEXT,
+        path='/courses/course-v1:edX+DemoX+Demo_Course/xblock/'
+             'block-v1:edX+DemoX+Demo_Course+type@problem+block@d1b84dcd39b0423d9e288f27f0f7f242/'
+             'handler/xmodule_handler/problem_check',
+        module={
+            'display_name': 'Multiple Choice',
+            'usage_key': 'block-v1:edX+DemoX+Demo_Course+type@problem+block@d1b84dcd39b0423d9e288f27f0f7f242',
+        },
+        asides={},
+    ),
+    event={
+        'problem_id': 'block-v1:edX+DemoX+Demo_Course+type@problem+block@d1b84dcd39b0423d9e288f27f0f7f242',
+        'state': {
+            'student_answers': {},
+            'seed': 1,
+            'done': None,
+            'correct_map': {},
+            'input_state': {'d1b84dcd39b0423d9e288f27f0f7f242_2_1': {}},
+        },
+        'answers': {'d1b84dcd39b0423d9e288f27f0f7f242_2_1': 'choice_2'},
+        'grade': 1,
+        'max_grade': 1,
+        'correct_map': {
+            'd1b84dcd39b0423d9e288f27f0f7f242_2_1': {
+                'correctness': 'correct',
+                'npoints': None,
+                'msg': '',
+                'hint': '',
+                'hintmode': None,
+                'queuestate': None,
+                'answervariable': None,
+            },
+        },
+        'success': 'correct',
+        'attempts': 1,
+        'submission': {
+            'd1b84dcd39b0423d9e288f27f0f7f242_2_1': {
+                'question': 'Which of the following is a fruit?',
+                'answer': 'Apple',
+                'response_type': 'multiplechoiceresponse',
+                'input_type': 'choicegroup',
+                'correct': True,
+                'variant': '',
+            },
+        },
+    },
+)
+
+
+def dumps(event):
+    """Serializes the event as the logger backend used to."""
+    return json.dumps(event, cls=DateTimeJSONEncoder)[:50000]
+
+
+def events_per_second(encode, event, number=20000):
+    """
+    Returns the number of times per second the function serializes the
+    event, on one core.
+    """
+    return number / timeit.timeit(lambda: encode(event), number=number)
+
+
+def main():
+    """
+    Print the number of events per second each way serializes each event.
+    """
+    encoders = [('json.dumps', dumps), ('EventEncoder', EventEncoder(max_event_size=50000).encode)]
+    print '{:<16}'.format('event') + ''.join('{:>16}'.format(name) for name, _ in encoders)
+    for name, event in [('play_video', VIDEO_EVENT), ('problem_check', PROBLEM_EVENT)]:
+        print '{:<16}'.format(name) + ''.join(
+            '{:>16.0f}'.format(events_per_second(encode, event)) for _, encode in encoders
+        )
+
+
+if __name__ == '__main__':
+    main()
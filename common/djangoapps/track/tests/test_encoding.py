@@ -0,0 +1,113 @@
+"""Tests of the serialization of events to JSON."""
+import json
+from datetime import date, datetime, timedelta
+
+import ddt
+from django.test import TestCase
+from opaque_keys.edx.keys import CourseKey
+from pytz import UTC, timezone
+
+from track.encoding import EventEncoder
+from track.utils import DateTimeJSONEncoder
+
+
+def request_event(**fields):
+    """Returns an event with the fields of a request, and the given ones."""
+    event = {
+        'username': 'learner',
+        'session': 'a7b6c5d4e3f2a1b0c9d8e7f6a5b4c3d2',
+        'ip': '127.0.0.1',
+        'agent': u'Mozilla/5.0 (\xfcnicode)',
+        'host': 'courses.example.com',
+        'referer': 'https://courses.example.com/courses/course-v1:edX+DemoX+Demo_Course/courseware',
+        'accept_language': 'en-US,en;q=0.8',
+        'event_type': 'play_video',
+        'event_source': 'browser',
+        'time': datetime(2018, 5, 1, 7, 27, 10, 20000, tzinfo=UTC),
+        'event': {'id': 'video', 'currentTime': 12.5, 'code': 'html5'},
+    }
+    event.update(fields)
+    return event
+
+
+@ddt.ddt
+class TestEventEncoder(TestCase):
+    """Tests of EventEncoder."""
+
+    def test_same_as_json(self):
+        event = request_event()
+        encoder = EventEncoder()
+        self.assertEqual(
+            json.loads(encoder.encode(event)),
+            json.loads(json.dumps(event, cls=DateTimeJSONEncoder))
+        )
+
+    def test_events(self):
+        encoder = EventEncoder()
+        for event in [request_event(), request_event(username='other', event={'currentTime': 20})]:
+            self.assertEqual(json.loads(encoder.encode(event)), json.loads(json.dumps(event, cls=DateTimeJSONEncoder)))
+
+    @ddt.data(
+        {},
+        {'name': 'edx.test'},
+        {'username': 'learner'},
+    )
+    def test_fields(self, event):
+        self.assertEqual(json.loads(EventEncoder().encode(event)), event)
+
+    @ddt.data(
+        (datetime(2012, 5, 1, 7, 27, 10, 20000), '2012-05-01T07:27:10.020000+00:00'),
+        (datetime(2012, 5, 1, 7, 27, 10, 20000, tzinfo=UTC), '2012-05-01T07:27:10.020000+00:00'),
+        (
+            timezone('US/Eastern').localize(datetime(2012, 5, 1, 3, 27, 10, 20000)),
+            '2012-05-01T07:27:10.020000+00:00'
+        ),
+        (date(2012, 5, 1), '2012-05-01'),
+        (CourseKey.from_string('course-v1:edX+DemoX+Demo_Course'), 'course-v1:edX+DemoX+Demo_Course'),
+    )
+    @ddt.unpack
+    def test_values(self, value, expected):
+        self.assertEqual(json.loads(EventEncoder().encode({'value': value})), {'value': expected})
+
+    def test_not_serializable(self):
+        with self.assertRaises(TypeError):
+            EventEncoder().encode({'value': timedelta(seconds=1)})
+
+    def assert_truncated(self, payload, payload_str):
+        """
+        Asserts that the event with the payload is serialized with a prefix
+        of the JSON of the payload, within the size limit.
+        """
+        encoder = EventEncoder(max_event_size=1000, truncate=True)
+        event_str = encoder.encode(request_event(event=payload))
+        self.assertLessEqual(len(event_str), 1000)
+        self.assertGreater(len(event_str), 990)
+
+        event = json.loads(event_str)
+        self.assertEqual(event['username'], 'learner')
+        self.assertEqual(event['event_type'], 'play_video')
+        self.assertIsInstance(event['event'], unicode)
+        self.assertTrue(payload_str.startswith(event['event']))
+
+    @ddt.data('x', '\\"', u'\u2603')
+    def test_truncated(self, character):
+        self.assert_truncated(character * 2000, character * 2000)
+
+    def test_truncated_utf8(self):
+        self.assert_truncated(u'\u2603'.encode('utf-8') * 2000, u'\u2603' * 2000)
+
+    def test_truncated_object(self):
+        self.assert_truncated({'answers': {'1_2_1': 'x' * 2000}}, '{"answers": {"1_2_1": "' + 'x' * 2000 + '"}}')
+
+    def test_dropped(self):
+        self.assertIsNone(EventEncoder(max_event_size=1000).encode(request_event(event='x' * 2000)))
+
+    def test_too_large(self):
+        encoder = EventEncoder(max_event_size=100, truncate=True)
+        self.assertIsNone(encoder.encode(request_event()))
+        self.assertIsNone(encoder.encode({'name': 'x' * 200}))
+
+    def test_within_size(self):
+        event = request_event()
+        event_str = EventEncoder().encode(event)
+        self.assertEqual(EventEncoder(max_event_size=len(event_str)).encode(event), event_str)
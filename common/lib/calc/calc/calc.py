@@ -1,12 +1,17 @@
 """
 Parser and evaluator for FormulaResponse and NumericalResponse
 
-Uses pyparsing to parse. Main function as of now is evaluator().
+Parses with a hand-written parser, falling back to pyparsing for the input
+it doesn't accept. Main functions as of now are evaluator() and
+compile_expression().
 """
 
 import math
 import numbers
 import operator
+import re
+import threading
+from collections import OrderedDict
 
 import numpy
 import scipy.constants
@@ -81,6 +86,20 @@ SUFFIXES = {
     '%': 0.01,
 }
 
+# The maximum number of compiled expressions that each process caches.
+MAX_COMPILED_EXPRESSIONS = 1024
+
+# The compiled expressions, by (math_expr, case_sensitive), in least
+# recently used order.
+# OrderedDict {(string, bool): CompiledExpression}
+_COMPILED_EXPRESSIONS = OrderedDict()
+
+# Guards _COMPILED_EXPRESSIONS, which the threads of a process share.
+_COMPILED_EXPRESSIONS_LOCK = threading.Lock()
+
+# The pyparsing grammar, once it's built by get_algebra_grammar.
+_ALGEBRA_GRAMMAR = None
+
 
 class UndefinedVariable(Exception):
     """
@@ -216,6 +235,114 @@ def eval_product(parse_result):
     return prod
 
 
+# The following few functions compile the nodes of a parse tree, given the
+# list of their compiled child nodes. Each compiled node is a function of
+# the variables and the functions to evaluate it with, and returns the
+# value the node represents, which is calculated in the same order as the
+# eval_ functions above.
+
+def compile_number(parse_result):
+    """
+    Compile a number, which doesn't depend on the variables.
+    """
+    number = eval_number(parse_result)
+    return lambda variables, functions: number
+
+
+def compile_variable(name):
+    """
+    Compile the variable with the given (casified) name.
+    """
+    return lambda variables, functions: variables[name]
+
+
+def compile_function(name, argument):
+    """
+    Compile a call of the function with the given (casified) name.
+    """
+    return lambda variables, functions: functions[name](argument(variables, functions))
+
+
+def compile_atom(parse_result):
+    """
+    Return the compiled node wrapped by the atom.
+
+    In the case of parenthesis, ignore them.
+    """
+    return next(k for k in parse_result if callable(k))
+
+
+def compile_power(parse_result):
+    """
+    Compile the exponentiation of the inputs, right to left, as eval_power.
+    """
+    operands = [k for k in parse_result if callable(k)]  # Ignore the '^' marks.
+    if len(operands) == 1:
+        return operands[0]
+
+    def evaluate_power(variables, functions):
+        """
+        Evaluate the exponentiation.
+        """
+        # Raise `b` to the power of `a`, from the right.
+        values = reversed([operand(variables, functions) for operand in operands])
+        return reduce(lambda a, b: b ** a, values)
+    return evaluate_power
+
+
+def compile_parallel(parse_result):
+    """
+    Compile the parallel resistors operator, as eval_parallel.
+
+    With arrays of values, the result is NaN at each index where one of the
+    inputs is zero.
+    """
+    operands = [k for k in parse_result if callable(k)]  # Ignore the '||' marks.
+    if len(operands) == 1:
+        return operands[0]
+
+    def evaluate_parallel(variables, functions):
+        """
+        Evaluate the parallel resistors operator.
+        """
+        values = [operand(variables, functions) for operand in operands]
+        if not any(numpy.ndim(value) for value in values):
+            if 0 in values:
+                return float('nan')
+            return 1. / sum(1. / value for value in values)
+
+        is_zero = reduce(numpy.logical_or, [numpy.equal(value, 0) for value in values])
+        values = [numpy.where(is_zero, 1., value) for value in values]
+        return numpy.where(is_zero, float('nan'), 1. / sum(1. / value for value in values))
+    return evaluate_parallel
+
+
+def compile_operations(parse_result, initial_value, initial_op, operators):
+    """
+    Compile a sum or a product, as eval_sum and eval_product.
+
+    `operators` maps the tokens of the operations to their functions, and
+    `initial_op` is used until the first token.
+    """
+    operations = []
+    current_op = initial_op
+    for token in parse_result:
+        if callable(token):
+            operations.append((current_op, token))
+        else:
+            current_op = operators[token]
+
+    def evaluate_operations(variables, functions):
+        """
+        Evaluate the operations, left to right.
+        """
+        total = initial_value
+        for current_op, operand in operations:
+            total = current_op(total, operand(variables, functions))
+        return total
+    return evaluate_operations
+
+
 def add_defaults(variables, functions, case_sensitive):
     """
     Create dictionaries with both the default and user-defined variables.
@@ -240,39 +367,131 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
      python numbers.
     -Unary functions are passed as a dictionary from string to function.
     """
-    # No need to go further.
-    if math_expr.strip() == "":
-        return float('nan')
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
+
 
-    # Parse the tree.
-    check_parens(math_expr)
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return the CompiledExpression of a string of math, which evaluates it
+    without parsing it again.
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+    The last MAX_COMPILED_EXPRESSIONS compiled expressions are cached, so
+    each distinct expression is parsed once, however many times it is
+    evaluated.
+    """
+    key = (math_expr, case_sensitive)
+    with _COMPILED_EXPRESSIONS_LOCK:
+        compiled_expression = _COMPILED_EXPRESSIONS.pop(key, None)
+        if compiled_expression is not None:
+            _COMPILED_EXPRESSIONS[key] = compiled_expression
+            return compiled_expression
+
+    # Parse outside the lock, so that other threads aren't kept waiting.
+    compiled_expression = CompiledExpression(math_expr, case_sensitive)
+    with _COMPILED_EXPRESSIONS_LOCK:
+        _COMPILED_EXPRESSIONS.pop(key, None)
+        while len(_COMPILED_EXPRESSIONS) >= MAX_COMPILED_EXPRESSIONS:
+            _COMPILED_EXPRESSIONS.popitem(last=False)
+        _COMPILED_EXPRESSIONS[key] = compiled_expression
+    return compiled_expression
+
+
+class CompiledExpression(object):
+    """
+    A parsed expression, whose tree is reduced once to nested functions of
+    the variables and functions to evaluate it with.
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
+    Evaluating the expression with numpy arrays as its variables evaluates
+    it at each of their values at once; see `evaluate_samples`.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        """
+        Parse the given math expression.
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
+        Raise UnmatchedParenthesis or a pyparsing.ParseException if it is
+        not valid.
+        """
+        self.math_expr = math_expr
+        self.case_sensitive = case_sensitive
+        self.math_interpreter = None
+        self._evaluate = None
+
+        # Empty expressions evaluate to NaN.
+        if math_expr.strip() == "":
+            return
+
+        # Parse the tree.
+        check_parens(math_expr)
+        self.math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+        self.math_interpreter.parse_algebra()
+
+        if case_sensitive:
+            casify = lambda x: x
+        else:
+            casify = lambda x: x.lower()  # Lowercase for case insens.
+
+        compile_actions = {
+            'number': compile_number,
+            'variable': lambda x: compile_variable(casify(x[0])),
+            'function': lambda x: compile_function(casify(x[0]), x[1]),
+            'atom': compile_atom,
+            'power': compile_power,
+            'parallel': compile_parallel,
+            'product': lambda x: compile_operations(
+                x, 1.0, operator.mul, {'*': operator.mul, '/': operator.truediv},
+            ),
+            'sum': lambda x: compile_operations(
+                x, 0.0, operator.add, {'+': operator.add, '-': operator.sub},
+            ),
+        }
+        self._evaluate = self.math_interpreter.reduce_tree(compile_actions)
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression with the given variables and functions, as
+        `evaluator` does.
+        """
+        # No need to go further.
+        if self._evaluate is None:
+            return float('nan')
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+        # Get our variables together.
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+
+        # ...and check them
+        self.math_interpreter.check_variables(all_variables, all_functions)
+
+        return self._evaluate(all_variables, all_functions)
+
+    def evaluate_samples(self, samples, functions):
+        """
+        Return the list of the values of the expression with each of the
+        given dicts of variables, which all have the same keys.
+
+        The samples are evaluated at once, with a numpy array of the values
+        of each variable.  Expressions that numpy can't evaluate in the same
+        way for an array as for each of its values are evaluated for each
+        sample in turn, such as those with functions that don't accept
+        arrays, or with values that raise errors, like division by zero.
+        """
+        if not samples:
+            return []
+
+        variables = {name: numpy.array([sample[name] for sample in samples]) for name in samples[0]}
+        try:
+            with numpy.errstate(divide='raise', over='raise', invalid='raise'):
+                values = self.evaluate(variables, functions)
+        except UndefinedVariable:
+            raise
+        except Exception:  # pylint: disable=broad-except
+            values = None
+
+        if numpy.shape(values) == (len(samples),):
+            return list(values)
+        elif values is not None and numpy.ndim(values) == 0:
+            # The expression doesn't depend on the variables.
+            return [values] * len(samples)
+        return [self.evaluate(sample, functions) for sample in samples]
 
 
 def check_parens(formula):
@@ -299,6 +518,313 @@ def check_parens(formula):
         raise UnmatchedParenthesis(msg.format(count))
 
 
+class ParseNode(list):
+    """
+    A named node of a parse tree from the FastParser: a list of its child
+    nodes and its terminal strings, like the pyparsing.ParseResults of the
+    same node from the pyparsing grammar.
+    """
+    def __init__(self, name, children):
+        super(ParseNode, self).__init__(children)
+        self.name = name
+
+    def getName(self):  # pylint: disable=invalid-name
+        """
+        Return the name of the node, as pyparsing.ParseResults.getName does.
+        """
+        return self.name
+
+
+class FastParseError(Exception):
+    """
+    Indicate when the FastParser does not accept an expression, which is
+    then parsed by pyparsing, to raise its pyparsing.ParseException.
+    """
+    pass
+
+
+class FastParser(object):
+    """
+    A precedence climbing parser of the grammar of `build_algebra_grammar`,
+    which gives the same parse trees as the grammar, as ParseNodes.
+
+    Each level of precedence gives a node of all of the operands at that
+    level and the operators between them, so that the tree can be reduced
+    by the same actions as the pyparsing tree.
+
+    The parser raises FastParseError for any input that it does not accept,
+    including input that the grammar might accept, so that it never gives a
+    tree that the grammar wouldn't.
+    """
+    # The names of the nodes of each level of precedence, from the lowest,
+    # with their operators.
+    LEVELS = (
+        ('sum', ('+', '-')),
+        ('product', ('*', '/')),
+        ('parallel', ('||',)),
+        ('power', ('^',)),
+    )
+
+    WHITESPACE = re.compile(r'[ \t\n\r]*')
+    INNER_NUMBER = re.compile(r'[0-9]+(?:\.[0-9]*)?|\.[0-9]+')
+    DIGITS = re.compile(r'[0-9]+')
+    # The alternative forms of variable names, in the order they are tried.
+    VARNAMES = (
+        # Tensors, such as U_{ijk}^{123} or U^{123}
+        re.compile(r"[A-Za-z][A-Za-z0-9]*(?:_\{[A-Za-z0-9]+\})?\^\{[A-Za-z0-9]+\}'*"),
+        # Tensors, such as U_{ijk}
+        re.compile(r"[A-Za-z][A-Za-z0-9]*_\{[A-Za-z0-9]+\}'*"),
+        # Variables, such as x or R_1'
+        re.compile(r"[A-Za-z][A-Za-z0-9_]*'*"),
+    )
+    FUNCTION_NAME = VARNAMES[-1]
+
+    def __init__(self, math_expr):
+        self.math_expr = math_expr
+        self.position = 0
+
+    def parse(self):
+        """
+        Return the parse tree of the expression.
+        """
+        tree = self.parse_level(0)
+        self.skip_whitespace()
+        if self.position != len(self.math_expr):
+            raise FastParseError(self.position)
+        return tree
+
+    def parse_level(self, level):
+        """
+        Parse the node of the given level of precedence at the current
+        position.
+        """
+        if level == len(self.LEVELS):
+            return self.parse_atom()
+
+        name, operators = self.LEVELS[level]
+        children = []
+        if name == 'sum':
+            # Allow a leading + or -.
+            sign = self.match_literal(operators)
+            if sign is not None:
+                children.append(sign)
+        children.append(self.parse_level(level + 1))
+        while True:
+            operator_token = self.match_literal(operators)
+            if operator_token is None:
+                return ParseNode(name, children)
+            children.append(operator_token)
+            children.append(self.parse_level(level + 1))
+
+    def parse_atom(self):
+        """
+        Parse a number, a function, a variable, or a parenthesized
+        expression at the current position.
+        """
+        self.skip_whitespace()
+        for parse in (self.parse_number, self.parse_function, self.parse_variable):
+            node = parse()
+            if node is not None:
+                return ParseNode('atom', [node])
+
+        if self.match_literal(('(',)) is None:
+            raise FastParseError(self.position)
+        expr = self.parse_level(0)
+        if self.match_literal((')',)) is None:
+            raise FastParseError(self.position)
+        return ParseNode('atom', ['(', expr, ')'])
+
+    def parse_number(self):
+        """
+        Parse a number at the current position, or return None if there is
+        no number there.
+        """
+        start = self.position
+        children = []
+        sign = self.match_literal(('+', '-'))
+        if sign is not None:
+            children.append(sign)
+            self.skip_whitespace()
+        inner_number = self.match_regex(self.INNER_NUMBER)
+        if inner_number is None:
+            self.position = start
+            return None
+        children.append(inner_number)
+
+        # The exponent is optional, but nothing else may follow an 'E'.
+        self.skip_whitespace()
+        if self.math_expr[self.position:self.position + 1] in ('e', 'E'):
+            self.position += 1
+            children.append('E')
+            sign = self.match_literal(('+', '-'))
+            if sign is not None:
+                children.append(sign)
+            self.skip_whitespace()
+            digits = self.match_regex(self.DIGITS)
+            if digits is None:
+                raise FastParseError(self.position)
+            children.append(digits)
+
+        suffix = self.match_literal(tuple(SUFFIXES))
+        if suffix is not None:
+            children.append(suffix)
+        return ParseNode('number', children)
+
+    def parse_function(self):
+        """
+        Parse a function at the current position, or return None if there
+        is no function there.
+        """
+        start = self.position
+        name = self.match_regex(self.FUNCTION_NAME)
+        if name is None or self.match_literal(('(',)) is None:
+            self.position = start
+            return None
+        # Nothing else may follow a name and a parenthesis.
+        expr = self.parse_level(0)
+        if self.match_literal((')',)) is None:
+            raise FastParseError(self.position)
+        return ParseNode('function', [name, expr])
+
+    def parse_variable(self):
+        """
+        Parse a variable at the current position, or return None if there
+        is no variable there.
+        """
+        for varname in self.VARNAMES:
+            name = self.match_regex(varname)
+            if name is not None:
+                return ParseNode('variable', [name])
+        return None
+
+    def skip_whitespace(self):
+        """
+        Skip the whitespace at the current position.
+        """
+        self.position = self.WHITESPACE.match(self.math_expr, self.position).end()
+
+    def match_literal(self, literals):
+        """
+        Skip whitespace, and return the first of the given literals at the
+        current position, or None if there is none.
+        """
+        self.skip_whitespace()
+        for literal in literals:
+            if self.math_expr.startswith(literal, self.position):
+                self.position += len(literal)
+                return literal
+        return None
+
+    def match_regex(self, regex):
+        """
+        Return the match of the given regex at the current position, or
+        None if there is none.
+        """
+        match = regex.match(self.math_expr, self.position)
+        if match is None:
+            return None
+        self.position = match.end()
+        return match.group()
+
+
+def build_algebra_grammar():
+    """
+    Build the pyparsing grammar of algebraic expressions.
+
+    Parsing an expression gives a `pyparsing.ParseResult` with proper
+    groupings to reflect parenthesis and order of operations. All operators
+    are left in the tree, and no strings of numbers are parsed into their
+    float versions.
+    """
+    # 0.33 or 7 or .34 or 16.
+    number_part = Word(nums)
+    inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+    # pyparsing allows spaces between tokens--`Combine` prevents that.
+    inner_number = Combine(inner_number)
+
+    # SI suffixes and percent.
+    number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+    # 0.33k or 17
+    plus_minus = Literal('+') | Literal('-')
+    number = Group(
+        Optional(plus_minus) +
+        inner_number +
+        Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+        Optional(number_suffix)
+    )
+    number = number("number")
+
+    # Predefine recursive variables.
+    expr = Forward()
+
+    # Handle variables passed in. They must start with a letter
+    # and may contain numbers and underscores afterward.
+    inner_varname = Combine(Word(alphas, alphanums + "_") + ZeroOrMore("'"))
+    # Alternative variable name in tensor format
+    # Tensor name must start with a letter, continue with alphanums
+    # Indices may be alphanumeric
+    # e.g., U_{ijk}^{123}
+    upper_indices = Literal("^{") + Word(alphanums) + Literal("}")
+    lower_indices = Literal("_{") + Word(alphanums) + Literal("}")
+    tensor_lower = Combine(Word(alphas, alphanums) + lower_indices + ZeroOrMore("'"))
+    tensor_mixed = Combine(Word(alphas, alphanums) + Optional(lower_indices) + upper_indices + ZeroOrMore("'"))
+    # Test for mixed tensor first, then lower tensor alone, then generic variable name
+    varname = Group(tensor_mixed | tensor_lower | inner_varname)("variable")
+
+    # Same thing for functions.
+    function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+    atom = number | function | varname | "(" + expr + ")"
+    atom = Group(atom)("atom")
+
+    # Do the following in the correct order to preserve order of operation.
+    pow_term = atom + ZeroOrMore("^" + atom)
+    pow_term = Group(pow_term)("power")
+
+    par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+    par_term = Group(par_term)("parallel")
+
+    prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+    prod_term = Group(prod_term)("product")
+
+    sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+    sum_term = Group(sum_term)("sum")
+
+    # Finish the recursion.
+    expr << sum_term  # pylint: disable=pointless-statement
+    return expr + stringEnd
+
+
+def get_algebra_grammar():
+    """
+    Return the pyparsing grammar of algebraic expressions, which is built
+    once per process.
+    """
+    global _ALGEBRA_GRAMMAR  # pylint: disable=global-statement
+    if _ALGEBRA_GRAMMAR is None:
+        _ALGEBRA_GRAMMAR = build_algebra_grammar()
+    return _ALGEBRA_GRAMMAR
+
+
+def fast_parse(math_expr):
+    """
+    Return the parse tree of the expression from the FastParser.
+
+    Raise FastParseError if the parser does not accept the expression.
+    """
+    return FastParser(math_expr).parse()
+
+
+def pyparsing_parse(math_expr):
+    """
+    Return the parse tree of the expression from the pyparsing grammar.
+
+    Raise pyparsing.ParseException if the expression is not valid.
+    """
+    return get_algebra_grammar().parseString(math_expr)[0]
+
+
 class ParseAugmenter(object):
     """
     Holds the data for a particular parse.
@@ -319,95 +845,42 @@ class ParseAugmenter(object):
         self.variables_used = set()
         self.functions_used = set()
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
-
     def parse_algebra(self):
         """
         Parse an algebraic expression into a tree.
 
-        Store a `pyparsing.ParseResult` in `self.tree` with proper groupings to
-        reflect parenthesis and order of operations. Leave all operators in the
-        tree and do not parse any strings of numbers into their float versions.
+        Store a tree in `self.tree` with proper groupings to reflect
+        parenthesis and order of operations, as described in
+        `build_algebra_grammar`. The tree is from the FastParser, or, for the
+        expressions it does not accept, from pyparsing, which raises a
+        `pyparsing.ParseException` if the expression is not valid.
 
         Adding the groups and result names makes the `repr()` of the result
         really gross. For debugging, use something like
           print OBJ.tree.asXML()
+        on the tree from `pyparsing_parse`.
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with a letter
-        # and may contain numbers and underscores afterward.
-        inner_varname = Combine(Word(alphas, alphanums + "_") + ZeroOrMore("'"))
-        # Alternative variable name in tensor format
-        # Tensor name must start with a letter, continue with alphanums
-        # Indices may be alphanumeric
-        # e.g., U_{ijk}^{123}
-        upper_indices = Literal("^{") + Word(alphanums) + Literal("}")
-        lower_indices = Literal("_{") + Word(alphanums) + Literal("}")
-        tensor_lower = Combine(Word(alphas, alphanums) + lower_indices + ZeroOrMore("'"))
-        tensor_mixed = Combine(Word(alphas, alphanums) + Optional(lower_indices) + upper_indices + ZeroOrMore("'"))
-        # Test for mixed tensor first, then lower tensor alone, then generic variable name
-        varname = Group(tensor_mixed | tensor_lower | inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
-
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=pointless-statement
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        try:
+            self.tree = fast_parse(self.math_expr)
+        except FastParseError:
+            self.tree = pyparsing_parse(self.math_expr)
+
+        # Store the variables and functions used.
+        def find_names(node):
+            """
+            Add the names of the variables and functions of the node and of
+            its descendants to `variables_used` and `functions_used`.
+            """
+            if not isinstance(node, (ParseResults, ParseNode)):
+                return
+            if node.getName() == 'variable':
+                self.variables_used.add(node[0])
+            elif node.getName() == 'function':
+                self.functions_used.add(node[0])
+            for child in node:
+                find_names(child)
+
+        find_names(self.tree)
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
@@ -429,7 +902,7 @@ class ParseAugmenter(object):
             Call the appropriate `handle_action` for this node. As its inputs,
             feed it the output of `handle_node` for each child node.
             """
-            if not isinstance(node, ParseResults):
+            if not isinstance(node, (ParseResults, ParseNode)):
                 # Then treat it as a terminal node.
                 if terminal_converter is None:
                     return node
@@ -0,0 +1,67 @@
+"""
+Microbenchmarks of the parsers of calc.py on typical student input.
+
+Run with `python -m calc.tests.benchmark_parsers` from common/lib/calc to
+compare the time of the FastParser and of the pyparsing grammar.
+"""
+import timeit
+
+from calc import calc
+
+# Typical answers to NumericalResponse and FormulaResponse problems.
+STUDENT_INPUTS = [
+    # Numbers and suffixes
+    '3.14159',
+    '-.5',
+    '4%',
+    '1E-3',
+    '6.02e23',
+    '12.5 %',
+    # Operators and parallel resistors
+    '1 + 2 * 3 - 4 / 5',
+    '-x^2^3',
+    'R1 || R2',
+    '5e3 || 4e3',
+    '1 || 2 || (3 + 4)',
+    # Variables, tensors and functions
+    "R_1' + R_2''",
+    'U_{ij}^{12} * x',
+    'sin(x)^2 + cos(x)^2',
+    'sqrt(x^2 + y^2) / (2*pi*f*C)',
+    'exp(-t/tau) * (1 - e^(-1))',
+    # Larger expressions
+    '(a + b)*(c - d)/(e + f*g) + log10(h) - 3.2e-4 * (k || m)',
+    'arctan(y/x) + 2*pi*(n + 1/2) - sin(theta)*cos(phi) / (1 + x^2)',
+]
+
+PARSERS = [
+    ('fast', calc.fast_parse),
+    ('pyparsing', calc.pyparsing_parse),
+]
+
+
+def benchmark(parse, number=200):
+    """
+    Return the average time, in microseconds, that the given parse
+    function takes for each of the student inputs.
+    """
+    parse('0')  # Build the grammar.
+    return [
+        timeit.timeit(lambda math_expr=math_expr: parse(math_expr), number=number) / number * 1e6
+        for math_expr in STUDENT_INPUTS
+    ]
+
+
+def main():
+    """
+    Print the time of each parser for each of the student inputs.
+    """
+    results = [(name, benchmark(parse)) for name, parse in PARSERS]
+    print '{:<70}'.format('input') + ''.join('{:>12}'.format(name) for name, _ in results)
+    for index, math_expr in enumerate(STUDENT_INPUTS):
+        print '{:<70}'.format(math_expr) + ''.join('{:>12.1f}'.format(times[index]) for _, times in results)
+    print '{:<70}'.format('total (us)') + ''.join('{:>12.1f}'.format(sum(times)) for _, times in results)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,14 @@
 Unit tests for calc.py
 """
 
+import random
+import threading
 import unittest
 import numpy
 import calc
-from pyparsing import ParseException
+from calc.tests.benchmark_parsers import STUDENT_INPUTS
+from mock import Mock, patch
+from pyparsing import ParseException, ParseResults
 
 # numpy's default behavior when it evaluates a function outside its domain
 # is to raise a warning (not an exception) which is then printed to STDOUT.
@@ -554,3 +558,164 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({}, {}, "(1+2")
         with self.assertRaisesRegexp(calc.UnmatchedParenthesis, 'no matching opening parenthesis'):
             calc.evaluator({}, {}, "(1+2))")
+
+
+class ParserTest(unittest.TestCase):
+    """
+    Check that the FastParser gives the same parse trees as the pyparsing
+    grammar
+    """
+    # Pieces of expressions, to make up random expressions from.
+    TOKENS = [
+        'x', 'y1', "R_1'", 'U_{ij}', 'U^{1}', 'U_{a}^{b}', 'sin', 'e', 'E', 'k', '_', '{', '}', "'",
+        '(', ')', '+', '-', '*', '/', '^', '||', '%', '.', ',',
+        '3', '.5', '2.', '1e3', '1E-3', '4%', ' ',
+    ]
+
+    def tree(self, node):
+        """
+        Return the name and the children of the node as tuples, to compare
+        the trees of both parsers.
+        """
+        if isinstance(node, (ParseResults, calc.calc.ParseNode)):
+            return (node.getName(), [self.tree(child) for child in node])
+        return node
+
+    def assert_same_tree(self, math_expr):
+        """
+        Check that the FastParser parses the expression as pyparsing does,
+        or doesn't accept it.
+        """
+        try:
+            fast_tree = self.tree(calc.calc.fast_parse(math_expr))
+        except calc.calc.FastParseError:
+            with self.assertRaises(ParseException):
+                calc.calc.pyparsing_parse(math_expr)
+        else:
+            self.assertEqual(fast_tree, self.tree(calc.calc.pyparsing_parse(math_expr)), math_expr)
+
+    def test_student_inputs(self):
+        for math_expr in STUDENT_INPUTS:
+            calc.calc.fast_parse(math_expr)
+            self.assert_same_tree(math_expr)
+
+    def test_whitespace(self):
+        for math_expr in ['- 3', '2 e3', '3 e- 4', '1.5 %', 'sin (x)', ' ( x ) ', '1 | | 2', 'x \' ']:
+            self.assert_same_tree(math_expr)
+
+    def test_random_expressions(self):
+        generator = random.Random(0)
+        for _ in range(2000):
+            tokens = [generator.choice(self.TOKENS) for _ in range(generator.randint(1, 8))]
+            self.assert_same_tree(''.join(tokens))
+
+    def test_fallback(self):
+        # The errors are from pyparsing.
+        with self.assertRaises(ParseException):
+            calc.evaluator({}, {}, '1 +* 2')
+        with self.assertRaises(ParseException):
+            calc.evaluator({}, {}, '3e')
+
+        # The grammar is only built once.
+        calc.calc.get_algebra_grammar()
+        with patch.object(calc.calc, 'build_algebra_grammar') as mock_build:
+            with self.assertRaises(ParseException):
+                calc.calc.pyparsing_parse('1 +* 2')
+        self.assertFalse(mock_build.called)
+
+
+class CompiledExpressionTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression and CompiledExpression
+    """
+    def setUp(self):
+        super(CompiledExpressionTest, self).setUp()
+        self.addCleanup(calc.calc._COMPILED_EXPRESSIONS.clear)  # pylint: disable=protected-access
+        self.samples = [{'x': x, 'y': y} for x, y in [(1.5, 2.0), (-0.5, 3.0), (2.0, 0.25)]]
+
+    def assert_samples_evaluated(self, math_expr, functions=None):
+        """
+        Check that all the samples evaluate to what `evaluator` gives.
+        """
+        functions = functions or {}
+        values = calc.compile_expression(math_expr).evaluate_samples(self.samples, functions)
+        expected_values = [calc.evaluator(sample, functions, math_expr) for sample in self.samples]
+        self.assertEqual(len(values), len(expected_values))
+        for value, expected_value in zip(values, expected_values):
+            numpy.testing.assert_almost_equal(value, expected_value)
+
+    def test_cache(self):
+        parse_algebra = calc.ParseAugmenter.parse_algebra
+        with patch.object(calc.ParseAugmenter, 'parse_algebra', autospec=True) as mock_parse_algebra:
+            mock_parse_algebra.side_effect = parse_algebra
+            compiled_expression = calc.compile_expression('x+1')
+            self.assertIs(calc.compile_expression('x+1'), compiled_expression)
+            self.assertEqual(calc.evaluator({'x': 2}, {}, 'x+1'), 3)
+            self.assertEqual(mock_parse_algebra.call_count, 1)
+
+            # The case sensitivity is part of the key.
+            self.assertIsNot(calc.compile_expression('x+1', case_sensitive=True), compiled_expression)
+
+    def test_least_recently_used(self):
+        with patch.object(calc.calc, 'MAX_COMPILED_EXPRESSIONS', 2):
+            compiled_expression = calc.compile_expression('1')
+            calc.compile_expression('2')
+            self.assertIs(calc.compile_expression('1'), compiled_expression)
+            calc.compile_expression('3')
+            self.assertIs(calc.compile_expression('1'), compiled_expression)
+            self.assertEqual(
+                sorted(calc.calc._COMPILED_EXPRESSIONS),  # pylint: disable=protected-access
+                [('1', False), ('3', False)],
+            )
+
+    def test_threads(self):
+        compiled_expressions = calc.calc._COMPILED_EXPRESSIONS  # pylint: disable=protected-access
+        errors = []
+
+        def compile_expressions():
+            """Compiles and evaluates expressions that evict each other."""
+            try:
+                for value in range(50):
+                    math_expr = 'x+{}'.format(value % 5)
+                    self.assertEqual(calc.compile_expression(math_expr).evaluate({'x': 1}, {}), 1 + value % 5)
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        with patch.object(calc.calc, 'MAX_COMPILED_EXPRESSIONS', 3):
+            threads = [threading.Thread(target=compile_expressions) for __ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(compiled_expressions), 3)
+
+    def test_empty_expression(self):
+        self.assertTrue(numpy.isnan(calc.compile_expression(' ').evaluate({}, {})))
+
+    def test_vectorized_samples(self):
+        function = Mock(side_effect=numpy.sin)
+        values = calc.compile_expression('f(x)^2 + y||x - 3*i').evaluate_samples(self.samples, {'f': function})
+        self.assertEqual(function.call_count, 1)
+        self.assertEqual(len(function.call_args[0][0]), 3)
+        for value, sample in zip(values, self.samples):
+            self.assertAlmostEqual(value, calc.evaluator(sample, {'f': numpy.sin}, 'f(x)^2 + y||x - 3*i'))
+
+        self.assert_samples_evaluated('2^y^x / (1 + y)')
+        self.assert_samples_evaluated('x || 0')
+        self.assert_samples_evaluated('4%')
+
+    def test_samples_evaluated_separately(self):
+        # A function that doesn't accept arrays.
+        self.assert_samples_evaluated('fact(4) + x')
+        # An error of only some of the samples.
+        self.assert_samples_evaluated('sqrt(x) + arccosh(y)')
+        with self.assertRaises(ValueError):
+            calc.compile_expression('x^0.5').evaluate_samples(self.samples, {})
+        with self.assertRaises(ZeroDivisionError):
+            calc.compile_expression('y/(x-2)').evaluate_samples(self.samples, {})
+
+    def test_samples_undefined_vars(self):
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'z'):
+            calc.compile_expression('x+z').evaluate_samples(self.samples, {})
@@ -26,10 +26,11 @@ from pytz import UTC
 
 import capa.customrender as customrender
 import capa.inputtypes as inputtypes
+import capa.problem_cache as problem_cache
 import capa.responsetypes as responsetypes
 import capa.xqueue_interface as xqueue_interface
 from capa.correctmap import CorrectMap
-from capa.safe_exec import safe_exec
+from capa.safe_exec import reads_globals_dynamically, safe_exec
 from capa.util import contextualize_text, convert_files_to_filenames
 from openedx.core.djangolib.markup import HTML
 from xmodule.stringify import stringify_children
@@ -178,13 +179,22 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
+        # parse problem XML file into an element tree, or copy the tree
+        # parsed before from the same text
+        definition_key = problem_cache.text_hash(problem_text)
+        self.tree = problem_cache.PARSED_PROBLEMS.get(definition_key)
+        if self.tree is None:
+            self.tree = etree.XML(problem_text)
 
-        self.make_xml_compatible(self.tree)
+            self.make_xml_compatible(self.tree)
 
-        # handle any <include file="foo"> tags
-        self._process_includes()
+            # Problems with includes aren't cached, since the included
+            # files may change without the problem's text changing.
+            if self.tree.find('.//include') is None:
+                problem_cache.PARSED_PROBLEMS.set(definition_key, self.tree)
+
+            # handle any <include file="foo"> tags
+            self._process_includes()
 
         # construct script processor context (eg for customresponse problems)
         if minimal_init:
@@ -864,6 +874,7 @@ class LoncapaProblem(object):
             all_code += code
 
         extra_files = []
+        context_key = None
         if all_code:
             # An asset named python_lib.zip can be imported by Python code.
             zip_lib = self.capa_system.get_python_lib_zip()
@@ -871,6 +882,15 @@ class LoncapaProblem(object):
                 extra_files.append(("python_lib.zip", zip_lib))
                 python_path.append("python_lib.zip")
 
+            # The context of the code is cached along with the results of
+            # the code, unless they are not to be cached for this problem.
+            if self.capa_system.cache is not None:
+                context_key = self._get_context_key(all_code, python_path, zip_lib)
+                cached_context = problem_cache.PROBLEM_CONTEXTS.get(context_key)
+                if cached_context is not None:
+                    cached_context['anonymous_student_id'] = self.capa_system.anonymous_student_id
+                    return cached_context
+
             try:
                 safe_exec(
                     all_code,
@@ -891,8 +911,24 @@ class LoncapaProblem(object):
         context['script_code'] = all_code
         context['python_path'] = python_path
         context['extra_files'] = extra_files or None
+        if context_key is not None:
+            problem_cache.PROBLEM_CONTEXTS.set(context_key, context)
         return context
 
+    def _get_context_key(self, all_code, python_path, zip_lib):
+        """
+        Returns the key of the context built by executing the given code
+        with the seed of this problem, for the problem context cache.
+        """
+        key_parts = [problem_cache.text_hash(all_code), repr(self.seed), repr(python_path)]
+        if zip_lib is not None:
+            key_parts.append(problem_cache.text_hash(zip_lib))
+        # The context of code which uses the learner's anonymous id, or may
+        # read it dynamically, is only shared by the learner's problems.
+        if 'anonymous_student_id' in all_code or reads_globals_dynamically(all_code):
+            key_parts.append(repr(self.capa_system.anonymous_student_id))
+        return problem_cache.text_hash(u'.'.join(key_parts))
+
     def _extract_html(self, problemtree):  # private
         """
         Main (private) function which converts Problem XML tree to HTML.
@@ -0,0 +1,86 @@
+"""
+In-process caches of the parts of LoncapaProblems that are the same for
+every learner who sees a problem.
+
+Building a LoncapaProblem parses its XML, processes its compatibility
+translations, and executes its script to build its context, each time the
+problem is loaded.  The parsed XML only depends on the problem's definition,
+and the context only depends on the script and the seed, so they are cached
+here by hashes of those, and each LoncapaProblem gets a copy of them to
+modify.
+"""
+import copy
+import hashlib
+
+from dogapi import dog_stats_api
+
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache
+
+
+def text_hash(text):
+    """
+    Returns a hash of the given text, or unicode text, for a cache key.
+    """
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    return hashlib.md5(text).hexdigest()
+
+
+class ProblemPartCache(object):
+    """
+    A least recently used cache of the parts of LoncapaProblems, which
+    returns copies of the parts it holds.
+
+    The parts are copied when they are cached as well as when they are
+    returned, so that neither the LoncapaProblem that cached a part nor any
+    of the ones that got it can change it.  The cache may be used by many
+    threads at once.
+    """
+    def __init__(self, name, max_entries):
+        """
+        Arguments:
+            name (str) - The name of the part, for metrics.
+
+            max_entries (int) - The maximum number of parts cached.
+        """
+        self.name = name
+        self.max_entries = max_entries
+
+        # The cached parts, each of size 1.
+        # SizeBoundedLRUCache {string: object}
+        self._parts = SizeBoundedLRUCache(max_size=max_entries)
+
+    def get(self, key):
+        """
+        Returns a copy of the part with the given key, or None if it is not
+        cached.
+        """
+        part = self._parts.get(key)
+        if part is None:
+            dog_stats_api.increment('capa.problem_cache.lookup', tags=[u'part:' + self.name, u'result:miss'])
+            return None
+
+        dog_stats_api.increment('capa.problem_cache.lookup', tags=[u'part:' + self.name, u'result:hit'])
+        return copy.deepcopy(part)
+
+    def set(self, key, part):
+        """
+        Caches a copy of the given part with the given key, removing the
+        least recently used parts to stay within max_entries.
+        """
+        self._parts.set(key, copy.deepcopy(part), size=1)
+
+    def clear(self):
+        """
+        Removes all of the cached parts.
+        """
+        self._parts.clear()
+
+
+# The parsed XML of problem definitions, before their scripts are executed,
+# by the hash of their text.
+PARSED_PROBLEMS = ProblemPartCache('tree', max_entries=500)
+
+# The contexts built by executing problem scripts, by the hash of their code,
+# seed and Python path.
+PROBLEM_CONTEXTS = ProblemPartCache('context', max_entries=2000)
@@ -1,3 +1,4 @@
 """Capa's specialized use of codejail.safe_exec."""
 
-from .safe_exec import safe_exec, update_hash
+from .result_cache import SafeExecResultCache
+from .safe_exec import configure_pool, reads_globals_dynamically, safe_exec, update_hash
@@ -0,0 +1,297 @@
+"""
+A pool of warm sandboxed processes for safe_exec.
+
+Running code with codejail starts a new sandboxed Python for each
+execution, which then imports numpy, scipy and the other assumed modules.
+The processes of a SandboxPool are started once with the same command as
+codejail, so they are confined by the same AppArmor profile and user, and
+import the assumed modules once.  Each of them runs each job in a new child
+forked from it, with the rlimits that codejail sets, so every execution
+still has a process of its own.  See pool_worker.py for the sandboxed side.
+
+The pool is used by safe_exec once it is configured with
+`capa.safe_exec.configure_pool`.  Its processes are started in a background
+thread when it is configured, and whenever one is replaced, so that
+requests don't wait for them to start.
+"""
+import json
+import logging
+import os
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException, json_safe
+
+from . import pool_worker
+
+log = logging.getLogger(__name__)
+
+# The source of pool_worker.py, which is run by the sandboxed processes.
+POOL_WORKER_FILE = pool_worker.__file__
+if POOL_WORKER_FILE.endswith("c"):
+    POOL_WORKER_FILE = POOL_WORKER_FILE[:-1]
+
+with open(POOL_WORKER_FILE) as pool_worker_file:
+    POOL_WORKER_PY = pool_worker_file.read()
+
+# The number of seconds that a process may take to start, or to return a
+# result beyond the REALTIME limit of its job.
+STARTUP_TIMEOUT = 30
+RESPONSE_GRACE_TIME = 5
+
+# The number of seconds that a process may take to exit when it's stopped.
+STOP_TIMEOUT = 1
+
+# The SandboxPool used by safe_exec, once it's configured.
+_POOL = None
+
+
+def configure(size, max_jobs=100, imports=()):
+    """
+    Configure safe_exec to run code in a SandboxPool with the given
+    arguments, or in a new sandboxed process for each execution if size is
+    0 or codejail isn't configured.
+    """
+    global _POOL  # pylint: disable=global-statement
+    if _POOL is not None:
+        _POOL.close()
+    _POOL = SandboxPool(size, max_jobs, imports) if size and jail_code.is_configured('python') else None
+    if _POOL is not None:
+        _POOL.warm()
+
+
+def get_pool():
+    """
+    Returns the configured SandboxPool, or None if there is none.
+    """
+    return _POOL
+
+
+class SandboxProcess(object):
+    """
+    A sandboxed process of a SandboxPool.
+    """
+    def __init__(self, imports):
+        """
+        Starts the process, and waits until it has imported the given
+        modules.
+        """
+        command = jail_code.COMMANDS['python']
+        cmd = []
+        if command.get('user'):
+            cmd.extend(['sudo', '-u', command['user']])
+        cmd.extend(command['cmdline_start'])
+        cmd.extend(['-c', POOL_WORKER_PY])
+
+        # Run in an empty directory, so that only the installed modules can
+        # be imported.
+        self.directory = tempfile.mkdtemp(prefix='codejail-pool-')
+        os.chmod(self.directory, 0o755)
+        with open(os.devnull, 'wb') as devnull:
+            self.process = subprocess.Popen(
+                cmd,
+                cwd=self.directory,
+                env={'OPENBLAS_NUM_THREADS': '1'},  # See TNL-6456
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=devnull,
+                close_fds=True,
+            )
+        self.pid = os.getpid()
+        self.jobs = 0
+        self.send({'imports': list(imports)})
+        self.receive(STARTUP_TIMEOUT)
+
+    def send(self, message):
+        """
+        Writes the message to the process.
+        """
+        pool_worker.write_message(self.process.stdin, message)
+
+    def receive(self, timeout):
+        """
+        Returns the next message from the process.
+
+        Raises:
+            SafeExecException - If the process exits or times out first.
+        """
+        deadline = time.time() + timeout
+        data = ''
+        length = None
+        stdout = self.process.stdout.fileno()
+        while length is None or len(data) < length:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not select.select([stdout], [], [], remaining)[0]:
+                raise SafeExecException("Couldn't execute jailed code: the sandbox process timed out")
+            chunk = os.read(stdout, 65536)
+            if not chunk:
+                raise SafeExecException("Couldn't execute jailed code: the sandbox process exited")
+            data += chunk
+            if length is None and len(data) >= pool_worker.HEADER.size:
+                length = pool_worker.HEADER.unpack(data[:pool_worker.HEADER.size])[0]
+                data = data[pool_worker.HEADER.size:]
+        return json.loads(data)
+
+    def execute(self, code, globals_dict):
+        """
+        Runs the code in a child of the process, and returns its response.
+        """
+        self.jobs += 1
+        self.send({'code': code, 'globals': globals_dict, 'limits': dict(jail_code.LIMITS)})
+        return self.receive(jail_code.LIMITS.get('REALTIME', 3) + RESPONSE_GRACE_TIME)
+
+    def stop(self):
+        """
+        Stops the process.
+        """
+        # The process exits at the end of its stdin.  It may be run by
+        # another user with sudo, so it can't always be killed.
+        try:
+            self.process.stdin.close()
+        except IOError:
+            pass
+        deadline = time.time() + STOP_TIMEOUT
+        while self.process.poll() is None and time.time() < deadline:
+            time.sleep(0.01)
+        if self.process.poll() is None:
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class SandboxPool(object):
+    """
+    A pool of warm sandboxed processes, which run code as codejail does.
+    """
+    def __init__(self, size, max_jobs, imports):
+        """
+        Arguments:
+            size (int) - The number of idle processes to keep.
+
+            max_jobs (int) - The number of jobs after which a process is
+                replaced.
+
+            imports (list) - The names of the modules to import in the
+                processes before they run any jobs.
+        """
+        self.size = size
+        self.max_jobs = max_jobs
+        self.imports = imports
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # The thread starting idle processes, if any, and the process it
+        # was started in.
+        self._warmer = None
+        self._warmer_pid = None
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Executes the code in a sandboxed process, as
+        codejail.safe_exec.safe_exec does.
+
+        The code has access to the globals in `globals_dict`, and any
+        changes it makes to those globals are visible in `globals_dict`
+        when this function returns.
+
+        Raises:
+            SafeExecException - If the code raises an exception, exceeds a
+                limit, or the process fails.
+            ValueError - If there are files for the code, which the pool
+                doesn't support.
+        """
+        if python_path or extra_files:
+            raise ValueError("The sandbox pool doesn't support files.")
+
+        process = self._acquire()
+        healthy = False
+        try:
+            response = process.execute(code, json_safe(globals_dict))
+            healthy = not response['recycle']
+        finally:
+            self._release(process, healthy)
+
+        if 'error' in response:
+            log.debug("Pooled sandbox execution of %s failed: %s", slug, response['error'])
+            raise SafeExecException("Couldn't execute jailed code: {}".format(response['error']))
+        globals_dict.update(response['globals'])
+
+    def warm(self):
+        """
+        Starts idle processes in a background thread, until there are
+        `size` of them, unless that thread is already running.
+        """
+        with self._lock:
+            if self._closed or (self._warmer_pid == os.getpid() and self._warmer.is_alive()):
+                return
+            self._warmer = threading.Thread(target=self._fill, name='sandbox-pool-warmer')
+            self._warmer.daemon = True
+            self._warmer_pid = os.getpid()
+        self._warmer.start()
+
+    def close(self):
+        """
+        Stops the idle processes, and starts no more.
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for process in idle:
+            process.stop()
+
+    def _fill(self):
+        """
+        Starts idle processes until there are `size` of them.
+        """
+        while True:
+            with self._lock:
+                self._forget_inherited()
+                if self._closed or len(self._idle) >= self.size:
+                    return
+            try:
+                process = SandboxProcess(self.imports)
+            except (SafeExecException, EnvironmentError):
+                log.exception("Couldn't start a sandbox process for the pool")
+                return
+            self._release(process, healthy=True)
+
+    def _forget_inherited(self):
+        """
+        Forgets the idle processes started before the current process was
+        forked, which are not ours to use.  Must be called with the lock.
+        """
+        if self._idle and self._idle[0].pid != os.getpid():
+            self._idle = []
+
+    def _acquire(self):
+        """
+        Returns an idle process, or starts one if there is none, in which
+        case more are started in the background for the next executions.
+        """
+        with self._lock:
+            self._forget_inherited()
+            if self._idle:
+                return self._idle.pop()
+        self.warm()
+        return SandboxProcess(self.imports)
+
+    def _release(self, process, healthy):
+        """
+        Returns the process to the pool, or stops it if it must not run
+        any more jobs.
+        """
+        if healthy and process.jobs < self.max_jobs:
+            with self._lock:
+                if not self._closed and len(self._idle) < self.size:
+                    self._idle.append(process)
+                    return
+        process.stop()
+        self.warm()
@@ -0,0 +1,180 @@
+"""
+The sandboxed process of a SandboxPool.
+
+This module is not imported: its source is run with `python -c` by the
+sandboxed Python that codejail is configured with, so it may only use the
+standard library.
+
+The process imports the given modules once, then reads jobs from stdin.
+It runs each job in a new child process forked from it, with the rlimits
+that codejail sets on its processes, so jobs can't affect each other or the
+state of this process.  The child can only write to a pipe for its result:
+its stdin, stdout and stderr are closed.  The result of each job is written
+to stdout, and the job and its result are collected before the next job is
+forked, so that no job can find another's data among the objects it inherits.
+
+Messages in both directions are JSON, preceded by their length.
+"""
+import gc
+import json
+import os
+import resource
+import select
+import signal
+import struct
+import sys
+import time
+import traceback
+from StringIO import StringIO
+
+HEADER = struct.Struct('>I')
+
+
+def read_message(stream):
+    """
+    Returns the next message from the stream, or None at its end.
+    """
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    return json.loads(stream.read(HEADER.unpack(header)[0]))
+
+
+def write_message(stream, message):
+    """
+    Writes the message to the stream.
+    """
+    data = json.dumps(message)
+    stream.write(HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def json_safe(globals_dict):
+    """
+    Returns the JSON-safe values of the globals, as codejail does.
+    """
+    ok_types = (type(None), int, long, float, str, unicode, list, tuple, dict)
+    safe_globals = {}
+    for name, value in globals_dict.iteritems():
+        if name == '__builtins__' or not isinstance(value, ok_types):
+            continue
+        try:
+            safe_globals[name] = json.loads(json.dumps(value))
+        except (TypeError, ValueError):
+            continue
+    return safe_globals
+
+
+def set_limits(limits):
+    """
+    Sets the rlimits of the current process, as codejail does.
+    """
+    # No subprocesses.
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    if limits.get('CPU'):
+        resource.setrlimit(resource.RLIMIT_CPU, (limits['CPU'], limits['CPU'] + 1))
+    if limits.get('VMEM'):
+        resource.setrlimit(resource.RLIMIT_AS, (limits['VMEM'], limits['VMEM']))
+    fsize = limits.get('FSIZE', 0)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))
+
+
+def run_child(job, result_fd):
+    """
+    Runs the job in the forked child, and writes its result to result_fd.
+    """
+    for fd in (0, 1, 2):
+        os.close(fd)
+    sys.stdin = StringIO()
+    sys.stdout = sys.stderr = StringIO()
+    try:
+        set_limits(job['limits'])
+        globals_dict = job['globals']
+        exec compile(job['code'], 'jailed_code', 'exec') in globals_dict  # pylint: disable=exec-used
+        result = {'globals': json_safe(globals_dict)}
+    except BaseException:  # pylint: disable=broad-except
+        result = {'error': traceback.format_exc()}
+    with os.fdopen(result_fd, 'wb') as result_file:
+        result_file.write(json.dumps(result))
+
+
+def run_job(job):
+    """
+    Returns the result of the job, run in a forked child.
+    """
+    result_read, result_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(result_read)
+            run_child(job, result_write)
+        finally:
+            os._exit(0)  # pylint: disable=protected-access
+    os.close(result_write)
+
+    # Read the result until the child closes the pipe or runs out of time.
+    chunks = []
+    deadline = time.time() + job['limits'].get('REALTIME', 3)
+    timed_out = False
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0 or not select.select([result_read], [], [], remaining)[0]:
+            timed_out = True
+            os.kill(pid, signal.SIGKILL)
+            break
+        chunk = os.read(result_read, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(result_read)
+    _, status = os.waitpid(pid, 0)
+
+    if timed_out:
+        return {'error': 'Timed out after {} seconds'.format(job['limits'].get('REALTIME', 3))}
+    try:
+        return json.loads(''.join(chunks))
+    except ValueError:
+        return {'error': 'Exited with status {}'.format(status)}
+
+
+def state():
+    """
+    Returns what must not change in this process between jobs.
+    """
+    return sorted(sys.modules), os.getcwd(), sorted(os.environ.items())
+
+
+def main():
+    """
+    Runs the jobs from stdin, until its end or a change to the state of
+    this process, after which the process must be replaced.
+    """
+    stdin, stdout = sys.stdin, sys.stdout
+    config = read_message(stdin)
+
+    for module_name in config['imports']:
+        try:
+            __import__(module_name)
+        except ImportError:
+            continue
+    write_message(stdout, {'ready': True})
+
+    initial_state = state()
+    while True:
+        job = read_message(stdin)
+        if job is None:
+            return
+        result = run_job(job)
+        result['recycle'] = state() != initial_state
+        write_message(stdout, result)
+        if result['recycle']:
+            return
+
+        # The next job is forked from this process, so it must not inherit
+        # this one's code, globals or result.
+        del job, result
+        gc.collect()
+
+
+if __name__ == '__main__':
+    main()
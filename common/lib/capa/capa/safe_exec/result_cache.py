@@ -0,0 +1,112 @@
+"""
+A two-tier cache of the results of safe_exec.
+
+Executions are cached by a hash of their code, the globals it uses, its files
+and random seed, so
+that rendering a randomized problem for many learners runs the sandbox only
+once for each distinct seed.  Results are kept in a least recently used
+cache in the process, in front of a cache shared amongst processes, such as
+a Django cache.
+"""
+import copy
+import json
+import time
+
+from dogapi import dog_stats_api
+
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache
+
+
+class SafeExecResultCache(object):
+    """
+    A cache of safe_exec results, for the `cache` argument of safe_exec.
+
+    Results are first looked up in the process, then in the shared cache,
+    from which they are kept in the process.  Results larger than
+    `max_result_size` are not cached at all, and neither tier holds a
+    result for longer than its timeout.
+
+    Callers get their own copy of a cached result, which they may change.
+    """
+    def __init__(self, shared_cache=None, max_entries=1000, max_result_size=64 * 1024,
+                 local_timeout=300, shared_timeout=24 * 60 * 60):
+        """
+        Arguments:
+            shared_cache - An object with .get(key) and .set(key, value,
+                timeout) methods, such as a Django cache, or None to only
+                cache in the process.
+
+            max_entries (int) - The maximum number of results cached in the
+                process.
+
+            max_result_size (int) - The size, in bytes of JSON, of the
+                largest result to cache.
+
+            local_timeout (int) - The number of seconds for which results
+                are cached in the process.
+
+            shared_timeout (int) - The number of seconds for which results
+                are cached in the shared cache.
+        """
+        self.shared_cache = shared_cache
+        self.max_entries = max_entries
+        self.max_result_size = max_result_size
+        self.local_timeout = local_timeout
+        self.shared_timeout = shared_timeout
+
+        # The results cached in the process, with the times they expire.
+        # SizeBoundedLRUCache {string: (float, object)}
+        self._results = SizeBoundedLRUCache(max_size=max_entries)
+
+    def get(self, key):
+        """
+        Returns the cached result with the given key, or None if it is not
+        cached.
+        """
+        now = time.time()
+        expires, result = self._results.get(key, (None, None))
+        if expires is not None and expires > now:
+            dog_stats_api.increment('capa.safe_exec.cache.lookup', tags=[u'tier:local', u'result:hit'])
+            return copy.deepcopy(result)
+        dog_stats_api.increment('capa.safe_exec.cache.lookup', tags=[u'tier:local', u'result:miss'])
+
+        if self.shared_cache is None:
+            return None
+        result = self.shared_cache.get(key)
+        if result is None:
+            dog_stats_api.increment('capa.safe_exec.cache.lookup', tags=[u'tier:shared', u'result:miss'])
+            return None
+
+        dog_stats_api.increment('capa.safe_exec.cache.lookup', tags=[u'tier:shared', u'result:hit'])
+        self._set_local(key, result, now)
+        return copy.deepcopy(result)
+
+    def set(self, key, result):
+        """
+        Caches the given result with the given key in both tiers, unless it
+        is too large.
+        """
+        try:
+            result_size = len(json.dumps(result))
+        except (TypeError, ValueError):
+            return
+        if result_size > self.max_result_size:
+            dog_stats_api.increment('capa.safe_exec.cache.skipped', tags=[u'reason:size'])
+            return
+
+        self._set_local(key, result, time.time())
+        if self.shared_cache is not None:
+            self.shared_cache.set(key, result, self.shared_timeout)
+
+    def clear(self):
+        """
+        Removes the results cached in the process.
+        """
+        self._results.clear()
+
+    def _set_local(self, key, result, now):
+        """
+        Caches a copy of the given result in the process, removing the least
+        recently used results to stay within max_entries.
+        """
+        self._results.set(key, (now + self.local_timeout, copy.deepcopy(result)), size=1)
@@ -3,11 +3,13 @@
 from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
-from . import lazymod
+from . import lazymod, pool
 from dogapi import dog_stats_api
 from six import text_type
 
 import hashlib
+import re
+import time
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -50,6 +52,24 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The names through which code can read globals that it doesn't mention,
+# such as globals()['anonymous_student_id'] or eval of a built string.
+DYNAMIC_ACCESS_NAMES = frozenset([
+    "globals", "vars", "locals", "eval", "exec", "execfile", "compile",
+    "__dict__", "__main__", "__import__", "importlib", "modules",
+])
+
+
+def configure_pool(size, max_jobs=100):
+    """
+    Run code in a pool of `size` warm sandboxed processes, which each run
+    `max_jobs` executions before they're replaced, rather than in a new
+    sandboxed process for each execution.  See pool.py.
+
+    A `size` of 0 turns the pool off.
+    """
+    pool.configure(size, max_jobs, [modname for _, modname in ASSUMED_IMPORTS])
+
 
 def update_hash(hasher, obj):
     """
@@ -74,6 +94,43 @@ def update_hash(hasher, obj):
         hasher.update(repr(obj))
 
 
+def reads_globals_dynamically(code):
+    """
+    Returns whether `code` may read globals without mentioning their names,
+    through one of the DYNAMIC_ACCESS_NAMES.
+    """
+    return not DYNAMIC_ACCESS_NAMES.isdisjoint(re.findall(r"[A-Za-z_][A-Za-z0-9_]*", code))
+
+
+def _names_in_code(code, globals_dict):
+    """
+    Returns the set of the names in `globals_dict` that `code` mentions, or
+    all of them if it may read globals dynamically.
+
+    Only these globals can affect the result of executing `code`, so the
+    others, such as the learner's anonymous id, are left out of its cache key.
+    """
+    if reads_globals_dynamically(code):
+        return set(globals_dict)
+    words = set(re.findall(r"[A-Za-z_][A-Za-z0-9_]*", code))
+    return words.intersection(globals_dict)
+
+
+def _cache_key(code, globals_dict, random_seed, python_path, extra_files):
+    """
+    Returns the key under which to cache the execution of `code`.
+
+    The key depends on the code, the random seed, the files available to the
+    code, and the values of the globals the code uses.
+    """
+    md5er = hashlib.md5()
+    md5er.update(repr(code))
+    update_hash(md5er, json_safe({name: globals_dict[name] for name in _names_in_code(code, globals_dict)}))
+    update_hash(md5er, list(python_path or []))
+    update_hash(md5er, [list(extra_file) for extra_file in extra_files or []])
+    return "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+
+
 @dog_stats_api.timed('capa.safe_exec.time')
 def safe_exec(
     code,
@@ -101,9 +158,9 @@ def safe_exec(
     `extra_files` is a list of (filename, contents) pairs.  These files are
     created in the sandbox.
 
-    `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
-    to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    `cache` is an object with .get(key) and .set(key, value) methods, such as a
+    SafeExecResultCache.  It will be used to cache the execution, taking into account
+    the code, the values of the globals it uses, the files, and the random seed.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -113,31 +170,40 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        # The globals the code doesn't use are left out of the key, so they
+        # must also be left out of the cached result, lest one learner's
+        # globals be given to another.
+        unused_names = set(globals_dict) - _names_in_code(code, globals_dict)
+        key = _cache_key(code, globals_dict, random_seed, python_path, extra_files)
         cached = cache.get(key)
         if cached is not None:
-            # We have a cached result.  The result is a pair: the exception
-            # message, if any, else None; and the resulting globals dictionary.
-            emsg, cleaned_results = cached
+            # We have a cached result.  The result is the exception message,
+            # if any, else None; the resulting globals dictionary; and, unless
+            # it was cached before the time was, the time the execution took.
+            emsg, cleaned_results = cached[:2]
+            dog_stats_api.increment('capa.safe_exec.cache', tags=[u'result:hit'])
+            if len(cached) > 2:
+                dog_stats_api.histogram('capa.safe_exec.cache.saved_time', cached[2])
             globals_dict.update(cleaned_results)
             if emsg:
                 raise SafeExecException(emsg)
             return
+        dog_stats_api.increment('capa.safe_exec.cache', tags=[u'result:miss'])
 
     # Create the complete code we'll run.
     code_prolog = CODE_PROLOG % random_seed
 
-    # Decide which code executor to use.
+    # Decide which code executor to use.  The pool doesn't support files.
+    sandbox_pool = pool.get_pool()
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif sandbox_pool is not None and not python_path and not extra_files:
+        exec_fn = sandbox_pool.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
     # Run the code!  Results are side effects in globals_dict.
+    start_time = time.time()
     try:
         exec_fn(
             code_prolog + LAZY_IMPORTS + code, globals_dict,
@@ -151,8 +217,10 @@ def safe_exec(
     # Put the result back in the cache.  This is complicated by the fact that
     # the globals dict might not be entirely serializable.
     if cache:
-        cleaned_results = json_safe(globals_dict)
-        cache.set(key, (emsg, cleaned_results))
+        cleaned_results = json_safe({
+            name: value for name, value in globals_dict.iteritems() if name not in unused_names
+        })
+        cache.set(key, (emsg, cleaned_results, time.time() - start_time))
 
     # If an exception happened, raise it now.
     if emsg:
@@ -0,0 +1,65 @@
+"""
+Benchmark of the check latency of a CustomResponse problem, with and without
+the pool of sandboxed processes.
+
+Run from common/lib/capa with the sandboxed Python that codejail uses:
+
+    python -m capa.safe_exec.tests.benchmark_pool --python-bin /edx/app/edxapp/venvs/edxapp-sandbox/bin/python \
+        --user sandbox
+"""
+import argparse
+import textwrap
+import time
+
+from codejail import jail_code
+
+from capa.safe_exec import configure_pool
+from capa.tests.helpers import new_loncapa_problem
+from capa.tests.response_xml_factory import CustomResponseXMLFactory
+
+# A check function of the kind courses use, which uses numpy.
+SCRIPT = textwrap.dedent("""
+    def check_func(expect, answer_given):
+        value = numpy.float64(answer_given)
+        return {'ok': bool(abs(value - float(expect)) < 1e-6), 'msg': 'Checked with numpy'}
+""")
+
+
+def check_latencies(checks):
+    """
+    Returns the sorted times, in milliseconds, of checking the problem the
+    given number of times.
+    """
+    xml = CustomResponseXMLFactory().build_xml(script=SCRIPT, cfn='check_func', expect='42')
+    problem = new_loncapa_problem(xml)
+    latencies = []
+    for _ in range(checks):
+        start = time.time()
+        problem.grade_answers({'1_2_1': '42'})
+        latencies.append((time.time() - start) * 1000)
+    return sorted(latencies)
+
+
+def main():
+    """
+    Print the p50 and p99 check latencies without and with the pool.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--python-bin', required=True, help='The sandboxed Python executable.')
+    parser.add_argument('--user', default=None, help='The user to run the sandboxed Python as.')
+    parser.add_argument('--checks', type=int, default=200, help='The number of checks of each mode.')
+    args = parser.parse_args()
+    jail_code.configure('python', args.python_bin, user=args.user)
+
+    print '{:<12}{:>12}{:>12}'.format('mode', 'p50 (ms)', 'p99 (ms)')
+    for mode, pool_size in [('codejail', 0), ('pool', 1)]:
+        configure_pool(pool_size)
+        latencies = check_latencies(args.checks)
+        print '{:<12}{:>12.1f}{:>12.1f}'.format(
+            mode, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)],
+        )
+    configure_pool(0)
+
+
+if __name__ == '__main__':
+    main()
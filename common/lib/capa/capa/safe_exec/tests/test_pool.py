@@ -0,0 +1,97 @@
+"""Test pool.py"""
+
+import unittest
+
+from codejail.jail_code import is_configured
+from codejail.safe_exec import SafeExecException
+from mock import patch
+from six import text_type
+
+from capa.safe_exec import configure_pool, pool, safe_exec
+
+
+class TestSandboxPool(unittest.TestCase):
+    """Test safe_exec with a pool of sandboxed processes."""
+
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        if not is_configured("python"):
+            raise unittest.SkipTest("Requires a configured codejail")
+        configure_pool(1, max_jobs=3)
+        self.addCleanup(configure_pool, 0)
+        self.wait_for_warm_pool()
+
+    def wait_for_warm_pool(self):
+        """Wait until the pool has started its idle processes."""
+        pool.get_pool()._warmer.join()  # pylint: disable=protected-access
+
+    def test_same_results(self):
+        code = "a = x * 2\nb = random.randint(0, 1000)\nc = int(math.pi)"
+        pooled_globals = {'x': 21}
+        safe_exec(code, pooled_globals, random_seed=17)
+
+        configure_pool(0)
+        jailed_globals = {'x': 21}
+        safe_exec(code, jailed_globals, random_seed=17)
+        self.assertEqual(pooled_globals, jailed_globals)
+        self.assertEqual(pooled_globals['a'], 42)
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", text_type(cm.exception))
+
+    def test_isolation(self):
+        # Each execution is in a new process.
+        safe_exec("import math; math.leaked = 1", {})
+        globals_dict = {}
+        safe_exec("import math; leaked = hasattr(math, 'leaked')", globals_dict)
+        self.assertFalse(globals_dict['leaked'])
+
+        # The code can't write to the pipes of its process.
+        with self.assertRaises(SafeExecException):
+            safe_exec("import os; os.write(1, 'forged')", {})
+        safe_exec("print 'ignored'\na = 1", globals_dict)
+        self.assertEqual(globals_dict['a'], 1)
+
+    def test_jobs_cannot_see_each_other(self):
+        # The next job is forked from the same process, which must not keep
+        # the previous job's globals or result.
+        safe_exec("learner_answer = ['secret']", {'learner_secret': ['secret']})
+        globals_dict = {}
+        safe_exec(
+            "import gc\n"
+            "leaked = any(\n"
+            "    isinstance(obj, dict) and ('learner_secret' in obj or 'learner_answer' in obj)\n"
+            "    for obj in gc.get_objects()\n"
+            ")\n",
+            globals_dict,
+        )
+        self.assertFalse(globals_dict['leaked'])
+
+    def test_warm(self):
+        # The pool starts its processes before they're needed, and replaces
+        # those that have run their jobs.
+        process = pool.get_pool()._idle[0]  # pylint: disable=protected-access
+        with patch.object(pool, 'SandboxProcess', wraps=pool.SandboxProcess) as mock_process:
+            for _ in range(3):
+                safe_exec("a = 1", {})
+            self.assertEqual(process.jobs, 3)
+            self.wait_for_warm_pool()
+            self.assertEqual(mock_process.call_count, 1)
+        self.assertEqual(len(pool.get_pool()._idle), 1)  # pylint: disable=protected-access
+        self.assertNotIn(process, pool.get_pool()._idle)  # pylint: disable=protected-access
+
+    def test_max_jobs(self):
+        safe_exec("a = 1", {})
+        process = pool.get_pool()._idle[0]  # pylint: disable=protected-access
+        for _ in range(2):
+            safe_exec("a = 1", {})
+        self.assertNotIn(process, pool.get_pool()._idle)  # pylint: disable=protected-access
+
+    def test_files_are_not_pooled(self):
+        with patch.object(pool.SandboxPool, 'safe_exec') as mock_pool_exec:
+            safe_exec("a = 1", {}, extra_files=[('data.txt', 'data')])
+            self.assertFalse(mock_pool_exec.called)
+            safe_exec("a = 1", {})
+            self.assertTrue(mock_pool_exec.called)
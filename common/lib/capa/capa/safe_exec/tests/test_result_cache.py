@@ -0,0 +1,87 @@
+"""Test result_cache.py"""
+
+import unittest
+
+from mock import Mock, call, patch
+
+from capa.safe_exec import SafeExecResultCache
+
+
+class TestSafeExecResultCache(unittest.TestCase):
+    """Test the two tiers of SafeExecResultCache."""
+
+    def setUp(self):
+        super(TestSafeExecResultCache, self).setUp()
+        self.shared_results = {}
+        self.shared_cache = Mock(
+            get=Mock(side_effect=self.shared_results.get),
+            set=Mock(side_effect=lambda key, result, timeout: self.shared_results.__setitem__(key, result)),
+        )
+        self.cache = SafeExecResultCache(self.shared_cache, max_entries=2, max_result_size=100)
+
+    def test_local_then_shared(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', (None, {'a': 1}, 0.5))
+        self.shared_cache.set.assert_called_once_with('key', (None, {'a': 1}, 0.5), 24 * 60 * 60)
+
+        # The result is in the process.
+        self.shared_cache.get.reset_mock()
+        self.assertEqual(self.cache.get('key'), (None, {'a': 1}, 0.5))
+        self.assertFalse(self.shared_cache.get.called)
+
+        # Another process gets the result from the shared cache, and keeps it.
+        cache = SafeExecResultCache(self.shared_cache)
+        self.assertEqual(cache.get('key'), (None, {'a': 1}, 0.5))
+        self.assertEqual(cache.get('key'), (None, {'a': 1}, 0.5))
+        self.shared_cache.get.assert_called_once_with('key')
+
+    def test_least_recently_used(self):
+        cache = SafeExecResultCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual([cache.get(key) for key in 'abc'], [1, None, 3])
+
+    def test_local_timeout(self):
+        with patch('capa.safe_exec.result_cache.time.time', return_value=1000):
+            self.cache.set('key', 1)
+        self.shared_results.clear()
+        with patch('capa.safe_exec.result_cache.time.time', return_value=1000 + 299):
+            self.assertEqual(self.cache.get('key'), 1)
+        with patch('capa.safe_exec.result_cache.time.time', return_value=1000 + 300):
+            self.assertIsNone(self.cache.get('key'))
+
+    def test_max_result_size(self):
+        self.cache.set('key', (None, {'a': 'x' * 100}))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.shared_cache.set.called)
+
+    def test_results_are_copied(self):
+        result = (None, {'a': [1]})
+        self.cache.set('key', result)
+        result[1]['a'].append(2)
+        self.cache.get('key')[1]['a'].append(3)
+        self.assertEqual(self.cache.get('key'), (None, {'a': [1]}))
+
+    @patch('capa.safe_exec.result_cache.dog_stats_api')
+    def test_lookup_metrics(self, mock_stats):
+        self.cache.get('key')
+        self.assertEqual(mock_stats.increment.mock_calls, [
+            call('capa.safe_exec.cache.lookup', tags=[u'tier:local', u'result:miss']),
+            call('capa.safe_exec.cache.lookup', tags=[u'tier:shared', u'result:miss']),
+        ])
+
+        mock_stats.reset_mock()
+        SafeExecResultCache().get('key')
+        self.assertEqual(mock_stats.increment.mock_calls, [
+            call('capa.safe_exec.cache.lookup', tags=[u'tier:local', u'result:miss']),
+        ])
+
+    def test_without_shared_cache(self):
+        cache = SafeExecResultCache()
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', 1)
+        self.assertEqual(cache.get('key'), 1)
+        cache.clear()
+        self.assertIsNone(cache.get('key'))
@@ -8,9 +8,10 @@ import textwrap
 import unittest
 
 import pytest
+from mock import Mock
 from six import text_type
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import SafeExecResultCache, safe_exec, update_hash
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -118,8 +119,9 @@ class TestSafeExecCaching(unittest.TestCase):
         # Cache miss
         safe_exec("a = int(math.pi)", g, cache=DictCache(cache))
         self.assertEqual(g['a'], 3)
-        # A result has been cached
-        self.assertEqual(cache.values()[0], (None, {'a': 3}))
+        # A result has been cached, with the time the execution took
+        self.assertEqual(cache.values()[0][:2], (None, {'a': 3}))
+        self.assertGreaterEqual(cache.values()[0][2], 0)
 
         # Fiddle with the cache, then try it again.
         cache[cache.keys()[0]] = (None, {'a': 17})
@@ -149,7 +151,7 @@ class TestSafeExecCaching(unittest.TestCase):
 
         # The exception should be in the cache now.
         self.assertEqual(len(cache), 1)
-        cache_exc_msg, cache_globals = cache.values()[0]
+        cache_exc_msg, cache_globals = cache.values()[0][:2]
         self.assertIn("ZeroDivisionError", cache_exc_msg)
 
         # Change the value stored in the cache, the result should change.
@@ -167,6 +169,44 @@ class TestSafeExecCaching(unittest.TestCase):
         safe_exec(code, g, cache=DictCache(cache))
         self.assertEqual(g['a'], 17)
 
+    def test_result_cache(self):
+        # Identical seeded executions run the code only once for each seed.
+        # Each execution sets its result in the cache.
+        cache = Mock(wraps=SafeExecResultCache(max_entries=10))
+        for seed in [1, 2, 1, 2, 1]:
+            safe_exec("a = random.random()", {}, random_seed=seed, cache=cache)
+        self.assertEqual(cache.set.call_count, 2)
+
+    def test_result_cache_ignores_unused_globals(self):
+        # Learners share results unless the code uses the globals that differ.
+        cache = Mock(wraps=SafeExecResultCache(max_entries=10))
+        for student_id in ['alice', 'bob']:
+            g = {'anonymous_student_id': student_id, 'x': 1}
+            safe_exec("a = x + random.random()", g, random_seed=1, cache=cache)
+            self.assertEqual(g['anonymous_student_id'], student_id)
+        self.assertEqual(cache.set.call_count, 1)
+
+        for student_id in ['alice', 'bob']:
+            g = {'anonymous_student_id': student_id}
+            safe_exec("a = anonymous_student_id.upper()", g, random_seed=1, cache=cache)
+            self.assertEqual(g['a'], student_id.upper())
+        self.assertEqual(cache.set.call_count, 3)
+
+    def test_result_cache_globals_read_dynamically(self):
+        # Code which may read globals without naming them isn't shared by learners.
+        cache = Mock(wraps=SafeExecResultCache(max_entries=10))
+        codes = [
+            "a = globals()['anonymous_student_id']",
+            "a = vars()['anonymous_student_id']",
+            "a = eval('anonymous' + '_student_id')",
+        ]
+        for code in codes:
+            for student_id in ['alice', 'bob']:
+                g = {'anonymous_student_id': student_id}
+                safe_exec(code, g, random_seed=1, cache=cache)
+                self.assertEqual(g['a'], student_id)
+        self.assertEqual(cache.set.call_count, 6)
+
     def test_unicode_submission(self):
         # Check that using non-ASCII unicode does not raise an encoding error.
         # Try several non-ASCII unicode characters.
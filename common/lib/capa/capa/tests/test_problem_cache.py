@@ -0,0 +1,185 @@
+"""
+Tests of the caches of parsed problems and problem contexts.
+"""
+import textwrap
+import threading
+import unittest
+
+from lxml import etree
+from mock import patch
+
+from capa import problem_cache
+from capa.capa_problem import LoncapaProblem
+from capa.tests.helpers import new_loncapa_problem, test_capa_system
+
+SCRIPT_PROBLEM_XML = textwrap.dedent("""
+    <problem>
+        <script type="loncapa/python">
+    answer = random.randint(1, 1000)
+        </script>
+        <customresponse cfn="check" expect="$answer">
+            <textline/>
+        </customresponse>
+    </problem>
+""")
+
+
+class DictCache(object):
+    """A cache implementation over a simple dict, for testing."""
+
+    def __init__(self):
+        self.cache = {}
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache[key] = value
+
+
+class ProblemPartCacheTest(unittest.TestCase):
+    """
+    Tests of ProblemPartCache.
+    """
+    def test_miss(self):
+        cache = problem_cache.ProblemPartCache('test', max_entries=10)
+        self.assertIsNone(cache.get('key'))
+
+    def test_copies(self):
+        cache = problem_cache.ProblemPartCache('test', max_entries=10)
+        part = {'answer': [1, 2]}
+        cache.set('key', part)
+        part['answer'].append(3)
+
+        cached_part = cache.get('key')
+        self.assertEqual(cached_part, {'answer': [1, 2]})
+        cached_part['answer'].append(4)
+        self.assertEqual(cache.get('key'), {'answer': [1, 2]})
+
+    def test_copies_trees(self):
+        cache = problem_cache.ProblemPartCache('test', max_entries=10)
+        cache.set('key', etree.XML('<problem><p>Text</p></problem>'))
+
+        tree = cache.get('key')
+        tree.set('id', '1')
+        self.assertIsNone(cache.get('key').get('id'))
+
+    def test_least_recently_used(self):
+        cache = problem_cache.ProblemPartCache('test', max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_disabled(self):
+        cache = problem_cache.ProblemPartCache('test', max_entries=0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+    def test_threads(self):
+        cache = problem_cache.ProblemPartCache('test', max_entries=5)
+        wrong_parts = []
+
+        def use_cache(thread_number):
+            """Sets and gets parts, evicting those of the other threads."""
+            for i in range(200):
+                key = (thread_number, i % 10)
+                cache.set(key, [thread_number, i])
+                part = cache.get(key)
+                if part is not None and part[0] != thread_number:
+                    wrong_parts.append(part)
+
+        threads = [threading.Thread(target=use_cache, args=(thread_number,)) for thread_number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(wrong_parts, [])
+        self.assertEqual(len(cache._parts), 5)  # pylint: disable=protected-access
+
+
+class LoncapaProblemCacheTest(unittest.TestCase):
+    """
+    Tests of the use of the caches by LoncapaProblem.
+    """
+    def setUp(self):
+        super(LoncapaProblemCacheTest, self).setUp()
+        problem_cache.PARSED_PROBLEMS.clear()
+        problem_cache.PROBLEM_CONTEXTS.clear()
+        self.addCleanup(problem_cache.PARSED_PROBLEMS.clear)
+        self.addCleanup(problem_cache.PROBLEM_CONTEXTS.clear)
+
+    def new_problem(self, problem_id='1', seed=723, anonymous_student_id='student', xml=SCRIPT_PROBLEM_XML):
+        """
+        Returns a LoncapaProblem of the XML, whose Python results are cached.
+        """
+        capa_system = test_capa_system()
+        capa_system.cache = DictCache()
+        capa_system.anonymous_student_id = anonymous_student_id
+        return new_loncapa_problem(xml, problem_id=problem_id, capa_system=capa_system, seed=seed)
+
+    def test_parsed_once(self):
+        with patch('capa.capa_problem.etree.XML', wraps=etree.XML) as mock_xml:
+            first_problem = self.new_problem(problem_id='1')
+            second_problem = self.new_problem(problem_id='2')
+        self.assertEqual(mock_xml.call_count, 1)
+
+        # Each problem has its own tree, with its own ids.
+        self.assertEqual(first_problem.tree.find('.//textline').get('id'), '1_2_1')
+        self.assertEqual(second_problem.tree.find('.//textline').get('id'), '2_2_1')
+
+    def test_includes_not_cached(self):
+        xml = '<problem><include file="test_include.xml"/></problem>'
+        with patch.object(LoncapaProblem, '_process_includes') as mock_process_includes:
+            new_loncapa_problem(xml)
+            new_loncapa_problem(xml)
+        self.assertEqual(mock_process_includes.call_count, 2)
+
+    def test_context_built_once_per_seed(self):
+        with patch('capa.capa_problem.safe_exec') as mock_safe_exec:
+            first_problem = self.new_problem(seed=1)
+            self.new_problem(seed=1)
+            self.new_problem(seed=2)
+        self.assertEqual(mock_safe_exec.call_count, 2)
+
+        # Changes to the context of a problem aren't seen by the others.
+        first_problem.context['answer'] = 'changed'
+        self.assertNotIn('answer', self.new_problem(seed=1).context)
+
+    def test_context_same_with_cache(self):
+        context = self.new_problem(seed=5).context
+        cached_context = self.new_problem(seed=5).context
+        self.assertEqual(cached_context['answer'], context['answer'])
+        self.assertEqual(cached_context['script_code'], context['script_code'])
+
+    def test_context_of_learner(self):
+        xml = SCRIPT_PROBLEM_XML.replace('random.randint(1, 1000)', 'anonymous_student_id')
+        with patch('capa.capa_problem.safe_exec') as mock_safe_exec:
+            self.new_problem(xml=xml, anonymous_student_id='student1')
+            self.new_problem(xml=xml, anonymous_student_id='student1')
+            problem = self.new_problem(xml=xml, anonymous_student_id='student2')
+        self.assertEqual(mock_safe_exec.call_count, 2)
+        self.assertEqual(problem.context['anonymous_student_id'], 'student2')
+
+    def test_context_of_learner_read_dynamically(self):
+        xml = SCRIPT_PROBLEM_XML.replace('random.randint(1, 1000)', "globals()['anonymous_student_id']")
+        with patch('capa.capa_problem.safe_exec') as mock_safe_exec:
+            self.new_problem(xml=xml, anonymous_student_id='student1')
+            self.new_problem(xml=xml, anonymous_student_id='student2')
+        self.assertEqual(mock_safe_exec.call_count, 2)
+
+    def test_shared_context_has_learner_id(self):
+        self.new_problem(anonymous_student_id='student1')
+        with patch('capa.capa_problem.safe_exec') as mock_safe_exec:
+            problem = self.new_problem(anonymous_student_id='student2')
+        self.assertFalse(mock_safe_exec.called)
+        self.assertEqual(problem.context['anonymous_student_id'], 'student2')
+
+    def test_context_not_cached_without_cache(self):
+        with patch('capa.capa_problem.safe_exec') as mock_safe_exec:
+            new_loncapa_problem(SCRIPT_PROBLEM_XML)
+            new_loncapa_problem(SCRIPT_PROBLEM_XML)
+        self.assertEqual(mock_safe_exec.call_count, 2)
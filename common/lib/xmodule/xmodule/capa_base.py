@@ -225,6 +225,14 @@ class CapaFields(object):
                "or to report an issue, please contact moocsupport@mathworks.com"),
         scope=Scope.settings
     )
+    cache_python_results = Boolean(
+        display_name=_("Cache Python Script Results"),
+        help=_("Defines whether the results of the Python scripts of this problem are cached and shared "
+               "amongst the learners who have the same random seed. Set to False if the scripts can give "
+               "different results for the same seed, for example because they use the current time."),
+        default=True,
+        scope=Scope.settings
+    )
 
 
 class CapaMixin(ScorableXBlockMixin, CapaFields):
@@ -329,7 +337,7 @@ class CapaMixin(ScorableXBlockMixin, CapaFields):
         capa_system = LoncapaSystem(
             ajax_url=self.runtime.ajax_url,
             anonymous_student_id=self.runtime.anonymous_student_id,
-            cache=self.runtime.cache,
+            cache=self.runtime.cache if self.cache_python_results else None,
             can_execute_unsafe_code=self.runtime.can_execute_unsafe_code,
             get_python_lib_zip=self.runtime.get_python_lib_zip,
             DEBUG=self.runtime.DEBUG,
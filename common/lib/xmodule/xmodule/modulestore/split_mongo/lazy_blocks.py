@@ -0,0 +1,214 @@
+"""
+A map of the blocks of a split structure whose values are decoded lazily.
+"""
+from collections import Mapping, MutableMapping
+from copy import deepcopy
+from time import time
+
+
+class _NotDecoded(object):
+    """
+    The placeholder value of a block that has not been decoded yet.
+    """
+    def __repr__(self):
+        return '<not decoded>'
+
+
+NOT_DECODED = _NotDecoded()
+
+
+class LazyBlockMap(MutableMapping):
+    """
+    A mapping of {BlockKey: BlockData} for the 'blocks' of a structure,
+    whose values are decoded from their encoded form only when first
+    accessed.
+
+    All the keys of the map are present from the start, so membership
+    tests, iteration over the keys, and len do not decode any blocks.
+    Methods that return or compare values decode the blocks they need;
+    methods over all of the values decode all of the remaining blocks.
+
+    The map isn't a dict, so that dict(), dict.update(), ** and the other
+    copies of it which read a dict's entries directly also decode the
+    blocks, rather than returning their placeholders.  Contracts on the
+    blocks of a structure are therefore 'map(...)' rather than 'dict(...)'.
+
+    The decode function may return objects that share data with the
+    encoded blocks, as the map is their only user.  Once the map is copied,
+    the encoded blocks are shared with the copy, so each block is then
+    decoded from a deep copy of its encoded data.
+
+    The children of the blocks can be iterated without decoding them, if
+    the map is given a function which reads them from the encoded blocks.
+
+    The number of blocks decoded and the time spent decoding them are
+    kept, for instrumentation.
+
+    A pickled map is unpickled as a plain dict.
+    """
+    def __init__(self, encoded_blocks, decode, get_children=None):
+        """
+        Arguments:
+            encoded_blocks (dict {BlockKey: object}) - The encoded data of
+                each block.
+
+            decode (function) - A function that returns the BlockData
+                decoded from the encoded data of a block.
+
+            get_children (function) - An optional function that returns
+                the list of the BlockKeys of the children of the block with
+                the given BlockKey, from its encoded data.
+        """
+        # The blocks, or NOT_DECODED for those which have not been decoded.
+        # dict {BlockKey: BlockData}
+        self._blocks = dict.fromkeys(encoded_blocks, NOT_DECODED)
+        self._encoded_blocks = encoded_blocks
+        self._decode = decode
+        self._get_children = get_children
+        self._is_shared = False
+        self.decoded_count = 0
+        self.decode_time = 0.0
+
+    def __getitem__(self, block_key):
+        value = self._blocks[block_key]
+        if value is NOT_DECODED:
+            value = self._decode_block(block_key)
+        return value
+
+    def __setitem__(self, block_key, value):
+        self._blocks[block_key] = value
+
+    def __delitem__(self, block_key):
+        del self._blocks[block_key]
+
+    def __iter__(self):
+        return iter(self._blocks)
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __contains__(self, block_key):
+        return block_key in self._blocks
+
+    def _decode_block(self, block_key):
+        """
+        Decodes the block with the given key and stores it in the map.
+        """
+        start = time()
+        encoded_block = self._encoded_blocks[block_key]
+        if self._is_shared:
+            encoded_block = deepcopy(encoded_block)
+        value = self._decode(encoded_block)
+        self._blocks[block_key] = value
+        self.decoded_count += 1
+        self.decode_time += time() - start
+        return value
+
+    def decoded_keys(self):
+        """
+        Returns the keys of the blocks that have been decoded or set.
+        """
+        return [block_key for block_key, value in self._blocks.iteritems() if value is not NOT_DECODED]
+
+    def decode_all(self):
+        """
+        Decodes all of the blocks that have not been decoded yet.
+        """
+        for block_key in [block_key for block_key, value in self._blocks.iteritems() if value is NOT_DECODED]:
+            self._decode_block(block_key)
+
+    def iter_children(self):
+        """
+        Returns an iterator of (block_key, [child BlockKey]) for all of the
+        blocks, which reads the children of the blocks that have not been
+        decoded from their encoded data, if possible.
+        """
+        for block_key, value in self._blocks.iteritems():
+            if value is NOT_DECODED:
+                if self._get_children is not None:
+                    yield block_key, self._get_children(block_key)
+                    continue
+                value = self._decode_block(block_key)
+            yield block_key, value.fields.get('children', [])
+
+    def itervalues(self):
+        self.decode_all()
+        return self._blocks.itervalues()
+
+    def iteritems(self):
+        self.decode_all()
+        return self._blocks.iteritems()
+
+    def values(self):
+        self.decode_all()
+        return self._blocks.values()
+
+    def items(self):
+        self.decode_all()
+        return self._blocks.items()
+
+    def clear(self):
+        self._blocks.clear()
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        self.decode_all()
+        if isinstance(other, LazyBlockMap):
+            other.decode_all()
+            other = other._blocks  # pylint: disable=protected-access
+        return self._blocks == other
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        self.decode_all()
+        return repr(self._blocks)
+
+    def _copy_with(self, copy_value):
+        """
+        Returns a copy of this map whose decoded values are copied with
+        the given function, and whose encoded blocks are shared.
+        """
+        copied = LazyBlockMap.__new__(LazyBlockMap)
+        copied._blocks = {  # pylint: disable=protected-access
+            block_key: value if value is NOT_DECODED else copy_value(value)
+            for block_key, value in self._blocks.iteritems()
+        }
+        copied._encoded_blocks = self._encoded_blocks  # pylint: disable=protected-access
+        copied._decode = self._decode  # pylint: disable=protected-access
+        copied._get_children = self._get_children  # pylint: disable=protected-access
+        copied._is_shared = self._is_shared = True  # pylint: disable=protected-access
+        copied.decoded_count = 0
+        copied.decode_time = 0.0
+        return copied
+
+    def copy(self):
+        """
+        Returns a shallow copy of this map.
+        """
+        return self._copy_with(lambda value: value)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self._copy_with(lambda value: deepcopy(value, memo))
+
+    def __reduce__(self):
+        return dict, (dict(self.iteritems()),)
+
+
+def iter_block_children(blocks):
+    """
+    Returns an iterator of (block_key, [child BlockKey]) for all of the
+    given blocks of a structure, without decoding the blocks of a
+    LazyBlockMap where possible.
+    """
+    if isinstance(blocks, LazyBlockMap):
+        return blocks.iter_children()
+    return ((block_key, block.fields.get('children', [])) for block_key, block in blocks.iteritems())
@@ -2,7 +2,6 @@
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
 import datetime
-import cPickle as pickle
 import math
 import zlib
 import pymongo
@@ -15,6 +14,7 @@ from time import time
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -28,6 +28,13 @@ from mongodb_proxy import autoretry_read
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.lazy_blocks import LazyBlockMap
+from xmodule.modulestore.split_mongo.shared_structure_cache import (
+    DEFAULT_MAX_SIZE,
+    SharedStructureCache,
+    decode_structure,
+    encode_structure
+)
 from xmodule.mongo_utils import connect_to_mongodb, create_collection_index
 
 
@@ -44,6 +51,17 @@ def get_cache(alias):
     return caches[alias]
 
 
+def get_shared_structure_cache():
+    """
+    Return the SharedStructureCache configured by the
+    COURSE_STRUCTURE_SHARED_CACHE setting, or None if it isn't configured.
+    """
+    config = getattr(settings, 'COURSE_STRUCTURE_SHARED_CACHE', None) or {}
+    if not config.get('DIRECTORY'):
+        return None
+    return SharedStructureCache(config['DIRECTORY'], config.get('MAX_SIZE', DEFAULT_MAX_SIZE))
+
+
 def round_power_2(value):
     """
     Return value rounded up to the nearest power of 2.
@@ -162,6 +180,11 @@ class QueryTimer(object):
 
 TIMER = QueryTimer(__name__, 0.01)
 
+# The default maximum number of ids in each query of
+# MongoConnection.get_definitions, which keeps the queries well under the
+# size limit of mongo documents.
+DEFINITIONS_CHUNK_SIZE = 1000
+
 
 def structure_from_mongo(structure, course_context=None):
     """
@@ -171,6 +194,10 @@ def structure_from_mongo(structure, course_context=None):
     Converts 'blocks.*.fields.children' from [[block_type, block_id]] to [BlockKey].
     N.B. Does not convert any other ReferenceFields (because we don't know which fields they are at this level).
 
+    The blocks are converted to BlockData lazily, upon first access, so
+    that requests which only touch a few blocks of a large course don't
+    pay for converting all of them.  See LazyBlockMap.
+
     Arguments:
         structure: The document structure to convert
         course_context (CourseKey): For metrics gathering, the CourseKey
@@ -186,16 +213,33 @@ def structure_from_mongo(structure, course_context=None):
                 check('list(list[2])', block['fields']['children'])
 
         structure['root'] = BlockKey(*structure['root'])
-        new_blocks = {}
-        for block in structure['blocks']:
-            if 'children' in block['fields']:
-                block['fields']['children'] = [BlockKey(*child) for child in block['fields']['children']]
-            new_blocks[BlockKey(block['block_type'], block.pop('block_id'))] = BlockData(**block)
-        structure['blocks'] = new_blocks
+        encoded_blocks = {BlockKey(block['block_type'], block['block_id']): block for block in structure['blocks']}
+        structure['blocks'] = LazyBlockMap(
+            encoded_blocks,
+            _block_data_from_mongo,
+            lambda block_key: _children_from_mongo(encoded_blocks[block_key]),
+        )
 
         return structure
 
 
+def _block_data_from_mongo(block):
+    """
+    Converts a block of a structure document to BlockData.
+    """
+    if 'children' in block['fields']:
+        block['fields']['children'] = _children_from_mongo(block)
+    return BlockData(**block)
+
+
+def _children_from_mongo(block):
+    """
+    Returns 'fields.children' of a block of a structure document, converted
+    from [[block_type, block_id]] to [BlockKey].
+    """
+    return [BlockKey(*child) for child in block['fields'].get('children', [])]
+
+
 def structure_to_mongo(structure, course_context=None):
     """
     Converts the 'blocks' key from a map {BlockKey: block_data} to
@@ -208,7 +252,7 @@ def structure_to_mongo(structure, course_context=None):
         tagger.measure('blocks', len(structure['blocks']))
 
         check('BlockKey', structure['root'])
-        check('dict(BlockKey: BlockData)', structure['blocks'])
+        check('map(BlockKey: BlockData)', structure['blocks'])
         for block in structure['blocks'].itervalues():
             if 'children' in block.fields:
                 check('list(BlockKey)', block.fields['children'])
@@ -228,55 +272,94 @@ def structure_to_mongo(structure, course_context=None):
 class CourseStructureCache(object):
     """
     Wrapper around django cache object to cache course structure objects.
-    The course structures are pickled and compressed when cached.
+    The course structures are encoded block by block (see
+    shared_structure_cache.encode_structure) and compressed when cached,
+    and their blocks are decoded upon access.
 
     If the 'course_structure_cache' doesn't exist, then don't do anything for
     for set and get.
+
+    If the COURSE_STRUCTURE_SHARED_CACHE setting is configured, structures
+    are also cached in memory-mapped files shared amongst the processes on
+    the local node, which are checked first.
     """
+    # The version of the cached values, which were pickled structures in
+    # version 1.  Structures are cached with this version so that
+    # processes running older code don't find values they can't decode.
+    VERSION = 2
+
     def __init__(self):
         self.cache = None
+        self.shared_cache = None
         if DJANGO_AVAILABLE:
             try:
                 self.cache = get_cache('course_structure_cache')
             except InvalidCacheBackendError:
                 pass
+            self.shared_cache = get_shared_structure_cache()
 
     def get(self, key, course_context=None):
-        """Pull the compressed, pickled struct data from cache and deserialize."""
+        """Pull the compressed, encoded struct data from cache and deserialize."""
+        if self.shared_cache is not None:
+            with TIMER.timer("CourseStructureCache.get_shared", course_context) as tagger:
+                structure = self.shared_cache.get(key)
+                tagger.tag(from_cache=str(structure is not None).lower())
+                if structure is not None:
+                    tagger.measure('blocks', len(structure['blocks']))
+                    return structure
+
         if self.cache is None:
             return None
 
         with TIMER.timer("CourseStructureCache.get", course_context) as tagger:
-            compressed_pickled_data = self.cache.get(key)
-            tagger.tag(from_cache=str(compressed_pickled_data is not None).lower())
+            compressed_encoded_data = self.cache.get(key, version=self.VERSION)
+            tagger.tag(from_cache=str(compressed_encoded_data is not None).lower())
 
-            if compressed_pickled_data is None:
+            if compressed_encoded_data is None:
                 # Always log cache misses, because they are unexpected
                 tagger.sample_rate = 1
                 return None
 
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            tagger.measure('compressed_size', len(compressed_encoded_data))
 
-            pickled_data = zlib.decompress(compressed_pickled_data)
-            tagger.measure('uncompressed_size', len(pickled_data))
+            encoded_data = zlib.decompress(compressed_encoded_data)
+            tagger.measure('uncompressed_size', len(encoded_data))
 
-            return pickle.loads(pickled_data)
+            structure = decode_structure(encoded_data)
+            tagger.measure('blocks', len(structure['blocks']))
+
+        # Share the structure with the other processes on this node, so
+        # they don't have to decompress it too.
+        self._set_shared(key, encoded_data, course_context)
+        return structure
 
     def set(self, key, structure, course_context=None):
-        """Given a structure, will pickle, compress, and write to cache."""
-        if self.cache is None:
+        """Given a structure, will encode, compress, and write to cache."""
+        if self.cache is None and self.shared_cache is None:
             return None
 
         with TIMER.timer("CourseStructureCache.set", course_context) as tagger:
-            pickled_data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
-            tagger.measure('uncompressed_size', len(pickled_data))
+            encoded_data = encode_structure(structure)
+            tagger.measure('uncompressed_size', len(encoded_data))
+
+            if self.cache is not None:
+                # 1 = Fastest (slightly larger results)
+                compressed_encoded_data = zlib.compress(encoded_data, 1)
+                tagger.measure('compressed_size', len(compressed_encoded_data))
 
-            # 1 = Fastest (slightly larger results)
-            compressed_pickled_data = zlib.compress(pickled_data, 1)
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+                # Stuctures are immutable, so we set a timeout of "never"
+                self.cache.set(key, compressed_encoded_data, None, version=self.VERSION)
 
-            # Stuctures are immutable, so we set a timeout of "never"
-            self.cache.set(key, compressed_pickled_data, None)
+        self._set_shared(key, encoded_data, course_context)
+
+    def _set_shared(self, key, encoded_data, course_context):
+        """Write the encoded structure to the shared cache, if configured."""
+        if self.shared_cache is None:
+            return
+
+        with TIMER.timer("CourseStructureCache.set_shared", course_context) as tagger:
+            tagger.measure('uncompressed_size', len(encoded_data))
+            self.shared_cache.set_encoded(key, encoded_data)
 
 
 class MongoConnection(object):
@@ -285,10 +368,12 @@ class MongoConnection(object):
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, definitions_chunk_size=DEFINITIONS_CHUNK_SIZE, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        :param definitions_chunk_size: the maximum number of ids in each query of get_definitions
         """
         # Set a write concern of 1, which makes writes complete successfully to the primary
         # only before returning. Also makes pymongo report write errors.
@@ -303,6 +388,7 @@ class MongoConnection(object):
         self.course_index = self.database[collection + '.active_versions']
         self.structures = self.database[collection + '.structures']
         self.definitions = self.database[collection + '.definitions']
+        self.definitions_chunk_size = definitions_chunk_size
 
     def heartbeat(self):
         """
@@ -566,8 +652,14 @@ class MongoConnection(object):
         """
         with TIMER.timer("get_definitions", course_context) as tagger:
             tagger.measure('definitions', len(definitions))
-            definitions = self.definitions.find({'_id': {'$in': definitions}})
-            return definitions
+            results = []
+            queries = 0
+            for start in xrange(0, len(definitions), self.definitions_chunk_size):
+                chunk = definitions[start:start + self.definitions_chunk_size]
+                results.extend(self.definitions.find({'_id': {'$in': chunk}}))
+                queries += 1
+            tagger.measure('queries', queries)
+            return results
 
     def insert_definition(self, definition, course_context=None):
         """
@@ -0,0 +1,294 @@
+"""
+A cache of split structures on the local node, which is shared amongst the
+processes of the node via memory-mapped files.
+
+Structures are immutable and keyed by their ObjectIds, so cached files
+never need to be invalidated.  Each structure is stored in a read-only
+encoding in which each block is pickled separately, so that processes map
+the same pages of the file and decode only the blocks that they access,
+rather than each decompressing and unpickling the entire structure.
+CourseStructureCache stores structures in the same encoding, compressed,
+so structures from the django cache are also decoded block by block.
+
+The layout of a cached file is:
+
+    header | pickled blocks | pickled structure without blocks | index
+
+where the header holds the offsets of the pickled structure and of the
+index, and the index is a marshalled tuple of the types, ids, end offsets
+and children of the blocks.  The children are in the index so that the
+parents of blocks can be found without decoding every block.
+"""
+import cPickle as pickle
+import errno
+import logging
+import marshal
+import mmap
+import os
+import re
+import struct
+import tempfile
+from itertools import izip
+
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache
+from xmodule.modulestore.split_mongo import BlockKey
+
+from .lazy_blocks import LazyBlockMap
+
+log = logging.getLogger(__name__)
+
+
+MAGIC = 'EDXSTRCT'
+FORMAT_VERSION = 2
+_HEADER = struct.Struct('<8sHQQ')
+
+FILE_SUFFIX = '.structure'
+_VALID_KEY = re.compile(r'^[0-9A-Za-z_-]+$')
+
+# The default size, in bytes, above which the least recently used
+# structures are removed from the directory.
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+
+# The maximum number of structures that each process keeps mapped.
+MAX_MAPPED_STRUCTURES = 32
+
+# The structures mapped by the current process, each of size 1, which its
+# threads share.
+# SizeBoundedLRUCache {string: _EncodedStructure}
+_MAPPED_STRUCTURES = SizeBoundedLRUCache(max_size=MAX_MAPPED_STRUCTURES)
+
+
+def encode_structure(structure):
+    """
+    Returns the given structure in the encoding of the cached files.
+    """
+    structure_without_blocks = dict(structure)
+    blocks = structure_without_blocks.pop('blocks')
+
+    block_types, block_ids, block_ends, block_children, pickled_blocks = [], [], [], [], []
+    position = _HEADER.size
+    for block_key, block_data in blocks.iteritems():
+        pickled_block = pickle.dumps(block_data, pickle.HIGHEST_PROTOCOL)
+        position += len(pickled_block)
+        block_types.append(block_key.type)
+        block_ids.append(block_key.id)
+        block_ends.append(position)
+        block_children.append([tuple(child) for child in block_data.fields.get('children', [])])
+        pickled_blocks.append(pickled_block)
+
+    pickled_structure = pickle.dumps(structure_without_blocks, pickle.HIGHEST_PROTOCOL)
+    index_offset = position + len(pickled_structure)
+    return ''.join([_HEADER.pack(MAGIC, FORMAT_VERSION, position, index_offset)] + pickled_blocks + [
+        pickled_structure,
+        marshal.dumps((block_types, block_ids, block_ends, block_children)),
+    ])
+
+
+def decode_structure(encoded_structure):
+    """
+    Returns a structure whose blocks are decoded from the given encoded
+    structure upon access.
+
+    Raises:
+        ValueError - If the data is not in the supported encoding.
+    """
+    return _EncodedStructure(encoded_structure).get_structure()
+
+
+class _EncodedStructure(object):
+    """
+    A structure in the encoding of the cached files.
+    """
+    def __init__(self, buffer_):
+        """
+        Arguments:
+            buffer_ (mmap.mmap or str) - The mapped file, or the encoded
+                structure.
+
+        Raises:
+            ValueError - If the data is not in the supported encoding.
+        """
+        magic, version, structure_offset, index_offset = _HEADER.unpack_from(buffer_)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError('Unsupported format of cached structure: {!r} {}'.format(magic, version))
+
+        self.buffer = buffer_
+        self.size = len(buffer_)
+        self._pickled_structure = buffer_[structure_offset:index_offset]
+
+        # Map of each block's key to the span of its pickled data.
+        # dict {BlockKey: (int, int)}
+        block_types, block_ids, block_ends, block_children = marshal.loads(buffer_[index_offset:])
+        block_keys = [BlockKey(block_type, block_id) for block_type, block_id in izip(block_types, block_ids)]
+        block_starts = [_HEADER.size] + block_ends[:-1]
+        self.block_spans = dict(izip(block_keys, izip(block_starts, block_ends)))
+
+        # Map of each block's key to the [type, id] of its children.
+        # dict {BlockKey: [(string, string)]}
+        self._block_children = dict(izip(block_keys, block_children))
+
+    def decode_block(self, span):
+        """
+        Returns the BlockData pickled at the given span of the buffer.
+        """
+        start, end = span
+        return pickle.loads(self.buffer[start:end])
+
+    def get_children(self, block_key):
+        """
+        Returns the BlockKeys of the children of the block with the given
+        key.
+        """
+        return [BlockKey(*child) for child in self._block_children[block_key]]
+
+    def get_structure(self):
+        """
+        Returns a new structure whose blocks are decoded from the file
+        upon access.
+        """
+        structure = pickle.loads(self._pickled_structure)
+        structure['blocks'] = LazyBlockMap(self.block_spans, self.decode_block, self.get_children)
+        return structure
+
+
+class SharedStructureCache(object):
+    """
+    A cache of structures in memory-mapped files in a directory on the
+    local node.
+    """
+    def __init__(self, directory, max_size):
+        """
+        Arguments:
+            directory (string) - The directory of the cached files, which
+                is preferably on a memory-backed filesystem, such as
+                /dev/shm.
+
+            max_size (int) - The size, in bytes, above which the least
+                recently used files are removed from the directory.
+        """
+        self.directory = directory
+        self.max_size = max_size
+
+    def get(self, key):
+        """
+        Returns the structure with the given key, or None if it is not
+        cached.
+        """
+        key = self._file_key(key)
+        if key is None:
+            return None
+
+        mapped_structure = _MAPPED_STRUCTURES.get(key)
+        if mapped_structure is None:
+            mapped_structure = self._map(key)
+            if mapped_structure is None:
+                return None
+            _MAPPED_STRUCTURES.set(key, mapped_structure, size=1)
+
+        return mapped_structure.get_structure()
+
+    def set(self, key, structure):
+        """
+        Writes the given structure to the cache with the given key.
+        """
+        if self._file_key(key) is None:
+            return
+
+        try:
+            encoded_structure = encode_structure(structure)
+        except ValueError:
+            # Block ids that cannot be marshalled are not supported.
+            log.exception('Unable to encode structure %s for the shared structure cache.', key)
+            return
+
+        self.set_encoded(key, encoded_structure)
+
+    def set_encoded(self, key, encoded_structure):
+        """
+        Writes the given structure, already in the encoding returned by
+        encode_structure, to the cache with the given key.
+        """
+        key = self._file_key(key)
+        if key is None:
+            return
+
+        # Write to a temporary file first, so that other processes never
+        # map a partially written file.
+        try:
+            file_descriptor, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            try:
+                with os.fdopen(file_descriptor, 'wb') as temp_file:
+                    temp_file.write(encoded_structure)
+                os.rename(temp_path, self._path(key))
+            except Exception:
+                os.remove(temp_path)
+                raise
+        except (IOError, OSError):
+            log.exception('Unable to write structure %s to the shared structure cache.', key)
+            return
+
+        self._remove_least_recently_used()
+
+    def _map(self, key):
+        """
+        Returns the _EncodedStructure of the file with the given key, or
+        None if there is no such file.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cached_file:
+                buffer_ = mmap.mmap(cached_file.fileno(), 0, access=mmap.ACCESS_READ)
+            # Mark the file as recently used.
+            os.utime(path, None)
+        except (IOError, OSError, ValueError) as error:
+            if getattr(error, 'errno', None) != errno.ENOENT:
+                log.exception('Unable to map structure %s from the shared structure cache.', key)
+            return None
+
+        try:
+            return _EncodedStructure(buffer_)
+        except (ValueError, EOFError, struct.error):
+            log.exception('Unable to decode structure %s from the shared structure cache.', key)
+            buffer_.close()
+            return None
+
+    def _remove_least_recently_used(self):
+        """
+        Removes the least recently used files from the directory until
+        their total size is at most max_size.
+
+        Processes that have already mapped a removed file are unaffected.
+        """
+        cached_files = []
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(FILE_SUFFIX):
+                try:
+                    file_stat = os.stat(os.path.join(self.directory, file_name))
+                except OSError:
+                    continue
+                cached_files.append((file_stat.st_mtime, file_stat.st_size, file_name))
+
+        total_size = sum(size for _, size, _ in cached_files)
+        for _, size, file_name in sorted(cached_files):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except OSError:
+                continue
+            total_size -= size
+
+    def _path(self, key):
+        """
+        Returns the path of the cached file with the given key.
+        """
+        return os.path.join(self.directory, key + FILE_SUFFIX)
+
+    @staticmethod
+    def _file_key(key):
+        """
+        Returns the given key as a string for the name of a cached file,
+        or None if it is not valid in a file name.
+        """
+        key = unicode(key)
+        return str(key) if _VALID_KEY.match(key) else None
@@ -1267,6 +1267,22 @@ class SplitModuleItemTests(SplitModuleTest):
             expected_ids.remove(child.location.block_id)
         self.assertEqual(len(expected_ids), 0)
 
+    @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
+    def test_get_item_prefetch_definitions(self, _from_json):
+        """
+        Test that get_item prefetches the definitions of the item's descendants into the bulk operation
+        """
+        course_key = CourseLocator(org='testx', course='GreekHero', run='run', branch=BRANCH_NAME_DRAFT)
+        store = modulestore()
+        with store.bulk_operations(course_key):
+            block = store.get_item(
+                BlockUsageLocator(course_key, 'course', 'head12345'), depth=1, prefetch_block_types=True
+            )
+            # pylint: disable=protected-access
+            definitions = store._get_bulk_ops_record(course_key).definitions
+            for descendant in [block] + block.get_children():
+                self.assertIn(descendant.definition_locator.definition_id, definitions)
+
 
 def version_agnostic(children):
     """
@@ -481,6 +481,26 @@ class TestBulkWriteMixinFindMethods(TestBulkWriteMixin):
         self.bulk._end_bulk_operation(self.course_key)
         self.assertFalse(self.conn.insert_definition.called)
 
+    def test_prefetch_definitions(self):
+        db_definition = lambda _id: {'db': 'definition', '_id': _id}
+        self.conn.get_definitions.return_value = [db_definition(2), db_definition(3)]
+        self.bulk._begin_bulk_operation(self.course_key)
+        self.bulk.update_definition(self.course_key, {'active': 'definition', '_id': 1})
+
+        self.assertEqual(self.bulk.prefetch_definitions(self.course_key, [1, 2, 3, 3]), 2)
+        self.assertEqual(self.conn.get_definitions.call_count, 1)
+        self.assertItemsEqual(self.conn.get_definitions.call_args[0][0], [2, 3])
+
+        # The prefetched definitions are read from the cache of the bulk operation.
+        self.assertEqual(self.bulk.get_definition(self.course_key, 2), db_definition(2))
+        self.assertFalse(self.conn.get_definition.called)
+        self.bulk._end_bulk_operation(self.course_key)
+        self.assertFalse(self.conn.insert_definition.called)
+
+    def test_prefetch_definitions_without_bulk_operation(self):
+        self.assertEqual(self.bulk.prefetch_definitions(self.course_key, [1, 2]), 0)
+        self.assertFalse(self.conn.get_definitions.called)
+
     def test_no_bulk_find_structures_derived_from(self):
         ids = [Mock(name='id')]
         self.conn.find_structures_derived_from.return_value = [MagicMock(name='result')]
@@ -1,6 +1,6 @@
 """ Test the behavior of split_mongo/MongoConnection """
 import unittest
-from mock import patch
+from mock import Mock, call, patch
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
 from xmodule.exceptions import HeartbeatFailure
 
@@ -19,3 +19,20 @@ class TestHeartbeatFailureException(unittest.TestCase):
 
             with self.assertRaises(HeartbeatFailure):
                 useless_conn.heartbeat()
+
+
+class TestGetDefinitions(unittest.TestCase):
+    """ Test that definitions are queried in chunks """
+    shard = 2
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.connect_to_mongodb')
+    def test_get_definitions_in_chunks(self, mock_connect):  # pylint: disable=unused-argument
+        conn = MongoConnection('useless', 'useless', 'useless', definitions_chunk_size=2)
+        conn.definitions = Mock()
+        conn.definitions.find.side_effect = lambda query: [{'_id': _id} for _id in query['_id']['$in']]
+
+        self.assertEqual(conn.get_definitions([1, 2, 3]), [{'_id': 1}, {'_id': 2}, {'_id': 3}])
+        self.assertEqual(conn.definitions.find.call_args_list, [
+            call({'_id': {'$in': [1, 2]}}),
+            call({'_id': {'$in': [3]}}),
+        ])
@@ -0,0 +1,296 @@
+"""
+Tests for split_mongo/shared_structure_cache.py, split_mongo/lazy_blocks.py
+and the lazy decoding of structures in split_mongo/mongo_connection.py
+"""
+import cPickle as pickle
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from copy import deepcopy
+
+from bson.objectid import ObjectId
+from django.test.utils import override_settings
+from mock import patch
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo import shared_structure_cache
+from xmodule.modulestore.split_mongo.lazy_blocks import LazyBlockMap, iter_block_children
+from xmodule.modulestore.split_mongo.mongo_connection import get_shared_structure_cache, structure_from_mongo
+from xmodule.modulestore.split_mongo.shared_structure_cache import SharedStructureCache
+
+
+def _create_structure(num_blocks):
+    """
+    Returns a structure of a course with the given number of verticals.
+    """
+    block_keys = [BlockKey('vertical', 'vertical_{}'.format(index)) for index in range(num_blocks)]
+    root_key = BlockKey('course', 'course')
+    blocks = {
+        block_key: BlockData(block_type=block_key.type, fields={'display_name': block_key.id}, definition=ObjectId())
+        for block_key in block_keys
+    }
+    blocks[root_key] = BlockData(block_type='course', fields={'children': block_keys}, definition=ObjectId())
+    return {
+        '_id': ObjectId(),
+        'root': root_key,
+        'blocks': blocks,
+        'previous_version': None,
+        'schema_version': 1,
+    }
+
+
+class TestLazyBlockMap(unittest.TestCase):
+    """
+    Tests for LazyBlockMap
+    """
+    shard = 2
+
+    def setUp(self):
+        super(TestLazyBlockMap, self).setUp()
+        self.encoded_blocks = {BlockKey('html', str(index)): index for index in range(3)}
+        self.blocks = LazyBlockMap(self.encoded_blocks, lambda encoded: BlockData(fields={'index': encoded}))
+
+    def test_lazy_decoding(self):
+        self.assertEquals(len(self.blocks), 3)
+        self.assertIn(BlockKey('html', '1'), self.blocks)
+        self.assertEquals(self.blocks.decoded_keys(), [])
+
+        self.assertEquals(self.blocks[BlockKey('html', '1')].fields, {'index': 1})
+        self.assertIs(self.blocks.get(BlockKey('html', '1')), self.blocks[BlockKey('html', '1')])
+        self.assertIsNone(self.blocks.get(BlockKey('html', 'missing')))
+        self.assertEquals(self.blocks.decoded_keys(), [BlockKey('html', '1')])
+
+        self.assertEquals(sorted(block.fields['index'] for block in self.blocks.itervalues()), [0, 1, 2])
+        self.assertEquals(len(self.blocks.decoded_keys()), 3)
+
+    def test_modification(self):
+        self.assertEquals(self.blocks.pop(BlockKey('html', '0')).fields, {'index': 0})
+        del self.blocks[BlockKey('html', '1')]
+        self.blocks[BlockKey('html', '3')] = BlockData(fields={'index': 3})
+
+        self.assertEquals(
+            {block_key: block.fields for block_key, block in self.blocks.iteritems()},
+            {BlockKey('html', '2'): {'index': 2}, BlockKey('html', '3'): {'index': 3}},
+        )
+
+    def test_copies(self):
+        decoded_block = self.blocks[BlockKey('html', '0')]
+
+        copied = self.blocks.copy()
+        self.assertEquals(copied.decoded_keys(), [BlockKey('html', '0')])
+        self.assertIs(copied[BlockKey('html', '0')], decoded_block)
+
+        deep_copied = deepcopy(self.blocks)
+        self.assertEquals(deep_copied.decoded_keys(), [BlockKey('html', '0')])
+        self.assertIsNot(deep_copied[BlockKey('html', '0')], decoded_block)
+        self.assertEquals(deep_copied, self.blocks)
+
+        unpickled = pickle.loads(pickle.dumps(self.blocks, pickle.HIGHEST_PROTOCOL))
+        self.assertIs(type(unpickled), dict)
+        self.assertEquals(unpickled, self.blocks)
+
+    def test_copied_as_mapping(self):
+        # Copies which read a dict's entries directly would get the placeholders
+        # of the blocks that have not been decoded.
+        def keywords(**kwargs):
+            """Returns the keyword arguments."""
+            return kwargs
+
+        blocks = LazyBlockMap({'html': 0}, lambda encoded: BlockData(fields={'index': encoded}))
+        updated = {}
+        updated.update(self.blocks)
+        for copied in [dict(self.blocks), updated, keywords(**blocks)]:
+            for block in copied.values():
+                self.assertIsInstance(block, BlockData)
+
+    def test_iter_children(self):
+        blocks = LazyBlockMap(
+            self.encoded_blocks,
+            lambda encoded: BlockData(fields={'children': [BlockKey('html', str(encoded))]}),
+            lambda block_key: [BlockKey('problem', block_key.id)],
+        )
+        blocks[BlockKey('html', '0')].fields['children'] = []
+
+        self.assertEquals(
+            dict(iter_block_children(blocks)),
+            {
+                BlockKey('html', '0'): [],
+                BlockKey('html', '1'): [BlockKey('problem', '1')],
+                BlockKey('html', '2'): [BlockKey('problem', '2')],
+            },
+        )
+        self.assertEquals(blocks.decoded_keys(), [BlockKey('html', '0')])
+
+        # Without a function to get the children, the blocks are decoded.
+        self.assertEquals(dict(iter_block_children(self.blocks))[BlockKey('html', '1')], [])
+        self.assertEquals(len(self.blocks.decoded_keys()), 3)
+
+    def test_counters(self):
+        self.assertIs(self.blocks[BlockKey('html', '0')], self.blocks[BlockKey('html', '0')])
+        self.assertEquals(self.blocks.decoded_count, 1)
+        self.blocks.decode_all()
+        self.assertEquals(self.blocks.decoded_count, 3)
+        self.assertGreater(self.blocks.decode_time, 0)
+
+
+class TestStructureFromMongo(unittest.TestCase):
+    """
+    Tests for the lazy decoding of structure_from_mongo
+    """
+    shard = 2
+
+    def setUp(self):
+        super(TestStructureFromMongo, self).setUp()
+        self.structure = structure_from_mongo({
+            '_id': ObjectId(),
+            'root': ['course', 'course'],
+            'blocks': [
+                {
+                    'block_type': 'course',
+                    'block_id': 'course',
+                    'fields': {'children': [['chapter', 'chapter']]},
+                    'definition': ObjectId(),
+                },
+                {
+                    'block_type': 'chapter',
+                    'block_id': 'chapter',
+                    'fields': {'display_name': 'Chapter'},
+                    'definition': ObjectId(),
+                    'edit_info': {'edited_by': 1},
+                },
+            ],
+        })
+
+    def test_lazy_decoding(self):
+        blocks = self.structure['blocks']
+        self.assertEquals(self.structure['root'], BlockKey('course', 'course'))
+        self.assertEquals(set(blocks), {BlockKey('course', 'course'), BlockKey('chapter', 'chapter')})
+        self.assertEquals(
+            dict(iter_block_children(blocks)),
+            {BlockKey('course', 'course'): [BlockKey('chapter', 'chapter')], BlockKey('chapter', 'chapter'): []},
+        )
+        self.assertEquals(blocks.decoded_keys(), [])
+
+        chapter = blocks[BlockKey('chapter', 'chapter')]
+        self.assertEquals(chapter.block_type, 'chapter')
+        self.assertEquals(chapter.fields, {'display_name': 'Chapter'})
+        self.assertEquals(chapter.edit_info.edited_by, 1)
+        self.assertEquals(blocks[BlockKey('course', 'course')].fields['children'], [BlockKey('chapter', 'chapter')])
+        self.assertIsInstance(blocks[BlockKey('course', 'course')].fields['children'][0], BlockKey)
+
+    def test_copies_do_not_share_blocks(self):
+        copied = deepcopy(self.structure)
+        copied['blocks'][BlockKey('chapter', 'chapter')].fields['display_name'] = 'Changed'
+        self.assertEquals(self.structure['blocks'][BlockKey('chapter', 'chapter')].fields['display_name'], 'Chapter')
+
+
+class TestSharedStructureCache(unittest.TestCase):
+    """
+    Tests for SharedStructureCache
+    """
+    shard = 2
+
+    def setUp(self):
+        super(TestSharedStructureCache, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(shared_structure_cache._MAPPED_STRUCTURES.clear)  # pylint: disable=protected-access
+        self.cache = SharedStructureCache(self.directory, 1024 * 1024)
+        self.structure = _create_structure(10)
+
+    def test_round_trip(self):
+        key = self.structure['_id']
+        self.assertIsNone(self.cache.get(key))
+
+        self.cache.set(key, self.structure)
+        cached_structure = self.cache.get(key)
+        self.assertEquals(cached_structure['blocks'].decoded_keys(), [])
+        self.assertEquals(
+            dict(iter_block_children(cached_structure['blocks'])),
+            dict(iter_block_children(self.structure['blocks'])),
+        )
+        self.assertEquals(cached_structure['blocks'].decoded_keys(), [])
+        self.assertEquals(cached_structure, self.structure)
+
+        # Each get returns a new structure.
+        root_key = self.structure['root']
+        self.assertIsNot(self.cache.get(key)['blocks'][root_key], cached_structure['blocks'][root_key])
+
+    def test_decode_structure(self):
+        encoded_structure = shared_structure_cache.encode_structure(self.structure)
+        structure = shared_structure_cache.decode_structure(encoded_structure)
+        self.assertEquals(structure['blocks'].decoded_keys(), [])
+        self.assertEquals(structure, self.structure)
+
+    def test_shared_amongst_processes(self):
+        key = self.structure['_id']
+        self.cache.set(key, self.structure)
+
+        # Another process maps the file written by this process.
+        shared_structure_cache._MAPPED_STRUCTURES.clear()  # pylint: disable=protected-access
+        self.assertEquals(SharedStructureCache(self.directory, 1024 * 1024).get(key), self.structure)
+
+    def test_unsupported_file(self):
+        key = self.structure['_id']
+        with open(os.path.join(self.directory, str(key) + shared_structure_cache.FILE_SUFFIX), 'wb') as cached_file:
+            cached_file.write('not a structure')
+        self.assertIsNone(self.cache.get(key))
+
+    def test_invalid_key(self):
+        self.cache.set('../structure', self.structure)
+        self.assertEquals(os.listdir(self.directory), [])
+        self.assertIsNone(self.cache.get('../structure'))
+
+    def test_remove_least_recently_used(self):
+        structures = [_create_structure(10) for _ in range(3)]
+        size = len(shared_structure_cache.encode_structure(structures[0]))
+        cache = SharedStructureCache(self.directory, size * 2)
+
+        for index, structure in enumerate(structures):
+            cache.set(structure['_id'], structure)
+            # Make sure the files are ordered by their modification times.
+            os.utime(cache._path(str(structure['_id'])), (index, index))  # pylint: disable=protected-access
+
+        self.assertEquals(
+            sorted(os.listdir(self.directory)),
+            sorted(str(structure['_id']) + shared_structure_cache.FILE_SUFFIX for structure in structures[1:]),
+        )
+
+    def test_threads(self):
+        structures = [_create_structure(2) for _ in range(4)]
+        for structure in structures:
+            self.cache.set(structure['_id'], structure)
+        mapped_structures = shared_structure_cache._MAPPED_STRUCTURES  # pylint: disable=protected-access
+        errors = []
+
+        def get_structures():
+            """Gets structures that evict each other from the mapped structures."""
+            try:
+                for index in range(50):
+                    structure = structures[index % len(structures)]
+                    self.assertEquals(self.cache.get(structure['_id']), structure)
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        with patch.object(mapped_structures, 'max_size', 2):
+            threads = [threading.Thread(target=get_structures) for __ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEquals(errors, [])
+        self.assertLessEqual(len(mapped_structures), 2)
+
+    def test_configured_directory_only(self):
+        with override_settings(COURSE_STRUCTURE_SHARED_CACHE={'DIRECTORY': self.directory}):
+            cache = get_shared_structure_cache()
+        self.assertEquals(cache.directory, self.directory)
+        self.assertEquals(cache.max_size, shared_structure_cache.DEFAULT_MAX_SIZE)
+
+    def test_not_configured(self):
+        with override_settings(COURSE_STRUCTURE_SHARED_CACHE={'MAX_SIZE': 1024}):
+            self.assertIsNone(get_shared_structure_cache())
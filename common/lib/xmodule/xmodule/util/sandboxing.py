@@ -1,8 +1,16 @@
 import re
+
+from capa.safe_exec import SafeExecResultCache, configure_pool
 from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
 
 DEFAULT_PYTHON_LIB_FILENAME = 'python_lib.zip'
 
+# The SafeExecResultCache of the process, once it's created by
+# get_safe_exec_cache.
+_SAFE_EXEC_CACHE = None
+
 
 def can_execute_unsafe_code(course_id):
     """
@@ -38,3 +46,35 @@ def get_python_lib_zip(contentstore, course_id):
         return zip_lib.data
     else:
         return None
+
+
+def get_safe_exec_cache():
+    """
+    Return the SafeExecResultCache of the process, configured by the
+    SAFE_EXEC_CACHE setting.
+    """
+    global _SAFE_EXEC_CACHE  # pylint: disable=global-statement
+    if _SAFE_EXEC_CACHE is None:
+        config = getattr(settings, 'SAFE_EXEC_CACHE', None) or {}
+        _SAFE_EXEC_CACHE = SafeExecResultCache(
+            shared_cache=caches[config.get('CACHE_ALIAS', 'default')],
+            max_entries=config.get('MAX_ENTRIES', 1000),
+            max_result_size=config.get('MAX_RESULT_SIZE', 64 * 1024),
+            local_timeout=config.get('LOCAL_TIMEOUT', 300),
+            shared_timeout=config.get('SHARED_TIMEOUT', 24 * 60 * 60),
+        )
+    return _SAFE_EXEC_CACHE
+
+
+class ConfigureSandboxPoolMiddleware(object):
+    """
+    Configure the pool of sandboxed processes of capa's safe_exec from the
+    'pool' of the CODE_JAIL setting, when the process starts.
+
+    Like codejail's ConfigureCodeJailMiddleware, this is a middleware only so
+    that it runs on startup, and must come after that one.
+    """
+    def __init__(self):
+        pool_config = getattr(settings, 'CODE_JAIL', {}).get('pool', {})
+        configure_pool(pool_config.get('size', 0), pool_config.get('max_jobs', 100))
+        raise MiddlewareNotUsed()
@@ -428,6 +428,13 @@ class CourseAuthorization(models.Model):
         except cls.DoesNotExist:
             return False
 
+    @classmethod
+    def instructor_email_enabled_for_courses(cls, course_ids):
+        """
+        Returns the set of the given course ids for which email is enabled.
+        """
+        return set(cls.objects.filter(course_id__in=course_ids, email_enabled=True).values_list('course_id', flat=True))
+
     def __unicode__(self):
         not_en = "Not "
         if self.email_enabled:
@@ -468,6 +475,19 @@ class BulkEmailFlag(ConfigurationModel):
         else:  # implies enabled == True and require_course_email == False, so email is globally enabled
             return True
 
+    @classmethod
+    def feature_enabled_for_courses(cls, course_ids):
+        """
+        Returns the set of the given course ids for which the bulk email feature is available, with at most one
+        query of the course authorizations.  See feature_enabled.
+        """
+        if not BulkEmailFlag.is_enabled():
+            return set()
+        elif BulkEmailFlag.current().require_course_email_auth:
+            return CourseAuthorization.instructor_email_enabled_for_courses(course_ids)
+        else:
+            return set(course_ids)
+
     class Meta(object):
         app_label = "bulk_email"
 
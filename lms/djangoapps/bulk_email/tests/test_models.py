@@ -300,3 +300,15 @@ class CourseAuthorizationTest(TestCase):
 
         # Now, course should STILL be authorized!
         self.assertTrue(BulkEmailFlag.feature_enabled(course_id))
+
+    def test_feature_enabled_for_courses(self):
+        course_ids = [CourseKey.from_string('abc/123/doremi'), CourseKey.from_string('blahx/blah101/ehhhhhhh')]
+        CourseAuthorization.objects.create(course_id=course_ids[0], email_enabled=True)
+        CourseAuthorization.objects.create(course_id=course_ids[1], email_enabled=False)
+        self.assertEqual(BulkEmailFlag.feature_enabled_for_courses(course_ids), set())
+
+        BulkEmailFlag.objects.create(enabled=True, require_course_email_auth=True)
+        self.assertEqual(BulkEmailFlag.feature_enabled_for_courses(course_ids), {course_ids[0]})
+
+        BulkEmailFlag.objects.create(enabled=True, require_course_email_auth=False)
+        self.assertEqual(BulkEmailFlag.feature_enabled_for_courses(course_ids), set(course_ids))
@@ -13,7 +13,8 @@ from lms.djangoapps.certificates.models import (
     CertificateStatuses,
     GeneratedCertificate,
     certificate_info_for_user,
-    certificate_status_for_student
+    certificate_status_for_student,
+    certificate_statuses_for_student
 )
 from lms.djangoapps.certificates.tests.factories import GeneratedCertificateFactory
 from student.models import CourseEnrollment
@@ -54,6 +55,27 @@ class CertificatesModelTest(ModuleStoreTestCase, MilestonesTestCaseMixin):
         self.assertEqual(certificate_status['status'], CertificateStatuses.unavailable)
         self.assertEqual(certificate_status['mode'], GeneratedCertificate.MODES.honor)
 
+    def test_certificate_statuses_for_student(self):
+        student = UserFactory()
+        course_ids = [self.instructor_paced_course.id, self.self_paced_course.id]
+        GeneratedCertificateFactory.create(
+            user=student,
+            course_id=self.self_paced_course.id,
+            status=CertificateStatuses.downloadable,
+            mode=GeneratedCertificate.MODES.verified,
+            download_url='http://www.example.com/certificate.pdf'
+        )
+
+        with self.assertNumQueries(1):
+            certificate_statuses = certificate_statuses_for_student(student, course_ids)
+        self.assertEqual(
+            certificate_statuses,
+            {course_id: certificate_status_for_student(student, course_id) for course_id in course_ids}
+        )
+        self.assertEqual(
+            certificate_statuses[self.self_paced_course.id]['status'], CertificateStatuses.downloadable
+        )
+
     @unpack
     @data(
         {'allow_certificate': False, 'whitelisted': False, 'grade': None, 'output': ['N', 'N', 'N/A']},
@@ -2,10 +2,13 @@
 API entry point to the course_blocks app with top-level
 get_course_blocks function.
 """
+from collections import namedtuple
+
 from django.conf import settings
 
 from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
 from openedx.core.djangoapps.content.block_structure.transformers import BlockStructureTransformers
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache
 
 from .transformers import library_content, start_date, user_partitions, visibility, load_override_data
 from .usage_info import CourseUsageInfo
@@ -14,6 +17,10 @@ INDIVIDUAL_STUDENT_OVERRIDE_PROVIDER = (
     'lms.djangoapps.courseware.student_field_overrides.IndividualStudentOverrideProvider'
 )
 
+# The maximum number of distinct transformed block structures kept for
+# sharing amongst users.  See create_shared_block_structures.
+MAX_SHARED_BLOCK_STRUCTURES = 10
+
 
 def has_individual_student_override_provider():
     """
@@ -50,6 +57,7 @@ def get_course_blocks(
         starting_block_usage_key,
         transformers=None,
         collected_block_structure=None,
+        shared_block_structures=None,
 ):
     """
     A higher order function implemented on top of the
@@ -72,6 +80,15 @@ def get_course_blocks(
             BlockStructureManager.get_collected.  Can be optionally
             provided if already available, for optimization.
 
+        shared_block_structures (SizeBoundedLRUCache) - If provided,
+            the transformed block structure is shared, via this cache,
+            amongst calls for users with equal equivalence keys of the
+            transformers (see BlockStructureTransformers.equivalence_key),
+            and a copy of it is returned.  See
+            create_shared_block_structures.  Only used if
+            collected_block_structure is provided, and the same one must
+            be provided for all of the calls.
+
     Returns:
         BlockStructureBlockData - A transformed block structure,
             starting at starting_block_usage_key, that has undergone the
@@ -85,8 +102,96 @@ def get_course_blocks(
         transformers = BlockStructureTransformers(get_course_block_access_transformers(user))
     transformers.usage_info = CourseUsageInfo(starting_block_usage_key.course_key, user)
 
+    if shared_block_structures is not None and collected_block_structure is not None:
+        equivalence_key = transformers.equivalence_key(collected_block_structure)
+        if equivalence_key is not None:
+            shared_key = (starting_block_usage_key, equivalence_key)
+            block_structure = shared_block_structures.get(shared_key)
+            if block_structure is None:
+                block_structure = get_block_structure_manager(starting_block_usage_key.course_key).get_transformed(
+                    transformers,
+                    starting_block_usage_key,
+                    collected_block_structure,
+                )
+                shared_block_structures.set(shared_key, block_structure, size=1)
+            # Each caller is given a copy, since it may be modified.
+            return block_structure.copy()
+
     return get_block_structure_manager(starting_block_usage_key.course_key).get_transformed(
         transformers,
         starting_block_usage_key,
         collected_block_structure,
     )
+
+
+def create_shared_block_structures():
+    """
+    Returns a cache for sharing transformed block structures amongst calls
+    of get_course_blocks, which keeps the MAX_SHARED_BLOCK_STRUCTURES most
+    recently used structures, so that the memory it holds is bounded for
+    runs over many users with distinct access.
+    """
+    return SizeBoundedLRUCache(max_size=MAX_SHARED_BLOCK_STRUCTURES)
+
+
+CourseBlocksResult = namedtuple('CourseBlocksResult', ['user', 'block_structure', 'error'])
+
+
+def get_course_blocks_for_users(
+        users,
+        starting_block_usage_key,
+        transformers=None,
+        collected_block_structure=None,
+):
+    """
+    Yields a CourseBlocksResult for each of the given users, which is a
+    named tuple of:
+
+        (user, block_structure, error)
+
+    where block_structure is the transformed block structure that would
+    be returned by get_course_blocks for the user.  If an error occurred
+    for the user, block_structure is None and error is the exception, so
+    the remaining users are still yielded.
+
+    The users are grouped by the equivalence keys of the transformers,
+    which identify the users' effective inputs to the transformers, such
+    as their partition groups and access to the course.  Each distinct
+    transformed block structure is computed once, for the first user in
+    its group, and a copy of it is yielded for the remaining users.
+    Users for whom the transformers do not support equivalence keys are
+    transformed individually.
+
+    Arguments:
+        users (iterable of django.contrib.auth.models.User) - User
+            objects for which the block structure is to be transformed.
+
+        starting_block_usage_key (UsageKey) - See the description in
+            get_course_blocks.
+
+        transformers (BlockStructureTransformers) - A collection of
+            transformers whose transform methods are to be called for
+            each user.  If None, get_course_block_access_transformers()
+            is used for each user.
+
+        collected_block_structure (BlockStructureBlockData) - See the
+            description in get_course_blocks.  If None, it is retrieved
+            once for all users.
+    """
+    if collected_block_structure is None:
+        collected_block_structure = get_block_structure_manager(starting_block_usage_key.course_key).get_collected()
+
+    shared_block_structures = create_shared_block_structures()
+    for user in users:
+        try:
+            block_structure = get_course_blocks(
+                user,
+                starting_block_usage_key,
+                transformers,
+                collected_block_structure,
+                shared_block_structures,
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            yield CourseBlocksResult(user, None, exc)
+        else:
+            yield CourseBlocksResult(user, block_structure, None)
@@ -0,0 +1,84 @@
+"""
+Tests for course_blocks API
+"""
+from mock import patch
+
+from openedx.core.djangoapps.content.block_structure.manager import BlockStructureManager
+from student.tests.factories import UserFactory
+
+from .. import api as course_blocks_api
+from ..api import get_course_blocks_for_users
+from ..transformers.tests.helpers import BlockParentsMapTestCase, publish_course, update_block
+from ..transformers.visibility import VisibilityTransformer
+
+
+class GetCourseBlocksForUsersTestCase(BlockParentsMapTestCase):
+    """
+    Tests for get_course_blocks_for_users
+    """
+    TRANSFORMER_CLASS_TO_TEST = VisibilityTransformer
+    shard = 3
+
+    def setUp(self):
+        super(GetCourseBlocksForUsersTestCase, self).setUp()
+        block = self.get_block(1)
+        block.visible_to_staff_only = True
+        update_block(block)
+        publish_course(self.course)
+
+        self.other_student = UserFactory.create()
+
+    def get_accessible_blocks(self, block_structure):
+        """
+        Returns the indices of the blocks in the given block structure.
+        """
+        return {index for index, xblock_key in enumerate(self.xblock_keys) if xblock_key in block_structure}
+
+    def test_shared_transforms(self):
+        users = [self.student, self.other_student, self.staff]
+        with patch.object(
+            BlockStructureManager,
+            'get_transformed',
+            autospec=True,
+            side_effect=BlockStructureManager.get_transformed,
+        ) as mock_get_transformed:
+            results = list(get_course_blocks_for_users(users, self.course.location, self.transformers))
+
+        # The students share the same transform.
+        self.assertEquals(mock_get_transformed.call_count, 2)
+
+        self.assertEquals([result.user for result in results], users)
+        self.assertEquals([result.error for result in results], [None, None, None])
+        self.assertEquals(
+            [self.get_accessible_blocks(result.block_structure) for result in results],
+            [{0, 2, 5, 6}, {0, 2, 5, 6}, set(range(len(self.parents_map)))],
+        )
+        self.assertIsNot(results[0].block_structure, results[1].block_structure)
+
+    def test_error(self):
+        error = Exception('error')
+        with patch.object(VisibilityTransformer, 'equivalence_key', side_effect=[error, False]):
+            results = list(
+                get_course_blocks_for_users([self.student, self.other_student], self.course.location, self.transformers)
+            )
+
+        self.assertEquals((results[0].block_structure, results[0].error), (None, error))
+        self.assertEquals(self.get_accessible_blocks(results[1].block_structure), {0, 2, 5, 6})
+
+    @patch.object(course_blocks_api, 'MAX_SHARED_BLOCK_STRUCTURES', 1)
+    def test_shared_transforms_bounded(self):
+        users = [self.student, self.staff, self.other_student]
+        with patch.object(
+            BlockStructureManager,
+            'get_transformed',
+            autospec=True,
+            side_effect=BlockStructureManager.get_transformed,
+        ) as mock_get_transformed:
+            results = list(get_course_blocks_for_users(users, self.course.location, self.transformers))
+
+        # The students' transform was evicted by the staff's.
+        self.assertEquals(mock_get_transformed.call_count, 3)
+        self.assertEquals(
+            [self.get_accessible_blocks(result.block_structure) for result in results],
+            [{0, 2, 5, 6}, set(range(len(self.parents_map))), {0, 2, 5, 6}],
+        )
@@ -67,7 +67,12 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
                 summary = summarize_block(child_key)
                 block_structure.set_transformer_block_field(child_key, cls, 'block_analytics_summary', summary)
 
-    def transform_block_filters(self, usage_info, block_structure):
+    def _get_library_children(self, usage_info, block_structure):
+        """
+        Returns the set of all children of library_content modules and
+        the set of those selected for the user, updating the user's
+        selections as needed.
+        """
         all_library_children = set()
         all_selected_children = set()
         for block_key in block_structure:
@@ -118,6 +123,15 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
                 )
                 all_selected_children.update(usage_info.course_key.make_usage_key(s[0], s[1]) for s in selected)
 
+        return all_library_children, all_selected_children
+
+    def equivalence_key(self, usage_info, block_structure):
+        _, all_selected_children = self._get_library_children(usage_info, block_structure)
+        return frozenset(all_selected_children)
+
+    def transform_block_filters(self, usage_info, block_structure):
+        all_library_children, all_selected_children = self._get_library_children(usage_info, block_structure)
+
         def check_child_removal(block_key):
             """
             Return True if selected block should be removed.
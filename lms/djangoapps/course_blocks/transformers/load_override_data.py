@@ -79,6 +79,14 @@ class OverrideDataTransformer(BlockStructureTransformer):
         # collect basic xblock fields
         block_structure.request_xblock_fields(*REQUESTED_FIELDS)
 
+    def equivalence_key(self, usage_info, block_structure):
+        overrides = StudentFieldOverride.objects.filter(
+            course_id=usage_info.course_key,
+            field__in=REQUESTED_FIELDS,
+            student__id=self.user.id,
+        ).values_list('location', 'field', 'value')
+        return tuple(sorted((unicode(location), field, value) for location, field, value in overrides))
+
     def transform(self, usage_info, block_structure):
         """
         loads override data into blocks
@@ -72,6 +72,10 @@ class SplitTestTransformer(FilteringTransformerMixin, BlockStructureTransformer)
                 group = child_to_group.get(child_location, None)
                 child.group_access[partition_for_this_block.id] = [group] if group is not None else []
 
+    def equivalence_key(self, usage_info, block_structure):
+        # The same split_test modules are removed for all users.
+        return ()
+
     def transform_block_filters(self, usage_info, block_structure):
         """
         Mutates block_structure based on the given usage_info.
@@ -79,6 +83,15 @@ class SplitTestTransformer(FilteringTransformerMixin, BlockStructureTransformer)
 
         # The UserPartitionTransformer will enforce group access, so
         # go ahead and remove all extraneous split_test modules.
+        block_index = block_structure.get_block_index()
+        if block_index is not None:
+            return [
+                block_structure.create_removal_bitmap(
+                    block_index.block_type_bitset('split_test'),
+                    keep_descendants=True,
+                )
+            ]
+
         return [
             block_structure.create_removal_filter(
                 lambda block_key: block_key.block_type == 'split_test',
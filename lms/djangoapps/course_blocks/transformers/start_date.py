@@ -27,9 +27,10 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
 
     Staff users are exempted from visibility rules.
     """
-    WRITE_VERSION = 1
+    WRITE_VERSION = 2
     READ_VERSION = 1
     MERGED_START_DATE = 'merged_start_date'
+    START_DATE_BITSETS = 'start_date_bitsets'
 
     @classmethod
     def name(cls):
@@ -67,11 +68,51 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
             func_merge_ancestors=max,
         )
 
+        # Group the blocks by the values that determine their access, so
+        # that access is checked once per group rather than per block.
+        block_index = block_structure.get_block_index()
+        if block_index is not None:
+            block_keys_by_start_date = {}
+            for block_key in block_structure.topological_traversal():
+                days_early_for_beta = getattr(block_structure.get_xblock(block_key), 'days_early_for_beta', None)
+                start_date = cls._get_merged_start_date(block_structure, block_key)
+                block_keys_by_start_date.setdefault((days_early_for_beta, start_date), []).append(block_key)
+
+            block_structure.set_transformer_data(cls, cls.START_DATE_BITSETS, [
+                (days_early_for_beta, start_date, block_index.bitset(block_keys))
+                for (days_early_for_beta, start_date), block_keys in block_keys_by_start_date.iteritems()
+            ])
+
+    def _get_removed_bitset(self, usage_info, block_structure):
+        """
+        Returns the bitset of the blocks that the user does not have
+        access to, or None if the blocks were collected without an
+        index.
+        """
+        start_date_bitsets = block_structure.get_transformer_data(self, self.START_DATE_BITSETS)
+        if start_date_bitsets is None:
+            return None
+
+        removed_bitset = 0
+        for days_early_for_beta, start_date, bitset in start_date_bitsets:
+            if not check_start_date(usage_info.user, days_early_for_beta, start_date, usage_info.course_key):
+                removed_bitset |= bitset
+        return removed_bitset
+
+    def equivalence_key(self, usage_info, block_structure):
+        if usage_info.has_staff_access:
+            return 0
+        return self._get_removed_bitset(usage_info, block_structure)
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Start Date check.
         if usage_info.has_staff_access:
             return [block_structure.create_universal_filter()]
 
+        removed_bitset = self._get_removed_bitset(usage_info, block_structure)
+        if removed_bitset is not None:
+            return [block_structure.create_removal_bitmap(removed_bitset)]
+
         removal_condition = lambda block_key: not check_start_date(
             usage_info.user,
             block_structure.get_xblock_field(block_key, 'days_early_for_beta'),
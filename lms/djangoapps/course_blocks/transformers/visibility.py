@@ -22,10 +22,11 @@ class VisibilityTransformer(FilteringTransformerMixin, BlockStructureTransformer
 
     Staff users are exempted from visibility rules.
     """
-    WRITE_VERSION = 1
+    WRITE_VERSION = 2
     READ_VERSION = 1
 
     MERGED_VISIBLE_TO_STAFF_ONLY = 'merged_visible_to_staff_only'
+    VISIBLE_TO_STAFF_ONLY_BITSET = 'visible_to_staff_only_bitset'
 
     @classmethod
     def name(cls):
@@ -59,11 +60,29 @@ class VisibilityTransformer(FilteringTransformerMixin, BlockStructureTransformer
             merged_field_name=cls.MERGED_VISIBLE_TO_STAFF_ONLY,
         )
 
+        block_index = block_structure.get_block_index()
+        if block_index is not None:
+            block_structure.set_transformer_data(
+                cls,
+                cls.VISIBLE_TO_STAFF_ONLY_BITSET,
+                block_index.bitset(
+                    block_key for block_key in block_structure
+                    if cls._get_visible_to_staff_only(block_structure, block_key)
+                ),
+            )
+
+    def equivalence_key(self, usage_info, block_structure):
+        return usage_info.has_staff_access
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Visibility check.
         if usage_info.has_staff_access:
             return [block_structure.create_universal_filter()]
 
+        visible_to_staff_only_bitset = block_structure.get_transformer_data(self, self.VISIBLE_TO_STAFF_ONLY_BITSET)
+        if visible_to_staff_only_bitset is not None:
+            return [block_structure.create_removal_bitmap(visible_to_staff_only_bitset)]
+
         return [
             block_structure.create_removal_filter(
                 lambda block_key: self._get_visible_to_staff_only(block_structure, block_key),
@@ -42,6 +42,7 @@ from openedx.core.djangoapps.content.course_overviews.models import CourseOvervi
 from openedx.core.djangoapps.external_auth.models import ExternalAuthMap
 from student import auth
 from student.models import CourseEnrollmentAllowed
+from openedx.core.lib.cache_utils import get_cache
 from student.roles import (
     CourseBetaTesterRole,
     CourseCcxCoachRole,
@@ -50,6 +51,7 @@ from student.roles import (
     GlobalStaff,
     OrgInstructorRole,
     OrgStaffRole,
+    RoleCache,
     SupportStaffRole
 )
 from util import milestones_helpers as milestones_helpers
@@ -65,6 +67,10 @@ from xmodule.x_module import XModule
 
 log = logging.getLogger(__name__)
 
+# The namespace of the request cache of the CourseEnrollmentAllowed rows
+# that has_access_many loads, by user email and course key.
+ENROLLMENT_ALLOWED_CACHE_NAMESPACE = u'courseware.access.enrollment_allowed'
+
 
 def has_ccx_coach_role(user, course_key):
     """
@@ -167,6 +173,52 @@ def has_access(user, action, obj, course_key=None):
                     .format(type(obj)))
 
 
+def has_access_many(user, action, objs, course_key=None):
+    """
+    Check whether a user has the access to do action on each of objs, as
+    has_access does, with the queries that the checks share done at once:
+    the user's roles are loaded once, and, for the 'enroll' and 'see_exists'
+    actions, so are the CourseEnrollmentAllowed rows of all of the courses.
+
+    Returns a list of the AccessResponses of objs, in the same order.
+    """
+    if not user:
+        user = AnonymousUser()
+
+    if not user.is_authenticated:
+        return [has_access(user, action, obj, course_key) for obj in objs]
+
+    # pylint: disable=protected-access
+    if not hasattr(user, '_roles'):
+        user._roles = RoleCache(user)
+
+    enrollment_allowed = get_cache(ENROLLMENT_ALLOWED_CACHE_NAMESPACE)
+    if action in ('enroll', 'see_exists'):
+        course_keys = [obj.id for obj in objs if isinstance(obj, (CourseDescriptor, CourseOverview))]
+        for cea in CourseEnrollmentAllowed.objects.filter(email=user.email, course_id__in=course_keys):
+            enrollment_allowed[(user.email, cea.course_id)] = cea
+        for key in course_keys:
+            enrollment_allowed.setdefault((user.email, key), None)
+
+    try:
+        return [has_access(user, action, obj, course_key) for obj in objs]
+    finally:
+        # The rows are only reused by this call, as they may change later in
+        # the request.
+        enrollment_allowed.clear()
+
+
+def _get_course_enrollment_allowed(user, course_key):
+    """
+    Returns the CourseEnrollmentAllowed of the user's email for the course,
+    or None, from those loaded by has_access_many if it has.
+    """
+    enrollment_allowed = get_cache(ENROLLMENT_ALLOWED_CACHE_NAMESPACE)
+    if (user.email, course_key) in enrollment_allowed:
+        return enrollment_allowed[(user.email, course_key)]
+    return CourseEnrollmentAllowed.objects.filter(email=user.email, course_id=course_key).first()
+
+
 def has_staff_access_to_preview_mode(user, course_key):
     """
     Checks if given user can access course in preview mode.
@@ -264,7 +316,7 @@ def _can_enroll_courselike(user, courselike):
     # Note that as dictated by the legacy database schema, the filter call includes
     # a `course_id` kwarg which requires a CourseKey.
     if user is not None and user.is_authenticated:
-        cea = CourseEnrollmentAllowed.objects.filter(email=user.email, course_id=course_key).first()
+        cea = _get_course_enrollment_allowed(user, course_key)
         if cea and cea.valid_for_user(user):
             return ACCESS_GRANTED
         elif cea:
@@ -61,23 +61,29 @@ def get_course(course_id, depth=0):
     return course
 
 
-def get_course_by_id(course_key, depth=0):
+def get_course_by_id(course_key, depth=0, prefetch_block_types=None):
     """
     Given a course id, return the corresponding course descriptor.
 
     If such a course does not exist, raises a 404.
 
     depth: The number of levels of children for the modulestore to cache. None means infinite depth
+
+    prefetch_block_types: The block types (or True for all block types) out to depth whose
+      definitions the modulestore should prefetch in bulk. Only useful if the caller holds a
+      bulk operation on the course while it uses the blocks.
     """
+    kwargs = {'prefetch_block_types': prefetch_block_types} if prefetch_block_types else {}
     with modulestore().bulk_operations(course_key):
-        course = modulestore().get_course(course_key, depth=depth)
+        course = modulestore().get_course(course_key, depth=depth, **kwargs)
     if course:
         return course
     else:
         raise Http404("Course not found: {}.".format(unicode(course_key)))
 
 
-def get_course_with_access(user, action, course_key, depth=0, check_if_enrolled=False, check_survey_complete=True):
+def get_course_with_access(user, action, course_key, depth=0, check_if_enrolled=False, check_survey_complete=True,
+                           prefetch_block_types=None):
     """
     Given a course_key, look up the corresponding course descriptor,
     check that the user has the access to perform the specified action
@@ -94,8 +100,9 @@ def get_course_with_access(user, action, course_key, depth=0, check_if_enrolled=
       Note: We do not want to continually add these optional booleans.  Ideally,
       these special cases could not only be handled inside has_access, but could
       be plugged in as additional callback checks for different actions.
+    prefetch_block_types: See get_course_by_id.
     """
-    course = get_course_by_id(course_key, depth)
+    course = get_course_by_id(course_key, depth, prefetch_block_types=prefetch_block_types)
     check_course_access(course, user, action, check_if_enrolled, check_survey_complete)
     return course
 
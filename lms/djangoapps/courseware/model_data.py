@@ -33,7 +33,7 @@ from opaque_keys.edx.block_types import BlockTypeKeyV1
 from opaque_keys.edx.keys import CourseKey
 from xblock.core import XBlockAside
 from xblock.exceptions import InvalidScopeError, KeyValueMultiSaveError
-from xblock.fields import Scope, UserScope
+from xblock.fields import BlockScope, Scope, UserScope
 from xblock.runtime import KeyValueStore
 
 from courseware.user_state_client import DjangoXBlockUserStateClient
@@ -56,13 +56,21 @@ def _all_usage_keys(descriptors, aside_types):
     Return a set of all usage_ids for the `descriptors` and for
     as all asides in `aside_types` for those descriptors.
     """
+    return _with_aside_usage_keys((descriptor.scope_ids.usage_id for descriptor in descriptors), aside_types)
+
+
+def _with_aside_usage_keys(usage_keys, aside_types):
+    """
+    Return a set of the `usage_keys` and of the usage_ids of all asides
+    in `aside_types` for those usage keys.
+    """
     usage_ids = set()
-    for descriptor in descriptors:
-        usage_ids.add(descriptor.scope_ids.usage_id)
+    for usage_key in usage_keys:
+        usage_ids.add(usage_key)
 
         for aside_type in aside_types:
-            usage_ids.add(AsideUsageKeyV1(descriptor.scope_ids.usage_id, aside_type))
-            usage_ids.add(AsideUsageKeyV2(descriptor.scope_ids.usage_id, aside_type))
+            usage_ids.add(AsideUsageKeyV1(usage_key, aside_type))
+            usage_ids.add(AsideUsageKeyV2(usage_key, aside_type))
 
     return usage_ids
 
@@ -175,6 +183,17 @@ class DjangoOrmFieldCache(object):
         for field_object in self._read_objects(fields, xblocks, aside_types):
             self._cache[self._cache_key_for_field_object(field_object)] = field_object
 
+    def cache_usage_keys(self, usage_keys):
+        """
+        Load all fields of the blocks with the supplied ``usage_keys``
+        into this cache.
+
+        Arguments:
+            usage_keys (set of :class:`UsageKey`): The blocks to cache fields for.
+        """
+        for field_object in self._read_objects_for_usage_keys(usage_keys):
+            self._cache[self._cache_key_for_field_object(field_object)] = field_object
+
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def get(self, kvs_key):
         """
@@ -320,6 +339,17 @@ class DjangoOrmFieldCache(object):
         """
         raise NotImplementedError()
 
+    @abstractmethod
+    def _read_objects_for_usage_keys(self, usage_keys):
+        """
+        Return an iterator for all objects stored in the underlying datastore
+        for the blocks with the supplied ``usage_keys``.
+
+        Arguments:
+            usage_keys (set of :class:`UsageKey`): The blocks to load fields for
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def _cache_key_for_field_object(self, field_object):
         """
@@ -361,9 +391,19 @@ class UserStateCache(object):
             xblocks (list of :class:`XBlock`): XBlocks to cache fields for.
             aside_types (list of str): Aside types to cache fields for.
         """
+        self.cache_usage_keys(_all_usage_keys(xblocks, aside_types))
+
+    def cache_usage_keys(self, usage_keys):
+        """
+        Load all fields of the blocks with the supplied ``usage_keys``
+        into this cache.
+
+        Arguments:
+            usage_keys (set of :class:`UsageKey`): The blocks to cache fields for.
+        """
         block_field_state = self._client.get_many(
             self.user.username,
-            _all_usage_keys(xblocks, aside_types),
+            usage_keys,
         )
         for user_state in block_field_state:
             self._cache[user_state.block_key] = user_state.state
@@ -535,6 +575,16 @@ class UserStateSummaryCache(DjangoOrmFieldCache):
             field_name__in=set(field.name for field in fields),
         )
 
+    def _read_objects_for_usage_keys(self, usage_keys):
+        """
+        Return an iterator for all objects stored in the underlying datastore
+        for the blocks with the supplied ``usage_keys``.
+
+        Arguments:
+            usage_keys (set of :class:`UsageKey`): The blocks to load fields for
+        """
+        return XModuleUserStateSummaryField.objects.chunked_filter('usage_id__in', usage_keys)
+
     def _cache_key_for_field_object(self, field_object):
         """
         Return the key used in this DjangoOrmFieldCache to store the specified field_object.
@@ -598,6 +648,17 @@ class PreferencesCache(DjangoOrmFieldCache):
             field_name__in=set(field.name for field in fields),
         )
 
+    def _read_objects_for_usage_keys(self, usage_keys):
+        """
+        Return an iterator for all of the user's objects stored in the
+        underlying datastore, whatever the types of the blocks with the
+        supplied ``usage_keys``.
+
+        Arguments:
+            usage_keys (set of :class:`UsageKey`): The blocks to load fields for
+        """
+        return XModuleStudentPrefsField.objects.filter(student=self.user.pk)
+
     def _cache_key_for_field_object(self, field_object):
         """
         Return the key used in this DjangoOrmFieldCache to store the specified field_object.
@@ -658,6 +719,16 @@ class UserInfoCache(DjangoOrmFieldCache):
             field_name__in=set(field.name for field in fields),
         )
 
+    def _read_objects_for_usage_keys(self, usage_keys):
+        """
+        Return an iterator for all of the user's objects stored in the
+        underlying datastore.
+
+        Arguments:
+            usage_keys (set of :class:`UsageKey`): The blocks to load fields for
+        """
+        return XModuleStudentInfoField.objects.filter(student=self.user.pk)
+
     def _cache_key_for_field_object(self, field_object):
         """
         Return the key used in this DjangoOrmFieldCache to store the specified field_object.
@@ -722,6 +793,15 @@ class FieldDataCache(object):
             ),
         }
         self.scorable_locations = set()
+
+        # The usage keys (including those of asides) of the blocks whose
+        # field data has been loaded into this cache.
+        self._cached_usage_keys = set()
+
+        # Whether the field data of blocks is loaded when it's first accessed
+        # (see add_block_structure_descendants).
+        self._load_on_access = False
+
         self.add_descriptors_to_cache(descriptors)
 
     def add_descriptors_to_cache(self, descriptors):
@@ -729,6 +809,12 @@ class FieldDataCache(object):
         Add all `descriptors` to this FieldDataCache.
         """
         if self.user.is_authenticated:
+            if self._load_on_access:
+                descriptors = [
+                    descriptor for descriptor in descriptors
+                    if descriptor.scope_ids.usage_id not in self._cached_usage_keys
+                ]
+
             self.scorable_locations.update(desc.location for desc in descriptors if desc.has_score)
             for scope, fields in self._fields_to_cache(descriptors).items():
                 if scope not in self.cache:
@@ -736,6 +822,55 @@ class FieldDataCache(object):
 
                 self.cache[scope].cache_fields(fields, descriptors, self.asides)
 
+            self._cached_usage_keys.update(_all_usage_keys(descriptors, self.asides))
+
+    def add_block_structure_descendants(self, block_structure, usage_key):
+        """
+        Add the block at `usage_key` and all of its descendants in the
+        collected `block_structure` to this FieldDataCache, without
+        instantiating their descriptors.
+
+        All of the Scope.user_state and Scope.user_state_summary data of
+        the blocks, and all of the user's Scope.preferences and
+        Scope.user_info data, are loaded with a query each.
+
+        From then on, the field data of any other block (e.g., one added
+        to the course since the block structure was collected, or one
+        required by a conditional block) is loaded when it's first
+        accessed, so the descriptors needn't be added to this
+        FieldDataCache before they are rendered.
+
+        Arguments:
+            block_structure: The collected block structure of the course.
+            usage_key: The usage key of the block.
+
+        Returns: whether the block was added.
+        """
+        if not self.user.is_authenticated or usage_key not in block_structure:
+            return False
+
+        usage_keys = _with_aside_usage_keys(block_structure.post_order_traversal(start_node=usage_key), self.asides)
+        for cache in self.cache.itervalues():
+            cache.cache_usage_keys(usage_keys)
+        self._cached_usage_keys.update(usage_keys)
+        self._load_on_access = True
+        return True
+
+    def _load_block_on_access(self, key):
+        """
+        Load the block field data of the block of `key` into this
+        FieldDataCache, if it's loaded when it's first accessed and it
+        hasn't been loaded yet.
+        """
+        if not self._load_on_access or key.scope.block != BlockScope.USAGE:
+            return
+
+        if key.block_scope_id not in self._cached_usage_keys:
+            usage_keys = {key.block_scope_id}
+            for scope in (Scope.user_state, Scope.user_state_summary):
+                self.cache[scope].cache_usage_keys(usage_keys)
+            self._cached_usage_keys.update(usage_keys)
+
     def add_descriptor_descendents(self, descriptor, depth=None, descriptor_filter=lambda descriptor: True):
         """
         Add all descendants of `descriptor` to this FieldDataCache.
@@ -823,6 +958,7 @@ class FieldDataCache(object):
         if key.scope not in self.cache:
             raise KeyError(key.field_name)
 
+        self._load_block_on_access(key)
         return self.cache[key.scope].get(key)
 
     @contract(kv_dict="dict(DjangoKeyValueStore_Key: *)")
@@ -850,6 +986,7 @@ class FieldDataCache(object):
             if key.scope not in self.cache:
                 continue
 
+            self._load_block_on_access(key)
             by_scope[key.scope][key] = value
 
         for scope, set_many_data in by_scope.iteritems():
@@ -883,6 +1020,7 @@ class FieldDataCache(object):
         if key.scope not in self.cache:
             raise KeyError(key.field_name)
 
+        self._load_block_on_access(key)
         self.cache[key.scope].delete(key)
 
     @contract(key=DjangoKeyValueStore.Key, returns=bool)
@@ -904,6 +1042,7 @@ class FieldDataCache(object):
         if key.scope not in self.cache:
             return False
 
+        self._load_block_on_access(key)
         return self.cache[key.scope].has(key)
 
     @contract(key=DjangoKeyValueStore.Key, returns="datetime|None")
@@ -924,6 +1063,7 @@ class FieldDataCache(object):
         if key.scope not in self.cache:
             return None
 
+        self._load_block_on_access(key)
         return self.cache[key.scope].last_modified(key)
 
     def __len__(self):
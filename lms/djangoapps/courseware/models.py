@@ -213,6 +213,31 @@ class BaseStudentModuleHistory(models.Model):
 
         return history_entries
 
+    @staticmethod
+    def bulk_save_history(student_modules):
+        """
+        Saves the history entries of the given StudentModules in a single
+        query, in the history table that their post_save signal would save
+        them in.  For the StudentModules that are written with bulk
+        operations, which don't send that signal.
+        """
+        if settings.FEATURES.get('ENABLE_CSMH_EXTENDED'):
+            history_class = coursewarehistoryextended.models.StudentModuleHistoryExtended
+        else:
+            history_class = StudentModuleHistory
+
+        history_class.objects.bulk_create([
+            history_class(
+                student_module=student_module,
+                version=None,
+                created=student_module.modified,
+                state=student_module.state,
+                grade=student_module.grade,
+                max_grade=student_module.max_grade,
+            )
+            for student_module in student_modules
+        ])
+
 
 class StudentModuleHistory(BaseStudentModuleHistory):
     """Keeps a complete history of state changes for a given XModule for a given
@@ -851,3 +851,47 @@ class CourseOverviewAccessTestCase(ModuleStoreTestCase):
         course_overview = CourseOverview.get_from_id(course.id)
         with self.assertNumQueries(num_queries, table_blacklist=QUERY_COUNT_TABLE_BLACKLIST):
             bool(access.has_access(user, action, course_overview, course_key=course.id))
+
+    @ddt.data(*itertools.product(
+        ['user_normal', 'user_beta_tester', 'user_staff', 'user_anonymous'],
+        ['enroll', 'load', 'staff', 'see_exists', 'see_about_page'],
+    ))
+    @ddt.unpack
+    @patch.dict('django.conf.settings.FEATURES', {'DISABLE_START_DATES': False})
+    def test_has_access_many(self, user_attr_name, action):
+        user = getattr(self, user_attr_name)
+        course_overviews = [
+            CourseOverview.get_from_id(course.id)
+            for course in [self.course_default, self.course_started, self.course_not_started, self.course_staff_only]
+        ]
+        self.assertEqual(
+            [bool(response) for response in access.has_access_many(user, action, course_overviews)],
+            [bool(access.has_access(user, action, course_overview)) for course_overview in course_overviews]
+        )
+
+    def test_has_access_many_enrollment_allowed(self):
+        course_invitation_only = CourseFactory.create(invitation_only=True)
+        CourseEnrollmentAllowedFactory(email=self.user_normal.email, course_id=course_invitation_only.id)
+        course_overviews = [
+            CourseOverview.get_from_id(course_invitation_only.id),
+            CourseOverview.get_from_id(CourseFactory.create(invitation_only=True).id),
+        ]
+        self.assertEqual(
+            [bool(response) for response in access.has_access_many(self.user_normal, 'enroll', course_overviews)],
+            [True, False]
+        )
+
+    @ddt.data(1, 4)
+    @patch.dict('django.conf.settings.FEATURES', {'DISABLE_START_DATES': False})
+    def test_has_access_many_num_queries(self, num_courses):
+        course_overviews = [
+            CourseOverview.get_from_id(CourseFactory.create(start=self.course_not_started.start).id)
+            for __ in range(num_courses)
+        ]
+
+        # get a fresh user object that won't have any cached role information
+        user = User.objects.get(id=self.user_normal.id)
+
+        # The user's roles, and the enrollment allowances of the courses
+        with self.assertNumQueries(2, table_blacklist=QUERY_COUNT_TABLE_BLACKLIST):
+            access.has_access_many(user, 'see_exists', course_overviews)
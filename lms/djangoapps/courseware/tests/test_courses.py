@@ -98,6 +98,14 @@ class CoursesTest(ModuleStoreTestCase):
         with check_mongo_calls(num_mongo_calls):
             course_access_func(user, 'load', course.id)
 
+    def test_get_course_with_access_prefetch(self):
+        user = UserFactory.create()
+        course = CourseFactory.create(default_store=ModuleStoreEnum.Type.split)
+        store = modulestore()
+        with mock.patch.object(store, 'get_course', wraps=store.get_course) as mock_get_course:
+            get_course_with_access(user, 'load', course.id, depth=2, prefetch_block_types=True)
+        mock_get_course.assert_any_call(course.id, depth=2, prefetch_block_types=True)
+
     def test_get_courses_by_org(self):
         """
         Verify that org filtering performs as expected, and that an empty result
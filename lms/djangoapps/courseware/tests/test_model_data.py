@@ -11,7 +11,7 @@ from xblock.core import XBlock
 from xblock.exceptions import KeyValueMultiSaveError
 from xblock.fields import BlockScope, Scope, ScopeIds
 
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError, UserStateCache
 from courseware.models import (
     StudentModule,
     XModuleStudentInfoField,
@@ -26,8 +26,12 @@ from courseware.tests.factories import (
     course_id,
     location
 )
+from openedx.core.djangoapps.content.block_structure.factory import BlockStructureFactory
 from openedx.core.lib.tests import attr
 from student.tests.factories import UserFactory
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 
 def mock_field(scope, name):
@@ -434,3 +438,73 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+class TestBlockStructureDescendants(ModuleStoreTestCase):
+    """
+    Tests for adding the descendants of a block in a block structure to a FieldDataCache.
+    """
+    shard = 4
+
+    def setUp(self):
+        super(TestBlockStructureDescendants, self).setUp()
+        self.user = UserFactory.create()
+        self.course = CourseFactory.create()
+        self.chapter = ItemFactory.create(parent=self.course, category='chapter')
+        self.sequential = ItemFactory.create(parent=self.chapter, category='sequential')
+        self.vertical = ItemFactory.create(parent=self.sequential, category='vertical')
+        self.problem = ItemFactory.create(parent=self.vertical, category='problem')
+        self.block_structure = BlockStructureFactory.create_from_modulestore(self.course.location, self.store)
+        self.field_data_cache = FieldDataCache([], self.course.id, self.user)
+
+    def attempts_key(self, block):
+        """
+        Returns the key of the attempts field of the given block.
+        """
+        return DjangoKeyValueStore.Key(Scope.user_state, self.user.id, block.location, 'attempts')
+
+    def create_student_module(self, block):
+        """
+        Creates a StudentModule for the given block.
+        """
+        cmfStudentModuleFactory.create(
+            student=self.user,
+            course_id=self.course.id,
+            module_state_key=block.location,
+            state='{"attempts": 1}',
+        )
+
+    def test_descendants(self):
+        self.create_student_module(self.problem)
+
+        # One query for each of the user_state, user_state_summary, preferences and user_info scopes.
+        with self.assertNumQueries(4):
+            self.assertTrue(
+                self.field_data_cache.add_block_structure_descendants(self.block_structure, self.sequential.location)
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.field_data_cache.get(self.attempts_key(self.problem)), 1)
+            self.assertFalse(self.field_data_cache.has(self.attempts_key(self.vertical)))
+
+        # The descriptors of the descendants aren't queried for again.
+        sequential = modulestore().get_item(self.sequential.location, depth=None)
+        with patch.object(UserStateCache, 'cache_usage_keys') as mock_cache_usage_keys:
+            self.field_data_cache.add_descriptor_descendents(sequential, depth=None)
+        self.assertFalse(mock_cache_usage_keys.called)
+
+    def test_block_added_later(self):
+        other_problem = ItemFactory.create(parent=self.vertical, category='problem')
+        self.create_student_module(other_problem)
+        self.field_data_cache.add_block_structure_descendants(self.block_structure, self.sequential.location)
+
+        # The block isn't in the block structure, so its field data is loaded when it's first accessed.
+        with self.assertNumQueries(2):
+            self.assertEqual(self.field_data_cache.get(self.attempts_key(other_problem)), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.field_data_cache.get(self.attempts_key(other_problem)), 1)
+
+    def test_missing_block(self):
+        missing_key = self.course.id.make_usage_key('sequential', 'missing')
+        with self.assertNumQueries(0):
+            self.assertFalse(self.field_data_cache.add_block_structure_descendants(self.block_structure, missing_key))
+        self.assertFalse(self.field_data_cache.has(self.attempts_key(self.problem)))
@@ -3,14 +3,20 @@ Black-box tests of the DjangoUserStateClient against the semantics
 defined in edx_user_state_client.
 """
 
+import json
 from collections import defaultdict
 from unittest import skip
 
+from django.db import connections
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from edx_user_state_client.tests import UserStateClientTestBase
+from opaque_keys.edx.locator import CourseLocator
 
+from courseware.models import StudentModule
 from courseware.tests.factories import UserFactory
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.user_state_client import DjangoXBlockUserStateClient, user_state_write_behind
+from coursewarehistoryextended.models import StudentModuleHistoryExtended
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
@@ -36,3 +42,96 @@ class TestDjangoUserStateClient(UserStateClientTestBase, ModuleStoreTestCase):
         super(TestDjangoUserStateClient, self).setUp()
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
+
+
+class TestDjangoUserStateClientWriteBehind(TestCase):
+    """
+    Tests of the DjangoUserStateClient within user_state_write_behind.
+    """
+    shard = 4
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestDjangoUserStateClientWriteBehind, self).setUp()
+        self.user = UserFactory.create()
+        self.client = DjangoXBlockUserStateClient(self.user)
+        self.course_key = CourseLocator('org', 'course', 'run')
+        self.usage_keys = [self.course_key.make_usage_key('problem', 'problem_{}'.format(i)) for i in range(10)]
+
+    def _stored_state(self, usage_key):
+        """
+        Returns the stored state of the user's block.
+        """
+        return json.loads(StudentModule.objects.get(student=self.user, module_state_key=usage_key).state)
+
+    def test_read_your_writes(self):
+        with user_state_write_behind():
+            self.client.set(self.user.username, self.usage_keys[0], {'a': 1})
+            self.client.set_many(self.user.username, {self.usage_keys[0]: {'b': 2}, self.usage_keys[1]: {'c': 3}})
+            self.assertFalse(StudentModule.objects.filter(student=self.user).exists())
+
+            self.assertEqual(self.client.get(self.user.username, self.usage_keys[0]).state, {'a': 1, 'b': 2})
+            self.assertEqual(self.client.get(self.user.username, self.usage_keys[1], fields=['c']).state, {'c': 3})
+
+        self.assertEqual(self._stored_state(self.usage_keys[0]), {'a': 1, 'b': 2})
+        self.assertEqual(self._stored_state(self.usage_keys[1]), {'c': 3})
+        student_module_ids = StudentModule.objects.filter(student=self.user).values_list('id', flat=True)
+        self.assertEqual(
+            StudentModuleHistoryExtended.objects.filter(student_module__in=list(student_module_ids)).count(), 2
+        )
+
+    def test_overlaid_on_stored_state(self):
+        self.client.set(self.user.username, self.usage_keys[0], {'a': 1, 'b': 1})
+        with user_state_write_behind():
+            self.client.set(self.user.username, self.usage_keys[0], {'b': 2})
+            self.assertEqual(self.client.get(self.user.username, self.usage_keys[0]).state, {'a': 1, 'b': 2})
+            self.assertEqual(self._stored_state(self.usage_keys[0]), {'a': 1, 'b': 1})
+
+        self.assertEqual(self._stored_state(self.usage_keys[0]), {'a': 1, 'b': 2})
+
+    def test_delete(self):
+        self.client.set(self.user.username, self.usage_keys[0], {'a': 1})
+        with user_state_write_behind():
+            self.client.set(self.user.username, self.usage_keys[0], {'a': 2, 'b': 2})
+            self.client.delete(self.user.username, self.usage_keys[0], fields=['a'])
+            self.assertEqual(self.client.get(self.user.username, self.usage_keys[0]).state, {'b': 2})
+
+        self.assertEqual(self._stored_state(self.usage_keys[0]), {'b': 2})
+
+    def test_discarded_upon_exception(self):
+        with self.assertRaises(ValueError):
+            with user_state_write_behind():
+                self.client.set(self.user.username, self.usage_keys[0], {'a': 1})
+                raise ValueError()
+
+        self.assertFalse(StudentModule.objects.filter(student=self.user).exists())
+
+    def test_constant_queries(self):
+        def flush_queries(usage_keys):
+            """
+            Returns the number of queries to flush the creation and the
+            update of the given blocks' states.
+            """
+            with CaptureQueriesContext(connections['default']) as queries:
+                for value in range(2):
+                    with user_state_write_behind():
+                        self.client.set_many(self.user.username, {usage_key: {'a': value} for usage_key in usage_keys})
+            return len(queries)
+
+        self.assertEqual(flush_queries(self.usage_keys[:1]), flush_queries(self.usage_keys[1:]))
+
+    def test_locked_in_order(self):
+        self.client.set_many(self.user.username, {usage_key: {'a': 1} for usage_key in self.usage_keys})
+        with CaptureQueriesContext(connections['default']) as queries:
+            with user_state_write_behind():
+                self.client.set_many(self.user.username, {usage_key: {'a': 2} for usage_key in self.usage_keys})
+
+        # The rows to update are selected (for update, where the database supports it) in the order of their keys.
+        ordered_selects = [
+            query['sql'] for query in queries
+            if 'ORDER BY' in query['sql'] and 'module_state_key' in query['sql'].split('ORDER BY')[-1]
+        ]
+        self.assertEqual(len(ordered_selects), 1)
+        for usage_key in self.usage_keys:
+            self.assertEqual(self._stored_state(usage_key), {'a': 2})
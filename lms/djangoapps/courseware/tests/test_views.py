@@ -54,6 +54,7 @@ from lms.djangoapps.grades.config.waffle import waffle as grades_waffle
 from lms.djangoapps.grades.config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT
 from openedx.core.djangoapps.catalog.tests.factories import CourseFactory as CatalogCourseFactory
 from openedx.core.djangoapps.catalog.tests.factories import CourseRunFactory, ProgramFactory
+from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from openedx.core.djangoapps.crawlers.models import CrawlersConfig
 from openedx.core.djangoapps.credit.api import set_credit_requirements
@@ -204,12 +205,16 @@ class IndexQueryTestCase(ModuleStoreTestCase):
     CREATE_USER = False
     NUM_PROBLEMS = 20
 
-    @ddt.data(
-        (ModuleStoreEnum.Type.mongo, 10, 147),
-        (ModuleStoreEnum.Type.split, 4, 147),
+    LAZY_SECTION_LOADING_FLAG = CourseWaffleFlag(
+        WaffleFlagNamespace(name='courseware'), 'enable_lazy_section_loading'
     )
-    @ddt.unpack
-    def test_index_query_counts(self, store_type, expected_mongo_query_count, expected_mysql_query_count):
+
+    def _create_section(self, store_type):
+        """
+        Creates a course with a section of NUM_PROBLEMS problems, in which a
+        new user is enrolled and logged in, and returns the course's key and
+        the section's URL.
+        """
         with self.store.default_store(store_type):
             course = CourseFactory.create()
             with self.store.bulk_operations(course.id):
@@ -223,16 +228,44 @@ class IndexQueryTestCase(ModuleStoreTestCase):
         self.client.login(username=self.user.username, password=TEST_PASSWORD)
         CourseEnrollment.enroll(self.user, course.id)
 
+        return course.id, reverse(
+            'courseware_section',
+            kwargs={
+                'course_id': unicode(course.id),
+                'chapter': unicode(chapter.location.block_id),
+                'section': unicode(section.location.block_id),
+            }
+        )
+
+    @ddt.data(
+        (ModuleStoreEnum.Type.mongo, 10, 147),
+        (ModuleStoreEnum.Type.split, 4, 147),
+    )
+    @ddt.unpack
+    def test_index_query_counts(self, store_type, expected_mongo_query_count, expected_mysql_query_count):
+        __, url = self._create_section(store_type)
+
         with self.assertNumQueries(expected_mysql_query_count, table_blacklist=QUERY_COUNT_TABLE_BLACKLIST):
             with check_mongo_calls(expected_mongo_query_count):
-                url = reverse(
-                    'courseware_section',
-                    kwargs={
-                        'course_id': unicode(course.id),
-                        'chapter': unicode(chapter.location.block_id),
-                        'section': unicode(section.location.block_id),
-                    }
-                )
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    @ddt.data(
+        (ModuleStoreEnum.Type.mongo, 10),
+        (ModuleStoreEnum.Type.split, 4),
+    )
+    @ddt.unpack
+    def test_index_query_counts_lazy_section_loading(self, store_type, expected_mongo_query_count):
+        """
+        The section's blocks are loaded in bulk, with as many queries as without
+        the flag, however many of them there are.
+        """
+        course_key, url = self._create_section(store_type)
+        # Collect the block structure, so that the view reads it from the cache.
+        get_block_structure_manager(course_key).get_collected()
+
+        with override_waffle_flag(self.LAZY_SECTION_LOADING_FLAG, active=True):
+            with check_mongo_calls(expected_mongo_query_count):
                 response = self.client.get(url)
                 self.assertEqual(response.status_code, 200)
 
@@ -5,6 +5,8 @@ data in a Django ORM model.
 
 import itertools
 import logging
+from collections import OrderedDict
+from contextlib import contextmanager
 from operator import attrgetter
 from time import time
 
@@ -12,8 +14,11 @@ from django.conf import settings
 from django.core.paginator import Paginator
 from django.contrib.auth.models import User
 from django.db import transaction
+from django.db.models import Case, TextField, Value, When
 from django.db.utils import IntegrityError
+from django.utils import timezone
 from edx_django_utils import monitoring as monitoring_utils
+from edx_django_utils.cache import RequestCache
 from edx_user_state_client.interface import XBlockUserState, XBlockUserStateClient
 from xblock.fields import Scope
 
@@ -28,6 +33,117 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+WRITE_BEHIND_CACHE_NAMESPACE = u'courseware.user_state_client.write_behind'
+
+
+@contextmanager
+def user_state_write_behind():
+    """
+    A context manager within which the Scope.user_state written by any
+    DjangoXBlockUserStateClient is buffered in the request cache, rather
+    than written to StudentModule immediately.
+
+    Upon exception-free exit, all of the buffered writes are flushed with a
+    bulk insert of the new StudentModules, a single update of the existing
+    ones, and a bulk insert of their history, in a transaction.  If an
+    exception is raised, the buffered writes are discarded.
+
+    Within the context, get_many returns the buffered state overlaid on the
+    stored state, so reads see the writes that were made before them.
+    Nested contexts are flushed by the outermost one.
+    """
+    request_cache = RequestCache(WRITE_BEHIND_CACHE_NAMESPACE).data
+    if 'buffer' in request_cache:
+        yield
+        return
+
+    write_buffer = request_cache['buffer'] = _UserStateWriteBuffer()
+    try:
+        yield
+    finally:
+        request_cache.pop('buffer', None)
+    with transaction.atomic():
+        write_buffer.flush()
+
+
+def _get_write_buffer():
+    """
+    Returns the active _UserStateWriteBuffer, or None if writes are not
+    being buffered.
+    """
+    return RequestCache(WRITE_BEHIND_CACHE_NAMESPACE).data.get('buffer')
+
+
+class _UserStateWriteBuffer(object):
+    """
+    The Scope.user_state written within a user_state_write_behind context,
+    which has not been flushed yet.
+    """
+    def __init__(self):
+        # The client and user that wrote the state of each username.
+        # dict {username: (DjangoXBlockUserStateClient, User)}
+        self.writers = {}
+
+        # The fields written for each block, and when they were written.
+        # OrderedDict {username: OrderedDict {UsageKey: (dict, datetime)}}
+        self.states = OrderedDict()
+
+    def add(self, client, user, block_keys_to_state):
+        """
+        Buffers the given states of the given user's blocks, overlaid over
+        any states already buffered for them.
+        """
+        self.writers.setdefault(user.username, (client, user))
+        user_states = self.states.setdefault(user.username, OrderedDict())
+        modified = timezone.now()
+        for usage_key, state in block_keys_to_state.iteritems():
+            buffered_state, _ = user_states.get(usage_key, ({}, None))
+            # Copy the state as it would be stored, so that later changes to
+            # its values by the caller aren't written.
+            buffered_state.update(json.loads(json.dumps(state)))
+            user_states[usage_key] = (buffered_state, modified)
+
+    def delete(self, username, block_keys, fields):
+        """
+        Deletes the given fields (or all fields, if None) from the buffered
+        states of the given user's blocks.
+        """
+        user_states = self.states.get(username, {})
+        for usage_key in block_keys:
+            if usage_key not in user_states:
+                continue
+            if fields is None:
+                del user_states[usage_key]
+            else:
+                buffered_state, _ = user_states[usage_key]
+                for field in fields:
+                    buffered_state.pop(field, None)
+
+    def get_states(self, username, block_keys):
+        """
+        Returns the buffered states of the given user's blocks, as an
+        OrderedDict {UsageKey: (dict, datetime)}.
+        """
+        user_states = self.states.get(username, {})
+        return OrderedDict(
+            (usage_key, user_states[usage_key])
+            for usage_key in block_keys
+            if usage_key in user_states
+        )
+
+    def flush(self):
+        """
+        Writes all of the buffered states to the database.
+        """
+        for username, user_states in self.states.iteritems():
+            if not user_states:
+                continue
+            client, user = self.writers[username]
+            client._flush_buffered_states(  # pylint: disable=protected-access
+                user,
+                OrderedDict((usage_key, state) for usage_key, (state, _) in user_states.iteritems()),
+            )
+
 
 class DjangoXBlockUserStateClient(XBlockUserStateClient):
     """
@@ -198,19 +314,28 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         self._ddog_histogram(evt_time, 'get_many.blks_requested', len(block_keys))
         self._nr_stat_accumulate('get_many', 'blocks_requested', len(block_keys))
 
+        # State written within a user_state_write_behind context, which is
+        # overlaid on the stored state.
+        write_buffer = _get_write_buffer()
+        buffered_states = write_buffer.get_states(username, block_keys) if write_buffer else {}
+
         modules = self._get_student_modules(username, block_keys)
         for module, usage_key in modules:
-            if module.state is None:
+            buffered_state, modified = buffered_states.pop(usage_key, (None, module.modified))
+            if module.state is None and buffered_state is None:
                 self._ddog_increment(evt_time, 'get_many.empty_state')
                 continue
 
-            state = json.loads(module.state)
-            state_length = len(module.state)
+            state = json.loads(module.state) if module.state is not None else {}
+            state_length = len(module.state or '')
 
             # record this metric before the check for empty state, so that we
             # have some visibility into empty blocks.
             self._ddog_histogram(evt_time, 'get_many.block_size', state_length)
 
+            if buffered_state is not None:
+                state.update(buffered_state)
+
             # If the state is the empty dict, then it has been deleted, and so
             # conformant UserStateClients should treat it as if it doesn't exist.
             if state == {}:
@@ -228,7 +353,19 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
                     for field in fields
                     if field in state
                 }
-            yield XBlockUserState(username, usage_key, state, module.modified, scope)
+            yield XBlockUserState(username, usage_key, state, modified, scope)
+
+        # Blocks whose state has been written, but not stored yet.
+        for usage_key, (buffered_state, modified) in buffered_states.iteritems():
+            state = dict(buffered_state)
+            if fields is not None:
+                state = {
+                    field: state[field]
+                    for field in fields
+                    if field in state
+                }
+            total_block_count += 1
+            yield XBlockUserState(username, usage_key, state, modified, scope)
 
         # The rest of this method exists only to report metrics.
         finish_time = time()
@@ -270,6 +407,12 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
             # what we have.
             return
 
+        write_buffer = _get_write_buffer()
+        if write_buffer is not None:
+            write_buffer.add(self, user, block_keys_to_state)
+            self._nr_stat_accumulate('set_many', 'blocks_buffered', len(block_keys_to_state))
+            return
+
         evt_time = time()
 
         for usage_key, state in block_keys_to_state.items():
@@ -349,6 +492,119 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         self._ddog_histogram(evt_time, 'set_many.response_time', duration)
         self._nr_stat_accumulate('set_many', 'duration', duration)
 
+    def _flush_buffered_states(self, user, block_keys_to_state):
+        """
+        Overlays the given states, buffered within a user_state_write_behind
+        context, over the stored states of the given user's blocks, with a
+        constant number of queries per course.
+
+        If another process creates one of the StudentModules concurrently,
+        the states are written one block at a time, as set_many does.
+
+        Arguments:
+            user (:class:`~User`): The user whose states are written.
+            block_keys_to_state (dict): A dict mapping UsageKeys to state dicts.
+        """
+        evt_time = time()
+        course_key_func = attrgetter('course_key')
+        by_course = itertools.groupby(
+            sorted(block_keys_to_state, key=course_key_func),
+            course_key_func,
+        )
+        for course_key, usage_keys in by_course:
+            # The blocks are written in a fixed order, so that concurrent flushes of
+            # the user's states lock the same rows in the same order.
+            course_block_keys_to_state = OrderedDict(
+                (usage_key, block_keys_to_state[usage_key]) for usage_key in sorted(usage_keys, key=unicode)
+            )
+            try:
+                with transaction.atomic():
+                    self._bulk_write_states(user, course_key, course_block_keys_to_state)
+            except IntegrityError:
+                log.warning("set_many: IntegrityError for student {} - course_id {} - flushing {} block keys".format(
+                    user, repr(unicode(course_key)), len(course_block_keys_to_state)
+                ))
+                self.set_many(user.username, course_block_keys_to_state)
+
+        duration = (time() - evt_time) * 1000  # milliseconds
+        self._ddog_histogram(evt_time, 'set_many.blks_flushed', len(block_keys_to_state))
+        self._nr_stat_accumulate('set_many', 'blocks_flushed', len(block_keys_to_state))
+        self._nr_stat_accumulate('set_many', 'flush_duration', duration)
+
+    def _bulk_write_states(self, user, course_key, block_keys_to_state):
+        """
+        Overlays the given states over the stored states of the given user's
+        blocks in a course, creating the StudentModules that do not exist
+        yet, and saves their history.  Must be called in a transaction.
+        """
+        modified = timezone.now()
+        # The existing modules are locked in the order of their keys, rather than
+        # in whichever order the database reads them, so that concurrent flushes
+        # can't deadlock on each other's locks.
+        existing_modules = {
+            student_module.module_state_key.map_into_course(course_key): student_module
+            for student_module in StudentModule.objects.select_for_update().filter(
+                student=user,
+                course_id=course_key,
+                module_state_key__in=block_keys_to_state.keys(),
+            ).order_by('module_state_key')
+        }
+
+        created_modules, updated_modules = [], []
+        for usage_key, state in block_keys_to_state.iteritems():
+            student_module = existing_modules.get(usage_key)
+            if student_module is None:
+                created_modules.append(StudentModule(
+                    student=user,
+                    course_id=course_key,
+                    module_state_key=usage_key,
+                    module_type=usage_key.block_type,
+                    state=json.dumps(state),
+                ))
+            else:
+                current_state = json.loads(student_module.state) if student_module.state is not None else {}
+                current_state.update(state)
+                student_module.state = json.dumps(current_state)
+                student_module.modified = modified
+                updated_modules.append(student_module)
+
+            self._nr_block_stat_increment(
+                'set_many', usage_key.block_type, 'blocks_updated' if student_module else 'blocks_created'
+            )
+
+        if created_modules:
+            StudentModule.objects.bulk_create(created_modules)
+        if updated_modules:
+            # A single UPDATE of all of the modules, with each module's state.
+            new_states = [
+                When(id=student_module.id, then=Value(student_module.state))
+                for student_module in updated_modules
+            ]
+            StudentModule.objects.filter(id__in=[student_module.id for student_module in updated_modules]).update(
+                state=Case(*new_states, output_field=TextField()),
+                modified=modified,
+            )
+
+        # Bulk operations don't send the post_save signals which save the
+        # history of the modules, so it is saved here.
+        history_modules = [
+            student_module for student_module in updated_modules
+            if student_module.module_type in BaseStudentModuleHistory.HISTORY_SAVING_TYPES
+        ]
+        created_history_keys = [
+            student_module.module_state_key for student_module in created_modules
+            if student_module.module_type in BaseStudentModuleHistory.HISTORY_SAVING_TYPES
+        ]
+        if created_history_keys:
+            # The ids of bulk created objects aren't set on all databases.
+            history_modules.extend(StudentModule.objects.filter(
+                student=user,
+                course_id=course_key,
+                module_state_key__in=created_history_keys,
+            ))
+        if history_modules:
+            BaseStudentModuleHistory.bulk_save_history(history_modules)
+
     def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
         """
         Delete the stored XBlock state for a many xblock usages.
@@ -370,6 +626,10 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
         self._ddog_histogram(evt_time, 'delete_many.block_count', len(block_keys))
 
+        write_buffer = _get_write_buffer()
+        if write_buffer is not None:
+            write_buffer.delete(username, block_keys, fields)
+
         student_modules = self._get_student_modules(username, block_keys)
         for student_module, _ in student_modules:
             if fields is None:
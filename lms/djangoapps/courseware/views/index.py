@@ -28,6 +28,7 @@ from lms.djangoapps.courseware.exceptions import CourseAccessRedirect
 from lms.djangoapps.experiments.utils import get_experiment_user_metadata_context
 from lms.djangoapps.gating.api import get_entrance_exam_score_ratio, get_entrance_exam_usage_key
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
+from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
 from openedx.core.djangoapps.crawlers.models import CrawlersConfig
 from openedx.core.djangoapps.lang_pref import LANGUAGE_KEY
 from openedx.core.djangoapps.user_api.preferences.api import get_user_preference
@@ -72,6 +73,11 @@ class CoursewareIndex(View):
         waffle_flag = CourseWaffleFlag(WaffleFlagNamespace(name='seo'), 'enable_anonymous_courseware_access')
         return waffle_flag.is_enabled(self.course_key)
 
+    @cached_property
+    def enable_lazy_section_loading(self):
+        waffle_flag = CourseWaffleFlag(WaffleFlagNamespace(name='courseware'), 'enable_lazy_section_loading')
+        return waffle_flag.is_enabled(self.course_key)
+
     @method_decorator(ensure_csrf_cookie)
     @method_decorator(cache_control(no_cache=True, no_store=True, must_revalidate=True))
     @method_decorator(ensure_valid_course_key)
@@ -117,6 +123,7 @@ class CoursewareIndex(View):
                     request.user, 'load', self.course_key,
                     depth=CONTENT_DEPTH,
                     check_if_enrolled=not self.enable_anonymous_courseware_access,
+                    prefetch_block_types=True,
                 )
                 self.is_staff = has_access(request.user, 'staff', self.course)
                 self._setup_masquerade_for_effective_user()
@@ -333,9 +340,20 @@ class CoursewareIndex(View):
         Prefetches all descendant data for the requested section and
         sets up the runtime, which binds the request user to the section.
         """
-        # Pre-fetch all descendant data
+        # Load all descendants in bulk, since rendering the section renders every one of them
         self.section = modulestore().get_item(self.section.location, depth=None, lazy=False)
-        self.field_data_cache.add_descriptor_descendents(self.section, depth=None)
+
+        # Pre-fetch all descendant data
+        prefetched = False
+        if self.enable_lazy_section_loading:
+            # Enumerate the descendants from the collected block structure, rather than
+            # walking their descriptors to find the fields to load.
+            prefetched = self.field_data_cache.add_block_structure_descendants(
+                get_block_structure_manager(self.course_key).get_collected(),
+                self.section.location,
+            )
+        if not prefetched:
+            self.field_data_cache.add_descriptor_descendents(self.section, depth=None)
 
         # Bind section to user
         self.section = get_module_for_descriptor(
@@ -11,6 +11,7 @@ import mock
 
 import lms.lib.comment_client as cc
 
+from django_comment_client.tests.utils import UnpooledCommentsServiceMixin
 from django_comment_common.models import ForumsConfig
 from django_comment_common.signals import comment_created
 from edx_ace.recipient import Recipient
@@ -65,7 +66,7 @@ def make_mock_responder(subscribed_thread_ids=None, thread_data=None, comment_da
 
 
 @ddt.ddt
-class TaskTestCase(ModuleStoreTestCase):
+class TaskTestCase(UnpooledCommentsServiceMixin, ModuleStoreTestCase):
     shard = 4
 
     @classmethod
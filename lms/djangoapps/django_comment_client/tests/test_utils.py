@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 import datetime
 import json
+import logging
+import time
 
 import ddt
 import mock
 
 from django.urls import reverse
-from django.test import RequestFactory, TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from edx_django_utils.cache import RequestCache
 from mock import Mock, patch
 from pytz import UTC
@@ -20,7 +22,11 @@ from courseware.tests.factories import InstructorFactory
 from django_comment_client.constants import TYPE_ENTRY, TYPE_SUBCATEGORY
 from django_comment_client.tests.factories import RoleFactory
 from django_comment_client.tests.unicode import UnicodeTestMixin
-from django_comment_client.tests.utils import config_course_discussions, topic_name_to_id
+from django_comment_client.tests.utils import (
+    UnpooledCommentsServiceMixin,
+    config_course_discussions,
+    topic_name_to_id
+)
 from django_comment_common.models import (
     CourseDiscussionSettings,
     ForumsConfig,
@@ -33,7 +39,12 @@ from django_comment_common.utils import (
     set_course_discussion_settings
 )
 from lms.djangoapps.teams.tests.factories import CourseTeamFactory
-from lms.lib.comment_client.utils import CommentClientMaintenanceError, perform_request
+from lms.lib.comment_client.utils import (
+    CommentClientMaintenanceError,
+    close_sessions,
+    perform_in_parallel,
+    perform_request
+)
 from openedx.core.djangoapps.course_groups import cohorts
 from openedx.core.djangoapps.course_groups.cohorts import set_course_cohorted
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory, config_course_cohorts
@@ -41,11 +52,14 @@ from openedx.core.djangoapps.util.testing import ContentGroupTestCase
 from openedx.core.lib.tests import attr
 from student.roles import CourseStaffRole
 from student.tests.factories import AdminFactory, CourseEnrollmentFactory, UserFactory
+from terrain.stubs.comments import StubCommentsService, StubCommentsServiceHandler
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MIXED_MODULESTORE, ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, ToyCourseFactory
 
+log = logging.getLogger(__name__)
+
 
 @attr(shard=1)
 class DictionaryTestCase(TestCase):
@@ -1811,7 +1825,7 @@ class GroupModeratorPermissionsTestCase(ModuleStoreTestCase):
         })
 
 
-class ClientConfigurationTestCase(TestCase):
+class ClientConfigurationTestCase(UnpooledCommentsServiceMixin, TestCase):
     """Simple test cases to ensure enabling/disabling the use of the comment service works as intended."""
 
     def test_disabled(self):
@@ -1840,6 +1854,115 @@ class ClientConfigurationTestCase(TestCase):
         self.assertEqual(result, {})
 
 
+class KeepAliveCommentsServiceHandler(StubCommentsServiceHandler):
+    """
+    A handler of the stub comments service which keeps connections alive.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super(KeepAliveCommentsServiceHandler, self).setup()
+        self.server.connection_count += 1
+
+    def send_response(self, status_code, content=None, headers=None):
+        headers = dict(headers or {})
+        headers['Content-Length'] = str(len(content or ''))
+        super(KeepAliveCommentsServiceHandler, self).send_response(status_code, content, headers)
+
+
+class KeepAliveCommentsService(StubCommentsService):
+    """
+    A stub comments service which keeps connections alive, and counts them.
+    """
+    HANDLER_CLASS = KeepAliveCommentsServiceHandler
+
+    def __init__(self, *args, **kwargs):
+        self.connection_count = 0
+        super(KeepAliveCommentsService, self).__init__(*args, **kwargs)
+
+
+@attr(shard=1)
+@ddt.ddt
+class CommentsServiceConnectionsTestCase(TestCase):
+    """
+    Tests of the connections to the comments service, and of the requests made in parallel.
+    """
+    def setUp(self):
+        super(CommentsServiceConnectionsTestCase, self).setUp()
+        config = ForumsConfig.current()
+        config.enabled = True
+        config.save()
+
+        self.server = KeepAliveCommentsService()
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(close_sessions)
+        self.url = 'http://127.0.0.1:{}/api/v1/users/1'.format(self.server.port)
+
+    def get_latencies(self, count):
+        """
+        Makes the given number of requests to the stub comments service, and
+        returns the median and the 99th percentile of their latencies, in ms.
+        """
+        latencies = []
+        for _ in range(count):
+            start = time.time()
+            self.assertEqual(perform_request('get', self.url)['id'], '1')
+            latencies.append((time.time() - start) * 1000)
+        latencies.sort()
+        return latencies[count // 2], latencies[count * 99 // 100]
+
+    @override_settings(COMMENTS_SERVICE_CONNECTIONS={'POOL_ENABLED': True})
+    def test_pooled_connections(self):
+        p50, p99 = self.get_latencies(100)
+        log.info(u"Pooled comments service latencies: p50=%.2fms, p99=%.2fms", p50, p99)
+        self.assertEqual(self.server.connection_count, 1)
+
+    @override_settings(COMMENTS_SERVICE_CONNECTIONS={'POOL_ENABLED': False})
+    def test_unpooled_connections(self):
+        p50, p99 = self.get_latencies(100)
+        log.info(u"Unpooled comments service latencies: p50=%.2fms, p99=%.2fms", p50, p99)
+        self.assertEqual(self.server.connection_count, 100)
+
+    @override_settings(COMMENTS_SERVICE_CONNECTIONS={'POOL_ENABLED': True, 'FAN_OUT_WORKERS': 2})
+    def test_parallel_requests(self):
+        results = perform_in_parallel(
+            lambda: perform_request('get', self.url),
+            lambda: perform_request('get', self.url),
+            lambda: perform_request('get', self.url.replace('users/1', 'users/2')),
+        )
+        self.assertEqual([result['id'] for result in results], ['1', '1', '2'])
+
+    @override_settings(COMMENTS_SERVICE_CONNECTIONS={'FAN_OUT_WORKERS': 2})
+    def test_parallel_requests_config(self):
+        # The config is read in the current thread, and used by the others.
+        with patch.object(ForumsConfig, 'current', wraps=ForumsConfig.current) as mock_current:
+            perform_in_parallel(
+                lambda: perform_request('get', self.url),
+                lambda: perform_request('get', self.url),
+            )
+        self.assertEqual(mock_current.call_count, 1)
+
+    @ddt.data(0, 2)
+    def test_parallel_errors(self, workers):
+        def fail(exception_class):
+            """
+            Raises an exception of the given class.
+            """
+            raise exception_class()
+
+        with override_settings(COMMENTS_SERVICE_CONNECTIONS={'FAN_OUT_WORKERS': workers}):
+            with self.assertRaises(KeyError):
+                perform_in_parallel(lambda: 1, lambda: fail(KeyError), lambda: fail(ValueError))
+            with self.assertRaises(ValueError):
+                perform_in_parallel(lambda: fail(ValueError), lambda: fail(KeyError))
+
+    def test_sequential_requests(self):
+        calls = []
+        results = perform_in_parallel(lambda: calls.append(1) or 1, lambda: calls.append(2) or 2)
+        self.assertEqual(results, [1, 2])
+        self.assertEqual(calls, [1, 2])
+
+
 def set_discussion_division_settings(
         course_key, enable_cohorts=False, always_divide_inline_discussions=False,
         divided_discussions=[], division_scheme=CourseDiscussionSettings.COHORT
@@ -1,6 +1,7 @@
 """
 Utilities for tests within the django_comment_client module.
 """
+from django.test import override_settings
 from mock import patch
 
 from django_comment_common.models import ForumsConfig, Role
@@ -14,9 +15,23 @@ from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
 
 
-class ForumsEnableMixin(object):
+class UnpooledCommentsServiceMixin(object):
     """
-    Ensures that the forums are enabled for a given test class.
+    Makes the requests of a test class to the comments service one at a time,
+    without pooled connections, for the tests which mock requests.request,
+    which pooled connections don't call, or expect the requests in order.
+    """
+    def setUp(self):
+        super(UnpooledCommentsServiceMixin, self).setUp()
+        override = override_settings(COMMENTS_SERVICE_CONNECTIONS={'POOL_ENABLED': False, 'FAN_OUT_WORKERS': 0})
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class ForumsEnableMixin(UnpooledCommentsServiceMixin):
+    """
+    Ensures that the forums are enabled for a given test class, whose
+    requests to the comments service are mocked.
     """
     def setUp(self):
         super(ForumsEnableMixin, self).setUp()
@@ -14,7 +14,15 @@ class CourseData(object):
     This is an in-memory object that maintains its own internal
     cache during its lifecycle.
     """
-    def __init__(self, user, course=None, collected_block_structure=None, structure=None, course_key=None):
+    def __init__(
+            self,
+            user,
+            course=None,
+            collected_block_structure=None,
+            structure=None,
+            course_key=None,
+            shared_block_structures=None,
+    ):
         if not any([course, collected_block_structure, structure, course_key]):
             raise ValueError(
                 "You must specify one of course, collected_block_structure, structure, or course_key to this method."
@@ -26,6 +34,10 @@ class CourseData(object):
         self._course_key = course_key
         self._location = None
 
+        # Transformed block structures shared amongst users, as
+        # described in course_blocks.api.get_course_blocks.
+        self._shared_block_structures = shared_block_structures
+
     @property
     def course_key(self):
         if not self._course_key:
@@ -55,6 +67,7 @@ class CourseData(object):
                 self.user,
                 self.location,
                 collected_block_structure=self._collected_block_structure,
+                shared_block_structures=self._shared_block_structures,
             )
         return self._structure
 
@@ -7,6 +7,7 @@ from logging import getLogger
 import dogstats_wrapper as dog_stats_api
 from six import text_type
 
+from lms.djangoapps.course_blocks.api import create_shared_block_structures
 from openedx.core.djangoapps.signals.signals import COURSE_GRADE_CHANGED, COURSE_GRADE_NOW_PASSED
 
 from .config import assume_zero_if_absent, should_persist_grades
@@ -31,6 +32,7 @@ class CourseGradeFactory(object):
             course_structure=None,
             course_key=None,
             create_if_needed=True,
+            shared_block_structures=None,
     ):
         """
         Returns the CourseGrade for the given user in the course.
@@ -42,7 +44,9 @@ class CourseGradeFactory(object):
         At least one of course, collected_block_structure, course_structure,
         or course_key should be provided.
         """
-        course_data = CourseData(user, course, collected_block_structure, course_structure, course_key)
+        course_data = CourseData(
+            user, course, collected_block_structure, course_structure, course_key, shared_block_structures,
+        )
         try:
             return self._read(user, course_data)
         except PersistentCourseGrade.DoesNotExist:
@@ -61,6 +65,7 @@ class CourseGradeFactory(object):
             course_structure=None,
             course_key=None,
             force_update_subsections=False,
+            shared_block_structures=None,
     ):
         """
         Computes, updates, and returns the CourseGrade for the given
@@ -69,7 +74,9 @@ class CourseGradeFactory(object):
         At least one of course, collected_block_structure, course_structure,
         or course_key should be provided.
         """
-        course_data = CourseData(user, course, collected_block_structure, course_structure, course_key)
+        course_data = CourseData(
+            user, course, collected_block_structure, course_structure, course_key, shared_block_structures,
+        )
         return self._update(
             user,
             course_data,
@@ -101,18 +108,23 @@ class CourseGradeFactory(object):
         course_data = CourseData(
             user=None, course=course, collected_block_structure=collected_block_structure, course_key=course_key,
         )
+        # 3. Optimization: the transformed course structure is computed
+        #    once for all students with the same access to the course,
+        #    amongst the most recently used ones.
+        shared_block_structures = create_shared_block_structures()
         stats_tags = [u'action:{}'.format(course_data.course_key)]
         for user in users:
             with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
-                yield self._iter_grade_result(user, course_data, force_update)
+                yield self._iter_grade_result(user, course_data, force_update, shared_block_structures)
 
-    def _iter_grade_result(self, user, course_data, force_update):
+    def _iter_grade_result(self, user, course_data, force_update, shared_block_structures=None):
         try:
             kwargs = {
                 'user': user,
                 'course': course_data.course,
                 'collected_block_structure': course_data.collected_structure,
-                'course_key': course_data.course_key
+                'course_key': course_data.course_key,
+                'shared_block_structures': shared_block_structures,
             }
             if force_update:
                 kwargs['force_update_subsections'] = True
@@ -0,0 +1,20 @@
+"""
+This module contains various configuration settings via
+waffle switches for the instructor_task app.
+"""
+from openedx.core.djangoapps.waffle_utils import WaffleSwitchNamespace
+
+# Namespace
+WAFFLE_NAMESPACE = u'instructor_task'
+
+# Switches
+STREAM_GRADE_REPORTS = u'stream_grade_reports'
+SHARD_GRADE_REPORTS = u'shard_grade_reports'
+BATCH_RESCORE = u'batch_rescore'
+
+
+def waffle():
+    """
+    Returns the namespaced, cached, audited Waffle class for instructor_task.
+    """
+    return WaffleSwitchNamespace(name=WAFFLE_NAMESPACE, log_prefix=u'InstructorTask: ')
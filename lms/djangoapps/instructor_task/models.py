@@ -18,15 +18,18 @@ import hashlib
 import json
 import logging
 import os.path
+import tempfile
+from cStringIO import StringIO
 from uuid import uuid4
 
 from boto.exception import BotoServerError
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.files.base import ContentFile
+from django.core.files.base import ContentFile, File
 from django.db import models, transaction
 from opaque_keys.edx.django.models import CourseKeyField
 from six import text_type
+from storages.backends.s3boto import S3BotoStorage
 
 from openedx.core.storage import get_storage
 
@@ -231,6 +234,9 @@ class DjangoStorageReportStore(ReportStore):
     """
     ReportStore implementation that delegates to django's storage api.
     """
+    # The size, in bytes, of the chunks of CSV written by stream_rows.
+    STREAM_CHUNK_SIZE = 64 * 1024
+
     def __init__(self, storage_class=None, storage_kwargs=None):
         if storage_kwargs is None:
             storage_kwargs = {}
@@ -278,6 +284,86 @@ class DjangoStorageReportStore(ReportStore):
         output_buffer.seek(0)
         self.store(course_id, filename, output_buffer)
 
+    def stream_rows(self, course_id, filename, rows):
+        """
+        Like `store_rows`, but writes the CSV as the rows are generated, so
+        that only a chunk of it is held in memory at a time.
+        """
+        self._stream(course_id, filename, lambda output_file: self._write_csv(output_file, rows))
+
+    def concatenate(self, course_id, filename, part_filenames):
+        """
+        Store the concatenation of the given CSV files, which were stored by
+        `store_rows` or `stream_rows`, as a single CSV named `filename`.
+        """
+        def write_parts(output_file):
+            """
+            Writes the parts to the given file, without their BOMs.
+            """
+            output_file.write(codecs.BOM_UTF8)
+            for part_filename in part_filenames:
+                with self.storage.open(self.path_to(course_id, part_filename), 'rb') as part_file:
+                    if part_file.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+                        part_file.seek(0)
+                    for chunk in iter(lambda: part_file.read(self.STREAM_CHUNK_SIZE), ''):
+                        output_file.write(chunk)
+
+        self._stream(course_id, filename, write_parts)
+
+    def exists(self, course_id, filename):
+        """
+        Return whether the given file exists for the given course.
+        """
+        return self.storage.exists(self.path_to(course_id, filename))
+
+    def delete(self, course_id, filename):
+        """
+        Delete the given file of the given course.
+        """
+        self.storage.delete(self.path_to(course_id, filename))
+
+    def _stream(self, course_id, filename, write):
+        """
+        Stores the file written by the function `write`, which is given a
+        file to write to, in chunks of no more than about STREAM_CHUNK_SIZE
+        bytes.
+
+        S3 storage uploads the file in parts as it is written.  Other
+        storages store the file from a temporary file once it's complete.
+        """
+        if isinstance(self.storage, S3BotoStorage):
+            output_file = self.storage.open(self.path_to(course_id, filename), 'wb')
+            try:
+                write(output_file)
+            except Exception:
+                # Don't complete the upload of a partial file.
+                if output_file._multipart is not None:  # pylint: disable=protected-access
+                    output_file._multipart.cancel_upload()  # pylint: disable=protected-access
+                raise
+            output_file.close()
+        else:
+            with tempfile.TemporaryFile() as output_file:
+                write(output_file)
+                output_file.seek(0)
+                self.store(course_id, filename, File(output_file))
+
+    def _write_csv(self, output_file, rows):
+        """
+        Writes the given rows to the given file in csv format, in chunks of
+        about STREAM_CHUNK_SIZE bytes.
+        """
+        # Adding unicode signature (BOM) for MS Excel 2013 compatibility
+        output_file.write(codecs.BOM_UTF8)
+        chunk = StringIO()
+        csvwriter = csv.writer(chunk)
+        for row in self._get_utf8_encoded_rows(rows):
+            csvwriter.writerow(row)
+            if chunk.tell() >= self.STREAM_CHUNK_SIZE:
+                output_file.write(chunk.getvalue())
+                chunk.seek(0)
+                chunk.truncate()
+        output_file.write(chunk.getvalue())
+
     def links_for(self, course_id):
         """
         For a given `course_id`, return a list of `(filename, url)` tuples.
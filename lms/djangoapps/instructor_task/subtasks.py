@@ -8,7 +8,7 @@ from time import time
 from uuid import uuid4
 
 import psutil
-from celery.states import READY_STATES, RETRY, SUCCESS
+from celery.states import FAILURE, READY_STATES, RETRY, SUCCESS
 from django.core.cache import cache
 from django.db import DatabaseError, transaction
 
@@ -211,7 +211,7 @@ class SubtaskStatus(object):
         return unicode(repr(self))
 
 
-def initialize_subtask_info(entry, action_name, total_num, subtask_id_list):
+def initialize_subtask_info(entry, action_name, total_num, subtask_id_list, required_subtask_ids=()):
     """
     Store initial subtask information to InstructorTask object.
 
@@ -232,6 +232,10 @@ def initialize_subtask_info(entry, action_name, total_num, subtask_id_list):
     information for each subtask.  The value for each subtask (keyed by its task_id)
     is its subtask status, as defined by SubtaskStatus.to_dict().
 
+    If there are `required_subtask_ids` (which must also be in `subtask_id_list`), they are stored
+    under a 'required' key, and the InstructorTask's "status" will instead be changed to FAILURE
+    if any of them fails.
+
     This information needs to be set up in the InstructorTask before any of the subtasks start
     running.  If not, there is a chance that the subtasks could complete before the parent task
     is done creating subtasks.  Doing so also simplifies the save() here, as it avoids the need
@@ -265,6 +269,8 @@ def initialize_subtask_info(entry, action_name, total_num, subtask_id_list):
         'failed': 0,
         'status': subtask_status
     }
+    if required_subtask_ids:
+        subtask_dict['required'] = list(required_subtask_ids)
     entry.subtasks = json.dumps(subtask_dict)
 
     # and save the entry immediately, before any subtasks actually start work:
@@ -281,6 +287,7 @@ def queue_subtasks_for_query(
     item_fields,
     items_per_task,
     total_num_items,
+    extra_subtask_ids=(),
 ):
     """
     Generates and queues subtasks to each execute a chunk of "items" generated by a queryset.
@@ -296,6 +303,9 @@ def queue_subtasks_for_query(
             These are in addition to the 'pk' field.
         `items_per_task` : maximum size of chunks to break each query chunk into for use by a subtask.
         `total_num_items` : total amount of items that will be put into subtasks
+        `extra_subtask_ids` : ids of additional subtasks that are known to the InstructorTask,
+            but are queued by the caller, such as a subtask that runs once the others are done.
+            The InstructorTask fails if any of them fails.
 
     Returns:  the task progress as stored in the InstructorTask object.
 
@@ -316,7 +326,9 @@ def queue_subtasks_for_query(
     )
     # Make sure this is committed to database before handing off subtasks to celery.
     with outer_atomic():
-        progress = initialize_subtask_info(entry, action_name, total_num_items, subtask_id_list)
+        progress = initialize_subtask_info(
+            entry, action_name, total_num_items, subtask_id_list + list(extra_subtask_ids), list(extra_subtask_ids),
+        )
 
     # Construct a generator that will return the recipients to use for each subtask.
     # Pass in the desired fields to fetch for each recipient.
@@ -514,7 +526,7 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
     subtasks.  'Total' is expected to have been set at the time the subtasks were created.
     The other three counters are incremented depending on the value of `status`.  Once the counters
     for 'succeeded' and 'failed' match the 'total', the subtasks are done and the InstructorTask's
-    "status" is changed to SUCCESS.
+    "status" is changed to SUCCESS (or to FAILURE, if any of its 'required' subtasks failed).
 
     The "subtasks" field also contains a 'status' key, that contains a dict that stores status
     information for each subtask.  At the moment, the value for each subtask (keyed by its task_id)
@@ -567,11 +579,21 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
         num_remaining = subtask_dict['total'] - subtask_dict['succeeded'] - subtask_dict['failed']
 
         # If we're done with the last task, update the parent status to indicate that.
-        # At present, we mark the task as having succeeded.  In future, we should see
-        # if there was a catastrophic failure that occurred, and figure out how to
-        # report that here.
+        # At present, we mark the task as having succeeded, unless one of its required
+        # subtasks failed.  In future, we should see if there was a catastrophic failure
+        # that occurred, and figure out how to report that here.
         if num_remaining <= 0:
-            entry.task_state = SUCCESS
+            failed_required_subtask_ids = [
+                subtask_id for subtask_id in subtask_dict.get('required', [])
+                if subtask_status_info[subtask_id]['state'] != SUCCESS
+            ]
+            if failed_required_subtask_ids:
+                entry.task_state = FAILURE
+                task_progress['message'] = u"Required subtasks failed: {}".format(
+                    u", ".join(failed_required_subtask_ids)
+                )
+            else:
+                entry.task_state = SUCCESS
         entry.subtasks = json.dumps(subtask_dict)
         entry.task_output = InstructorTask.create_output_for_success(task_progress)
 
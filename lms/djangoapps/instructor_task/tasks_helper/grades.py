@@ -35,6 +35,7 @@ from xmodule.modulestore.django import modulestore
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.split_test_module import get_split_user_partitions
 
+from ..config.waffle import STREAM_GRADE_REPORTS, waffle
 from .runner import TaskProgress
 from .utils import upload_csv_to_report_store
 
@@ -195,6 +196,10 @@ class CourseGradeReport(object):
     # Batch size for chunking the list of enrollees in the course.
     USER_BATCH_SIZE = 100
 
+    # The name of the report's CSV, and of its errors' CSV.
+    REPORT_NAME = 'grade_report'
+    ERROR_REPORT_NAME = 'grade_report_err'
+
     @classmethod
     def generate(cls, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
         """
@@ -204,6 +209,28 @@ class CourseGradeReport(object):
             context = _CourseGradeReportContext(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name)
             return CourseGradeReport()._generate(context)
 
+    @classmethod
+    def shard_headers(cls, course_id):
+        """
+        Returns the (success_headers, error_headers) of a sharded report
+        (see tasks_helper.shards).
+        """
+        context = _CourseGradeReportContext(None, None, course_id, None, None)
+        report = cls()
+        return report._success_headers(context), report._error_headers()
+
+    @classmethod
+    def shard_rows(cls, course_id, users):
+        """
+        A generator of batches of (success_rows, error_rows) for the given
+        users of a sharded report (see tasks_helper.shards).
+        """
+        with modulestore().bulk_operations(course_id):
+            context = _CourseGradeReportContext(None, None, course_id, None, None)
+            report = cls()
+            for batch in report._batch_users(context, users):
+                yield report._rows_for_users(context, [user for user in batch if user is not None])
+
     def _generate(self, context):
         """
         Internal method for generating a grade report for the given context.
@@ -213,11 +240,15 @@ class CourseGradeReport(object):
         error_headers = self._error_headers()
         batched_rows = self._batched_rows(context)
 
-        context.update_status(u'Compiling grades')
-        success_rows, error_rows = self._compile(context, batched_rows)
+        if waffle().is_enabled(STREAM_GRADE_REPORTS):
+            context.update_status(u'Compiling and uploading grades')
+            self._stream(context, success_headers, error_headers, batched_rows)
+        else:
+            context.update_status(u'Compiling grades')
+            success_rows, error_rows = self._compile(context, batched_rows)
 
-        context.update_status(u'Uploading grades')
-        self._upload(context, success_headers, success_rows, error_headers, error_rows)
+            context.update_status(u'Uploading grades')
+            self._upload(context, success_headers, success_rows, error_headers, error_rows)
 
         return context.update_status(u'Completed grades')
 
@@ -267,15 +298,48 @@ class CourseGradeReport(object):
         context.task_progress.total = context.task_progress.attempted
         return success_rows, error_rows
 
+    def _stream(self, context, success_headers, error_headers, batched_rows):
+        """
+        Compiles and uploads the CSVs for the given batched_rows one batch at
+        a time, so that memory use is bounded by the batch size rather than
+        by the number of learners, and updates the task's progress after
+        each batch.
+
+        Only the error rows, which are expected to be few, are kept until the
+        success rows have all been uploaded.
+        """
+        error_rows = []
+
+        def success_rows():
+            """
+            Generates the success rows, and keeps the error rows, of each
+            batch.
+            """
+            yield success_headers
+            for batch_success_rows, batch_error_rows in batched_rows:
+                error_rows.extend(batch_error_rows)
+                context.task_progress.succeeded += len(batch_success_rows)
+                context.task_progress.failed += len(batch_error_rows)
+                context.task_progress.attempted = context.task_progress.succeeded + context.task_progress.failed
+                context.task_progress.total = context.task_progress.attempted
+                context.update_status(u'Compiled grades of {} learners'.format(context.task_progress.attempted))
+                for row in batch_success_rows:
+                    yield row
+
+        date = datetime.now(UTC)
+        upload_csv_to_report_store(success_rows(), self.REPORT_NAME, context.course_id, date, stream=True)
+        if len(error_rows) > 0:
+            upload_csv_to_report_store([error_headers] + error_rows, self.ERROR_REPORT_NAME, context.course_id, date)
+
     def _upload(self, context, success_headers, success_rows, error_headers, error_rows):
         """
         Creates and uploads a CSV for the given headers and rows.
         """
         date = datetime.now(UTC)
-        upload_csv_to_report_store([success_headers] + success_rows, 'grade_report', context.course_id, date)
+        upload_csv_to_report_store([success_headers] + success_rows, self.REPORT_NAME, context.course_id, date)
         if len(error_rows) > 0:
             error_rows = [error_headers] + error_rows
-            upload_csv_to_report_store(error_rows, 'grade_report_err', context.course_id, date)
+            upload_csv_to_report_store(error_rows, self.ERROR_REPORT_NAME, context.course_id, date)
 
     def _grades_header(self, context):
         """
@@ -289,15 +353,17 @@ class CourseGradeReport(object):
             grades_header.append(assignment_info['average_header'])
         return grades_header
 
-    def _batch_users(self, context):
+    def _batch_users(self, context, users=None):
         """
-        Returns a generator of batches of users.
+        Returns a generator of batches of the given users, or of all of the
+        users enrolled in the course.
         """
         def grouper(iterable, chunk_size=self.USER_BATCH_SIZE, fillvalue=None):
             args = [iter(iterable)] * chunk_size
             return izip_longest(*args, fillvalue=fillvalue)
 
-        users = CourseEnrollment.objects.users_enrolled_in(context.course_id, include_inactive=True)
+        if users is None:
+            users = CourseEnrollment.objects.users_enrolled_in(context.course_id, include_inactive=True)
         users = users.select_related('profile')
         return grouper(users)
 
@@ -454,6 +520,18 @@ class CourseGradeReport(object):
 
 
 class ProblemGradeReport(object):
+    # Batch size of the rows of a sharded report.
+    USER_BATCH_SIZE = 100
+
+    # The name of the report's CSV, and of its errors' CSV.
+    REPORT_NAME = 'problem_grade_report'
+    ERROR_REPORT_NAME = 'problem_grade_report_err'
+
+    # This struct encapsulates both the display names of each static item in the
+    # header row as values as well as the django User field names of those items
+    # as the keys.  It is structured in this way to keep the values related.
+    HEADER_ROW = OrderedDict([('id', 'Student ID'), ('email', 'Email'), ('username', 'Username')])
+
     @classmethod
     def generate(cls, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
         """
@@ -466,17 +544,13 @@ class ProblemGradeReport(object):
         enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id, include_inactive=True)
         task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
 
-        # This struct encapsulates both the display names of each static item in the
-        # header row as values as well as the django User field names of those items
-        # as the keys.  It is structured in this way to keep the values related.
-        header_row = OrderedDict([('id', 'Student ID'), ('email', 'Email'), ('username', 'Username')])
-
         course = get_course_by_id(course_id)
         graded_scorable_blocks = cls._graded_scorable_blocks_to_header(course)
 
         # Just generate the static fields for now.
-        rows = [list(header_row.values()) + ['Enrollment Status', 'Grade'] + _flatten(graded_scorable_blocks.values())]
-        error_rows = [list(header_row.values()) + ['error_msg']]
+        success_headers, error_headers = cls._headers(graded_scorable_blocks)
+        rows = [success_headers]
+        error_rows = [error_headers]
         current_step = {'step': 'Calculating Grades'}
 
         # Bulk fetch and cache enrollment states so we can efficiently determine
@@ -484,33 +558,15 @@ class ProblemGradeReport(object):
         CourseEnrollment.bulk_fetch_enrollment_states(enrolled_students, course_id)
 
         for student, course_grade, error in CourseGradeFactory().iter(enrolled_students, course):
-            student_fields = [getattr(student, field_name) for field_name in header_row]
             task_progress.attempted += 1
 
-            if not course_grade:
-                err_msg = text_type(error)
-                # There was an error grading this student.
-                if not err_msg:
-                    err_msg = u'Unknown error'
-                error_rows.append(student_fields + [err_msg])
+            row, error_row = cls._user_rows(course_id, graded_scorable_blocks, student, course_grade, error)
+            if error_row:
+                error_rows.append(error_row)
                 task_progress.failed += 1
                 continue
 
-            enrollment_status = _user_enrollment_status(student, course_id)
-
-            earned_possible_values = []
-            for block_location in graded_scorable_blocks:
-                try:
-                    problem_score = course_grade.problem_scores[block_location]
-                except KeyError:
-                    earned_possible_values.append([u'Not Available', u'Not Available'])
-                else:
-                    if problem_score.first_attempted:
-                        earned_possible_values.append([problem_score.earned, problem_score.possible])
-                    else:
-                        earned_possible_values.append([u'Not Attempted', problem_score.possible])
-
-            rows.append(student_fields + [enrollment_status, course_grade.percent] + _flatten(earned_possible_values))
+            rows.append(row)
 
             task_progress.succeeded += 1
             if task_progress.attempted % status_interval == 0:
@@ -518,13 +574,85 @@ class ProblemGradeReport(object):
 
         # Perform the upload if any students have been successfully graded
         if len(rows) > 1:
-            upload_csv_to_report_store(rows, 'problem_grade_report', course_id, start_date)
+            upload_csv_to_report_store(rows, cls.REPORT_NAME, course_id, start_date)
         # If there are any error rows, write them out as well
         if len(error_rows) > 1:
-            upload_csv_to_report_store(error_rows, 'problem_grade_report_err', course_id, start_date)
+            upload_csv_to_report_store(error_rows, cls.ERROR_REPORT_NAME, course_id, start_date)
 
         return task_progress.update_task_state(extra_meta={'step': 'Uploading CSV'})
 
+    @classmethod
+    def shard_headers(cls, course_id):
+        """
+        Returns the (success_headers, error_headers) of a sharded report
+        (see tasks_helper.shards).
+        """
+        course = get_course_by_id(course_id)
+        return cls._headers(cls._graded_scorable_blocks_to_header(course))
+
+    @classmethod
+    def shard_rows(cls, course_id, users):
+        """
+        A generator of batches of (success_rows, error_rows) for the given
+        users of a sharded report (see tasks_helper.shards).
+        """
+        course = get_course_by_id(course_id)
+        graded_scorable_blocks = cls._graded_scorable_blocks_to_header(course)
+        CourseEnrollment.bulk_fetch_enrollment_states(users, course_id)
+
+        rows, error_rows = [], []
+        for student, course_grade, error in CourseGradeFactory().iter(users, course):
+            row, error_row = cls._user_rows(course_id, graded_scorable_blocks, student, course_grade, error)
+            if error_row:
+                error_rows.append(error_row)
+            else:
+                rows.append(row)
+            if len(rows) + len(error_rows) == cls.USER_BATCH_SIZE:
+                yield rows, error_rows
+                rows, error_rows = [], []
+        yield rows, error_rows
+
+    @classmethod
+    def _headers(cls, graded_scorable_blocks):
+        """
+        Returns the (success_headers, error_headers) of the report.
+        """
+        return (
+            list(cls.HEADER_ROW.values()) + ['Enrollment Status', 'Grade'] + _flatten(graded_scorable_blocks.values()),
+            list(cls.HEADER_ROW.values()) + ['error_msg'],
+        )
+
+    @classmethod
+    def _user_rows(cls, course_id, graded_scorable_blocks, student, course_grade, error):
+        """
+        Returns the (row, error_row) of the given student, one of which is
+        None.
+        """
+        student_fields = [getattr(student, field_name) for field_name in cls.HEADER_ROW]
+
+        if not course_grade:
+            err_msg = text_type(error)
+            # There was an error grading this student.
+            if not err_msg:
+                err_msg = u'Unknown error'
+            return None, student_fields + [err_msg]
+
+        enrollment_status = _user_enrollment_status(student, course_id)
+
+        earned_possible_values = []
+        for block_location in graded_scorable_blocks:
+            try:
+                problem_score = course_grade.problem_scores[block_location]
+            except KeyError:
+                earned_possible_values.append([u'Not Available', u'Not Available'])
+            else:
+                if problem_score.first_attempted:
+                    earned_possible_values.append([problem_score.earned, problem_score.possible])
+                else:
+                    earned_possible_values.append([u'Not Attempted', problem_score.possible])
+
+        return student_fields + [enrollment_status, course_grade.percent] + _flatten(earned_possible_values), None
+
     @classmethod
     def _graded_scorable_blocks_to_header(cls, course):
         """
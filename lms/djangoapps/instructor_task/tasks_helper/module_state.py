@@ -1,21 +1,34 @@
 """
 Instructor Tasks related to module state.
 """
+import copy
 import json
 import logging
+from collections import OrderedDict, namedtuple
 from time import time
 
+from django.db.models import Case, F, FloatField, TextField, Value, When
+from django.utils import timezone
 from django.utils.translation import ugettext_noop
+from eventtracking import tracker
 from opaque_keys.edx.keys import UsageKey
+from six import text_type
 
 import dogstats_wrapper as dog_stats_api
+from capa.capa_problem import LoncapaProblem
+from capa.correctmap import CorrectMap
 from capa.responsetypes import LoncapaProblemError, ResponseError, StudentInputError
+from courseware.access import has_access
 from courseware.courses import get_course_by_id, get_problems_in_section
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache
-from courseware.models import StudentModule
+from courseware.models import BaseStudentModuleHistory, StudentModule
 from courseware.module_render import get_module_for_descriptor_internal
+from lms.djangoapps.grades.constants import ScoreDatabaseTableEnum
 from lms.djangoapps.grades.events import GRADES_OVERRIDE_EVENT_TYPE, GRADES_RESCORE_EVENT_TYPE
+from lms.djangoapps.grades.signals.signals import PROBLEM_RAW_SCORE_CHANGED
+from openedx.core.lib.grade_utils import is_score_higher_or_equal
 from student.models import get_user_by_username_or_email
+from track import contexts
 from track.event_transaction_utils import create_new_event_transaction_id, set_event_transaction_type
 from track.views import task_track
 from util.db import outer_atomic
@@ -29,6 +42,11 @@ from .utils import UNKNOWN_TASK_ID, UPDATE_STATUS_FAILED, UPDATE_STATUS_SKIPPED,
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
+# The number of StudentModules rescored and written together by a batch
+# rescore, and the number of LoncapaProblems kept for each problem.
+RESCORE_BATCH_SIZE = 100
+MAX_RESCORE_PROBLEMS = 10
+
 
 def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name):
     """
@@ -59,26 +77,9 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
 
     """
     start_time = time()
-    usage_keys = []
-    problem_url = task_input.get('problem_url')
-    entrance_exam_url = task_input.get('entrance_exam_url')
     student_identifier = task_input.get('student')
     override_score_task = action_name == ugettext_noop('overridden')
-    problems = {}
-
-    # if problem_url is present make a usage key from it
-    if problem_url:
-        usage_key = UsageKey.from_string(problem_url).map_into_course(course_id)
-        usage_keys.append(usage_key)
-
-        # find the problem descriptor:
-        problem_descriptor = modulestore().get_item(usage_key)
-        problems[unicode(usage_key)] = problem_descriptor
-
-    # if entrance_exam is present grab all problems in it
-    if entrance_exam_url:
-        problems = get_problems_in_section(entrance_exam_url)
-        usage_keys = [UsageKey.from_string(location) for location in problems.keys()]
+    usage_keys, problems = _get_problems_for_task(course_id, task_input)
 
     modules_to_update = _get_modules_to_update(
         course_id, usage_keys, student_identifier, filter_fcn, override_score_task
@@ -108,6 +109,466 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     return task_progress.update_task_state()
 
 
+def perform_module_state_batch_rescore(xmodule_instance_args, _entry_id, course_id, task_input, action_name):
+    """
+    Rescores the submissions to the problems of the task, as
+    perform_module_state_update does with rescore_problem_module_state, in
+    batches of RESCORE_BATCH_SIZE StudentModules.
+
+    Instead of instantiating the problem for each learner, each problem is
+    instantiated once, and its LoncapaProblem is built once for each seed
+    and reused to grade all of the submissions with that seed (see
+    _BatchRescorer).  The StudentModules are visited in order of problem and
+    seed, and the new states and scores of each batch are written with a
+    single update once the batch is graded.  The same tracking events and
+    grade signals are emitted for each learner as when the learner's
+    problem is rescored.
+
+    Returns the task's results, as perform_module_state_update does.
+    """
+    start_time = time()
+    usage_keys, problems = _get_problems_for_task(course_id, task_input)
+    modules_to_update = _get_modules_to_update(course_id, usage_keys, task_input.get('student'), None)
+
+    # Only the ids and seeds of the StudentModules are kept for the whole
+    # task; the StudentModules themselves are fetched one batch at a time.
+    module_ids = []
+    for module_id, usage_key, state in modules_to_update.values_list('id', 'module_state_key', 'state').iterator():
+        seed = json.loads(state).get('seed') if state else None
+        module_ids.append(((unicode(usage_key), seed), module_id))
+    module_ids = [module_id for _, module_id in sorted(module_ids)]
+
+    task_progress = TaskProgress(action_name, len(module_ids), start_time)
+    task_progress.update_task_state()
+
+    rescorers = {}
+    with modulestore().bulk_operations(course_id):
+        course = get_course_by_id(course_id)
+        for batch_start in range(0, len(module_ids), RESCORE_BATCH_SIZE):
+            batch_ids = module_ids[batch_start:batch_start + RESCORE_BATCH_SIZE]
+            batch_tags = [u'action:{name}'.format(name=action_name)]
+            with dog_stats_api.timer('instructor_tasks.module.time.batch', tags=batch_tags):
+                update_statuses = _rescore_module_batch(
+                    xmodule_instance_args, course, problems, rescorers, batch_ids, task_input
+                )
+            for update_status in update_statuses:
+                task_progress.attempted += 1
+                if update_status == UPDATE_STATUS_SUCCEEDED:
+                    task_progress.succeeded += 1
+                elif update_status == UPDATE_STATUS_FAILED:
+                    task_progress.failed += 1
+                elif update_status == UPDATE_STATUS_SKIPPED:
+                    task_progress.skipped += 1
+                else:
+                    raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+
+    return task_progress.update_task_state()
+
+
+def _rescore_module_batch(xmodule_instance_args, course, problems, rescorers, module_ids, task_input):
+    """
+    Rescores the StudentModules with the given ids, and returns the
+    UPDATE_STATUS of each.
+
+    `rescorers` holds the _BatchRescorer of each problem, by the string of
+    its usage key, and is updated with the problems that don't have one yet.
+
+    The submissions are graded without locking their StudentModules, which
+    are then saved in a short transaction.  The submissions which can't be
+    rescored by their problem's _BatchRescorer, or whose state changed while
+    they were graded, are rescored by rescore_problem_module_state.
+    """
+    update_statuses = []
+    unbatched_modules = []
+    # [(UPDATE_STATUS, _RescoredModule, string)]
+    rescored_modules = []
+    student_modules = {
+        student_module.id: student_module
+        for student_module in StudentModule.objects.select_related('student').filter(id__in=module_ids)
+    }
+    for student_module in [student_modules[module_id] for module_id in module_ids if module_id in student_modules]:
+        problem_key = unicode(student_module.module_state_key)
+        if problem_key not in rescorers:
+            rescorers[problem_key] = _BatchRescorer(
+                xmodule_instance_args, course, problems[problem_key], task_input['only_if_higher']
+            )
+        graded_state = student_module.state
+        result = rescorers[problem_key].rescore(student_module)
+        if result is None:
+            unbatched_modules.append(student_module)
+            continue
+        update_status, rescored_module = result
+        if rescored_module is None:
+            update_statuses.append(update_status)
+        else:
+            rescored_modules.append((update_status, rescored_module, graded_state))
+
+    if rescored_modules:
+        saved_ids, modified = _save_rescored_modules([
+            (rescored_module.student_module, graded_state) for _, rescored_module, graded_state in rescored_modules
+        ])
+        for update_status, rescored_module, _ in rescored_modules:
+            student_module = rescored_module.student_module
+            if student_module.id not in saved_ids:
+                unbatched_modules.append(student_module)
+                continue
+            rescorers[unicode(student_module.module_state_key)].publish(rescored_module, modified)
+            update_statuses.append(update_status)
+
+    for student_module in unbatched_modules:
+        problem_key = unicode(student_module.module_state_key)
+        update_statuses.append(rescore_problem_module_state(
+            xmodule_instance_args, problems[problem_key], student_module, task_input
+        ))
+        # Instantiating the problem for the learner rebound its descriptor.
+        rescorers[problem_key].reset()
+    return update_statuses
+
+
+def _save_rescored_modules(graded_modules):
+    """
+    Saves the new states and scores of the StudentModules of the given
+    (StudentModule, graded state) tuples with a single update, and their
+    history with a single insert, unless their state in the database is no
+    longer the state that was graded.
+
+    Returns the set of the ids of the saved StudentModules, and the time at
+    which they were modified.
+    """
+    modified = timezone.now()
+    with outer_atomic():
+        current_states = dict(
+            StudentModule.objects.select_for_update().filter(
+                id__in=[student_module.id for student_module, _ in graded_modules]
+            ).values_list('id', 'state')
+        )
+        graded_modules = [
+            (student_module, graded_state) for student_module, graded_state in graded_modules
+            if current_states.get(student_module.id) == graded_state
+        ]
+        if not graded_modules:
+            return set(), modified
+
+        # Each row is only updated if its state is still the graded one.
+        conditions = [
+            (student_module, {'id': student_module.id, 'state': graded_state})
+            for student_module, graded_state in graded_modules
+        ]
+        StudentModule.objects.filter(id__in=[student_module.id for student_module, _ in graded_modules]).update(
+            state=Case(
+                *[When(then=Value(student_module.state), **condition) for student_module, condition in conditions],
+                default=F('state'), output_field=TextField()
+            ),
+            grade=Case(
+                *[When(then=Value(student_module.grade), **condition) for student_module, condition in conditions],
+                default=F('grade'), output_field=FloatField()
+            ),
+            max_grade=Case(
+                *[When(then=Value(student_module.max_grade), **condition) for student_module, condition in conditions],
+                default=F('max_grade'), output_field=FloatField()
+            ),
+            modified=modified,
+        )
+        student_modules = [student_module for student_module, _ in graded_modules]
+        for student_module in student_modules:
+            student_module.modified = modified
+
+        # Bulk updates don't send the post_save signals which save the history
+        # of the modules, so it is saved here.
+        BaseStudentModuleHistory.bulk_save_history([
+            student_module for student_module in student_modules
+            if student_module.module_type in BaseStudentModuleHistory.HISTORY_SAVING_TYPES
+        ])
+    return set(student_module.id for student_module in student_modules), modified
+
+
+# A submission graded by a _BatchRescorer, with the tracking event to emit
+# once its StudentModule is saved.
+_RescoredModule = namedtuple('_RescoredModule', ['student_module', 'score', 'score_updated', 'event_info'])
+
+
+class _BatchRescorer(object):
+    """
+    Grades the submissions of many learners to a capa problem again, as
+    CapaMixin.rescore does, with a LoncapaProblem built once for each seed.
+
+    The problem is instantiated for the first learner, and its
+    LoncapaProblems are shared by all learners: the context and responses of
+    the LoncapaProblem of each learner's seed are restored to their state
+    before any submission was graded, and the state of the learner is loaded
+    into it, before the submission is graded.  The problems whose context depends on the learner, and the ones
+    that can't be rescored, are left to rescore_problem_module_state.
+
+    The access of each learner to the problem is checked against the
+    problem's descriptor, rather than against the problem bound for the
+    learner.
+    """
+    def __init__(self, xmodule_instance_args, course, descriptor, only_if_higher):
+        self.xmodule_instance_args = xmodule_instance_args
+        self.course = course
+        self.descriptor = descriptor
+        self.only_if_higher = only_if_higher
+        self.batchable = (
+            descriptor.location.block_type == 'problem' and 'anonymous_student_id' not in descriptor.data
+        )
+
+        # The problem instantiated for the first learner.
+        self.instance = None
+
+        # The LoncapaProblems built for each seed, with the state of their
+        # context and responses before any learner's submission was graded,
+        # in least recently used order.
+        # OrderedDict {int: (LoncapaProblem, (dict, dict))}
+        self.problems = OrderedDict()
+
+    def reset(self):
+        """
+        Forgets the instantiated problem and its LoncapaProblems, which are
+        built again for the next learner.
+        """
+        self.instance = None
+        self.problems.clear()
+
+    def rescore(self, student_module):
+        """
+        Grades the submission of the StudentModule's learner again, and
+        updates the state and score of the StudentModule, which isn't saved.
+
+        Returns a tuple of the UPDATE_STATUS of the StudentModule and, if
+        it should be saved, its _RescoredModule, or None if it must be
+        rescored with rescore_problem_module_state.
+        """
+        student = student_module.student
+        state = json.loads(student_module.state) if student_module.state else {}
+        if not self.batchable or state.get('seed') is None:
+            return None
+
+        if not has_access(student, 'load', self.descriptor, self.course.id):
+            TASK_LOG.warning(u"No module {location} for student {student}--access denied?".format(
+                location=student_module.module_state_key,
+                student=student
+            ))
+            return UPDATE_STATUS_FAILED, None
+
+        if not state.get('done'):
+            return UPDATE_STATUS_SKIPPED, None
+
+        instance = self._get_instance(student)
+        if instance is None:
+            return None
+
+        lcp = self._get_problem(state)
+        # Events emitted by the responses while grading are tracked for the
+        # learner, and unmasked with the LoncapaProblem of the learner.
+        instance.runtime.track_function = _get_track_function_for_task(student, self.xmodule_instance_args)
+        instance.lcp = lcp
+
+        event_info = {'state': lcp.get_state(), 'problem_id': text_type(instance.location)}
+        orig_score = self._get_score(state, lcp)
+        event_info['orig_score'] = orig_score.raw_earned
+        event_info['orig_total'] = orig_score.raw_possible
+        try:
+            # Make sure that the attempt number is always at least 1 for
+            # grading purposes, as CapaMixin.update_correctness does.
+            lcp.context['attempt'] = max(state.get('attempts', 0), 1)
+            lcp.correct_map.update(lcp.get_grade_from_current_answers(None))
+            lcp_score = lcp.calculate_score()
+        except (LoncapaProblemError, StudentInputError, ResponseError):
+            event_info['failure'] = 'input_error'
+            self._track(student, 'problem_rescore_fail', event_info)
+            TASK_LOG.warning(
+                u"error processing rescore call for course %(course)s, problem %(loc)s "
+                u"and student %(student)s",
+                dict(
+                    course=self.course.id,
+                    loc=student_module.module_state_key,
+                    student=student
+                )
+            )
+            return UPDATE_STATUS_FAILED, None
+        except Exception:
+            event_info['failure'] = 'unexpected'
+            self._track(student, 'problem_rescore_fail', event_info)
+            raise
+        score = Score(raw_earned=lcp_score['score'], raw_possible=lcp_score['total'])
+
+        # As score_published_handler does for the published grade.
+        score_updated = True
+        if self.only_if_higher and not is_score_higher_or_equal(
+                student_module.grade, student_module.max_grade, score.raw_earned, score.raw_possible
+        ):
+            score_updated = False
+            TASK_LOG.warning(
+                u"Grades: Rescore is not higher than previous: "
+                u"user: {}, block: {}, previous: {}/{}, new: {}/{} ".format(
+                    student, student_module.module_state_key, student_module.grade, student_module.max_grade,
+                    score.raw_earned, score.raw_possible,
+                )
+            )
+
+        state.update(lcp.get_state())
+        if score_updated:
+            state['score'] = {'raw_earned': score.raw_earned, 'raw_possible': score.raw_possible}
+            student_module.grade = score.raw_earned
+            student_module.max_grade = score.raw_possible
+        student_module.state = json.dumps(state)
+
+        event_info['new_score'] = score.raw_earned
+        event_info['new_total'] = score.raw_possible
+        # success = correct if ALL questions in this problem are correct
+        event_info['correct_map'] = lcp.correct_map.get_dict()
+        event_info['success'] = 'correct' if all(
+            lcp.correct_map.is_correct(answer_id) for answer_id in lcp.correct_map
+        ) else 'incorrect'
+        event_info['attempts'] = state.get('attempts', 0)
+
+        TASK_LOG.debug(
+            u"successfully processed rescore call for course %(course)s, problem %(loc)s "
+            u"and student %(student)s",
+            dict(
+                course=self.course.id,
+                loc=student_module.module_state_key,
+                student=student
+            )
+        )
+        return UPDATE_STATUS_SUCCEEDED, _RescoredModule(
+            student_module, score, score_updated, self._unmask(event_info)
+        )
+
+    def publish(self, rescored_module, modified):
+        """
+        Emits the grade signal and tracking event of the saved
+        _RescoredModule, modified at the given time.
+        """
+        student_module = rescored_module.student_module
+        usage_key = student_module.module_state_key
+
+        # Set the tracking info before sending the signal, as
+        # rescore_problem_module_state does before rescoring.
+        create_new_event_transaction_id()
+        set_event_transaction_type(GRADES_RESCORE_EVENT_TYPE)
+
+        if rescored_module.score_updated:
+            # As score_published_handler does once it has set the score.
+            PROBLEM_RAW_SCORE_CHANGED.send(
+                sender=None,
+                raw_earned=rescored_module.score.raw_earned,
+                raw_possible=rescored_module.score.raw_possible,
+                weight=getattr(self.descriptor, 'weight', None),
+                user_id=student_module.student_id,
+                course_id=unicode(usage_key.course_key),
+                usage_id=unicode(usage_key),
+                only_if_higher=self.only_if_higher,
+                modified=modified,
+                score_db_table=ScoreDatabaseTableEnum.courseware_student_module,
+                score_deleted=False,
+                grader_response=False,
+            )
+
+        self._track(student_module.student, 'problem_rescore', rescored_module.event_info, unmask=False)
+
+    def _get_instance(self, student):
+        """
+        Returns the problem instantiated for the first learner, or None if
+        its submissions can't be rescored in batches.
+        """
+        if self.instance is None:
+            instance = _get_module_instance_for_task(
+                self.course.id,
+                student,
+                self.descriptor,
+                self.xmodule_instance_args,
+                grade_bucket_type='rescore',
+                course=self.course
+            )
+            if instance is None or not hasattr(instance, 'rescore') or not instance.lcp.supports_rescoring():
+                self.batchable = False
+                return None
+            self.instance = instance
+        return self.instance
+
+    def _get_problem(self, state):
+        """
+        Returns the LoncapaProblem of the seed of the given state, as it was
+        built, with the state loaded into it.
+        """
+        seed = state['seed']
+        lcp, initial_state = self.problems.pop(seed, (None, None))
+        if lcp is None:
+            lcp = LoncapaProblem(
+                problem_text=self.instance.data,
+                id=self.instance.location.html_id(),
+                state={'seed': seed},
+                seed=seed,
+                capa_system=self.instance.lcp.capa_system,
+                capa_module=self.instance,
+                extract_tree=False,
+            )
+            dog_stats_api.increment('instructor_tasks.rescore.problems_built')
+            initial_state = (
+                copy.deepcopy(lcp.context),
+                {responder: dict(vars(responder)) for responder in lcp.responders.values()},
+            )
+            while self.problems and len(self.problems) >= MAX_RESCORE_PROBLEMS:
+                self.problems.popitem(last=False)
+        self.problems[seed] = (lcp, initial_state)
+
+        # Grading a submission changes the context and the attributes of the
+        # responses, which must not be seen by the next learner.  The
+        # responses share the context, so it is restored in place.
+        initial_context, initial_responders = initial_state
+        lcp.context.clear()
+        lcp.context.update(copy.deepcopy(initial_context))
+        for responder, attributes in initial_responders.iteritems():
+            vars(responder).clear()
+            vars(responder).update(attributes)
+
+        # As LoncapaProblem.__init__ loads the state.
+        lcp.student_answers = state.get('student_answers', {})
+        lcp.has_saved_answers = state.get('has_saved_answers', False)
+        lcp.correct_map = CorrectMap()
+        lcp.correct_map.set_dict(state.get('correct_map', {}))
+        lcp.done = state.get('done', False)
+        lcp.input_state = state.get('input_state', {})
+        if not lcp.student_answers:
+            lcp.set_initial_display()
+        return lcp
+
+    def _get_score(self, state, lcp):
+        """
+        Returns the score of the given state, loaded into the LoncapaProblem,
+        as it would be set on the problem.
+        """
+        score = self.instance.fields['score'].from_json(state.get('score'))
+        if score is None:
+            lcp_score = lcp.calculate_score()
+            score = Score(raw_earned=lcp_score['score'], raw_possible=lcp_score['total'])
+        return score
+
+    def _unmask(self, event_info):
+        """
+        Returns a copy of the event_info with the choice names unmasked, as
+        CapaMixin.track_function_unmask does.
+        """
+        event_unmasked = copy.deepcopy(event_info)
+        self.instance.unmask_event(event_unmasked)
+        return event_unmasked
+
+    def _track(self, student, event_type, event_info, unmask=True):
+        """
+        Emits the tracking event for the learner, as the problem's runtime
+        would publish it.
+        """
+        if unmask:
+            event_info = self._unmask(event_info)
+        context = contexts.course_context_from_course_id(self.course.id)
+        context['user_id'] = student.id
+        context['asides'] = {}
+        track_function = _get_track_function_for_task(student, self.xmodule_instance_args)
+        with tracker.get_tracker().context(event_type, context):
+            track_function(event_type, event_info)
+
+
 @outer_atomic
 def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, task_input):
     '''
@@ -387,6 +848,33 @@ def _get_task_id_from_xmodule_args(xmodule_instance_args):
         return xmodule_instance_args.get('task_id', UNKNOWN_TASK_ID)
 
 
+def _get_problems_for_task(course_id, task_input):
+    """
+    Returns the usage keys of the problems of the task, and their
+    descriptors by the strings of their usage keys.
+    """
+    usage_keys = []
+    problem_url = task_input.get('problem_url')
+    entrance_exam_url = task_input.get('entrance_exam_url')
+    problems = {}
+
+    # if problem_url is present make a usage key from it
+    if problem_url:
+        usage_key = UsageKey.from_string(problem_url).map_into_course(course_id)
+        usage_keys.append(usage_key)
+
+        # find the problem descriptor:
+        problem_descriptor = modulestore().get_item(usage_key)
+        problems[unicode(usage_key)] = problem_descriptor
+
+    # if entrance_exam is present grab all problems in it
+    if entrance_exam_url:
+        problems = get_problems_in_section(entrance_exam_url)
+        usage_keys = [UsageKey.from_string(location) for location in problems.keys()]
+
+    return usage_keys, problems
+
+
 def _get_modules_to_update(course_id, usage_keys, student_identifier, filter_fcn, override_score_task=False):
     """
     Fetches a StudentModule instances for a given `course_id`, `student` object, and `usage_keys`.
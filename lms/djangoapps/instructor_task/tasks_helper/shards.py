@@ -0,0 +1,371 @@
+"""
+Functionality for generating grade reports in shards of users, which are
+generated in parallel by subtasks and then merged into the reports.
+
+Each shard covers a range of user ids, and stores its rows as a part of
+each report.  The parent task stores the headers of the reports as their
+first parts, and the last shard to succeed queues a final subtask that
+concatenates the parts in order.
+
+If a shard fails for good, no report is stored: the parts are deleted,
+and the merge subtask, and so the InstructorTask, is marked as failed.
+"""
+import json
+import logging
+from datetime import datetime
+from itertools import count
+from uuid import uuid4
+
+from celery import task
+from celery.states import FAILURE, READY_STATES, RETRY, SUCCESS
+from django.conf import settings
+from opaque_keys.edx.keys import CourseKey
+from pytz import UTC
+from six import text_type
+
+from lms.djangoapps.instructor_task.models import InstructorTask, ReportStore
+from lms.djangoapps.instructor_task.subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_query,
+    update_subtask_status
+)
+from student.models import CourseEnrollment
+
+from .grades import CourseGradeReport, ProblemGradeReport
+from .utils import get_report_name, tracker_emit
+
+TASK_LOG = logging.getLogger('edx.celery.task')
+
+# The report classes that can be sharded, by the names of their reports.
+REPORT_CLASSES = {
+    report_class.REPORT_NAME: report_class
+    for report_class in (CourseGradeReport, ProblemGradeReport)
+}
+
+
+def _part_filename(entry_id, csv_name, index):
+    """
+    Returns the name of a part of a report.  The parts are kept in a
+    subdirectory of the course's reports, so that they aren't listed as
+    reports themselves.
+    """
+    return u'shards/{entry_id}/{csv_name}.{index:05d}.csv'.format(entry_id=entry_id, csv_name=csv_name, index=index)
+
+
+def _existing_part_filenames(report_store, course_id, entry_id, report_context, csv_name):
+    """
+    Returns the names of the existing parts of the report, in order.
+    """
+    part_filenames = (
+        _part_filename(entry_id, csv_name, index) for index in range(report_context['num_shards'] + 1)
+    )
+    return [filename for filename in part_filenames if report_store.exists(course_id, filename)]
+
+
+def _delete_parts(entry_id, report_context):
+    """
+    Deletes the existing parts of the report, and of its errors' report.
+    """
+    report_class = REPORT_CLASSES[report_context['report_name']]
+    course_id = CourseKey.from_string(report_context['course_id'])
+    report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+    for csv_name in (report_class.REPORT_NAME, report_class.ERROR_REPORT_NAME):
+        for filename in _existing_part_filenames(report_store, course_id, entry_id, report_context, csv_name):
+            report_store.delete(course_id, filename)
+
+
+def _shard_users(course_id):
+    """
+    Returns the users of the course's grade reports, ordered by their ids.
+    """
+    return CourseEnrollment.objects.users_enrolled_in(course_id, include_inactive=True).order_by('id')
+
+
+def queue_report_shards(report_class, _xmodule_instance_args, entry_id, course_id, _task_input, action_name):
+    """
+    Queues subtasks to generate a report of the given class in shards of
+    no more than settings.GRADES_DOWNLOAD_USERS_PER_SHARD users, followed by
+    a subtask to merge them.
+
+    Reports of courses that are small enough for a single shard are
+    generated by this task.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # Check to see if the shards have already been queued, which happens
+    # when the task is requeued after a loss of connection to the broker.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(
+            u"Task %s has already queued the shards of its report! InstructorTask = %s", entry.task_id, entry,
+        )
+        return json.loads(entry.task_output)
+
+    users = _shard_users(course_id)
+    total_num_users = users.count()
+    if total_num_users <= settings.GRADES_DOWNLOAD_USERS_PER_SHARD:
+        return report_class.generate(_xmodule_instance_args, entry_id, course_id, _task_input, action_name)
+
+    num_shards, remainder = divmod(total_num_users, settings.GRADES_DOWNLOAD_USERS_PER_SHARD)
+    if remainder:
+        num_shards += 1
+
+    timestamp = datetime.now(UTC)
+    report_context = {
+        'course_id': text_type(course_id),
+        'report_name': report_class.REPORT_NAME,
+        'report_filename': get_report_name(report_class.REPORT_NAME, course_id, timestamp),
+        'error_report_filename': get_report_name(report_class.ERROR_REPORT_NAME, course_id, timestamp),
+        'merge_task_id': text_type(uuid4()),
+        'num_shards': num_shards,
+    }
+
+    # The headers are the first parts of the reports.
+    success_headers, error_headers = report_class.shard_headers(course_id)
+    report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+    report_store.store_rows(course_id, _part_filename(entry_id, report_class.REPORT_NAME, 0), [success_headers])
+    report_store.store_rows(course_id, _part_filename(entry_id, report_class.ERROR_REPORT_NAME, 0), [error_headers])
+
+    shard_indexes = count(1)
+
+    def _create_shard_subtask(user_list, initial_subtask_status):
+        """Creates a subtask to generate the shard of the given users."""
+        return generate_report_shard.subtask(
+            (
+                entry_id,
+                report_context,
+                next(shard_indexes),
+                (user_list[0]['pk'], user_list[-1]['pk']),
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_shard_subtask,
+        [users],
+        [],
+        settings.GRADES_DOWNLOAD_USERS_PER_SHARD,
+        total_num_users,
+        extra_subtask_ids=[report_context['merge_task_id']],
+    )
+
+
+@task(
+    default_retry_delay=settings.GRADES_DOWNLOAD_SHARD_RETRY_DELAY,
+    max_retries=settings.GRADES_DOWNLOAD_SHARD_MAX_RETRIES,
+)
+def generate_report_shard(entry_id, report_context, shard_index, user_id_range, subtask_status_dict):
+    """
+    Generates the rows of a report for the enrolled users whose ids are in
+    the given range, and stores them as the given part of the report.
+
+    Inputs are:
+      * `entry_id`: id of the InstructorTask object to which progress should be recorded.
+      * `report_context`: dict of the values that are the same for all of the shards of
+        the report: its 'course_id', the 'report_name' of its class, the 'report_filename'
+        and 'error_report_filename' to merge the shards into, the 'num_shards', and the
+        'merge_task_id' of the subtask that merges them.
+      * `shard_index`: the index of the shard's parts of the report, starting from 1.
+      * `user_id_range`: the (first, last) ids of the users of the shard.
+      * `subtask_status_dict`: dict containing values representing current status,
+        as described by SubtaskStatus.
+
+    A failed shard is retried on its own, up to max_retries times.  Once the
+    last shard has succeeded, the subtask that merges them is queued.  If a
+    shard fails after its retries, the merge is failed and the parts that
+    have been stored are deleted.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    TASK_LOG.info(
+        u"Preparing to generate shard %s of report %s for users %s as subtask %s for instructor task %d, status=%s",
+        shard_index, report_context['report_filename'], user_id_range, current_task_id, entry_id, subtask_status,
+    )
+
+    # Check that the subtask is known to the InstructorTask entry, and that
+    # it hasn't already been completed.  See send_course_email.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    try:
+        num_succeeded, num_failed = _generate_shard(entry_id, report_context, shard_index, user_id_range)
+    except Exception as exc:  # pylint: disable=broad-except
+        if subtask_status.retried_withmax < generate_report_shard.max_retries:
+            countdown = (2 ** subtask_status.retried_withmax) * generate_report_shard.default_retry_delay
+            TASK_LOG.warning(
+                u"Shard %s of report %s failed for subtask %s, retrying in %s seconds: %s",
+                shard_index, report_context['report_filename'], current_task_id, countdown, exc,
+            )
+            # Update the InstructorTask before retrying, so that there is no
+            # race with the update made by the retried subtask.
+            subtask_status.increment(retried_withmax=1, state=RETRY)
+            update_subtask_status(entry_id, current_task_id, subtask_status)
+            raise generate_report_shard.retry(
+                args=[entry_id, report_context, shard_index, user_id_range, subtask_status.to_dict()],
+                exc=exc,
+                countdown=countdown,
+                throw=True,
+            )
+
+        TASK_LOG.exception(
+            u"Shard %s of report %s failed for subtask %s after %s retries",
+            shard_index, report_context['report_filename'], current_task_id, subtask_status.retried_withmax,
+        )
+        subtask_status.increment(state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        # The report can't be merged without this shard, so the merge is
+        # failed as well, which fails the InstructorTask once the other shards
+        # are done.  The merge is failed before the parts are deleted, so that
+        # any shard which stores its parts afterwards sees it and deletes them.
+        _fail_merge(entry_id, report_context['merge_task_id'])
+        _delete_parts(entry_id, report_context)
+        raise
+
+    subtask_status.increment(succeeded=num_succeeded, failed=num_failed, state=SUCCESS)
+    update_subtask_status(entry_id, current_task_id, subtask_status)
+    TASK_LOG.info(
+        u"Shard %s of report %s succeeded for subtask %s",
+        shard_index, report_context['report_filename'], current_task_id,
+    )
+
+    subtask_states = _subtask_states(entry_id)
+    merge_task_id = report_context['merge_task_id']
+    if subtask_states[merge_task_id] == FAILURE:
+        # Another shard failed, so this shard's parts won't be merged.
+        _delete_parts(entry_id, report_context)
+    elif all(state == SUCCESS for task_id, state in subtask_states.iteritems() if task_id != merge_task_id):
+        # More than one shard may see that all of them have succeeded, but the
+        # merge subtask is only run once, as its id is checked in the same way.
+        merge_report_shards.apply_async(
+            (entry_id, report_context, SubtaskStatus.create(report_context['merge_task_id']).to_dict()),
+            task_id=report_context['merge_task_id'],
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return subtask_status.to_dict()
+
+
+def _generate_shard(entry_id, report_context, shard_index, user_id_range):
+    """
+    Stores the parts of the report for the shard, and returns the numbers
+    of the users whose rows succeeded and failed.
+    """
+    report_class = REPORT_CLASSES[report_context['report_name']]
+    course_id = CourseKey.from_string(report_context['course_id'])
+    users = _shard_users(course_id).filter(id__range=user_id_range)
+
+    num_succeeded = [0]
+    error_rows = []
+
+    def success_rows():
+        """Yields the successful rows of the shard, and collects its errors."""
+        for batch_success_rows, batch_error_rows in report_class.shard_rows(course_id, users):
+            num_succeeded[0] += len(batch_success_rows)
+            error_rows.extend(batch_error_rows)
+            for row in batch_success_rows:
+                yield row
+
+    report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+    report_store.stream_rows(
+        course_id, _part_filename(entry_id, report_class.REPORT_NAME, shard_index), success_rows(),
+    )
+    if len(error_rows) > 0:
+        report_store.store_rows(
+            course_id, _part_filename(entry_id, report_class.ERROR_REPORT_NAME, shard_index), error_rows,
+        )
+    return num_succeeded[0], len(error_rows)
+
+
+def _subtask_states(entry_id):
+    """
+    Returns the states of the subtasks of the InstructorTask, by their ids.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    subtask_status_info = json.loads(entry.subtasks)['status']
+    return {task_id: status['state'] for task_id, status in subtask_status_info.iteritems()}
+
+
+def _fail_merge(entry_id, merge_task_id):
+    """
+    Marks the merge subtask of the InstructorTask as failed, unless it has
+    already completed.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    merge_status = SubtaskStatus.from_dict(json.loads(entry.subtasks)['status'][merge_task_id])
+    if merge_status.state not in READY_STATES:
+        merge_status.increment(state=FAILURE)
+        update_subtask_status(entry_id, merge_task_id, merge_status)
+
+
+@task
+def merge_report_shards(entry_id, report_context, subtask_status_dict):
+    """
+    Concatenates the parts of the report, and of its errors' report if any
+    rows failed, and deletes the parts.  If that fails, the parts are deleted
+    and no report is stored.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    try:
+        _merge_shards(entry_id, report_context)
+    except Exception:
+        TASK_LOG.exception(
+            u"Merging the shards of report %s failed for subtask %s",
+            report_context['report_filename'], current_task_id,
+        )
+        _delete_reports(report_context)
+        _delete_parts(entry_id, report_context)
+        subtask_status.increment(state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        raise
+
+    subtask_status.increment(state=SUCCESS)
+    update_subtask_status(entry_id, current_task_id, subtask_status)
+    return subtask_status.to_dict()
+
+
+def _merge_shards(entry_id, report_context):
+    """
+    Stores the reports from their parts, and deletes the parts.
+    """
+    report_class = REPORT_CLASSES[report_context['report_name']]
+    course_id = CourseKey.from_string(report_context['course_id'])
+    report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+
+    part_filenames = _existing_part_filenames(
+        report_store, course_id, entry_id, report_context, report_class.REPORT_NAME,
+    )
+    error_part_filenames = _existing_part_filenames(
+        report_store, course_id, entry_id, report_context, report_class.ERROR_REPORT_NAME,
+    )
+    # Every shard stores a part of the report, even if it has no rows.
+    if len(part_filenames) != report_context['num_shards'] + 1:
+        raise ValueError(u"Only {} of the {} parts of report {} exist".format(
+            len(part_filenames), report_context['num_shards'] + 1, report_context['report_filename'],
+        ))
+
+    report_store.concatenate(course_id, report_context['report_filename'], part_filenames)
+    tracker_emit(report_class.REPORT_NAME)
+    # The first part of the errors' report is its headers.
+    if len(error_part_filenames) > 1:
+        report_store.concatenate(course_id, report_context['error_report_filename'], error_part_filenames)
+        tracker_emit(report_class.ERROR_REPORT_NAME)
+
+    for filename in part_filenames + error_part_filenames:
+        report_store.delete(course_id, filename)
+
+
+def _delete_reports(report_context):
+    """
+    Deletes the report, and its errors' report, if they have been stored.
+    """
+    course_id = CourseKey.from_string(report_context['course_id'])
+    report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+    for filename in (report_context['report_filename'], report_context['error_report_filename']):
+        if report_store.exists(course_id, filename):
+            report_store.delete(course_id, filename)
@@ -13,7 +13,7 @@ UPDATE_STATUS_FAILED = 'failed'
 UPDATE_STATUS_SKIPPED = 'skipped'
 
 
-def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name='GRADES_DOWNLOAD'):
+def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name='GRADES_DOWNLOAD', stream=False):
     """
     Upload data as a CSV using ReportStore.
 
@@ -26,21 +26,35 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name
             ]
         csv_name: Name of the resulting CSV
         course_id: ID of the course
+        stream: Whether to write the CSV as the rows are generated, rather
+            than all at once, so that `rows` may be a generator which is
+            never held in memory in its entirety.
 
     Returns:
         report_name: string - Name of the generated report
     """
     report_store = ReportStore.from_config(config_name)
-    report_name = u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
+    report_name = get_report_name(csv_name, course_id, timestamp)
+
+    if stream:
+        report_store.stream_rows(course_id, report_name, rows)
+    else:
+        report_store.store_rows(course_id, report_name, rows)
+    tracker_emit(csv_name)
+    return report_name
+
+
+def get_report_name(csv_name, course_id, timestamp):
+    """
+    Returns the name of the report CSV with the given name, for the given
+    course and timestamp.
+    """
+    return u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
         course_prefix=course_filename_prefix_generator(course_id),
         csv_name=csv_name,
         timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
     )
 
-    report_store.store_rows(course_id, report_name, rows)
-    tracker_emit(csv_name)
-    return report_name
-
 
 def tracker_emit(report_name):
     """
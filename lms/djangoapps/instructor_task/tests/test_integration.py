@@ -17,9 +17,11 @@ from django.urls import reverse
 from mock import patch
 from six import text_type
 
+from capa.capa_problem import LoncapaProblem
 from capa.responsetypes import StudentInputError
 from capa.tests.response_xml_factory import CodeResponseXMLFactory, CustomResponseXMLFactory
 from courseware.model_data import StudentModule
+from courseware.models import BaseStudentModuleHistory
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
 from lms.djangoapps.instructor_task.api import (
     submit_delete_problem_state_for_all_students,
@@ -27,7 +29,9 @@ from lms.djangoapps.instructor_task.api import (
     submit_rescore_problem_for_student,
     submit_reset_problem_attempts_for_all_students
 )
+from lms.djangoapps.instructor_task.config.waffle import BATCH_RESCORE, waffle
 from lms.djangoapps.instructor_task.models import InstructorTask
+from lms.djangoapps.instructor_task.tasks_helper import module_state
 from lms.djangoapps.instructor_task.tasks_helper.grades import CourseGradeReport
 from lms.djangoapps.instructor_task.tests.test_base import (
     OPTION_1,
@@ -429,6 +433,129 @@ class TestRescoringTask(TestIntegrationTask):
             self.check_state(user, descriptor, 0, 1, expected_attempts=2)
 
 
+class TestBatchRescoringTask(TestRescoringTask):
+    """
+    Runs the rescoring tests with the batch_rescore switch on, so that
+    problems are rescored by perform_module_state_batch_rescore.
+    """
+    def setUp(self):
+        super(TestBatchRescoringTask, self).setUp()
+        batch_rescore = waffle().override(BATCH_RESCORE, active=True)
+        batch_rescore.__enter__()
+        self.addCleanup(batch_rescore.__exit__, None, None, None)
+
+    def submit_option_answers(self, problem_url_name):
+        """
+        Defines an option problem, which all users answer, then changes its
+        correct answer.
+        """
+        self.define_option_problem(problem_url_name)
+        self.submit_student_answer('u1', problem_url_name, [OPTION_1, OPTION_1])
+        self.submit_student_answer('u2', problem_url_name, [OPTION_1, OPTION_2])
+        self.submit_student_answer('u3', problem_url_name, [OPTION_2, OPTION_1])
+        self.submit_student_answer('u4', problem_url_name, [OPTION_2, OPTION_2])
+        self.redefine_option_problem(problem_url_name, correct_answer=OPTION_2)
+
+    def test_problem_built_once_per_seed(self):
+        problem_url_name = 'H1P1'
+        self.submit_option_answers(problem_url_name)
+        module_state_lcp = 'lms.djangoapps.instructor_task.tasks_helper.module_state.LoncapaProblem'
+        with patch(module_state_lcp, wraps=LoncapaProblem) as mock_lcp:
+            self.submit_rescore_all_student_answers('instructor', problem_url_name)
+
+        # The problem isn't randomized, so all of its users have the same seed.
+        self.assertEqual(mock_lcp.call_count, 1)
+        descriptor = self.module_store.get_item(InstructorTaskModuleTestCase.problem_location(problem_url_name))
+        for user, expected_score in zip(self.users, (0, 1, 1, 2)):
+            self.check_state(user, descriptor, expected_score, 2)
+
+    def test_same_seed_graded_apart(self):
+        # The check function only sets the grade decimals of the first
+        # learner's response, which must not be used for the others.
+        problem_url_name = 'H1P1'
+        script = textwrap.dedent("""
+                def check_func(expect, answer_given):
+                    if answer_given == 'half':
+                        return {'ok': 'partial', 'grade_decimal': 0.5}
+                    return answer_given == expect
+            """)
+        ItemFactory.create(
+            parent_location=self.problem_section.location,
+            category="problem",
+            display_name=problem_url_name,
+            data=CustomResponseXMLFactory().build_xml(script=script, cfn="check_func", expect="42", num_responses=1),
+        )
+        for username, answer in (('u1', 'half'), ('u2', '42'), ('u3', '0')):
+            self.submit_student_answer(username, problem_url_name, [answer])
+        module_state_lcp = 'lms.djangoapps.instructor_task.tasks_helper.module_state.LoncapaProblem'
+        with patch(module_state_lcp, wraps=LoncapaProblem) as mock_lcp:
+            self.submit_rescore_all_student_answers('instructor', problem_url_name)
+
+        self.assertEqual(mock_lcp.call_count, 1)
+        descriptor = self.module_store.get_item(InstructorTaskModuleTestCase.problem_location(problem_url_name))
+        for user, expected_score in zip(self.users, (0.5, 1, 0)):
+            self.check_state(user, descriptor, expected_score, 1)
+
+    def test_saved_together(self):
+        problem_url_name = 'H1P1'
+        self.submit_option_answers(problem_url_name)
+        with patch.object(
+            BaseStudentModuleHistory, 'bulk_save_history', wraps=BaseStudentModuleHistory.bulk_save_history
+        ) as mock_save_history:
+            self.submit_rescore_all_student_answers('instructor', problem_url_name)
+
+        self.assertEqual(mock_save_history.call_count, 1)
+        saved_modules = mock_save_history.call_args[0][0]
+        self.assertEqual(set(module.student_id for module in saved_modules), {user.id for user in self.users})
+        descriptor = self.module_store.get_item(InstructorTaskModuleTestCase.problem_location(problem_url_name))
+        for user, expected_score in zip(self.users, (0, 1, 1, 2)):
+            history = BaseStudentModuleHistory.get_history([self.get_student_module(user.username, descriptor)])
+            self.assertEqual(history[0].grade, expected_score)
+
+    def test_changed_state_rescored_apart(self):
+        problem_url_name = 'H1P1'
+        self.submit_option_answers(problem_url_name)
+        descriptor = self.module_store.get_item(InstructorTaskModuleTestCase.problem_location(problem_url_name))
+        changed_module = self.get_student_module('u1', descriptor)
+        save_rescored_modules = module_state._save_rescored_modules  # pylint: disable=protected-access
+
+        def change_state(graded_modules):
+            """Changes the state of u1's problem after it's graded, before it's saved."""
+            StudentModule.objects.filter(id=changed_module.id).update(
+                state=json.dumps(dict(json.loads(changed_module.state), changed=True))
+            )
+            return save_rescored_modules(graded_modules)
+
+        with patch.object(module_state, '_save_rescored_modules', side_effect=change_state):
+            with patch.object(
+                module_state, 'rescore_problem_module_state', wraps=module_state.rescore_problem_module_state
+            ) as mock_rescore:
+                self.submit_rescore_all_student_answers('instructor', problem_url_name)
+
+        self.assertEqual(mock_rescore.call_count, 1)
+        self.assertEqual(mock_rescore.call_args[0][2].id, changed_module.id)
+        for user, expected_score in zip(self.users, (0, 1, 1, 2)):
+            self.check_state(user, descriptor, expected_score, 2)
+
+    def test_rescore_events(self):
+        problem_url_name = 'H1P1'
+        self.submit_option_answers(problem_url_name)
+        with patch('lms.djangoapps.instructor_task.tasks_helper.module_state.task_track') as mock_track:
+            self.submit_rescore_all_student_answers('instructor', problem_url_name)
+
+        rescore_events = {
+            call_args[0][1]['student']: call_args[0][3]
+            for call_args in mock_track.call_args_list
+            if call_args[0][2] == 'problem_rescore'
+        }
+        self.assertEqual(set(rescore_events), {user.username for user in self.users})
+        self.assertEqual(rescore_events['u1']['orig_score'], 2)
+        self.assertEqual(rescore_events['u1']['new_score'], 0)
+        self.assertEqual(rescore_events['u1']['success'], 'incorrect')
+        self.assertEqual(rescore_events['u4']['new_score'], 2)
+        self.assertEqual(rescore_events['u4']['success'], 'correct')
+
+
 class TestResetAttemptsTask(TestIntegrationTask):
     """
     Integration-style tests for resetting problem attempts in a background task.
@@ -1,6 +1,7 @@
 """
 Tests for instructor_task/models.py.
 """
+import codecs
 import copy
 import time
 from cStringIO import StringIO
@@ -51,6 +52,22 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def test_stream_rows(self):
+        """
+        Test that ReportStore.stream_rows() writes all of the rows of a
+        generator in chunks.
+        """
+        report_store = self.create_report_store()
+        rows = ([u'row', unicode(index)] for index in range(100))
+        with patch.object(report_store, 'STREAM_CHUNK_SIZE', 64):
+            report_store.stream_rows(self.course_id, 'report.csv', rows)
+
+        with report_store.storage.open(report_store.path_to(self.course_id, 'report.csv')) as csv_file:
+            self.assertEqual(
+                csv_file.read(),
+                codecs.BOM_UTF8 + ''.join('row,{}\r\n'.format(index) for index in range(100)),
+            )
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, SimpleTestCase):
     """
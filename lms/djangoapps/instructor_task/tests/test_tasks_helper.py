@@ -8,20 +8,24 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 
 """
 
+import json
 import os
 import shutil
 import tempfile
 import urllib
 from contextlib import contextmanager
 from datetime import datetime, timedelta
+from uuid import uuid4
 
 import ddt
 import unicodecsv
 from capa.tests.response_xml_factory import MultipleChoiceResponseXMLFactory
+from celery.states import FAILURE, SUCCESS
 from course_modes.models import CourseMode
 from course_modes.tests.factories import CourseModeFactory
 from courseware.tests.factories import InstructorFactory
 from django.conf import settings
+from django.db import DatabaseError
 from django.urls import reverse
 from django.test.utils import override_settings
 from edx_django_utils.cache import RequestCache
@@ -76,6 +80,12 @@ from lms.djangoapps.instructor_task.tasks_helper.misc import (
     upload_course_survey_report,
     upload_ora2_data,
 )
+from lms.djangoapps.instructor_task.tasks_helper.shards import (
+    _part_filename,
+    generate_report_shard,
+    queue_report_shards
+)
+from lms.djangoapps.instructor_task.tests.factories import InstructorTaskFactory
 from lms.djangoapps.instructor_task.tests.test_base import (
     InstructorTaskCourseTestCase,
     InstructorTaskModuleTestCase,
@@ -88,7 +98,8 @@ from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 from openedx.core.djangoapps.credit.tests.factories import CreditCourseFactory
 from openedx.core.djangoapps.user_api.partition_schemes import RandomUserPartitionScheme
 from openedx.core.djangoapps.util.testing import ContentGroupTestCase, TestConditionalContent
-from ..models import ReportStore
+from ..config.waffle import STREAM_GRADE_REPORTS, waffle
+from ..models import InstructorTask, ReportStore
 from ..tasks_helper.utils import UPDATE_STATUS_FAILED, UPDATE_STATUS_SUCCEEDED
 
 
@@ -155,6 +166,32 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
         self.assertTrue(any('grade_report_err' in item[0] for item in report_store.links_for(self.course.id)))
 
+    def test_streaming(self):
+        """
+        Test that streamed grade reports update the task's progress after
+        each batch of learners, and contain the same rows.
+        """
+        for i in range(3):
+            self.create_student('student{0}'.format(i), 'student{0}@example.com'.format(i))
+
+        self.current_task = Mock()
+        self.current_task.update_state = Mock()
+        with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task') as mock_current_task:
+            mock_current_task.return_value = self.current_task
+            with patch.object(CourseGradeReport, 'USER_BATCH_SIZE', 2):
+                with waffle().override(STREAM_GRADE_REPORTS, active=True):
+                    result = CourseGradeReport.generate(None, None, self.course.id, None, 'graded')
+
+        self.assertDictContainsSubset({'attempted': 3, 'succeeded': 3, 'failed': 0}, result)
+        progress_steps = [call[1]['meta']['step'] for call in self.current_task.update_state.call_args_list]
+        self.assertIn(u'Compiled grades of 2 learners', progress_steps)
+        self.assertIn(u'Compiled grades of 3 learners', progress_steps)
+        self.verify_rows_in_csv(
+            [{'Username': 'student{0}'.format(i)} for i in range(3)],
+            verify_order=False,
+            ignore_other_columns=True,
+        )
+
     def test_cohort_data_in_grading(self):
         """
         Test that cohort data is included in grades csv if cohort configuration is enabled for course.
@@ -1003,6 +1040,122 @@ class TestProblemGradeReport(TestReportMixin, InstructorTaskModuleTestCase):
         ])
 
 
+@ddt.ddt
+@override_settings(GRADES_DOWNLOAD_USERS_PER_SHARD=1)
+class TestShardedGradeReports(TestReportMixin, InstructorTaskModuleTestCase):
+    """
+    Test grade reports that are generated in shards by subtasks.
+    """
+    def setUp(self):
+        super(TestShardedGradeReports, self).setUp()
+        self.initialize_course()
+        self.student_1 = self.create_student(u'student_1')
+        self.student_2 = self.create_student(u'student_2')
+        self.entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_type='problem_grade_report',
+        )
+
+    def _queue_report_shards(self, report_class):
+        """
+        Generates the report of the given class in shards, and returns the
+        status of the InstructorTask's subtasks.
+        """
+        queue_report_shards(report_class, None, self.entry.id, self.course.id, None, 'graded')
+        self.entry = InstructorTask.objects.get(pk=self.entry.id)
+        return json.loads(self.entry.subtasks)
+
+    @ddt.data(CourseGradeReport, ProblemGradeReport)
+    def test_merged_report(self, report_class):
+        subtask_dict = self._queue_report_shards(report_class)
+
+        # A subtask for each user's shard, and one to merge them.
+        self.assertDictContainsSubset({'total': 3, 'succeeded': 3, 'failed': 0}, subtask_dict)
+        self.assertEqual(self.entry.task_state, SUCCESS)
+        self.assertDictContainsSubset({'attempted': 2, 'succeeded': 2, 'failed': 0}, json.loads(self.entry.task_output))
+
+        # The merged report is the only one, and it keeps the report's headers.
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+        self.assertEqual(self.get_csv_row_with_headers(), report_class.shard_headers(self.course.id)[0])
+        self.verify_rows_in_csv(
+            [{'Username': self.student_1.username}, {'Username': self.student_2.username}],
+            ignore_other_columns=True,
+        )
+
+    def test_retried_shard(self):
+        shard_rows = ProblemGradeReport.shard_rows
+        num_calls = [0]
+
+        def fail_once(course_id, users):
+            """Fails the first shard's first attempt."""
+            num_calls[0] += 1
+            if num_calls[0] == 1:
+                raise DatabaseError('Lost connection')
+            return shard_rows(course_id, users)
+
+        with patch.object(ProblemGradeReport, 'shard_rows', side_effect=fail_once):
+            subtask_dict = self._queue_report_shards(ProblemGradeReport)
+
+        self.assertDictContainsSubset({'total': 3, 'succeeded': 3, 'failed': 0}, subtask_dict)
+        retries = sorted(status['retried_withmax'] for status in subtask_dict['status'].itervalues())
+        self.assertEqual(retries, [0, 0, 1])
+        self.verify_rows_in_csv(
+            [{'Username': self.student_1.username}, {'Username': self.student_2.username}],
+            ignore_other_columns=True,
+        )
+
+    def test_failed_shard(self):
+        with patch.object(generate_report_shard, 'max_retries', 0):
+            with patch.object(ProblemGradeReport, 'shard_rows', side_effect=DatabaseError('Lost connection')):
+                subtask_dict = self._queue_report_shards(ProblemGradeReport)
+
+        # The merge fails along with the shards, which fails the task.
+        self.assertDictContainsSubset({'total': 3, 'succeeded': 0, 'failed': 3}, subtask_dict)
+        self.assertEqual(self.entry.task_state, FAILURE)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(report_store.links_for(self.course.id), [])
+        self.assert_no_parts(ProblemGradeReport)
+
+    @ddt.data(u'student_1', u'student_2')
+    def test_one_failed_shard(self, failed_username):
+        shard_rows = ProblemGradeReport.shard_rows
+
+        def fail_user(course_id, users):
+            """Fails the shard of the user with failed_username."""
+            if users.filter(username=failed_username).exists():
+                raise DatabaseError('Lost connection')
+            return shard_rows(course_id, users)
+
+        with patch.object(generate_report_shard, 'max_retries', 0):
+            with patch.object(ProblemGradeReport, 'shard_rows', side_effect=fail_user):
+                subtask_dict = self._queue_report_shards(ProblemGradeReport)
+
+        # Whichever shard fails, the parts of the other are deleted, and no report is stored.
+        self.assertDictContainsSubset({'total': 3, 'succeeded': 1, 'failed': 2}, subtask_dict)
+        self.assertEqual(self.entry.task_state, FAILURE)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(report_store.links_for(self.course.id), [])
+        self.assert_no_parts(ProblemGradeReport)
+
+    def assert_no_parts(self, report_class):
+        """
+        Asserts that none of the parts of the reports of the given class exist.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        for csv_name in (report_class.REPORT_NAME, report_class.ERROR_REPORT_NAME):
+            for index in range(3):
+                self.assertFalse(report_store.exists(self.course.id, _part_filename(self.entry.id, csv_name, index)))
+
+    @override_settings(GRADES_DOWNLOAD_USERS_PER_SHARD=2)
+    def test_single_shard(self):
+        with patch.object(ProblemGradeReport, 'generate', return_value={}) as mock_generate:
+            self._queue_report_shards(ProblemGradeReport)
+        self.assertTrue(mock_generate.called)
+        self.assertEqual(self.entry.subtasks, '')
+
+
 class TestProblemReportSplitTestContent(TestReportMixin, TestConditionalContent, InstructorTaskModuleTestCase):
     """
     Test the problem report on a course that has split tests.
@@ -203,6 +203,9 @@ if 'loc_cache' not in CACHES:
         'LOCATION': 'edx_location_mem_cache',
     }
 
+# Course structures shared amongst the processes on the node
+COURSE_STRUCTURE_SHARED_CACHE.update(ENV_TOKENS.get('COURSE_STRUCTURE_SHARED_CACHE', {}))
+
 # Email overrides
 DEFAULT_FROM_EMAIL = ENV_TOKENS.get('DEFAULT_FROM_EMAIL', DEFAULT_FROM_EMAIL)
 DEFAULT_FEEDBACK_EMAIL = ENV_TOKENS.get('DEFAULT_FEEDBACK_EMAIL', DEFAULT_FEEDBACK_EMAIL)
@@ -333,6 +336,7 @@ LOGGING = get_logger_config(LOG_DIR,
 COURSE_LISTINGS = ENV_TOKENS.get('COURSE_LISTINGS', {})
 COMMENTS_SERVICE_URL = ENV_TOKENS.get("COMMENTS_SERVICE_URL", '')
 COMMENTS_SERVICE_KEY = ENV_TOKENS.get("COMMENTS_SERVICE_KEY", '')
+COMMENTS_SERVICE_CONNECTIONS.update(ENV_TOKENS.get('COMMENTS_SERVICE_CONNECTIONS', {}))
 CERT_NAME_SHORT = ENV_TOKENS.get('CERT_NAME_SHORT', CERT_NAME_SHORT)
 CERT_NAME_LONG = ENV_TOKENS.get('CERT_NAME_LONG', CERT_NAME_LONG)
 CERT_QUEUE = ENV_TOKENS.get("CERT_QUEUE", 'test-pull')
@@ -363,8 +367,11 @@ for name, value in ENV_TOKENS.get("CODE_JAIL", {}).items():
         CODE_JAIL[name] = value
 
 COURSES_WITH_UNSAFE_CODE = ENV_TOKENS.get("COURSES_WITH_UNSAFE_CODE", [])
+SAFE_EXEC_CACHE.update(ENV_TOKENS.get('SAFE_EXEC_CACHE', {}))
 
 ASSET_IGNORE_REGEX = ENV_TOKENS.get('ASSET_IGNORE_REGEX', ASSET_IGNORE_REGEX)
+COURSE_ASSETS_DISK_CACHE.update(ENV_TOKENS.get('COURSE_ASSETS_DISK_CACHE', {}))
+COURSE_ASSETS_CHUNK_CACHE.update(ENV_TOKENS.get('COURSE_ASSETS_CHUNK_CACHE', {}))
 
 # Event Tracking
 if "TRACKING_IGNORE_URL_PATTERNS" in ENV_TOKENS:
@@ -632,6 +639,13 @@ DISABLE_ACCOUNT_ACTIVATION_REQUIREMENT_SWITCH = ENV_TOKENS.get(
 
 # Grades download
 GRADES_DOWNLOAD_ROUTING_KEY = ENV_TOKENS.get('GRADES_DOWNLOAD_ROUTING_KEY', HIGH_MEM_QUEUE)
+GRADES_DOWNLOAD_USERS_PER_SHARD = ENV_TOKENS.get('GRADES_DOWNLOAD_USERS_PER_SHARD', GRADES_DOWNLOAD_USERS_PER_SHARD)
+GRADES_DOWNLOAD_SHARD_RETRY_DELAY = ENV_TOKENS.get(
+    'GRADES_DOWNLOAD_SHARD_RETRY_DELAY', GRADES_DOWNLOAD_SHARD_RETRY_DELAY
+)
+GRADES_DOWNLOAD_SHARD_MAX_RETRIES = ENV_TOKENS.get(
+    'GRADES_DOWNLOAD_SHARD_MAX_RETRIES', GRADES_DOWNLOAD_SHARD_MAX_RETRIES
+)
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
 
@@ -405,6 +405,33 @@ COURSE_TALK_WRITE_ONLY_SOURCE = '//d3q6qq2zt8nhwv.cloudfront.net/s/js/widgets/co
 # Ignore static asset files on import which match this pattern
 ASSET_IGNORE_REGEX = r"(^\._.*$)|(^\.DS_Store$)|(^.*~$)"
 
+# Copies of large course assets on the local disk, from which the contentserver serves them.
+# The cache is disabled unless DIRECTORY is set.  If X_ACCEL_REDIRECT_PREFIX is set, the web
+# server is asked to send the copies, from the internal location that maps it to DIRECTORY.
+COURSE_ASSETS_DISK_CACHE = {
+    'DIRECTORY': None,
+    'MAX_SIZE': 10 * 1024 * 1024 * 1024,
+    'MIN_ASSET_SIZE': 1024 * 1024,
+    'X_ACCEL_REDIRECT_PREFIX': None,
+}
+
+# Assets too large for the course_assets cache, up to MAX_ASSET_SIZE bytes, are cached
+# in chunks, which are read as the contentserver needs them.
+COURSE_ASSETS_CHUNK_CACHE = {
+    'ENABLED': False,
+    'MAX_ASSET_SIZE': 100 * 1024 * 1024,
+}
+
+# Connections to the comments service.  Each process keeps a pool of up to POOL_SIZE
+# keep-alive connections to it, and retries failed connections up to RETRIES times.
+# Independent requests are made in parallel, by up to FAN_OUT_WORKERS threads.
+COMMENTS_SERVICE_CONNECTIONS = {
+    'POOL_ENABLED': True,
+    'POOL_SIZE': 10,
+    'RETRIES': 2,
+    'FAN_OUT_WORKERS': 4,
+}
+
 # Used for A/B testing
 DEFAULT_GROUPS = []
 
@@ -751,10 +778,12 @@ EVENT_TRACKING_BACKENDS = {
         'OPTIONS': {
             'backends': {
                 'logger': {
-                    'ENGINE': 'eventtracking.backends.logger.LoggerBackend',
+                    'ENGINE': 'track.backends.logger.LoggerBackend',
                     'OPTIONS': {
                         'name': 'tracking',
                         'max_event_size': TRACK_MAX_EVENT,
+                        # Drop large events, as eventtracking's logger backend does.
+                        'truncate': False,
                     }
                 }
             },
@@ -883,6 +912,17 @@ MODULESTORE = {
     }
 }
 
+# Directory on the local node in which split course structures are cached
+# in memory-mapped files, shared amongst the processes on the node.  It is
+# preferably on a memory-backed filesystem, such as /dev/shm.  If
+# DIRECTORY is None, structures are not cached there.
+COURSE_STRUCTURE_SHARED_CACHE = {
+    'DIRECTORY': None,
+    # Size, in bytes, above which the least recently used structures are
+    # removed from the directory.
+    'MAX_SIZE': 1024 * 1024 * 1024,
+}
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -896,6 +936,16 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # A pool of warm sandboxed processes, which each run jobs in forked
+    # children with the limits above.  A size of 0 means each execution
+    # starts a new sandboxed process instead.
+    'pool': {
+        # The number of idle processes to keep in each server process.
+        'size': 0,
+        # The number of executions after which a process is replaced.
+        'max_jobs': 100,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -908,6 +958,20 @@ CODE_JAIL = {
 #   ]
 COURSES_WITH_UNSAFE_CODE = []
 
+# The results of sandboxed code are cached in each process, and in the
+# Django cache named by CACHE_ALIAS, which is shared amongst the processes.
+SAFE_EXEC_CACHE = {
+    'CACHE_ALIAS': 'default',
+    # The maximum number of results cached in each process.
+    'MAX_ENTRIES': 1000,
+    # The size, in bytes of JSON, of the largest result to cache.
+    'MAX_RESULT_SIZE': 64 * 1024,
+    # The number of seconds for which results are cached in each process,
+    # and in the shared cache.
+    'LOCAL_TIMEOUT': 5 * 60,
+    'SHARED_TIMEOUT': 24 * 60 * 60,
+}
+
 ############################### DJANGO BUILT-INS ###############################
 # Change DEBUG in your environment settings files, not here
 DEBUG = False
@@ -1268,6 +1332,7 @@ MIDDLEWARE_CLASSES = [
 
     'django_comment_client.utils.ViewNameMiddleware',
     'codejail.django_integration.ConfigureCodeJailMiddleware',
+    'xmodule.util.sandboxing.ConfigureSandboxPoolMiddleware',
 
     # catches any uncaught RateLimitExceptions and returns a 403 instead of a 500
     'ratelimitbackend.middleware.RateLimitMiddleware',
@@ -1926,6 +1991,11 @@ BLOCK_STRUCTURES_SETTINGS = dict(
 
     # Backend storage options
     PRUNING_ACTIVE=False,
+
+    # Maximum total memory, in estimated bytes, of the block
+    # structures held in each process' cache, when the
+    # block_structure.enable_process_cache waffle switch is enabled.
+    PROCESS_CACHE_MAX_SIZE=100 * 1024 * 1024,
 )
 
 ################################ Bulk Email ###################################
@@ -2580,6 +2650,15 @@ BADGR_TIMEOUT = 10
 # the ones that contain information other than grades.
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
+# Parameters for breaking down grade reports into shards of users, when the
+# instructor_task.shard_grade_reports switch is on.
+GRADES_DOWNLOAD_USERS_PER_SHARD = 5000
+
+# Delay, in seconds, before retrying a failed shard, and the maximum number
+# of retries per shard.
+GRADES_DOWNLOAD_SHARD_RETRY_DELAY = 30
+GRADES_DOWNLOAD_SHARD_MAX_RETRIES = 3
+
 GRADES_DOWNLOAD = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-grades',
@@ -1,17 +1,45 @@
 """" Common utilities for comment client wrapper """
+import cookielib
 import logging
+import os
+import threading
+import urlparse
 from contextlib import contextmanager
 from time import time
 from uuid import uuid4
 
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.conf import settings
+from django.utils import translation
 from django.utils.translation import get_language
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 
 import dogstats_wrapper as dog_stats_api
 from .settings import SERVICE_HOST as COMMENTS_SERVICE
 
 log = logging.getLogger(__name__)
 
+# The default COMMENTS_SERVICE_CONNECTIONS setting.
+DEFAULT_CONNECTIONS_SETTINGS = {
+    'POOL_ENABLED': True,
+    'POOL_SIZE': 10,
+    'RETRIES': 2,
+    'FAN_OUT_WORKERS': 4,
+}
+
+# The pooled Sessions of this process, by (process id, scheme, host).
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+# The (process id, ThreadPoolExecutor) of perform_in_parallel.
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+# The ForumsConfig of the requests made by a thread of the executor.
+_LOCAL = threading.local()
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -49,11 +77,130 @@ def request_timer(request_id, method, url, tags=None):
     )
 
 
+def get_connections_settings():
+    """
+    Returns the COMMENTS_SERVICE_CONNECTIONS setting, with defaults for any
+    values it doesn't have.
+    """
+    connections_settings = dict(DEFAULT_CONNECTIONS_SETTINGS)
+    connections_settings.update(getattr(settings, 'COMMENTS_SERVICE_CONNECTIONS', {}))
+    return connections_settings
+
+
+def get_session(url):
+    """
+    Returns the requests Session of this process for the comments service at
+    the given URL, which keeps a pool of connections to it alive, or None if
+    connections aren't pooled.
+    """
+    connections_settings = get_connections_settings()
+    if not connections_settings['POOL_ENABLED']:
+        return None
+
+    scheme, host = urlparse.urlsplit(url)[:2]
+    # Connections opened before the process was forked are not its own.
+    key = (os.getpid(), scheme, host)
+    session = _SESSIONS.get(key)
+    if session is None:
+        with _SESSIONS_LOCK:
+            session = _SESSIONS.get(key)
+            if session is None:
+                session = requests.Session()
+                # The session is shared by the requests of all users, so it mustn't keep cookies.
+                session.cookies.set_policy(cookielib.DefaultCookiePolicy(allowed_domains=[]))
+                # Only failed connections are retried, as the requests may not be idempotent.
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=connections_settings['POOL_SIZE'],
+                    max_retries=Retry(total=connections_settings['RETRIES'], read=0, redirect=0),
+                )
+                session.mount(u'{}://{}'.format(scheme, host), adapter)
+                _SESSIONS[key] = session
+    return session
+
+
+def close_sessions():
+    """
+    Closes the pooled connections of this process.
+    """
+    with _SESSIONS_LOCK:
+        sessions = _SESSIONS.values()
+        _SESSIONS.clear()
+    for session in sessions:
+        session.close()
+
+
+def get_forums_config():
+    """
+    Returns the ForumsConfig of the requests of the current thread.
+    """
+    config = getattr(_LOCAL, 'config', None)
+    if config is None:
+        # To avoid dependency conflict
+        from django_comment_common.models import ForumsConfig
+        config = ForumsConfig.cached_current()
+    return config
+
+
+def perform_in_parallel(*calls):
+    """
+    Calls the given functions, which make independent requests to the
+    comments service, in parallel, and returns a list of their results.
+
+    The first function is called in the current thread, and the others in the
+    threads of an executor, with the ForumsConfig and the language of the
+    current thread.  If any of the functions raises an exception, the first
+    of them to do so, in the order of the functions, is raised.  Without
+    FAN_OUT_WORKERS, the functions are called in order, in the current thread.
+    """
+    executor = _get_executor()
+    if executor is None or len(calls) < 2:
+        return [call() for call in calls]
+
+    config = get_forums_config()
+    language = get_language()
+
+    def call_in_thread(call):
+        """
+        Calls the function, with the ForumsConfig and the language of the
+        current request.
+        """
+        _LOCAL.config = config
+        try:
+            with translation.override(language):
+                return call()
+        finally:
+            _LOCAL.config = None
+
+    futures = [executor.submit(call_in_thread, call) for call in calls[1:]]
+    try:
+        first_result = calls[0]()
+    except Exception:
+        # The other requests mustn't outlive this one.
+        wait(futures)
+        raise
+    return [first_result] + [future.result() for future in futures]
+
+
+def _get_executor():
+    """
+    Returns the ThreadPoolExecutor of this process for perform_in_parallel,
+    or None if there are no FAN_OUT_WORKERS.
+    """
+    global _EXECUTOR  # pylint: disable=global-statement
+    workers = get_connections_settings()['FAN_OUT_WORKERS']
+    if not workers:
+        return None
+    with _EXECUTOR_LOCK:
+        # Threads started before the process was forked don't run in it.
+        if _EXECUTOR is None or _EXECUTOR[0] != os.getpid():
+            _EXECUTOR = (os.getpid(), ThreadPoolExecutor(max_workers=workers))
+        return _EXECUTOR[1]
+
+
 def perform_request(method, url, data_or_params=None, raw=False,
                     metric_action=None, metric_tags=None, paged_results=False):
-    # To avoid dependency conflict
-    from django_comment_common.models import ForumsConfig
-    config = ForumsConfig.current()
+    config = get_forums_config()
 
     if not config.enabled:
         raise CommentClientMaintenanceError('service disabled')
@@ -81,8 +228,9 @@ def perform_request(method, url, data_or_params=None, raw=False,
         data = None
         params = data_or_params.copy()
         params.update(request_id_dict)
+    session = get_session(url)
     with request_timer(request_id, method, url, metric_tags):
-        response = requests.request(
+        response = (session or requests).request(
             method,
             url,
             data=data,
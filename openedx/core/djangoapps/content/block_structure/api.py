@@ -43,6 +43,16 @@ def clear_course_from_cache(course_key):
     get_block_structure_manager(course_key).clear()
 
 
+def evict_course_from_process_cache(course_key):
+    """
+    A higher order function implemented on top of the
+    block_structure.evict_from_process_cache function that evicts the
+    block structure for the given course_key from the cache of the
+    current process.
+    """
+    get_block_structure_manager(course_key).evict_from_process_cache()
+
+
 def get_block_structure_manager(course_key):
     """
     Returns the manager for managing Block Structures for the given course.
@@ -0,0 +1,116 @@
+"""
+Module for the stable index of the blocks in a collected block structure.
+
+Each block of a collected structure is assigned a position in the index
+at collect time.  Sets of blocks can then be represented as bitsets over
+the index, which transformers may compute at collect time, store with
+their collected data, and combine with bitwise operators at transform
+time, rather than evaluating a condition for each block.
+
+Bitsets are Python integers, whose bit at a block's position is set if
+the block is in the set.
+"""
+from collections import namedtuple
+
+
+# The name under which the index is stored in the transformer data of a
+# block structure and of each of its blocks.
+BLOCK_INDEX_KEY = '_block_index'
+
+
+class RemovalBitmap(namedtuple('RemovalBitmap', ['bitset', 'keep_descendants'])):
+    """
+    A decision of a transformer to remove the blocks in the given bitset
+    from a block structure.  See BlockStructureBlockData.remove_block for
+    the description of keep_descendants.
+
+    Returned by BlockStructureBlockData.create_removal_bitmap.
+    """
+    pass
+
+
+class BlockIndex(object):
+    """
+    The stable index of the blocks in a collected block structure.
+    """
+    def __init__(self, block_keys):
+        """
+        Arguments:
+            block_keys ([UsageKey or None]) - The usage keys of the blocks
+                at each position of the index.  Positions of blocks that
+                are no longer in the structure may be None.
+        """
+        self.block_keys = block_keys
+
+        # Map of a block's usage key to its position in the index.
+        # dict {UsageKey: int}
+        self._positions = {
+            block_key: position for position, block_key in enumerate(block_keys) if block_key is not None
+        }
+
+        # Map of a block type to the bitset of blocks of that type,
+        # computed upon first use.
+        # dict {string: int}
+        self._block_type_bitsets = None
+
+    def __len__(self):
+        return len(self.block_keys)
+
+    def __contains__(self, block_key):
+        return block_key in self._positions
+
+    def position(self, block_key):
+        """
+        Returns the position of the given block in the index.
+
+        Raises KeyError if the block is not in the index.
+        """
+        return self._positions[block_key]
+
+    def bitset(self, block_keys):
+        """
+        Returns the bitset of the given blocks.  Blocks that are not in
+        the index are ignored.
+        """
+        bits = bytearray(len(self.block_keys) // 8 + 1)
+        positions = self._positions
+        for block_key in block_keys:
+            position = positions.get(block_key)
+            if position is not None:
+                bits[position >> 3] |= 1 << (position & 7)
+        return int(str(bits[::-1]).encode('hex'), 16)
+
+    def iter_block_keys(self, bitset):
+        """
+        Returns an iterator of the usage keys of the blocks in the given
+        bitset, in the order of the index.
+        """
+        hex_bits = '{:x}'.format(bitset)
+        if len(hex_bits) % 2:
+            hex_bits = '0' + hex_bits
+        bits = bytearray(hex_bits.decode('hex'))
+        bits.reverse()
+
+        block_keys = self.block_keys
+        for byte_position, byte in enumerate(bits):
+            if byte:
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        block_key = block_keys[(byte_position << 3) + bit]
+                        if block_key is not None:
+                            yield block_key
+
+    def block_type_bitset(self, block_type):
+        """
+        Returns the bitset of the blocks of the given block type.
+        """
+        if self._block_type_bitsets is None:
+            block_keys_by_type = {}
+            for block_key in self.block_keys:
+                if block_key is not None:
+                    block_keys_by_type.setdefault(block_key.block_type, []).append(block_key)
+            self._block_type_bitsets = {
+                type_of_blocks: self.bitset(block_keys)
+                for type_of_blocks, block_keys in block_keys_by_type.iteritems()
+            }
+        return self._block_type_bitsets.get(block_type, 0)
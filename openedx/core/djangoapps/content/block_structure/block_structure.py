@@ -8,12 +8,12 @@ The following internal data structures are implemented:
     _BlockRelations - Data structure for a single block's relations.
     _BlockData - Data structure for a single block's data.
 """
-from copy import deepcopy
 from functools import partial
 from logging import getLogger
 
 from openedx.core.lib.graph_traversals import traverse_topologically, traverse_post_order
 
+from .block_index import BLOCK_INDEX_KEY, BlockIndex, RemovalBitmap
 from .exceptions import TransformerException
 
 
@@ -62,6 +62,12 @@ class BlockStructure(object):
         # dict {UsageKey: _BlockRelations}
         self._block_relations = {}
 
+        # Set of usage keys of blocks whose relations are owned by this
+        # instance and may be updated in place.  None if all relations are
+        # owned, i.e., if none are shared with a copy of this structure.
+        # set(UsageKey) or None
+        self._owned_relations = None
+
         # Add the root block.
         self._add_block(self._block_relations, root_block_usage_key)
 
@@ -91,7 +97,8 @@ class BlockStructure(object):
         Returns:
             [UsageKey] - A list of usage keys of the block's parents.
         """
-        return self._block_relations[usage_key].parents if usage_key in self else []
+        relations = self._block_relations.get(usage_key)
+        return relations.parents if relations else []
 
     def get_children(self, usage_key):
         """
@@ -105,7 +112,8 @@ class BlockStructure(object):
         Returns:
             [UsageKey] - A list of usage keys of the block's children.
         """
-        return self._block_relations[usage_key].children if usage_key in self else []
+        relations = self._block_relations.get(usage_key)
+        return relations.children if relations else []
 
     def set_root_block(self, usage_key):
         """
@@ -120,7 +128,7 @@ class BlockStructure(object):
                 new root of the block structure.
         """
         self.root_block_usage_key = usage_key
-        self._block_relations[usage_key].parents = []
+        self._get_writable_relations(usage_key).parents = []
 
     def __contains__(self, usage_key):
         """
@@ -205,29 +213,19 @@ class BlockStructure(object):
         """
         Mutates this block structure by removing any unreachable blocks.
         """
+        # Find the reachable blocks by traversing the structure from
+        # its root.
+        reachable = set(self.post_order_traversal())
 
-        # Create a new block relations map to store only those blocks
-        # that are still linked
-        pruned_block_relations = {}
-        old_block_relations = self._block_relations
-
-        # Build the structure from the leaves up by doing a post-order
-        # traversal of the old structure, thereby encountering only
-        # reachable blocks.
-        for block_key in self.post_order_traversal():
-            # If the block is in the old structure,
-            if block_key in old_block_relations:
-                # Add it to the new pruned structure
-                self._add_block(pruned_block_relations, block_key)
-
-                # Add a relationship to only those old children that
-                # were also added to the new pruned structure.
-                for child in old_block_relations[block_key].children:
-                    if child in pruned_block_relations:
-                        self._add_to_relations(pruned_block_relations, block_key, child)
-
-        # Replace this structure's relations with the newly pruned one.
-        self._block_relations = pruned_block_relations
+        # Remove the unreachable blocks, along with any relations from
+        # them to reachable blocks.  Relations of blocks that are not
+        # affected are left as is, rather than copied.
+        for block_key, relations in list(self._block_relations.iteritems()):
+            if block_key not in reachable:
+                del self._block_relations[block_key]
+            elif any(parent not in reachable for parent in relations.parents):
+                writable_relations = self._get_writable_relations(block_key)
+                writable_relations.parents = [parent for parent in relations.parents if parent in reachable]
 
     def _add_relation(self, parent_key, child_key):
         """
@@ -237,28 +235,31 @@ class BlockStructure(object):
             parent_key (UsageKey) - Usage key of the parent block.
             child_key (UsageKey) - Usage key of the child block.
         """
-        self._add_to_relations(self._block_relations, parent_key, child_key)
+        for usage_key in (parent_key, child_key):
+            if usage_key not in self._block_relations:
+                self._add_block(self._block_relations, usage_key)
+                if self._owned_relations is not None:
+                    self._owned_relations.add(usage_key)
 
-    @staticmethod
-    def _add_to_relations(block_relations, parent_key, child_key):
-        """
-        Adds a parent to child relationship in the given block
-        relations map.
+        self._get_writable_relations(child_key).parents.append(parent_key)
+        self._get_writable_relations(parent_key).children.append(child_key)
 
-        Arguments:
-            block_relations (dict({UsageKey: _BlockRelations})) -
-                Internal map of a block's usage key to its
-                parents/children relations.
-
-            parent_key (UsageKey) - Usage key of the parent block.
-
-            child_key (UsageKey) - Usage key of the child block.
+    def _get_writable_relations(self, usage_key):
+        """
+        Returns the relations of the block identified by the given
+        usage_key, copying them first if they are shared with a copy
+        of this structure.
         """
-        BlockStructure._add_block(block_relations, parent_key)
-        BlockStructure._add_block(block_relations, child_key)
+        relations = self._block_relations[usage_key]
+        if self._owned_relations is None or usage_key in self._owned_relations:
+            return relations
 
-        block_relations[child_key].parents.append(parent_key)
-        block_relations[parent_key].children.append(child_key)
+        writable_relations = _BlockRelations()
+        writable_relations.parents = list(relations.parents)
+        writable_relations.children = list(relations.children)
+        self._block_relations[usage_key] = writable_relations
+        self._owned_relations.add(usage_key)
+        return writable_relations
 
     @staticmethod
     def _add_block(block_relations, usage_key):
@@ -360,6 +361,16 @@ class TransformerDataMap(dict):
             self[key] = new_transformer_data
             return new_transformer_data
 
+    def copy_data(self):
+        """
+        Returns a new map with a shallow copy of each of this map's
+        TransformerData.
+        """
+        copied = TransformerDataMap()
+        for transformer_name, transformer_data in self.iteritems():
+            copied[transformer_name] = _copy_field_data(transformer_data, TransformerData)
+        return copied
+
     def _translate_key(self, key):
         """
         Allows the given key to be either the transformer's class or name,
@@ -392,6 +403,28 @@ class BlockData(FieldData):
         self.transformer_data = TransformerDataMap()
 
 
+def _copy_field_data(field_data, field_data_class):
+    """
+    Returns a new instance of the given FieldData class with a
+    shallow copy of the fields of the given field_data.
+    """
+    copied = field_data_class()
+    copied.fields = dict(field_data.fields)
+    return copied
+
+
+def _copy_block_data(block_data):
+    """
+    Returns a copy of the given BlockData, with shallow copies of its
+    fields and of the fields of its transformer data.  Field values
+    are expected to be replaced, rather than updated in place.
+    """
+    copied = BlockData(block_data.location)
+    copied.fields = dict(block_data.fields)
+    copied.transformer_data = block_data.transformer_data.copy_data()
+    return copied
+
+
 class BlockStructureBlockData(BlockStructure):
     """
     Subclass of BlockStructure that is responsible for managing block
@@ -401,7 +434,7 @@ class BlockStructureBlockData(BlockStructure):
     # update this value whenever the data structure changes. Dependent storage
     # layers can then use this value when serializing/deserializing block
     # structures, and invalidating any previously cached/stored data.
-    VERSION = 2
+    VERSION = 3
 
     def __init__(self, root_block_usage_key):
         super(BlockStructureBlockData, self).__init__(root_block_usage_key)
@@ -414,18 +447,49 @@ class BlockStructureBlockData(BlockStructure):
         # Map of a transformer's name to its non-block-specific data.
         self.transformer_data = TransformerDataMap()
 
+        # Set of usage keys of blocks whose data is owned by this
+        # instance and may be updated in place.  None if all block data
+        # is owned, i.e., if none is shared with a copy of this structure.
+        # set(UsageKey) or None
+        self._owned_block_data = None
+
+        # The stable index of the blocks collected in this structure,
+        # built upon first use and shared with copies of this structure.
+        # BlockIndex or None
+        self._block_index = None
+
     def copy(self):
         """
         Returns a new instance of BlockStructureBlockData with a
-        deep-copy of this instance's contents.
+        copy-on-write copy of this instance's contents.
+
+        The relations and data of each block are shared between this
+        instance and the copy, until they are updated through the
+        methods of either instance, at which point that instance makes
+        its own copy of the block's relations or data.  The cost of a
+        copy thereby scales with the number of blocks that are updated
+        rather than with the total size of the structure.
+
+        Note: Since block data may be shared, BlockData objects returned
+        by __getitem__ and iteritems are to be treated as read-only;
+        updates are to be made through the methods of this class.
         """
         from .factory import BlockStructureFactory
-        return BlockStructureFactory.create_new(
+        transformer_data = TransformerDataMap()
+        for transformer_name, transformer_data_of_structure in self.transformer_data.iteritems():
+            transformer_data[transformer_name] = _copy_field_data(transformer_data_of_structure, TransformerData)
+
+        copied = BlockStructureFactory.create_new(
             self.root_block_usage_key,
-            deepcopy(self._block_relations),
-            deepcopy(self.transformer_data),
-            deepcopy(self._block_data_map),
+            dict(self._block_relations),
+            transformer_data,
+            dict(self._block_data_map),
         )
+        for block_structure in (self, copied):
+            block_structure._owned_relations = set()
+            block_structure._owned_block_data = set()
+        copied._block_index = self.get_block_index()
+        return copied
 
     def iteritems(self):
         """
@@ -479,7 +543,7 @@ class BlockStructureBlockData(BlockStructure):
 
             override_data (object) - The data you want to set
         """
-        block_data = self._block_data_map.get(usage_key)
+        block_data = self._get_writable_block(usage_key) if usage_key in self._block_data_map else None
         setattr(block_data, field_name, override_data)
 
     def get_transformer_data(self, transformer, key, default=None):
@@ -593,7 +657,7 @@ class BlockStructureBlockData(BlockStructure):
                 whose data entry is to be deleted.
         """
         try:
-            transformer_block_data = self.get_transformer_block_data(usage_key, transformer)
+            transformer_block_data = self._get_writable_block(usage_key).transformer_data[transformer]
             delattr(transformer_block_data, key)
         except (AttributeError, KeyError):
             pass
@@ -623,11 +687,11 @@ class BlockStructureBlockData(BlockStructure):
 
         # Remove block from its children.
         for child in children:
-            self._block_relations[child].parents.remove(usage_key)
+            self._get_writable_relations(child).parents.remove(usage_key)
 
         # Remove block from its parents.
         for parent in parents:
-            self._block_relations[parent].children.remove(usage_key)
+            self._get_writable_relations(parent).children.remove(usage_key)
 
         # Remove block.
         self._block_relations.pop(usage_key, None)
@@ -639,6 +703,83 @@ class BlockStructureBlockData(BlockStructure):
                 for parent in parents:
                     self._add_relation(parent, child)
 
+    def get_block_index(self):
+        """
+        Returns the BlockIndex of the blocks collected in this
+        structure; returns None if the blocks were not indexed when
+        the structure was collected.
+        """
+        if self._block_index is None:
+            num_blocks = self.get_transformer_data(BLOCK_INDEX_KEY, 'num_blocks')
+            if num_blocks is None:
+                return None
+
+            block_keys = [None] * num_blocks
+            for block_key, block_data in self._block_data_map.iteritems():
+                position = getattr(block_data.transformer_data.get(BLOCK_INDEX_KEY), 'position', None)
+                if position is not None:
+                    block_keys[position] = block_key
+            self._block_index = BlockIndex(block_keys)
+        return self._block_index
+
+    def create_removal_bitmap(self, bitset, keep_descendants=False):
+        """
+        Returns a RemovalBitmap that removes the blocks in the given
+        bitset of this structure's BlockIndex.  A transformer may return
+        it from transform_block_filters instead of a removal filter, so
+        that its decisions are combined with those of other transformers
+        before a single traversal of the structure.
+
+        Arguments:
+            bitset (int) - The bitset of the blocks to remove.
+
+            keep_descendants (bool) - See the description in
+                remove_block.
+        """
+        return RemovalBitmap(bitset, keep_descendants)
+
+    def create_bitmap_removal_filter(self, removal_bitmaps):
+        """
+        Returns a filter function that removes the blocks in the given
+        RemovalBitmaps.  The bitmaps are combined with bitwise operators,
+        so the filter only looks up each block in the combined result.
+
+        Arguments:
+            removal_bitmaps ([RemovalBitmap]) - The bitmaps of the blocks
+                to remove.  A block that is in multiple bitmaps is removed
+                as specified by the first of them.
+        """
+        keep_descendants_of_removed = self._combine_removal_bitmaps(removal_bitmaps)
+
+        def bitmap_removal_filter(block_key):
+            """
+            Removes the given block if it is in the combined bitmaps.
+            Returns whether the block was retained.
+            """
+            keep_descendants = keep_descendants_of_removed.get(block_key)
+            if keep_descendants is None:
+                return True
+            self.remove_block(block_key, keep_descendants)
+            return False
+
+        return bitmap_removal_filter
+
+    def remove_blocks_in_bitmaps(self, removal_bitmaps):
+        """
+        Removes the blocks in the given RemovalBitmaps without traversing
+        the block structure.
+
+        Note: As with remove_block, descendants of removed blocks remain
+        in the structure unless the _prune_unreachable method is called.
+
+        Arguments:
+            removal_bitmaps ([RemovalBitmap]) - See the description in
+                create_bitmap_removal_filter.
+        """
+        for block_key, keep_descendants in self._combine_removal_bitmaps(removal_bitmaps).iteritems():
+            if block_key in self:
+                self.remove_block(block_key, keep_descendants)
+
     def create_universal_filter(self):
         """
         Returns a filter function that always returns True for all blocks.
@@ -750,19 +891,72 @@ class BlockStructureBlockData(BlockStructure):
             raise TransformerException('Version attributes are not set on transformer {0}.', transformer.name())
         self.set_transformer_data(transformer, TRANSFORMER_VERSION_KEY, transformer.WRITE_VERSION)
 
+    def _combine_removal_bitmaps(self, removal_bitmaps):
+        """
+        Returns a map of the usage key of each block in the given
+        RemovalBitmaps to whether its descendants are to be kept when it
+        is removed, as specified by the first bitmap that includes it.
+        """
+        removed = dropped = kept = 0
+        for removal_bitmap in removal_bitmaps:
+            newly_removed = removal_bitmap.bitset & ~removed
+            if removal_bitmap.keep_descendants:
+                kept |= newly_removed
+            else:
+                dropped |= newly_removed
+            removed |= removal_bitmap.bitset
+
+        block_index = self.get_block_index()
+        keep_descendants_of_removed = dict.fromkeys(block_index.iter_block_keys(dropped), False)
+        keep_descendants_of_removed.update(dict.fromkeys(block_index.iter_block_keys(kept), True))
+        return keep_descendants_of_removed
+
+    def _index_blocks(self):
+        """
+        Assigns each block of this structure its position in a new
+        BlockIndex, in topological order, and records the positions
+        with the structure's collected data.
+        """
+        block_keys = list(self.topological_traversal())
+        traversed = set(block_keys)
+        block_keys.extend(block_key for block_key in self._block_relations if block_key not in traversed)
+
+        for position, block_key in enumerate(block_keys):
+            self.set_transformer_block_field(block_key, BLOCK_INDEX_KEY, 'position', position)
+        self.set_transformer_data(BLOCK_INDEX_KEY, 'num_blocks', len(block_keys))
+        self._block_index = BlockIndex(block_keys)
+
     def _get_or_create_block(self, usage_key):
         """
-        Returns the BlockData associated with the given usage_key.
-        If not found, creates and returns a new BlockData and
-        maps it to the given key.
+        Returns the writable BlockData associated with the given
+        usage_key.  If not found, creates and returns a new BlockData
+        and maps it to the given key.
         """
         try:
-            return self._block_data_map[usage_key]
+            return self._get_writable_block(usage_key)
         except KeyError:
             block_data = BlockData(usage_key)
             self._block_data_map[usage_key] = block_data
+            if self._owned_block_data is not None:
+                self._owned_block_data.add(usage_key)
             return block_data
 
+    def _get_writable_block(self, usage_key):
+        """
+        Returns the BlockData associated with the given usage_key,
+        copying it first if it is shared with a copy of this structure.
+
+        Raises KeyError if not found.
+        """
+        block_data = self._block_data_map[usage_key]
+        if self._owned_block_data is None or usage_key in self._owned_block_data:
+            return block_data
+
+        writable_block_data = _copy_block_data(block_data)
+        self._block_data_map[usage_key] = writable_block_data
+        self._owned_block_data.add(usage_key)
+        return writable_block_data
+
 
 class BlockStructureModulestoreData(BlockStructureBlockData):
     """
@@ -2,6 +2,8 @@
 This module contains various configuration settings via
 waffle switches for the Block Structure framework.
 """
+from django.conf import settings
+
 from openedx.core.djangoapps.waffle_utils import WaffleSwitchNamespace
 from openedx.core.lib.cache_utils import request_cached
 
@@ -15,6 +17,11 @@ WAFFLE_NAMESPACE = u'block_structure'
 INVALIDATE_CACHE_ON_PUBLISH = u'invalidate_cache_on_publish'
 STORAGE_BACKING_FOR_CACHE = u'storage_backing_for_cache'
 RAISE_ERROR_WHEN_NOT_FOUND = u'raise_error_when_not_found'
+ENABLE_PROCESS_CACHE = u'enable_process_cache'
+
+# Default maximum total memory, in estimated bytes, of the
+# block structures held in each process' cache.
+DEFAULT_PROCESS_CACHE_MAX_SIZE = 100 * 1024 * 1024
 
 
 def waffle():
@@ -38,3 +45,11 @@ def cache_timeout_in_seconds():
     Returns and caches the current setting for cache_timeout_in_seconds.
     """
     return BlockStructureConfiguration.current().cache_timeout_in_seconds
+
+
+def process_cache_max_size():
+    """
+    Returns the current setting for the maximum total size of the
+    block structures held in each process' cache.
+    """
+    return settings.BLOCK_STRUCTURES_SETTINGS.get('PROCESS_CACHE_MAX_SIZE', DEFAULT_PROCESS_CACHE_MAX_SIZE)
@@ -135,6 +135,13 @@ class BlockStructureManager(object):
         """
         self.store.delete(self.root_block_usage_key)
 
+    def evict_from_process_cache(self):
+        """
+        Evicts the block structure associated with the given root block
+        key from the cache of the current process.
+        """
+        self.store.evict_from_process_cache(self.root_block_usage_key)
+
     @contextmanager
     def _bulk_operations(self):
         """
@@ -0,0 +1,788 @@
+"""
+Module for the versioned, columnar serialization format of BlockStructures.
+
+Rather than pickling the object graph of a block structure, the collected
+data is laid out as a sequence of independently compressed sections:
+
+    header - Magic bytes, the format version and the marshal version.
+
+    keys - An interned table of all usage keys in the structure.  Usage keys
+        that belong to a common course are stored as (block_type, block_id)
+        pairs against a single copy of their course key.
+
+    relations - Parent/child adjacency lists, stored as array-backed
+        offsets and indices into the key table.
+
+    structure data - Non-block-specific data of each transformer.
+
+    xblock fields - Columns of the collected xBlock fields.
+
+    transformer directory, followed by one section per transformer -
+        Columns of each transformer's block-specific data.
+
+Each column holds the values of a single field for the blocks that have a
+value for it, with an encoding specific to the column's type.  Columns of
+plain values (strings, numbers, containers of these) are marshalled,
+columns of datetimes and of usage keys in the key table are encoded as
+integers, and only columns with any other value types fall back to pickle.
+
+Transformer sections are decompressed and decoded lazily: a request that
+only reads the data of some transformers never decodes the others.
+"""
+# pylint: disable=protected-access
+from array import array
+from collections import defaultdict
+import cPickle as pickle
+from copy import deepcopy
+from datetime import datetime, timedelta
+from itertools import izip
+import marshal
+import struct
+import threading
+import zlib
+
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import UsageKey
+from pytz import UTC
+
+from .block_structure import _BlockRelations, _copy_field_data, BlockData, TransformerData, TransformerDataMap
+from .exceptions import BlockStructureException
+
+
+# Magic bytes that begin every serialization in this format.
+MAGIC = 'EBSC'
+
+# The latest version of the format.  Incrementally update this value
+# whenever the layout of the format changes.
+FORMAT_VERSION = 1
+
+# Version of the marshal format used for plain value columns.
+_MARSHAL_VERSION = 2
+
+_HEADER = struct.Struct('>4sBB')
+_SECTION_LENGTH = struct.Struct('>I')
+
+# Column encodings.
+_PLAIN_COLUMN = 0
+_DATETIME_COLUMN = 1
+_KEY_COLUMN = 2
+_PICKLE_COLUMN = 3
+
+_PLAIN_SCALAR_TYPES = frozenset([type(None), bool, int, long, float, str, unicode])
+_PLAIN_CONTAINER_TYPES = frozenset([list, tuple, set, frozenset])
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class BlockStructureSerializationError(BlockStructureException):
+    """
+    Exception for when serialized data is not in a format supported
+    by this module.
+    """
+    pass
+
+
+def is_serialized(serialized_data):
+    """
+    Returns whether the given data was serialized in this format.
+    """
+    return serialized_data[:len(MAGIC)] == MAGIC
+
+
+def serialize(block_relations, transformer_data, block_data_map):
+    """
+    Returns the serialization of the given data of a block structure.
+
+    Arguments:
+        block_relations (dict {UsageKey: _BlockRelations}) - The
+            structure's relations.
+
+        transformer_data (TransformerDataMap) - The structure's
+            non-block-specific transformer data.
+
+        block_data_map (dict {UsageKey: BlockData}) - The structure's
+            block data.
+    """
+    keys = list(block_relations)
+    keys.extend(key for key in block_data_map if key not in block_relations)
+    key_indices = {key: index for index, key in enumerate(keys)}
+
+    xblock_fields = {}
+    transformer_fields = {}
+    for block_key, block_data in block_data_map.iteritems():
+        row = key_indices[block_key]
+        _add_to_columns(xblock_fields, row, block_data.fields)
+        for transformer_name, block_transformer_data in block_data.transformer_data.iteritems():
+            _add_to_columns(transformer_fields.setdefault(transformer_name, {}), row, block_transformer_data.fields)
+
+    transformer_names = sorted(transformer_fields)
+    sections = [
+        _encode_keys(keys),
+        _encode_relations(block_relations, keys, key_indices),
+        _encode_structure_data(transformer_data),
+        _encode_columns(xblock_fields, key_indices),
+        _compress(sorted(key_indices[key] for key in block_data_map)),
+        _compress(transformer_names),
+    ]
+    sections.extend(
+        _encode_columns(transformer_fields[transformer_name], key_indices)
+        for transformer_name in transformer_names
+    )
+
+    output = [_HEADER.pack(MAGIC, FORMAT_VERSION, _MARSHAL_VERSION)]
+    for section in sections:
+        output.append(_SECTION_LENGTH.pack(len(section)))
+        output.append(section)
+    return ''.join(output)
+
+
+def deserialize(serialized_data):
+    """
+    Returns a tuple of (block_relations, transformer_data, block_data_map)
+    for the given serialized data.  The block-specific transformer data
+    in the returned block_data_map is decoded lazily upon access.
+
+    Raises:
+        BlockStructureSerializationError if the data is not in a
+        supported version of this format.
+    """
+    sections = _split_sections(serialized_data)
+
+    keys = _decode_keys(sections[0])
+    block_relations = _decode_relations(sections[1], keys)
+    transformer_data = _decode_structure_data(sections[2])
+    xblock_fields = _decode_columns(sections[3], keys)
+    block_rows = _decompress(sections[4])
+    transformer_names = _decompress(sections[5])
+
+    lazy_columns = _LazyTransformerColumns(keys, dict(zip(transformer_names, sections[6:])))
+
+    block_data_map = {}
+    for row in block_rows:
+        block_key = keys[row]
+        block_data = BlockData.__new__(BlockData)
+        block_data.__dict__.update(
+            fields=xblock_fields.get(row, {}),
+            location=block_key,
+            transformer_data=LazyTransformerDataMap(lazy_columns, row),
+        )
+        block_data_map[block_key] = block_data
+
+    return block_relations, transformer_data, block_data_map
+
+
+def decode_all(block_data_map):
+    """
+    Decodes the lazily decoded transformer data of all blocks in the
+    given block_data_map, as returned by deserialize.
+    """
+    decoded_columns = set()
+    for block_data in block_data_map.itervalues():
+        transformer_data = block_data.transformer_data
+        if isinstance(transformer_data, LazyTransformerDataMap) and id(transformer_data._lazy_columns) not in decoded_columns:
+            decoded_columns.add(id(transformer_data._lazy_columns))
+            transformer_data._load_all()
+
+
+class _LazyTransformerColumns(object):
+    """
+    The compressed, block-specific data of each transformer in a
+    serialized block structure.  A transformer's data is decoded upon
+    first access, and distributed to the LazyTransformerDataMap of each
+    block at once.
+    """
+    def __init__(self, keys, compressed_sections, decoded_names=None):
+        self._keys = keys
+        self._compressed_sections = compressed_sections
+
+        # Map of a row in the key table to its block's transformer data.
+        # dict {int: LazyTransformerDataMap}
+        self._maps_by_row = {}
+
+        # Set of names of transformers that have been decoded.  A name is
+        # only added once its data is in the maps of all registered blocks.
+        # set(string)
+        self.decoded_names = set(decoded_names or [])
+
+        # Serializes the decoding of transformers, as a deserialized block
+        # structure may be shared amongst threads by the process cache.
+        self._decode_lock = threading.Lock()
+
+    @property
+    def transformer_names(self):
+        """
+        Returns the names of the transformers with serialized data.
+        """
+        return self._compressed_sections.keys()
+
+    def register(self, row, transformer_data_map):
+        """
+        Registers the given map as the transformer data of the block
+        in the given row of the key table.
+        """
+        self._maps_by_row[row] = transformer_data_map
+
+    def decode(self, transformer_name):
+        """
+        Decodes the data of the given transformer into the maps of all
+        registered blocks, if not yet decoded.
+        """
+        with self._decode_lock:
+            if transformer_name in self.decoded_names:
+                return
+
+            if transformer_name in self._compressed_sections:
+                fields_by_row = _decode_columns(self._compressed_sections[transformer_name], self._keys)
+                for row, fields in fields_by_row.iteritems():
+                    transformer_data_map = self._maps_by_row.get(row)
+                    if transformer_data_map is not None:
+                        transformer_data_map._set_decoded(transformer_name, fields)
+
+            self.decoded_names.add(transformer_name)
+
+    def fresh_copy(self):
+        """
+        Returns a new instance for the same serialized data, without any
+        registered maps.
+        """
+        return _LazyTransformerColumns(self._keys, self._compressed_sections, self.decoded_names)
+
+
+class LazyTransformerDataMap(TransformerDataMap):
+    """
+    A TransformerDataMap for a single block whose entries are decoded
+    from serialized transformer columns when first accessed.
+    """
+    def __init__(self, lazy_columns, row):
+        super(LazyTransformerDataMap, self).__init__()
+        self._lazy_columns = lazy_columns
+        self._row = row
+
+        # Set of names of transformers whose entries were explicitly
+        # set on this map, and are not to be replaced by decoded data.
+        self._updated = set()
+
+        lazy_columns.register(row, self)
+
+    def __getitem__(self, key):
+        key = self._translate_key(key)
+        self._load(key)
+        return dict.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        key = self._translate_key(key)
+        self._updated.add(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        key = self._translate_key(key)
+        self._load(key)
+        self._updated.add(key)
+        dict.__delitem__(self, key)
+
+    def __contains__(self, key):
+        key = self._translate_key(key)
+        self._load(key)
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        key = self._translate_key(key)
+        self._load(key)
+        return dict.get(self, key, default)
+
+    def __iter__(self):
+        self._load_all()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._load_all()
+        return dict.__len__(self)
+
+    def keys(self):
+        self._load_all()
+        return dict.keys(self)
+
+    def values(self):
+        self._load_all()
+        return dict.values(self)
+
+    def items(self):
+        self._load_all()
+        return dict.items(self)
+
+    def iterkeys(self):
+        self._load_all()
+        return dict.iterkeys(self)
+
+    def itervalues(self):
+        self._load_all()
+        return dict.itervalues(self)
+
+    def iteritems(self):
+        self._load_all()
+        return dict.iteritems(self)
+
+    def __eq__(self, other):
+        self._load_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __deepcopy__(self, memo):
+        """
+        Copies the decoded entries, keeping the remaining entries lazy.
+        All copies made within a single deepcopy call share new lazy
+        columns.
+        """
+        columns_memo_key = ('lazy_columns', id(self._lazy_columns))
+        if columns_memo_key not in memo:
+            memo[columns_memo_key] = self._lazy_columns.fresh_copy()
+
+        copied = LazyTransformerDataMap(memo[columns_memo_key], self._row)
+        copied._updated = set(self._updated)
+        for key, value in dict.iteritems(self):
+            dict.__setitem__(copied, key, deepcopy(value, memo))
+        return copied
+
+    def copy_data(self):
+        """
+        Overrides the base implementation to keep the entries of the
+        copy lazy.
+        """
+        return _LazyTransformerDataMapCopy(self)
+
+    def __reduce_ex__(self, protocol):
+        """
+        Pickles as a regular TransformerDataMap with all entries decoded.
+        """
+        self._load_all()
+        return TransformerDataMap, (), None, None, dict.iteritems(self)
+
+    def _translate_key(self, key):
+        """
+        Overrides the base implementation to avoid the cost of an
+        exception for the common case of keys that are already names.
+        """
+        if isinstance(key, basestring):
+            return key
+        return super(LazyTransformerDataMap, self)._translate_key(key)
+
+    def _load(self, transformer_name):
+        """
+        Decodes the data of the given transformer, if not yet decoded.
+        """
+        if transformer_name not in self._lazy_columns.decoded_names:
+            self._lazy_columns.decode(transformer_name)
+
+    def _load_all(self):
+        """
+        Decodes the data of all transformers.
+        """
+        for transformer_name in self._lazy_columns.transformer_names:
+            self._load(transformer_name)
+
+    def _set_decoded(self, transformer_name, fields):
+        """
+        Sets the given decoded fields as the given transformer's data,
+        unless its entry was explicitly updated.
+        """
+        if transformer_name not in self._updated:
+            transformer_data = TransformerData.__new__(TransformerData)
+            transformer_data.__dict__['fields'] = fields
+            dict.__setitem__(self, transformer_name, transformer_data)
+
+
+class _LazyTransformerDataMapCopy(LazyTransformerDataMap):
+    """
+    A copy of a LazyTransformerDataMap, whose entries are copied from
+    the source map when first accessed.  The source map is expected
+    not to be updated, as is the case for the block data shared by
+    copy-on-write copies of a block structure.
+    """
+    def __init__(self, source):  # pylint: disable=super-init-not-called
+        TransformerDataMap.__init__(self)
+        self._lazy_columns = source._lazy_columns
+        self._row = source._row
+        self._updated = set()
+        self._source = source
+
+        # Set of names of transformers whose entries were copied from
+        # the source map.
+        self._copied_names = set()
+
+    def __deepcopy__(self, memo):
+        """
+        Copies all entries into a regular TransformerDataMap.
+        """
+        self._load_all()
+        copied = TransformerDataMap()
+        for key, value in dict.iteritems(self):
+            dict.__setitem__(copied, key, deepcopy(value, memo))
+        return copied
+
+    def _load(self, transformer_name):
+        """
+        Copies the source map's entry for the given transformer, if not
+        yet copied.
+        """
+        if transformer_name not in self._copied_names:
+            self._copied_names.add(transformer_name)
+            source_data = self._source.get(transformer_name)
+            if source_data is not None and transformer_name not in self._updated:
+                dict.__setitem__(self, transformer_name, _copy_field_data(source_data, TransformerData))
+
+    def _load_all(self):
+        """
+        Copies the source map's entries for all transformers.
+        """
+        for transformer_name in self._source:
+            self._load(transformer_name)
+
+
+#--- Sections ---#
+
+def _compress(value):
+    """
+    Returns the compressed marshalling of the given plain value.
+    """
+    return zlib.compress(marshal.dumps(value, _MARSHAL_VERSION))
+
+
+def _decompress(section):
+    """
+    Returns the plain value of the given compressed section.
+    """
+    return marshal.loads(zlib.decompress(section))
+
+
+def _split_sections(serialized_data):
+    """
+    Verifies the header of the given data and returns its sections.
+    """
+    try:
+        magic, format_version, marshal_version = _HEADER.unpack_from(serialized_data)
+    except struct.error:
+        magic = None
+    if magic != MAGIC:
+        raise BlockStructureSerializationError('Serialized data is not in the columnar block structure format.')
+    if format_version != FORMAT_VERSION or marshal_version != _MARSHAL_VERSION:
+        raise BlockStructureSerializationError(
+            'Unsupported columnar block structure format; version: {}, marshal version: {}.'.format(
+                format_version, marshal_version,
+            )
+        )
+
+    sections = []
+    offset = _HEADER.size
+    while offset < len(serialized_data):
+        section_length, = _SECTION_LENGTH.unpack_from(serialized_data, offset)
+        offset += _SECTION_LENGTH.size
+        sections.append(serialized_data[offset:offset + section_length])
+        offset += section_length
+    return sections
+
+
+def _encode_keys(keys):
+    """
+    Returns the section for the interned table of the given keys.
+
+    A usage key is interned against a template key of its course, whose
+    serialized string is stored only once, when the key can be rebuilt
+    exactly by replacing the template's block_type and block_id.  Any
+    other key is stored in a column of its own.
+    """
+    templates = []
+    template_indices = {}
+    block_types = []
+    block_type_indices = {}
+    interned = array('i')
+    block_ids = []
+    other_indices = []
+    other_keys = []
+
+    for index, key in enumerate(keys):
+        template_index = _get_template_index(key, templates, template_indices)
+        if template_index is not None and _from_template(templates[template_index], key) == key:
+            if key.block_type not in block_type_indices:
+                block_type_indices[key.block_type] = len(block_types)
+                block_types.append(key.block_type)
+            interned.extend((template_index, block_type_indices[key.block_type]))
+            block_ids.append(key.block_id)
+        else:
+            interned.extend((-1, -1))
+            block_ids.append(None)
+            other_indices.append(index)
+            other_keys.append(key)
+
+    return _compress((
+        [unicode(template) for template in templates],
+        block_types,
+        interned.tostring(),
+        block_ids,
+        other_indices,
+        _encode_column(other_keys, {}),
+    ))
+
+
+def _decode_keys(section):
+    """
+    Returns the list of keys in the given key table section.
+    """
+    serialized_templates, block_types, interned_data, block_ids, other_indices, (other_encoding, other_payload) = (
+        _decompress(section)
+    )
+    templates = []
+    for serialized_template in serialized_templates:
+        template = UsageKey.from_string(serialized_template)
+        templates.append((template.__class__, template.__getstate__()))
+    interned = array('i')
+    interned.fromstring(interned_data)
+
+    keys = []
+    for index, block_id in enumerate(block_ids):
+        template_index = interned[2 * index]
+        if template_index < 0:
+            keys.append(None)
+        else:
+            key_class, key_state = templates[template_index]
+            key_state['block_type'] = block_types[interned[2 * index + 1]]
+            key_state['block_id'] = block_id
+            key = key_class.__new__(key_class)
+            key.__setstate__(key_state)
+            keys.append(key)
+
+    for index, key in zip(other_indices, _decode_column(other_encoding, other_payload, keys)):
+        keys[index] = key
+    return keys
+
+
+def _get_template_index(key, templates, template_indices):
+    """
+    Returns the index of the template to intern the given key against,
+    adding the key as a new template if its course has none yet.
+    Returns None if the key cannot be interned.
+    """
+    template_id = (type(key), getattr(key, 'course_key', None))
+    if template_id in template_indices:
+        return template_indices[template_id]
+
+    template_index = None
+    if template_id[1] is not None and _is_serializable_usage_key(key):
+        template_index = len(templates)
+        templates.append(key)
+    template_indices[template_id] = template_index
+    return template_index
+
+
+def _is_serializable_usage_key(key):
+    """
+    Returns whether the given key is a usage key that can be rebuilt
+    from its serialized string and from its pickle state.
+    """
+    try:
+        state = key.__getstate__()
+        rebuilt_key = UsageKey.from_string(unicode(key))
+    except (AttributeError, InvalidKeyError):
+        return False
+    return 'block_type' in state and 'block_id' in state and rebuilt_key == key
+
+
+def _from_template(template, key):
+    """
+    Returns a key built from the given template key with the
+    block_type and block_id of the given key.
+    """
+    state = template.__getstate__()
+    state.update(block_type=key.block_type, block_id=key.block_id)
+    rebuilt_key = template.__class__.__new__(template.__class__)
+    rebuilt_key.__setstate__(state)
+    return rebuilt_key
+
+
+def _encode_relations(block_relations, keys, key_indices):
+    """
+    Returns the section for the given block relations, as offsets into
+    flat arrays of child and parent indices.
+    """
+    child_offsets, children = array('i', [0]), array('i')
+    parent_offsets, parents = array('i', [0]), array('i')
+    for key in keys[:len(block_relations)]:
+        relations = block_relations[key]
+        children.extend(key_indices[child] for child in relations.children)
+        child_offsets.append(len(children))
+        parents.extend(key_indices[parent] for parent in relations.parents)
+        parent_offsets.append(len(parents))
+
+    return _compress(tuple(
+        relation_array.tostring() for relation_array in (child_offsets, children, parent_offsets, parents)
+    ))
+
+
+def _decode_relations(section, keys):
+    """
+    Returns the block relations map of the given relations section.
+    """
+    child_offsets, children, parent_offsets, parents = arrays = [array('i') for _ in range(4)]
+    for relation_array, data in zip(arrays, _decompress(section)):
+        relation_array.fromstring(data)
+
+    children = [keys[child] for child in children]
+    parents = [keys[parent] for parent in parents]
+    block_relations = {}
+    for index in xrange(len(child_offsets) - 1):
+        relations = _BlockRelations.__new__(_BlockRelations)
+        relations.children = children[child_offsets[index]:child_offsets[index + 1]]
+        relations.parents = parents[parent_offsets[index]:parent_offsets[index + 1]]
+        block_relations[keys[index]] = relations
+    return block_relations
+
+
+def _encode_structure_data(transformer_data):
+    """
+    Returns the section for the given non-block-specific transformer data.
+    """
+    names = sorted(transformer_data)
+    encoding, payload = _encode_column([transformer_data[name].fields for name in names], {})
+    return _compress((names, encoding, payload))
+
+
+def _decode_structure_data(section):
+    """
+    Returns the TransformerDataMap of the given structure data section.
+    """
+    names, encoding, payload = _decompress(section)
+    transformer_data = TransformerDataMap()
+    for name, fields in zip(names, _decode_column(encoding, payload, [])):
+        transformer_data.get_or_create(name).fields = fields
+    return transformer_data
+
+
+#--- Columns ---#
+
+def _add_to_columns(columns, row, fields):
+    """
+    Adds the given fields of the block in the given row to the given
+    map of field name to (rows, values) columns.
+    """
+    for field_name, value in fields.iteritems():
+        rows, values = columns.setdefault(field_name, ([], []))
+        rows.append(row)
+        values.append(value)
+
+
+def _encode_columns(columns, key_indices):
+    """
+    Returns the section for the given map of field name to
+    (rows, values) columns.
+    """
+    encoded_columns = []
+    for field_name, (rows, values) in columns.iteritems():
+        encoding, payload = _encode_column(values, key_indices)
+        encoded_columns.append((field_name, array('i', rows).tostring(), encoding, payload))
+    return _compress(encoded_columns)
+
+
+def _decode_columns(section, keys):
+    """
+    Returns a map of row to the map of field name to value of the
+    fields in the given section.
+    """
+    fields_by_row = defaultdict(dict)
+    for field_name, row_data, encoding, payload in _decompress(section):
+        rows = array('i')
+        rows.fromstring(row_data)
+        for row, value in izip(rows, _decode_column(encoding, payload, keys)):
+            fields_by_row[row][field_name] = value
+    return fields_by_row
+
+
+def _encode_column(values, key_indices):
+    """
+    Returns a tuple of (encoding, payload) for the given list of values,
+    using the most compact encoding that supports all of them.
+    """
+    if all(_is_plain(value) for value in values):
+        return _PLAIN_COLUMN, values
+
+    if all(value is None or _is_datetime(value) for value in values):
+        is_aware = any(value.tzinfo is not None for value in values if value is not None)
+        if all(value is None or (value.tzinfo is not None) == is_aware for value in values):
+            return _DATETIME_COLUMN, (is_aware, [_encode_datetime(value) for value in values])
+
+    if key_indices and all(value is None or _is_key_in_table(value, key_indices) for value in values):
+        return _KEY_COLUMN, array('i', (-1 if value is None else key_indices[value] for value in values)).tostring()
+
+    return _PICKLE_COLUMN, pickle.dumps(values, pickle.HIGHEST_PROTOCOL)
+
+
+def _decode_column(encoding, payload, keys):
+    """
+    Returns the list of values in the given encoded column.
+    """
+    if encoding == _PLAIN_COLUMN:
+        return payload
+
+    elif encoding == _DATETIME_COLUMN:
+        is_aware, timestamps = payload
+        tzinfo = UTC if is_aware else None
+        return [
+            None if timestamp is None else (_EPOCH + timedelta(microseconds=timestamp)).replace(tzinfo=tzinfo)
+            for timestamp in timestamps
+        ]
+
+    elif encoding == _KEY_COLUMN:
+        key_rows = array('i')
+        key_rows.fromstring(payload)
+        return [None if key_row < 0 else keys[key_row] for key_row in key_rows]
+
+    elif encoding == _PICKLE_COLUMN:
+        return pickle.loads(payload)
+
+    raise BlockStructureSerializationError('Unknown column encoding: {}.'.format(encoding))
+
+
+def _is_plain(value):
+    """
+    Returns whether the given value can be marshalled without loss.
+    Subclasses of the plain types are excluded, since marshal does not
+    preserve them.
+    """
+    value_type = type(value)
+    if value_type in _PLAIN_SCALAR_TYPES:
+        return True
+    elif value_type in _PLAIN_CONTAINER_TYPES:
+        return all(_is_plain(item) for item in value)
+    elif value_type is dict:
+        return all(_is_plain(key) and _is_plain(item) for key, item in value.iteritems())
+    return False
+
+
+def _is_datetime(value):
+    """
+    Returns whether the given value is a datetime that can be encoded
+    as a timestamp without loss.
+    """
+    if type(value) is not datetime:  # pylint: disable=unidiomatic-typecheck
+        return False
+    return value.tzinfo is None or value.utcoffset() == timedelta(0)
+
+
+def _encode_datetime(value):
+    """
+    Returns the given datetime as microseconds since the epoch.
+    """
+    if value is None:
+        return None
+    delta = value.replace(tzinfo=None) - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _is_key_in_table(value, key_indices):
+    """
+    Returns whether the given value is one of the keys in the key table.
+    """
+    try:
+        return value in key_indices
+    except TypeError:
+        return False
@@ -9,7 +9,7 @@ from xmodule.modulestore.django import SignalHandler
 from opaque_keys.edx.locator import LibraryLocator
 
 from . import config
-from .api import clear_course_from_cache
+from .api import clear_course_from_cache, evict_course_from_process_cache
 from .tasks import update_course_in_cache_v2
 
 
@@ -26,6 +26,10 @@ def update_block_structure_on_course_publish(sender, course_key, **kwargs):  # p
     if config.waffle().is_enabled(config.INVALIDATE_CACHE_ON_PUBLISH):
         clear_course_from_cache(course_key)
 
+    # Caches of other processes detect the change once the block
+    # structure is updated by the following task.
+    evict_course_from_process_cache(course_key)
+
     update_course_in_cache_v2.apply_async(
         kwargs=dict(course_id=unicode(course_key)),
         countdown=settings.BLOCK_STRUCTURES_SETTINGS['COURSE_PUBLISH_TASK_DELAY'],
@@ -2,11 +2,13 @@
 Module for the Storage of BlockStructure objects.
 """
 # pylint: disable=protected-access
+import sys
 from logging import getLogger
+from uuid import uuid4
 
-from openedx.core.lib.cache_utils import zpickle, zunpickle
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache, get_memory_size, zunpickle
 
-from . import config
+from . import config, serialization
 from .block_structure import BlockStructureBlockData
 from .exceptions import BlockStructureNotFound
 from .factory import BlockStructureFactory
@@ -16,6 +18,14 @@ from .transformer_registry import TransformerRegistry
 
 logger = getLogger(__name__)  # pylint: disable=C0103
 
+# Process-local cache of deserialized block structures, created upon
+# first use.  See BlockStructureStore._get_process_cache.
+_PROCESS_CACHE = None
+
+# The number of blocks whose memory is measured to estimate the memory
+# of a block structure in the process cache.
+_MEMORY_SIZE_SAMPLE_SIZE = 100
+
 
 class StubModel(object):
     """
@@ -51,7 +61,7 @@ class BlockStructureStore(object):
 
     def add(self, block_structure):
         """
-        Stores and caches a compressed and pickled serialization of
+        Stores and caches a compressed, columnar serialization of
         the given block structure.
 
         The data stored includes the structure's
@@ -65,6 +75,7 @@ class BlockStructureStore(object):
 
         bs_model = self._update_or_create_model(block_structure, serialized_data)
         self._add_to_cache(serialized_data, bs_model)
+        self.evict_from_process_cache(block_structure.root_block_usage_key)
 
     def get(self, root_block_usage_key):
         """
@@ -79,6 +90,9 @@ class BlockStructureStore(object):
                 root of the block structure that is to be retrieved
                 from the store.
 
+        When the process cache is enabled, the returned block structure
+        is a copy-on-write copy of the one shared within the process.
+
         Returns:
             BlockStructure - The deserialized block structure starting
             at root_block_usage_key, if found.
@@ -88,14 +102,34 @@ class BlockStructureStore(object):
             found.
         """
         bs_model = self._get_model(root_block_usage_key)
+        process_cache = self._get_process_cache()
+        version = self._get_process_cache_version(bs_model) if process_cache else None
+
+        if version:
+            cached_entry = process_cache.get(unicode(root_block_usage_key))
+            if cached_entry and cached_entry[0] == version:
+                logger.debug("BlockStructure: Found in process cache; %s.", bs_model)
+                return cached_entry[1].copy()
 
         try:
             serialized_data = self._get_from_cache(bs_model)
         except BlockStructureNotFound:
             serialized_data = self._get_from_store(bs_model)
             self._add_to_cache(serialized_data, bs_model)
-
-        return self._deserialize(serialized_data, root_block_usage_key)
+            version = self._get_process_cache_version(bs_model) if process_cache else None
+
+        block_structure = self._deserialize(serialized_data, root_block_usage_key)
+        if version:
+            # Decode all of the structure's data up front, so that the memory
+            # it holds in the cache doesn't grow after it's measured.
+            serialization.decode_all(block_structure._block_data_map)
+            process_cache.set(
+                unicode(root_block_usage_key),
+                (version, block_structure),
+                size=_estimate_memory_size(block_structure, serialized_data),
+            )
+            return block_structure.copy()
+        return block_structure
 
     def delete(self, root_block_usage_key):
         """
@@ -108,9 +142,25 @@ class BlockStructureStore(object):
         """
         bs_model = self._get_model(root_block_usage_key)
         self._cache.delete(self._encode_root_cache_key(bs_model))
+        if not _is_storage_backing_enabled():
+            self._cache.delete(self._encode_version_cache_key(bs_model))
         bs_model.delete()
+        self.evict_from_process_cache(root_block_usage_key)
         logger.info("BlockStructure: Deleted from cache and store; %s.", bs_model)
 
+    def evict_from_process_cache(self, root_block_usage_key):
+        """
+        Evicts the block structure for the given root_block_usage_key
+        from the cache of the current process.
+
+        Note: Caches of other processes are not affected.  Their entries
+        are invalidated when the version recorded for the block
+        structure in the cache or storage changes.
+        """
+        process_cache = self._get_process_cache()
+        if process_cache:
+            process_cache.delete(unicode(root_block_usage_key))
+
     def is_up_to_date(self, root_block_usage_key, modulestore):
         """
         Returns whether the data in storage for the given key is
@@ -158,6 +208,14 @@ class BlockStructureStore(object):
         """
         cache_key = self._encode_root_cache_key(bs_model)
         self._cache.set(cache_key, serialized_data, timeout=config.cache_timeout_in_seconds())
+        if not _is_storage_backing_enabled():
+            # Record a new version for the data, for the process caches to
+            # detect the change.  Storage-backed data is versioned by its model.
+            version_cache_key = self._encode_version_cache_key(bs_model)
+            if self._get_process_cache():
+                self._cache.set(version_cache_key, uuid4().hex, timeout=config.cache_timeout_in_seconds())
+            else:
+                self._cache.delete(version_cache_key)
         logger.info("BlockStructure: Added to cache; %s, size: %d", bs_model, len(serialized_data))
 
     def _get_from_cache(self, bs_model):
@@ -191,18 +249,31 @@ class BlockStructureStore(object):
         """
         Serializes the data for the given block_structure.
         """
-        data_to_cache = (
+        return serialization.serialize(
             block_structure._block_relations,
             block_structure.transformer_data,
             block_structure._block_data_map,
         )
-        return zpickle(data_to_cache)
 
     def _deserialize(self, serialized_data, root_block_usage_key):
         """
         Deserializes the given data and returns the parsed block_structure.
+
+        Data stored by earlier releases in the zpickle format is still
+        supported, until it is replaced by newly collected data.
+
+        Raises:
+             BlockStructureNotFound if the data is in an unsupported
+             version of the serialization format.
         """
-        block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
+        if serialization.is_serialized(serialized_data):
+            try:
+                block_relations, transformer_data, block_data_map = serialization.deserialize(serialized_data)
+            except serialization.BlockStructureSerializationError:
+                logger.exception("BlockStructure: Unable to deserialize; %s.", root_block_usage_key)
+                raise BlockStructureNotFound(root_block_usage_key)
+        else:
+            block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
         return BlockStructureFactory.create_new(
             root_block_usage_key,
             block_relations,
@@ -210,6 +281,42 @@ class BlockStructureStore(object):
             block_data_map,
         )
 
+    def _get_process_cache_version(self, bs_model):
+        """
+        Returns the version of the data for the given BlockStructureModel
+        or StubModel, for validating entries in the process cache; returns
+        None if the version is not known.
+
+        The version of storage-backed data consists of the model's
+        version-relevant data and its modification time.  Otherwise, it is
+        the version recorded in the cache when the data was last added.
+        """
+        if _is_storage_backing_enabled():
+            version_data = self._version_data_of_model(bs_model)
+            return tuple(sorted(version_data.iteritems())) + (('modified', bs_model.modified),)
+        return self._cache.get(self._encode_version_cache_key(bs_model))
+
+    @staticmethod
+    def _get_process_cache():
+        """
+        Returns the process-local cache of deserialized block
+        structures; returns None if it is not enabled.
+        """
+        global _PROCESS_CACHE  # pylint: disable=global-statement
+        if not config.waffle().is_enabled(config.ENABLE_PROCESS_CACHE):
+            return None
+        if _PROCESS_CACHE is None:
+            _PROCESS_CACHE = SizeBoundedLRUCache(max_size=config.process_cache_max_size())
+        return _PROCESS_CACHE
+
+    @classmethod
+    def _encode_version_cache_key(cls, bs_model):
+        """
+        Returns the cache key for the version of the data of the given
+        BlockStructureModel or StubModel.
+        """
+        return u'{}.version'.format(cls._encode_root_cache_key(bs_model))
+
     @staticmethod
     def _encode_root_cache_key(bs_model):
         """
@@ -254,3 +361,34 @@ def _is_storage_backing_enabled():
     Returns whether storage backing for Block Structures is enabled.
     """
     return config.waffle().is_enabled(config.STORAGE_BACKING_FOR_CACHE)
+
+
+def _estimate_memory_size(block_structure, serialized_data):
+    """
+    Returns an estimate of the memory, in bytes, held by the given
+    deserialized block structure, whose data is all decoded.
+
+    The memory of a sample of the blocks is measured and scaled to all of
+    the blocks.  The serialized data is included, as it's kept for copies
+    of the structure to decode from.
+    """
+    block_keys = list(block_structure._block_relations)
+    sample_keys = block_keys[::max(1, len(block_keys) // _MEMORY_SIZE_SAMPLE_SIZE)]
+    sample = []
+    for block_key in sample_keys:
+        block_data = block_structure._block_data_map.get(block_key)
+        sample.append((
+            block_key,
+            block_structure._block_relations[block_key],
+            block_data.fields if block_data else None,
+            dict(block_data.transformer_data) if block_data else None,
+        ))
+
+    blocks_size = get_memory_size(sample) * len(block_keys) // max(1, len(sample_keys))
+    return (
+        blocks_size +
+        sys.getsizeof(block_structure._block_relations) +
+        sys.getsizeof(block_structure._block_data_map) +
+        get_memory_size(block_structure.transformer_data) +
+        len(serialized_data)
+    )
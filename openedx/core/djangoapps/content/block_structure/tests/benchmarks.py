@@ -0,0 +1,382 @@
+"""
+Benchmarks for the block_structure framework.
+
+These are not run as part of the test suite.  Run them from a shell with:
+
+    python -m openedx.core.djangoapps.content.block_structure.tests.benchmarks
+"""
+# pylint: disable=protected-access
+from copy import deepcopy
+from datetime import datetime, timedelta
+import timeit
+
+from opaque_keys.edx.locator import CourseLocator
+from pytz import UTC
+
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+from .. import serialization
+from ..block_structure import BlockStructureBlockData, TRANSFORMER_VERSION_KEY
+from ..factory import BlockStructureFactory
+from ..transformer import BlockStructureTransformer, FilteringTransformerMixin
+from ..transformers import BlockStructureTransformers
+
+# Block types of each level of the generated course, below the course block.
+COURSE_HIERARCHY = ('chapter', 'sequential', 'vertical')
+
+# Block types of the leaves of the generated course, used in rotation.
+LEAF_BLOCK_TYPES = ('problem', 'video', 'html', 'discussion')
+
+# Names of the transformers whose data is generated in the course.
+TRANSFORMER_NAMES = ('visibility', 'start_date', 'user_partitions', 'completion', 'video', 'grades')
+
+
+def generate_block_structure(num_blocks, branching_factor=5):
+    """
+    Returns a collected block structure for a generated course with
+    approximately num_blocks blocks, with xBlock fields and transformer
+    data that resemble those of a production course.
+    """
+    course_key = CourseLocator('edX', 'Benchmark', 'Run_{}'.format(num_blocks))
+    root_key = course_key.make_usage_key('course', 'course')
+    block_structure = BlockStructureBlockData(root_key)
+    start = datetime(2018, 1, 1, tzinfo=UTC)
+
+    for transformer_name in TRANSFORMER_NAMES:
+        block_structure.set_transformer_data(transformer_name, TRANSFORMER_VERSION_KEY, 1)
+    block_structure.set_transformer_data('user_partitions', 'user_partitions', [{'id': 50, 'groups': [1, 2]}])
+
+    def add_block(block_key, index):
+        """
+        Adds collected data for the given block.
+        """
+        block_data = block_structure._get_or_create_block(block_key)
+        block_data.category = block_key.block_type
+        block_data.display_name = u'{} {}'.format(block_key.block_type, index)
+        block_data.start = start + timedelta(days=index % 30)
+        block_data.due = start + timedelta(days=30 + index % 30) if block_key.block_type == 'sequential' else None
+        block_data.graded = index % 3 == 0
+        block_data.format = u'Homework' if index % 3 == 0 else None
+        block_data.visible_to_staff_only = index % 17 == 0
+        block_data.group_access = {50: [1]} if index % 11 == 0 else {}
+
+        block_structure.set_transformer_block_field(block_key, 'visibility', 'merged_visible_to_staff_only', False)
+        block_structure.set_transformer_block_field(block_key, 'start_date', 'merged_start_date', block_data.start)
+        block_structure.set_transformer_block_field(block_key, 'user_partitions', 'merged_group_access', {})
+        block_structure.set_transformer_block_field(block_key, 'completion', 'complete_by_viewing', index % 2 == 0)
+        if block_key.block_type == 'video':
+            block_structure.set_transformer_block_field(block_key, 'video', 'encoded_videos', {
+                'mobile_low': {'url': u'https://example.com/{}_low.mp4'.format(index), 'file_size': 2 ** 20},
+                'youtube': {'url': u'https://youtu.be/{}'.format(index), 'file_size': 0},
+            })
+        if block_key.block_type == 'problem':
+            block_structure.set_transformer_block_field(block_key, 'grades', 'max_score', float(index % 5 + 1))
+            block_structure.set_transformer_block_field(block_key, 'grades', 'explicit_graded', None)
+
+    counter = [0]
+
+    def add_children(parent_key, depth):
+        """
+        Recursively adds the descendants of the given block.
+        """
+        is_leaf_level = depth == len(COURSE_HIERARCHY)
+        for _ in range(branching_factor):
+            if counter[0] >= num_blocks - 1:
+                return
+            counter[0] += 1
+            if is_leaf_level:
+                block_type = LEAF_BLOCK_TYPES[counter[0] % len(LEAF_BLOCK_TYPES)]
+            else:
+                block_type = COURSE_HIERARCHY[depth]
+            child_key = course_key.make_usage_key(block_type, 'block_{}'.format(counter[0]))
+            block_structure._add_relation(parent_key, child_key)
+            add_block(child_key, counter[0])
+            if not is_leaf_level:
+                add_children(child_key, depth + 1)
+
+    add_block(root_key, 0)
+    while counter[0] < num_blocks - 1:
+        add_children(root_key, 0)
+    return block_structure
+
+
+def _best_time(func, repeat, number=1):
+    """
+    Returns the best time, in milliseconds, of the given function.
+    """
+    return min(timeit.repeat(func, repeat=repeat, number=number)) * 1000.0 / number
+
+
+def benchmark_serialization(num_blocks=5000, repeat=5):
+    """
+    Compares the columnar serialization format with the zpickle format for
+    a generated course, in terms of size and load time.  Load time is
+    measured both for loading the full structure and for reading only
+    the data of a couple of transformers.
+
+    Returns a list of (format name, size in bytes, full load ms,
+    partial load ms) tuples.
+    """
+    block_structure = generate_block_structure(num_blocks)
+    data = (block_structure._block_relations, block_structure.transformer_data, block_structure._block_data_map)
+    transformers_to_read = ('visibility', 'start_date')
+
+    def read_transformers(block_data_map, transformer_names):
+        """
+        Reads the data of the given transformers for all blocks.
+        """
+        for block_data in block_data_map.itervalues():
+            for transformer_name in transformer_names:
+                block_data.transformer_data.get(transformer_name)
+
+    def load_pickle(transformer_names):
+        """
+        Loads the zpickle format, reading the given transformers' data.
+        """
+        read_transformers(zunpickle(pickled)[2], transformer_names)
+
+    def load_columnar(transformer_names):
+        """
+        Loads the columnar format, reading the given transformers' data.
+        """
+        read_transformers(serialization.deserialize(columnar)[2], transformer_names)
+
+    pickled = zpickle(data)
+    columnar = serialization.serialize(*data)
+    return [
+        (
+            format_name,
+            len(serialized),
+            _best_time(lambda: load(TRANSFORMER_NAMES), repeat),  # pylint: disable=cell-var-from-loop
+            _best_time(lambda: load(transformers_to_read), repeat),  # pylint: disable=cell-var-from-loop
+        )
+        for format_name, serialized, load in (
+            ('zpickle', pickled, load_pickle),
+            ('columnar', columnar, load_columnar),
+        )
+    ]
+
+
+def benchmark_copy(num_blocks=10000, repeat=5):
+    """
+    Compares a full deep copy with a copy-on-write copy of a deserialized
+    course, both for the copy alone and for a copy followed by a typical
+    per-user transformation that reads the data of all blocks and
+    updates only a few of them.
+
+    Returns a list of (copy method, copy ms, copy and transform ms) tuples.
+    """
+    collected = generate_block_structure(num_blocks)
+    block_structure = BlockStructureFactory.create_new(
+        collected.root_block_usage_key,
+        *serialization.deserialize(serialization.serialize(
+            collected._block_relations, collected.transformer_data, collected._block_data_map,
+        ))
+    )
+
+    def transform(copied):
+        """
+        Reads the start dates of all blocks, overrides the display
+        names of a few blocks and removes a few others.
+        """
+        block_keys = list(copied)
+        for block_key in block_keys:
+            copied.get_transformer_block_field(block_key, 'start_date', 'merged_start_date')
+        for block_key in block_keys[1::500]:
+            copied.override_xblock_field(block_key, 'display_name', u'Override')
+        for block_key in block_keys[2::500]:
+            copied.remove_block(block_key, keep_descendants=False)
+        copied._prune_unreachable()
+
+    return [
+        (
+            copy_name,
+            _best_time(lambda: copy_func(block_structure), repeat),  # pylint: disable=cell-var-from-loop
+            _best_time(lambda: transform(copy_func(block_structure)), repeat),  # pylint: disable=cell-var-from-loop
+        )
+        for copy_name, copy_func in (
+            ('deepcopy', deepcopy),
+            ('copy-on-write', BlockStructureBlockData.copy),
+        )
+    ]
+
+
+class BenchmarkFilteringTransformer(FilteringTransformerMixin, BlockStructureTransformer):
+    """
+    A filtering transformer that removes the blocks whose collected value
+    meets a user-specific condition, either with a removal filter that
+    checks each block, or with a removal bitmap combined from bitsets of
+    the blocks with each collected value.
+    """
+    WRITE_VERSION = 1
+    READ_VERSION = 1
+
+    def __init__(self, transformer_name, get_value, is_removed, use_bitmaps):
+        """
+        Arguments:
+            transformer_name (string) - The name of the transformer.
+
+            get_value ((block_structure, block_key)->hashable) - Returns
+                the collected value of a block.
+
+            is_removed ((usage_info, value)->bool) - Returns whether
+                blocks with the given value are to be removed.
+
+            use_bitmaps (bool) - Whether to return a removal bitmap
+                rather than a removal filter.
+        """
+        self.transformer_name = transformer_name
+        self.get_value = get_value
+        self.is_removed = is_removed
+        self.use_bitmaps = use_bitmaps
+
+    def name(self):  # pylint: disable=arguments-differ
+        return self.transformer_name
+
+    def collect_bitsets(self, block_structure):
+        """
+        Collects the bitset of the blocks with each collected value.
+        """
+        block_keys_by_value = {}
+        for block_key in block_structure:
+            block_keys_by_value.setdefault(self.get_value(block_structure, block_key), []).append(block_key)
+
+        block_index = block_structure.get_block_index()
+        block_structure.set_transformer_data(self, 'bitsets', [
+            (value, block_index.bitset(block_keys)) for value, block_keys in block_keys_by_value.iteritems()
+        ])
+
+    def transform_block_filters(self, usage_info, block_structure):
+        if self.use_bitmaps:
+            removed_bitset = 0
+            for value, bitset in block_structure.get_transformer_data(self, 'bitsets'):
+                if self.is_removed(usage_info, value):
+                    removed_bitset |= bitset
+            return [block_structure.create_removal_bitmap(removed_bitset)]
+
+        return [
+            block_structure.create_removal_filter(
+                lambda block_key: self.is_removed(usage_info, self.get_value(block_structure, block_key)),
+            )
+        ]
+
+
+def _create_benchmark_transformers(use_bitmaps):
+    """
+    Returns five filtering transformers that resemble the course access
+    transformers, for the courses created by generate_block_structure.
+    """
+    def group_access(block_structure, block_key):
+        """
+        Returns the group access of the block as a hashable value.
+        """
+        return tuple(sorted(
+            (partition_id, tuple(group_ids))
+            for partition_id, group_ids in block_structure.get_xblock_field(block_key, 'group_access').iteritems()
+        ))
+
+    return [
+        BenchmarkFilteringTransformer(
+            'visibility',
+            lambda block_structure, block_key: block_structure.get_transformer_block_field(
+                block_key, 'visibility', 'merged_visible_to_staff_only',
+            ),
+            lambda usage_info, visible_to_staff_only: visible_to_staff_only and not usage_info['is_staff'],
+            use_bitmaps,
+        ),
+        BenchmarkFilteringTransformer(
+            'start_date',
+            lambda block_structure, block_key: block_structure.get_transformer_block_field(
+                block_key, 'start_date', 'merged_start_date',
+            ),
+            lambda usage_info, start: start > usage_info['now'],
+            use_bitmaps,
+        ),
+        BenchmarkFilteringTransformer(
+            'user_partitions',
+            group_access,
+            lambda usage_info, access: any(
+                usage_info['groups'].get(partition_id) not in group_ids for partition_id, group_ids in access
+            ),
+            use_bitmaps,
+        ),
+        BenchmarkFilteringTransformer(
+            'hidden_content',
+            lambda block_structure, block_key: block_structure.get_xblock_field(block_key, 'due'),
+            lambda usage_info, due: due is not None and due < usage_info['now'] - timedelta(days=7),
+            use_bitmaps,
+        ),
+        BenchmarkFilteringTransformer(
+            'discussions',
+            lambda block_structure, block_key: block_key.block_type,
+            lambda usage_info, block_type: block_type in usage_info['hidden_block_types'],
+            use_bitmaps,
+        ),
+    ]
+
+
+def benchmark_filtering(sizes=(1000, 10000), repeat=5):
+    """
+    Compares removal filters with removal bitmaps for filtering copies
+    of generated courses of the given sizes with five transformers.
+
+    Returns a list of (number of blocks, filters ms, bitmaps ms,
+    number of remaining blocks) tuples.
+    """
+    usage_info = {
+        'is_staff': False,
+        'now': datetime(2018, 1, 20, tzinfo=UTC),
+        'groups': {50: 1},
+        'hidden_block_types': {'discussion'},
+    }
+    results = []
+    for num_blocks in sizes:
+        block_structure = generate_block_structure(num_blocks)
+        block_structure._index_blocks()
+        for transformer in _create_benchmark_transformers(use_bitmaps=True):
+            transformer.collect_bitsets(block_structure)
+
+        remaining_blocks = set()
+        times = []
+        for use_bitmaps in (False, True):
+            transformers = BlockStructureTransformers(usage_info=usage_info)
+            transformers._transformers['supports_filter'] = _create_benchmark_transformers(use_bitmaps)
+
+            def transform():
+                """
+                Transforms a copy of the course.
+                """
+                copied = block_structure.copy()
+                transformers.transform(copied)  # pylint: disable=cell-var-from-loop
+                return copied
+
+            remaining_blocks.add(frozenset(transform()))
+            times.append(_best_time(transform, repeat))
+
+        assert len(remaining_blocks) == 1, 'Filters and bitmaps removed different blocks.'
+        results.append((num_blocks, times[0], times[1], len(remaining_blocks.pop())))
+    return results
+
+
+def main():
+    """
+    Runs and prints all benchmarks.
+    """
+    print('Serialization of a generated 5,000-block course:')
+    print('{:<10} {:>10} {:>16} {:>19}'.format('format', 'bytes', 'full load (ms)', 'partial load (ms)'))
+    for result in benchmark_serialization():
+        print('{:<10} {:>10} {:>16.1f} {:>19.1f}'.format(*result))
+
+    print('\nCopies of a deserialized 10,000-block course:')
+    print('{:<15} {:>10} {:>25}'.format('method', 'copy (ms)', 'copy and transform (ms)'))
+    for result in benchmark_copy():
+        print('{:<15} {:>10.1f} {:>25.1f}'.format(*result))
+
+    print('\nFiltering copies of generated courses with five transformers:')
+    print('{:<8} {:>14} {:>14} {:>12}'.format('blocks', 'filters (ms)', 'bitmaps (ms)', 'remaining'))
+    for result in benchmark_filtering():
+        print('{:<8} {:>14.1f} {:>14.1f} {:>12}'.format(*result))
+
+
+if __name__ == '__main__':
+    main()
@@ -136,9 +136,9 @@ class MockCache(object):
 
     def delete(self, key):
         """
-        Deletes the given key from the cache.
+        Deletes the given key from the cache, if found.
         """
-        del self.map[key]
+        self.map.pop(key, None)
 
 
 class MockModulestoreFactory(object):
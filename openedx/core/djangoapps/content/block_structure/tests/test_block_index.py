@@ -0,0 +1,105 @@
+"""
+Tests for block_index.py
+"""
+# pylint: disable=protected-access
+from unittest import TestCase
+
+from opaque_keys.edx.locator import CourseLocator
+
+from ..block_index import BlockIndex
+from ..block_structure import BlockStructureBlockData
+from ..factory import BlockStructureFactory
+from .helpers import ChildrenMapTestMixin
+
+
+class TestBlockIndex(TestCase):
+    """
+    Tests for BlockIndex
+    """
+    shard = 2
+
+    def setUp(self):
+        super(TestBlockIndex, self).setUp()
+        self.block_keys = ['block_{}'.format(position) for position in range(20)]
+        self.block_index = BlockIndex(self.block_keys)
+
+    def test_bitset(self):
+        self.assertEquals(self.block_index.bitset([]), 0)
+        self.assertEquals(self.block_index.bitset(['block_0', 'block_3', 'block_9']), 0b1000001001)
+        self.assertEquals(self.block_index.bitset(['block_19', 'not_indexed']), 1 << 19)
+
+    def test_iter_block_keys(self):
+        for block_keys in ([], ['block_0'], ['block_7', 'block_8'], self.block_keys):
+            self.assertEquals(list(self.block_index.iter_block_keys(self.block_index.bitset(block_keys))), block_keys)
+
+    def test_removed_blocks(self):
+        block_index = BlockIndex([None, 'block_1', None, 'block_3'])
+        self.assertNotIn(None, block_index)
+        self.assertEquals(block_index.position('block_3'), 3)
+        self.assertEquals(list(block_index.iter_block_keys(0b1111)), ['block_1', 'block_3'])
+
+    def test_block_type_bitset(self):
+        course_key = CourseLocator('org', 'course', 'run')
+        block_keys = [
+            course_key.make_usage_key(block_type, str(position))
+            for position, block_type in enumerate(['course', 'split_test', 'vertical', 'split_test'])
+        ]
+        block_index = BlockIndex(block_keys)
+        self.assertEquals(block_index.block_type_bitset('split_test'), 0b1010)
+        self.assertEquals(block_index.block_type_bitset('video'), 0)
+
+
+class TestBlockStructureIndex(ChildrenMapTestMixin, TestCase):
+    """
+    Tests for the BlockIndex of a block structure
+    """
+    shard = 2
+
+    def setUp(self):
+        super(TestBlockStructureIndex, self).setUp()
+        self.block_structure = self.create_block_structure(self.SIMPLE_CHILDREN_MAP, BlockStructureBlockData)
+
+    def test_not_indexed(self):
+        self.assertIsNone(self.block_structure.get_block_index())
+
+    def test_index_blocks(self):
+        self.block_structure._index_blocks()
+        block_index = self.block_structure.get_block_index()
+        self.assertEquals(block_index.block_keys, list(self.block_structure.topological_traversal()))
+
+        # The index is rebuilt from the structure's collected data.
+        rebuilt = BlockStructureFactory.create_new(
+            self.block_structure.root_block_usage_key,
+            self.block_structure._block_relations,
+            self.block_structure.transformer_data,
+            self.block_structure._block_data_map,
+        )
+        self.assertEquals(rebuilt.get_block_index().block_keys, block_index.block_keys)
+
+        # The index is shared with copies.
+        self.assertIs(rebuilt.copy().get_block_index(), rebuilt.get_block_index())
+
+    def test_bitmap_removal_filter(self):
+        self.block_structure._index_blocks()
+        block_index = self.block_structure.get_block_index()
+
+        # Block 1 is in both bitmaps, and is removed as specified by the
+        # first of them.
+        self.block_structure.filter_topological_traversal(
+            self.block_structure.create_bitmap_removal_filter([
+                self.block_structure.create_removal_bitmap(block_index.bitset([1]), keep_descendants=True),
+                self.block_structure.create_removal_bitmap(block_index.bitset([1, 2])),
+            ])
+        )
+        self.assert_block_structure(self.block_structure, [[3, 4], [], [], [], []], missing_blocks=[1, 2])
+
+    def test_remove_blocks_in_bitmaps(self):
+        self.block_structure._index_blocks()
+        block_index = self.block_structure.get_block_index()
+
+        self.block_structure.remove_blocks_in_bitmaps([
+            self.block_structure.create_removal_bitmap(block_index.bitset([1]), keep_descendants=True),
+            self.block_structure.create_removal_bitmap(block_index.bitset([1, 2])),
+        ])
+        self.block_structure._prune_unreachable()
+        self.assert_block_structure(self.block_structure, [[3, 4], [], [], [], []], missing_blocks=[1, 2])
@@ -310,3 +310,47 @@ class TestBlockStructureData(TestCase, ChildrenMapTestMixin):
         _set_value(new_copy, 'edit2')
         self.assertEquals(_get_value(block_structure), 'edit1')
         self.assertEquals(_get_value(new_copy), 'edit2')
+
+    def test_copy_on_write(self):
+        block_structure = self.create_block_structure(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        for block_key in block_structure:
+            block_structure._get_or_create_block(block_key).display_name = 'original'
+
+        new_copy = block_structure.copy()
+        copy_of_copy = new_copy.copy()
+
+        # blocks are shared until they are updated
+        self.assertIs(block_structure._block_data_map[1], new_copy._block_data_map[1])
+        self.assertIs(block_structure._block_relations[1], new_copy._block_relations[1])
+
+        new_copy.override_xblock_field(1, 'display_name', 'edit')
+        new_copy.remove_block(3, keep_descendants=False)
+        self.assertIsNot(block_structure._block_data_map[1], new_copy._block_data_map[1])
+        self.assertIs(block_structure._block_data_map[2], new_copy._block_data_map[2])
+
+        for structure in (block_structure, copy_of_copy):
+            self.assertEquals(structure.get_xblock_field(1, 'display_name'), 'original')
+            self.assert_block_structure(structure, ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        self.assertEquals(new_copy.get_xblock_field(1, 'display_name'), 'edit')
+        self.assertNotIn(3, new_copy)
+
+    def test_prune_copy(self):
+        #     0
+        #    / \
+        #   1  2
+        #   |  |
+        #   3  |
+        #    \ |
+        #     4
+        children_map = [[1, 2], [3], [4], [4], []]
+        block_structure = self.create_block_structure(children_map)
+        new_copy = block_structure.copy()
+
+        new_copy.remove_block(1, keep_descendants=False)
+        new_copy._prune_unreachable()
+        self.assert_block_structure(new_copy, [[2], [], [4], [], []], missing_blocks=[1, 3])
+        self.assertEquals(new_copy.get_parents(4), [2])
+        self.assert_block_structure(block_structure, children_map)
+
+        # relations of blocks that are not affected remain shared
+        self.assertIs(block_structure._block_relations[2], new_copy._block_relations[2])
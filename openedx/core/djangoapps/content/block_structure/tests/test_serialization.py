@@ -0,0 +1,200 @@
+"""
+Tests for serialization.py
+"""
+# pylint: disable=protected-access
+from copy import deepcopy
+from datetime import datetime
+from unittest import TestCase
+
+from mock import patch
+from pytz import UTC
+
+from .. import serialization
+from ..block_structure import BlockStructureBlockData, TransformerData
+from .helpers import ChildrenMapTestMixin, MockTransformer, UsageKeyFactoryMixin
+
+
+class OtherMockTransformer(MockTransformer):
+    """
+    A second mock transformer, for data that is decoded separately.
+    """
+    pass
+
+
+class SerializationTestMixin(object):
+    """
+    Tests for the columnar serialization of block structures.
+    """
+    def setUp(self):
+        super(SerializationTestMixin, self).setUp()
+        self.children_map = self.DAG_CHILDREN_MAP
+        self.block_structure = self.create_block_structure(self.children_map)
+        self.block_structure._add_transformer(MockTransformer)
+        for block_index in range(len(self.children_map)):
+            block_key = self.block_key_factory(block_index)
+            block_data = self.block_structure._get_or_create_block(block_key)
+            block_data.display_name = u'Block {}'.format(block_index)
+            block_data.start = datetime(2018, 1, block_index + 1, tzinfo=UTC)
+            block_data.group_access = {50: [block_index]}
+            self.block_structure.set_transformer_block_field(block_key, MockTransformer, 'parent', block_key)
+            self.block_structure.set_transformer_block_field(block_key, OtherMockTransformer, 'other', object)
+
+    def deserialize(self, block_structure):
+        """
+        Returns a block structure serialized from and deserialized
+        into the given block structure.
+        """
+        serialized_data = serialization.serialize(
+            block_structure._block_relations,
+            block_structure.transformer_data,
+            block_structure._block_data_map,
+        )
+        self.assertTrue(serialization.is_serialized(serialized_data))
+        deserialized = BlockStructureBlockData(block_structure.root_block_usage_key)
+        deserialized._block_relations, deserialized.transformer_data, deserialized._block_data_map = (
+            serialization.deserialize(serialized_data)
+        )
+        return deserialized
+
+    def assert_block_data_equal(self, block_structure, expected_block_structure):
+        """
+        Verifies that the block data of the given block structures are equal.
+        """
+        self.assertEquals(
+            {name: data.fields for name, data in block_structure.transformer_data.iteritems()},
+            {name: data.fields for name, data in expected_block_structure.transformer_data.iteritems()},
+        )
+        self.assertEquals(set(block_structure._block_data_map), set(expected_block_structure._block_data_map))
+        for block_key, block_data in block_structure.iteritems():
+            expected_block_data = expected_block_structure[block_key]
+            self.assertEquals(block_data.location, expected_block_data.location)
+            self.assertEquals(block_data.fields, expected_block_data.fields)
+            self.assertEquals(
+                {name: data.fields for name, data in block_data.transformer_data.iteritems()},
+                {name: data.fields for name, data in expected_block_data.transformer_data.iteritems()},
+            )
+
+    def test_round_trip(self):
+        deserialized = self.deserialize(self.block_structure)
+        self.assert_block_structure(deserialized, self.children_map)
+        self.assert_block_data_equal(deserialized, self.block_structure)
+
+    def test_lazy_transformer_data(self):
+        deserialized = self.deserialize(self.block_structure)
+        block_key = self.block_key_factory(1)
+        lazy_columns = deserialized[block_key].transformer_data._lazy_columns
+        self.assertEquals(lazy_columns.decoded_names, set())
+
+        self.assertEquals(deserialized.get_transformer_block_field(block_key, MockTransformer, 'parent'), block_key)
+        self.assertEquals(lazy_columns.decoded_names, {MockTransformer.name()})
+
+        self.assertIs(deserialized.get_transformer_block_field(block_key, OtherMockTransformer, 'other'), object)
+        self.assertEquals(lazy_columns.decoded_names, {MockTransformer.name(), OtherMockTransformer.name()})
+
+    def test_decoded_after_decoding(self):
+        deserialized = self.deserialize(self.block_structure)
+        block_key = self.block_key_factory(1)
+        lazy_columns = deserialized[block_key].transformer_data._lazy_columns
+        decode_columns = serialization._decode_columns
+
+        def check_not_decoded(*args):
+            """Checks that the transformer isn't marked as decoded while it's being decoded."""
+            self.assertNotIn(MockTransformer.name(), lazy_columns.decoded_names)
+            return decode_columns(*args)
+
+        with patch.object(serialization, '_decode_columns', side_effect=check_not_decoded) as mock_decode_columns:
+            self.assertEquals(deserialized.get_transformer_block_field(block_key, MockTransformer, 'parent'), block_key)
+            self.assertEquals(deserialized.get_transformer_block_field(block_key, MockTransformer, 'parent'), block_key)
+        self.assertEquals(mock_decode_columns.call_count, 1)
+        self.assertEquals(lazy_columns.decoded_names, {MockTransformer.name()})
+
+    def test_update_before_decoding(self):
+        deserialized = self.deserialize(self.block_structure)
+        block_key = self.block_key_factory(1)
+        deserialized[block_key].transformer_data[MockTransformer] = TransformerData()
+        deserialized.remove_transformer_block_field(block_key, OtherMockTransformer, 'other')
+
+        self.assertEquals(deserialized[block_key].transformer_data[MockTransformer].fields, {})
+        self.assertEquals(deserialized.get_transformer_block_field(block_key, OtherMockTransformer, 'other'), None)
+        self.assertIs(
+            deserialized.get_transformer_block_field(self.block_key_factory(2), OtherMockTransformer, 'other'),
+            object,
+        )
+
+    def test_deepcopy(self):
+        deserialized = self.deserialize(self.block_structure)
+        block_key = self.block_key_factory(1)
+        deserialized.set_transformer_block_field(block_key, MockTransformer, 'parent', None)
+
+        copied = deserialized.copy()
+        self.assertEquals(copied[block_key].transformer_data._lazy_columns.decoded_names, {MockTransformer.name()})
+        self.assertIsNone(copied.get_transformer_block_field(block_key, MockTransformer, 'parent'))
+        self.assertIs(copied.get_transformer_block_field(block_key, OtherMockTransformer, 'other'), object)
+
+        copied.set_transformer_block_field(block_key, OtherMockTransformer, 'other', None)
+        self.assertIs(deserialized.get_transformer_block_field(block_key, OtherMockTransformer, 'other'), object)
+        self.assertEquals(deepcopy(deserialized[block_key].fields), self.block_structure[block_key].fields)
+
+    def test_copy_on_write(self):
+        deserialized = self.deserialize(self.block_structure)
+        block_key = self.block_key_factory(1)
+        lazy_columns = deserialized[block_key].transformer_data._lazy_columns
+
+        copied = deserialized.copy()
+        copied.set_transformer_block_field(block_key, MockTransformer, 'parent', None)
+        self.assertEquals(lazy_columns.decoded_names, {MockTransformer.name()})
+        self.assertIsNone(copied.get_transformer_block_field(block_key, MockTransformer, 'parent'))
+        self.assertEquals(deserialized.get_transformer_block_field(block_key, MockTransformer, 'parent'), block_key)
+
+        copied.remove_transformer_block_field(block_key, OtherMockTransformer, 'other')
+        self.assertIsNone(copied.get_transformer_block_field(block_key, OtherMockTransformer, 'other'))
+        self.assertIs(deserialized.get_transformer_block_field(block_key, OtherMockTransformer, 'other'), object)
+
+        copy_of_copy = copied.copy()
+        self.assertIsNone(copy_of_copy.get_transformer_block_field(block_key, MockTransformer, 'parent'))
+        self.assertEquals(
+            {name: data.fields for name, data in deepcopy(copy_of_copy[block_key].transformer_data).iteritems()},
+            {MockTransformer.name(): {'parent': None}, OtherMockTransformer.name(): {}},
+        )
+
+    def test_unsupported_version(self):
+        serialized_data = serialization.serialize(
+            self.block_structure._block_relations,
+            self.block_structure.transformer_data,
+            self.block_structure._block_data_map,
+        )
+        header = serialization._HEADER.pack(
+            serialization.MAGIC, serialization.FORMAT_VERSION + 1, serialization._MARSHAL_VERSION,
+        )
+        with self.assertRaises(serialization.BlockStructureSerializationError):
+            serialization.deserialize(header + serialized_data[len(header):])
+
+
+class TestSerialization(SerializationTestMixin, ChildrenMapTestMixin, TestCase):
+    """
+    Tests for the columnar serialization of block structures with
+    simple block keys, which are stored in a column of their own.
+    """
+    shard = 2
+
+
+class TestSerializationWithUsageKeys(SerializationTestMixin, UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
+    """
+    Tests for the columnar serialization of block structures with
+    usage keys, which are interned in the serialized key table.
+    """
+    shard = 2
+
+    def test_interned_keys(self):
+        serialized_keys = serialization._decompress(
+            serialization._split_sections(
+                serialization.serialize(
+                    self.block_structure._block_relations,
+                    self.block_structure.transformer_data,
+                    self.block_structure._block_data_map,
+                )
+            )[0]
+        )
+        templates, block_types = serialized_keys[:2]
+        self.assertEquals(len(templates), 1)
+        self.assertEquals(block_types, ['course'])
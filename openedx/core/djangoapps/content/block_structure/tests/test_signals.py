@@ -80,3 +80,9 @@ class CourseBlocksSignalTest(ModuleStoreTestCase):
     def test_update_only_for_courses(self, key, expect_update_called, mock_update):
         update_block_structure_on_course_publish(sender=None, course_key=key)
         self.assertEqual(mock_update.called, expect_update_called)
+
+    @patch('openedx.core.djangoapps.content.block_structure.manager.BlockStructureManager.evict_from_process_cache')
+    def test_process_cache_eviction(self, mock_bs_manager_evict):
+        self.course.display_name = "Padawan 101"
+        self.store.update_item(self.course, self.user.id)
+        self.assertTrue(mock_bs_manager_evict.called)
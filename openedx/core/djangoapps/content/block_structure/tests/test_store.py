@@ -2,10 +2,13 @@
 Tests for block_structure/cache.py
 """
 import ddt
+from mock import patch
 
 from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
+from openedx.core.lib.cache_utils import zpickle
 
-from ..config import STORAGE_BACKING_FOR_CACHE, waffle
+from .. import store as store_module
+from ..config import ENABLE_PROCESS_CACHE, STORAGE_BACKING_FOR_CACHE, waffle
 from ..config.models import BlockStructureConfiguration
 from ..exceptions import BlockStructureNotFound
 from ..store import BlockStructureStore
@@ -30,6 +33,9 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
         self.mock_cache = MockCache()
         self.store = BlockStructureStore(self.mock_cache)
 
+        store_module._PROCESS_CACHE = None  # pylint: disable=protected-access
+        self.addCleanup(setattr, store_module, '_PROCESS_CACHE', None)
+
     def add_transformers(self):
         """
         Add each registered transformer to the block structure.
@@ -79,6 +85,21 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
             stored_value = self.store.get(self.block_structure.root_block_usage_key)
             self.assert_block_structure(stored_value, self.children_map)
 
+    def test_get_legacy_serialization(self):
+        self.store.add(self.block_structure)
+        for cache_key in self.mock_cache.map:
+            self.mock_cache.map[cache_key] = zpickle((
+                self.block_structure._block_relations,  # pylint: disable=protected-access
+                self.block_structure.transformer_data,
+                self.block_structure._block_data_map,  # pylint: disable=protected-access
+            ))
+        stored_value = self.store.get(self.block_structure.root_block_usage_key)
+        self.assert_block_structure(stored_value, self.children_map)
+        self.assertEquals(
+            stored_value.get_transformer_block_field(self.block_key_factory(0), MockTransformer, 'test'),
+            '{} val'.format(MockTransformer.name()),
+        )
+
     @ddt.data(1, 5, None)
     def test_cache_timeout(self, timeout):
         if timeout is not None:
@@ -89,3 +110,64 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
         self.assertEquals(self.mock_cache.timeout_from_last_call, 0)
         self.store.add(self.block_structure)
         self.assertEquals(self.mock_cache.timeout_from_last_call, timeout)
+
+    def get_stored_test_value(self):
+        """
+        Returns the test transformer value of the stored block structure.
+        """
+        stored_value = self.store.get(self.block_structure.root_block_usage_key)
+        self.assert_block_structure(stored_value, self.children_map)
+        return stored_value.get_transformer_block_field(self.block_key_factory(0), MockTransformer, 'test')
+
+    @ddt.data(True, False)
+    def test_process_cache(self, with_storage_backing):
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with waffle().override(ENABLE_PROCESS_CACHE, active=True):
+                self.store.add(self.block_structure)
+                stored_value = self.store.get(self.block_structure.root_block_usage_key)
+
+                # Updates to the returned structure are not shared
+                stored_value.set_transformer_block_field(self.block_key_factory(0), MockTransformer, 'test', 'edit')
+                stored_value.remove_block(self.block_key_factory(1), keep_descendants=False)
+
+                # Subsequent gets are served from the process cache
+                with patch.object(self.store, '_deserialize') as mock_deserialize:
+                    self.assertEquals(self.get_stored_test_value(), 'MockTransformer val')
+                    self.assertFalse(mock_deserialize.called)
+
+    def test_process_cache_version_change(self):
+        with waffle().override(ENABLE_PROCESS_CACHE, active=True):
+            self.store.add(self.block_structure)
+            self.assertEquals(self.get_stored_test_value(), 'MockTransformer val')
+
+            # Simulate an update of the block structure by another process
+            self.block_structure.set_transformer_block_field(self.block_key_factory(0), MockTransformer, 'test', 'new')
+            self.store.add(self.block_structure)
+            store_module._PROCESS_CACHE.set(  # pylint: disable=protected-access
+                unicode(self.block_structure.root_block_usage_key),
+                ('outdated version', self.block_structure),
+                size=1,
+            )
+            self.assertEquals(self.get_stored_test_value(), 'new')
+
+    def test_process_cache_size(self):
+        root_block_usage_key = self.block_structure.root_block_usage_key
+        with waffle().override(ENABLE_PROCESS_CACHE, active=True):
+            self.store.add(self.block_structure)
+            self.store.get(root_block_usage_key)
+            serialized_data = self.store._get_from_cache(self.store._get_model(root_block_usage_key))
+
+        # The cached structure is fully decoded, and sized by the memory it holds
+        process_cache = store_module._PROCESS_CACHE  # pylint: disable=protected-access
+        __, cached_block_structure = process_cache.get(unicode(root_block_usage_key))
+        lazy_columns = cached_block_structure._block_data_map[root_block_usage_key].transformer_data._lazy_columns
+        self.assertEquals(lazy_columns.decoded_names, set(lazy_columns.transformer_names))
+        self.assertGreater(process_cache.size, len(serialized_data))
+
+    def test_process_cache_eviction(self):
+        with waffle().override(ENABLE_PROCESS_CACHE, active=True):
+            self.store.add(self.block_structure)
+            self.store.get(self.block_structure.root_block_usage_key)
+            self.store.delete(self.block_structure.root_block_usage_key)
+            with self.assertRaises(BlockStructureNotFound):
+                self.store.get(self.block_structure.root_block_usage_key)
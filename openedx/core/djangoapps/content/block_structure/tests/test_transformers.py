@@ -4,7 +4,7 @@ Tests for transformers.py
 from mock import MagicMock, patch
 from unittest import TestCase
 
-from ..block_structure import BlockStructureModulestoreData
+from ..block_structure import BlockStructureBlockData, BlockStructureModulestoreData
 from ..exceptions import TransformerException, TransformerDataIncompatible
 from ..transformers import BlockStructureTransformers
 from .helpers import (
@@ -82,3 +82,35 @@ class TestBlockStructureTransformers(ChildrenMapTestMixin, TestCase):
                 self.transformers.verify_versions(block_structure)
             self.transformers.collect(block_structure)
             self.assertTrue(self.transformers.verify_versions(block_structure))
+
+    def test_transform_with_removal_bitmaps(self):
+        block_structure = self.create_block_structure(self.SIMPLE_CHILDREN_MAP, BlockStructureBlockData)
+        block_structure._index_blocks()  # pylint: disable=protected-access
+        block_index = block_structure.get_block_index()
+        filtering_transformer = MockFilteringTransformer()
+
+        with patch.object(filtering_transformer, 'transform_block_filters', return_value=[
+            block_structure.create_removal_bitmap(block_index.bitset([1]), keep_descendants=True),
+            block_structure.create_removal_filter(lambda block_key: block_key == 3),
+            block_structure.create_removal_bitmap(block_index.bitset([4])),
+        ]):
+            with mock_registered_transformers([filtering_transformer]):
+                self.transformers += [filtering_transformer]
+            self.transformers.transform(block_structure)
+
+        self.assert_block_structure(block_structure, [[2], [], [], [], []], missing_blocks=[1, 3, 4])
+
+    def test_equivalence_key(self):
+        self.add_mock_transformer()
+        block_structure = MagicMock()
+
+        # Transforms are not shared unless all transformers support it.
+        self.assertIsNone(self.transformers.equivalence_key(block_structure))
+
+        with patch.object(self.registered_transformers[0], 'equivalence_key', return_value='group'):
+            self.assertIsNone(self.transformers.equivalence_key(block_structure))
+            with patch.object(self.registered_transformers[1], 'equivalence_key', return_value=False):
+                self.assertEquals(
+                    self.transformers.equivalence_key(block_structure),
+                    ((MockFilteringTransformer.name(), False), (MockTransformer.name(), 'group')),
+                )
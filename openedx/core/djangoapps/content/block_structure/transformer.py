@@ -155,6 +155,32 @@ class BlockStructureTransformer(object):
         """
         raise NotImplementedError
 
+    def equivalence_key(self, usage_info, block_structure):  # pylint: disable=unused-argument
+        """
+        Returns a hashable key of the usage-specific inputs to this
+        Transformer's transform method, such that transforming the given
+        collected block_structure for any two usage_infos with equal keys
+        yields equal results.  This allows the result of a transform to
+        be computed once and shared amongst many usage_infos, such as
+        when transforming a course for all of its learners.
+
+        The key should be much cheaper to compute than the transform
+        itself.  It is compared only amongst usage_infos transformed at
+        about the same time, so it need not reflect the current time.
+
+        Returns None, by default, if the result of the transform is
+        specific to the usage_info and cannot be shared.
+
+        Arguments:
+            usage_info (any negotiated type) - See the description in
+                the transform method.
+
+            block_structure (BlockStructureBlockData) - The collected
+                block structure that is to be transformed.  It must not
+                be modified by this method.
+        """
+        return None
+
 
 class FilteringTransformerMixin(BlockStructureTransformer):
     """
@@ -183,12 +209,17 @@ class FilteringTransformerMixin(BlockStructureTransformer):
         This is an alternative to the standard transform method.
 
         Returns a list of filter functions to be used for filtering out
-        any unwanted blocks in the given block_structure.
+        any unwanted blocks in the given block_structure.  The list may
+        also include RemovalBitmaps of blocks to remove, which are
+        combined with consecutive RemovalBitmaps of other transformers
+        using bitwise operators.
 
         In addition to the commonly used methods listed above, the following
         methods are commonly used by implementations of transform_block_filters:
             create_universal_filter
             create_removal_filter
+            create_removal_bitmap
+            get_block_index
 
         Note: Transformers that implement this alternative should be
         independent of all other registered transformers as they may not
@@ -4,6 +4,7 @@ Module for a collection of BlockStructureTransformers.
 import functools
 from logging import getLogger
 
+from .block_index import RemovalBitmap
 from .exceptions import TransformerException, TransformerDataIncompatible
 from .transformer import FilteringTransformerMixin
 from .transformer_registry import TransformerRegistry
@@ -75,6 +76,10 @@ class BlockStructureTransformers(object):
         """
         Collects data for each registered transformer.
         """
+        # Index the blocks first, so transformers can collect bitsets
+        # of blocks.
+        block_structure._index_blocks()  # pylint: disable=protected-access
+
         for transformer in TransformerRegistry.get_registered_transformers():
             block_structure._add_transformer(transformer)  # pylint: disable=protected-access
             transformer.collect(block_structure)
@@ -105,6 +110,21 @@ class BlockStructureTransformers(object):
             )
         return True
 
+    def equivalence_key(self, block_structure):
+        """
+        Returns a hashable key such that transforming the given collected
+        block structure with this collection yields equal results for all
+        usage_infos with equal keys, or None if the result cannot be
+        shared.  See BlockStructureTransformer.equivalence_key.
+        """
+        keys = []
+        for transformer in self._transformers['supports_filter'] + self._transformers['no_filter']:
+            key = transformer.equivalence_key(self.usage_info, block_structure)
+            if key is None:
+                return None
+            keys.append((transformer.name(), key))
+        return tuple(keys)
+
     def transform(self, block_structure):
         """
         The given block structure is transformed by each transformer in the
@@ -126,9 +146,27 @@ class BlockStructureTransformers(object):
         if not self._transformers['supports_filter']:
             return
 
+        # Consecutive removal bitmaps are combined into a single filter,
+        # while keeping the order of all filters, since a block that is
+        # removed by multiple filters is removed as specified by the first.
         filters = []
+        removal_bitmaps = []
         for transformer in self._transformers['supports_filter']:
-            filters.extend(transformer.transform_block_filters(self.usage_info, block_structure))
+            for block_filter in transformer.transform_block_filters(self.usage_info, block_structure):
+                if isinstance(block_filter, RemovalBitmap):
+                    removal_bitmaps.append(block_filter)
+                    continue
+                if removal_bitmaps:
+                    filters.append(block_structure.create_bitmap_removal_filter(removal_bitmaps))
+                    removal_bitmaps = []
+                filters.append(block_filter)
+        if removal_bitmaps:
+            if not filters:
+                # Without any filter functions to evaluate, there is no
+                # need to traverse the structure.
+                block_structure.remove_blocks_in_bitmaps(removal_bitmaps)
+                return
+            filters.append(block_structure.create_bitmap_removal_filter(removal_bitmaps))
 
         combined_filters = functools.reduce(
             self._filter_chain,
@@ -1,8 +1,12 @@
 """
 Helper functions for caching course assets.
 """
+import hashlib
+
+from django.conf import settings
 from django.core.cache import caches
 from django.core.cache.backends.base import InvalidCacheBackendError
+from gridfs.grid_file import DEFAULT_CHUNK_SIZE
 from opaque_keys import InvalidKeyError
 
 from xmodule.contentstore.content import STATIC_CONTENT_VERSION
@@ -14,6 +18,10 @@ try:
 except InvalidCacheBackendError:
     pass
 
+# The size of the cached chunks of large assets.  It's the size of GridFS chunks,
+# so that each chunk is read from one GridFS chunk.
+CONTENT_CHUNK_SIZE = DEFAULT_CHUNK_SIZE
+
 
 def set_cached_content(content):
     """
@@ -48,3 +56,100 @@ def del_cached_content(location):
         pass
 
     CONTENT_CACHE.delete_many(locations, version=STATIC_CONTENT_VERSION)
+
+
+def should_cache_chunks(content):
+    """
+    Returns whether the data of the given content, too large to be cached as a
+    whole, should be cached in chunks.
+    """
+    config = getattr(settings, 'COURSE_ASSETS_CHUNK_CACHE', {})
+    return (
+        config.get('ENABLED', False) and
+        content.content_digest is not None and
+        content.length is not None and
+        content.length <= config.get('MAX_ASSET_SIZE', 0)
+    )
+
+
+def get_chunk_key(content, index):
+    """
+    Returns the cache key of the chunk of the given content with the given index.
+
+    The key has the content's digest, so that the chunks of a changed asset
+    aren't read, and don't need to be deleted.
+    """
+    asset_hash = hashlib.sha1(u'{}.{}'.format(content.location, content.content_digest).encode('utf-8')).hexdigest()
+    return u'course_asset_chunk.{}.{}'.format(asset_hash, index)
+
+
+class CachedChunkStream(object):
+    """
+    A file-like object over the data of a StaticContentStream, which reads the
+    data in chunks from the cache, and the chunks that aren't cached from the
+    content, which it then caches.
+
+    Only the chunks that are read are held in memory, so the data of a large
+    asset is never read as a whole, and range requests only read the chunks of
+    their ranges.
+    """
+    def __init__(self, content):
+        self.content = content
+        self.position = 0
+
+        # The index and data of the chunk that was read last.
+        self._chunk_index = None
+        self._chunk = None
+
+    def seek(self, position):
+        """
+        Moves to the given position in the data.
+        """
+        self.position = position
+
+    def tell(self):
+        """
+        Returns the position in the data.
+        """
+        return self.position
+
+    def read(self, size=-1):
+        """
+        Returns up to size bytes of the data from the position, or all of the
+        rest of it if size is negative.
+        """
+        if size < 0:
+            size = self.content.length - self.position
+        pieces = []
+        while size > 0 and self.position < self.content.length:
+            index, offset = divmod(self.position, CONTENT_CHUNK_SIZE)
+            piece = self._get_chunk(index)[offset:offset + size]
+            if not piece:
+                break
+            pieces.append(piece)
+            self.position += len(piece)
+            size -= len(piece)
+        return ''.join(pieces)
+
+    def close(self):
+        """
+        Closes the content's stream.
+        """
+        self.content.close()
+
+    def _get_chunk(self, index):
+        """
+        Returns the chunk of the data with the given index, from the cache, or
+        from the content if it isn't cached.
+        """
+        if index != self._chunk_index:
+            key = get_chunk_key(self.content, index)
+            chunk = CONTENT_CACHE.get(key, version=STATIC_CONTENT_VERSION)
+            if chunk is None:
+                first = index * CONTENT_CHUNK_SIZE
+                last = min(first + CONTENT_CHUNK_SIZE, self.content.length) - 1
+                chunk = ''.join(self.content.stream_data_in_range(first, last))
+                CONTENT_CACHE.set(key, chunk, version=STATIC_CONTENT_VERSION)
+            self._chunk_index = index
+            self._chunk = chunk
+        return self._chunk
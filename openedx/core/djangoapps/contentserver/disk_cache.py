@@ -0,0 +1,289 @@
+"""
+A cache of large course assets on the local disk.
+
+Assets too large for the course_assets cache are otherwise read from GridFS,
+chunk by chunk, for every request, including each of the range requests
+with which video players seek.  The contentserver keeps copies of them in
+COURSE_ASSETS_DISK_CACHE['DIRECTORY'], from which they are served, and
+removes the least recently used copies to keep the directory within
+COURSE_ASSETS_DISK_CACHE['MAX_SIZE'] bytes.
+
+Each copy is named by a hash of the asset's location and digest, so that a
+changed asset is copied again, and its old copy is eventually evicted.
+Assets are copied in background threads, while the requests that missed
+them are served from the contentstore.  The directory may be shared by the
+processes of a node: each asset is only copied by the process that holds its
+lock file, and copies are written to temporary files and renamed into place.
+Each process keeps track of the files in the directory and their total size,
+and scans the directory again every SCAN_INTERVAL seconds for the files that
+the other processes added, used and removed.
+"""
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from xmodule.assetstore.assetmgr import AssetManager
+from xmodule.exceptions import NotFoundError
+from xmodule.modulestore.exceptions import ItemNotFoundError
+
+log = logging.getLogger(__name__)
+
+# The prefix of the names of the files that copies are written to, and of
+# the lock files of the copies being written.
+TEMP_FILE_PREFIX = '.tmp-'
+LOCK_FILE_SUFFIX = '.lock'
+
+# The number of seconds after which a temporary or lock file is assumed to
+# have been left by a process which stopped while writing a copy.
+TEMP_FILE_TIMEOUT = 60 * 60
+
+# The number of seconds after which a process scans the directory again.
+SCAN_INTERVAL = 5 * 60
+
+# The AssetDiskCache of COURSE_ASSETS_DISK_CACHE, once it's created.
+_DISK_CACHE = None
+
+
+def get_asset_disk_cache():
+    """
+    Returns the AssetDiskCache configured by the COURSE_ASSETS_DISK_CACHE
+    setting, or None if it isn't enabled.
+    """
+    global _DISK_CACHE  # pylint: disable=global-statement
+    config = getattr(settings, 'COURSE_ASSETS_DISK_CACHE', {})
+    if not config.get('DIRECTORY'):
+        return None
+    if _DISK_CACHE is None or _DISK_CACHE.directory != config['DIRECTORY']:
+        _DISK_CACHE = AssetDiskCache(
+            config['DIRECTORY'],
+            max_size=config.get('MAX_SIZE', 10 * 1024 * 1024 * 1024),
+            min_asset_size=config.get('MIN_ASSET_SIZE', 1024 * 1024),
+        )
+    return _DISK_CACHE
+
+
+class AssetDiskCache(object):
+    """
+    A least recently used cache of the data of course assets, in files in a
+    directory.
+    """
+    def __init__(self, directory, max_size, min_asset_size):
+        """
+        Arguments:
+            directory (str) - The directory of the cached files.
+
+            max_size (int) - The total size, in bytes, of the cached files.
+
+            min_asset_size (int) - The size, in bytes, of the smallest asset
+                to cache.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.min_asset_size = min_asset_size
+        self._lock = threading.Lock()
+
+        # The sizes of the cached files, in least recently used order, and
+        # their total, as of the last scan of the directory and the changes
+        # since made by this process.
+        # OrderedDict {string: int}
+        self._files = OrderedDict()
+        self._size = 0
+        self._scanned_at = None
+
+        # The threads copying assets in the background, by their paths.
+        # {string: threading.Thread}
+        self._fills = {}
+
+    def should_cache(self, content):
+        """
+        Returns whether the data of the given content belongs in this cache.
+        """
+        return content.length is not None and self.min_asset_size <= content.length <= self.max_size
+
+    def get_relative_path(self, path):
+        """
+        Returns the path of the given cached file, relative to the directory.
+        """
+        return os.path.relpath(path, self.directory)
+
+    def get_path(self, content):
+        """
+        Returns the path of the cached copy of the content's data, or None
+        if it isn't cached.
+        """
+        path = self._path(content)
+        try:
+            # Mark the copy as recently used.
+            os.utime(path, None)
+        except OSError:
+            return None
+        with self._lock:
+            if path in self._files:
+                self._files[path] = self._files.pop(path)
+        return path
+
+    def fill(self, content):
+        """
+        Starts copying the data of the given content into the cache in a
+        background thread, unless it's already being copied by this process.
+        """
+        path = self._path(content)
+        with self._lock:
+            if path in self._fills:
+                return
+            thread = threading.Thread(target=self._fill, args=(content, path), name='asset-disk-cache-fill')
+            thread.daemon = True
+            self._fills[path] = thread
+        thread.start()
+
+    def wait(self):
+        """
+        Waits until the copies started by fill are written.
+        """
+        with self._lock:
+            threads = list(self._fills.values())
+        for thread in threads:
+            thread.join()
+
+    def add(self, content):
+        """
+        Copies the data of the given content from the contentstore into the
+        cache, and returns the path of the copy, or None if it couldn't be
+        copied, or is being copied by another process or thread.  The data
+        is read from a stream of its own, so that the content can still be
+        read.
+        """
+        path = self._path(content)
+        lock_path = os.path.join(os.path.dirname(path), TEMP_FILE_PREFIX + os.path.basename(path) + LOCK_FILE_SUFFIX)
+        temp_path = None
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+        except OSError as error:
+            # Another process may have just made the directory.
+            if error.errno != errno.EEXIST:
+                log.exception(u"Couldn't copy %s to the asset disk cache", content.location)
+                return None
+        try:
+            lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                log.exception(u"Couldn't lock %s in the asset disk cache", content.location)
+            return None
+
+        try:
+            if os.path.exists(path):
+                self._track(path, os.path.getsize(path))
+                return path
+            self._make_room(content.length)
+            temp_fd, temp_path = tempfile.mkstemp(prefix=TEMP_FILE_PREFIX, dir=os.path.dirname(path))
+            with os.fdopen(temp_fd, 'wb') as temp_file:
+                for chunk in AssetManager.find(content.location, as_stream=True).stream_data():
+                    temp_file.write(chunk)
+            os.rename(temp_path, path)
+            self._track(path, os.path.getsize(path))
+        except (IOError, OSError, ItemNotFoundError, NotFoundError):
+            log.exception(u"Couldn't copy %s to the asset disk cache", content.location)
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+        finally:
+            os.close(lock_fd)
+            self._remove(lock_path)
+        return path
+
+    def clear(self):
+        """
+        Removes all of the cached files.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
+        with self._lock:
+            self._files.clear()
+            self._size = 0
+            self._scanned_at = None
+
+    def _fill(self, content, path):
+        """
+        Copies the data of the given content into the cache, in the
+        background thread started by fill.
+        """
+        try:
+            self.add(content)
+        finally:
+            with self._lock:
+                self._fills.pop(path, None)
+
+    def _path(self, content):
+        """
+        Returns the path of the copy of the content's data.
+        """
+        version = content.content_digest or content.last_modified_at.isoformat()
+        key = hashlib.sha1(u'{}.{}'.format(content.location, version).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def _track(self, path, size):
+        """
+        Records the cached file of the given size as the most recently used.
+        """
+        with self._lock:
+            self._size += size - self._files.pop(path, 0)
+            self._files[path] = size
+
+    def _make_room(self, needed_size):
+        """
+        Removes the least recently used files until there's room for a file
+        of the given size.
+        """
+        with self._lock:
+            if self._scanned_at is None or time.time() - self._scanned_at >= SCAN_INTERVAL:
+                self._scan()
+            removed_paths = []
+            while self._files and self._size + needed_size > self.max_size:
+                path, size = self._files.popitem(last=False)
+                self._size -= size
+                removed_paths.append(path)
+        for path in removed_paths:
+            self._remove(path)
+
+    def _scan(self):
+        """
+        Finds the cached files in the directory, in order of their last use,
+        and removes any temporary files left behind.  Must be called with
+        the lock.
+        """
+        files = []
+        now = time.time()
+        for dir_path, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if file_name.startswith(TEMP_FILE_PREFIX):
+                    if stat.st_mtime < now - TEMP_FILE_TIMEOUT:
+                        self._remove(path)
+                    continue
+                files.append((stat.st_mtime, path, stat.st_size))
+
+        files.sort()
+        self._files = OrderedDict((path, size) for _, path, size in files)
+        self._size = sum(self._files.values())
+        self._scanned_at = now
+
+    def _remove(self, path):
+        """
+        Removes the file, unless another process already has.
+        """
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -2,26 +2,32 @@
 Middleware to serve assets.
 """
 
+import calendar
 import logging
 import datetime
+import uuid
+from io import BytesIO
 log = logging.getLogger(__name__)
 try:
     import newrelic.agent
 except ImportError:
     newrelic = None  # pylint: disable=invalid-name
+from django.conf import settings
 from django.http import (
-    HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
-    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect)
+    FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
+    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect, StreamingHttpResponse)
+from django.utils.http import parse_http_date_safe
 from six import text_type
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from openedx.core.djangoapps.header_control import force_header_for_response
-from .caching import get_cached_content, set_cached_content
+from .caching import CachedChunkStream, get_cached_content, set_cached_content, should_cache_chunks
+from .disk_cache import get_asset_disk_cache
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -32,6 +38,9 @@ from .models import CourseAssetCacheTtlConfig, CdnUserAgentsConfig
 
 HTTP_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
 
+# The most ranges of a Range header that are sent as a multipart message.
+MAX_BYTE_RANGES = 20
+
 
 class StaticContentServer(object):
     """
@@ -47,7 +56,7 @@ class StaticContentServer(object):
             StaticContent.is_versioned_asset_path(request.path)
         )
 
-    # pylint: disable=too-many-statements
+    # pylint: disable=too-many-statements, too-many-branches
     def process_request(self, request):
         """Process the given request"""
         asset_path = request.path
@@ -109,11 +118,25 @@ class StaticContentServer(object):
 
             # Figure out if the client sent us a conditional request, and let them know
             # if this asset has changed since then.
-            last_modified_at_str = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            if is_not_modified(request, content):
+                response = HttpResponseNotModified()
+                self.set_caching_headers(content, response)
+                return response
+
+            # Serve large assets from their copies in the asset disk cache, if there is one.
+            disk_path = self.get_disk_cache_path(content)
+            if disk_path is not None:
+                x_accel_redirect_prefix = settings.COURSE_ASSETS_DISK_CACHE.get('X_ACCEL_REDIRECT_PREFIX')
+                if x_accel_redirect_prefix:
+                    # Let the web server send the file, and any ranges of it.
+                    response = HttpResponse()
+                    response['X-Accel-Redirect'] = x_accel_redirect_prefix.rstrip('/') + '/' + (
+                        get_asset_disk_cache().get_relative_path(disk_path)
+                    )
+                    response['Content-Type'] = content.content_type
+                    response['X-Frame-Options'] = 'ALLOW'
+                    self.set_caching_headers(content, response)
+                    return response
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
@@ -122,10 +145,15 @@ class StaticContentServer(object):
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
-            if request.META.get('HTTP_RANGE'):
-                # If we have a StaticContent, get a StaticContentStream.  Can't manipulate the bytes otherwise.
-                if isinstance(content, StaticContent):
-                    content = AssetManager.find(loc, as_stream=True)
+            disk_file = None
+            if request.META.get('HTTP_RANGE') and if_range_matches(request, content):
+                # Read the ranges from the cached copy, or from the data of an in-memory StaticContent.
+                # Can't manipulate the bytes otherwise.
+                if disk_path is not None:
+                    disk_file = open(disk_path, 'rb')
+                    content = with_stream(content, disk_file)
+                elif not isinstance(content, StaticContentStream):
+                    content = with_stream(content, BytesIO(content.data))
 
                 header_value = request.META['HTTP_RANGE']
                 try:
@@ -139,38 +167,59 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, text_type(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
+                    elif len(ranges) > MAX_BYTE_RANGES or get_ranges_length(ranges) > content.length:
+                        # Sending that many ranges, or overlapping ranges, costs more than the full content.
                         log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, text_type(loc)
+                            u"Too many ranges in Range header: %s for content: %s", header_value, text_type(loc)
                         )
                     else:
-                        first, last = ranges[0]
+                        ranges = [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s",
+                                header_value, text_type(loc)
+                            )
+                            response = HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            response['Content-Range'] = 'bytes */{length}'.format(length=content.length)
+                            return response
 
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
+                        if len(ranges) == 1:
+                            first, last = ranges[0]
                             response = HttpResponse(content.stream_data_in_range(first, last))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
-                            response.status_code = 206  # Partial Content
-
-                            if newrelic:
-                                newrelic.agent.add_custom_parameter('contentserver.ranged', True)
+                            response['Content-Type'] = content.content_type
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s",
-                                header_value, text_type(loc)
+                            # Content for multiple ranges is sent as a multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            boundary = uuid.uuid4().hex
+                            response = HttpResponse(
+                                stream_byteranges(content, ranges, boundary),
+                                content_type='multipart/byteranges; boundary={}'.format(boundary),
                             )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            response['Content-Length'] = str(len(response.content))
+                        response.status_code = 206  # Partial Content
+
+                        if newrelic:
+                            newrelic.agent.add_custom_parameter('contentserver.ranged', True)
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                if disk_path is not None:
+                    response = FileResponse(open(disk_path, 'rb'))
+                elif isinstance(content, StaticContentStream):
+                    # Stream large assets, rather than reading them into memory.
+                    response = StreamingHttpResponse(content.stream_data())
+                else:
+                    response = HttpResponse(content.stream_data())
                 response['Content-Length'] = content.length
+                response['Content-Type'] = content.content_type
+
+            if disk_file is not None:
+                # The response has already read what it needs of the cached copy.
+                disk_file.close()
 
             if newrelic:
                 newrelic.agent.add_custom_parameter('contentserver.content_len', content.length)
@@ -178,7 +227,6 @@ class StaticContentServer(object):
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
             response['X-Frame-Options'] = 'ALLOW'
 
             # Set any caching headers, and do any response cleanup needed.  Based on how much
@@ -215,6 +263,9 @@ class StaticContentServer(object):
             response['Cache-Control'] = "private, no-cache, no-store"
 
         response['Last-Modified'] = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
+        etag = get_etag(content)
+        if etag is not None:
+            response['ETag'] = etag
 
         # Force the Vary header to only vary responses on Origin, so that XHR and browser requests get cached
         # separately and don't screw over one another. i.e. a browser request that doesn't send Origin, and
@@ -289,9 +340,116 @@ class StaticContentServer(object):
             if content.length is not None and content.length < 1048576:
                 content = content.copy_to_in_mem()
                 set_cached_content(content)
+            elif should_cache_chunks(content):
+                # Larger assets are cached in chunks, which are read as they're needed.
+                content = with_stream(content, CachedChunkStream(content))
 
         return content
 
+    def get_disk_cache_path(self, content):
+        """
+        Returns the path of the copy of the given content in the asset disk
+        cache, or None if the content isn't served from the disk cache.  If
+        the content isn't copied there yet, it's copied in the background,
+        and served from the contentstore until it is.
+        """
+        disk_cache = get_asset_disk_cache()
+        if disk_cache is None or not isinstance(content, StaticContentStream) or not disk_cache.should_cache(content):
+            return None
+
+        path = disk_cache.get_path(content)
+        if newrelic:
+            newrelic.agent.add_custom_parameter('contentserver.disk_cache_hit', path is not None)
+        if path is None:
+            disk_cache.fill(content)
+        return path
+
+
+def get_etag(content):
+    """
+    Returns the entity tag of the given content, from its digest, or None if
+    it has no digest.
+    """
+    if not content.content_digest:
+        return None
+    return '"{}"'.format(content.content_digest)
+
+
+def is_not_modified(request, content):
+    """
+    Returns whether the conditional headers of the request show that the
+    client already has the current version of the content.
+
+    See spec for details: https://tools.ietf.org/html/rfc7232#section-6
+    """
+    if 'HTTP_IF_NONE_MATCH' in request.META:
+        # If-None-Match takes precedence over If-Modified-Since.  Entity
+        # tags are compared weakly for it.
+        etags = [etag.strip() for etag in request.META['HTTP_IF_NONE_MATCH'].split(',')]
+        etags = [etag[2:] if etag.startswith('W/') else etag for etag in etags]
+        return '*' in etags or get_etag(content) in etags
+
+    if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+        if_modified_since = parse_http_date_safe(request.META['HTTP_IF_MODIFIED_SINCE'])
+        last_modified = calendar.timegm(content.last_modified_at.utctimetuple())
+        return if_modified_since is not None and last_modified <= if_modified_since
+
+    return False
+
+
+def if_range_matches(request, content):
+    """
+    Returns whether the Range header of the request applies to the current
+    version of the content, which is when it has no If-Range header, or its
+    If-Range header has the content's entity tag or modification date.
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    return if_range in (get_etag(content), content.last_modified_at.strftime(HTTP_DATE_FORMAT))
+
+
+def with_stream(content, stream):
+    """
+    Returns a StaticContentStream of the given content, which reads its data
+    from the given stream.
+    """
+    return StaticContentStream(
+        content.location, content.name, content.content_type, stream,
+        last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+        import_path=content.import_path, length=content.length, locked=content.locked,
+        content_digest=content.content_digest,
+    )
+
+
+def get_ranges_length(ranges):
+    """
+    Returns the total number of bytes in the given list of (first, last) ranges.
+    """
+    return sum(last - first + 1 for first, last in ranges)
+
+
+def stream_byteranges(content, ranges, boundary):
+    """
+    Yields the body of a multipart/byteranges message of the given ranges of
+    the content.
+
+    See spec for details: https://tools.ietf.org/html/rfc7233#appendix-A
+    """
+    for first, last in ranges:
+        yield (
+            '--{boundary}\r\n'
+            'Content-Type: {content_type}\r\n'
+            'Content-Range: bytes {first}-{last}/{length}\r\n'
+            '\r\n'
+        ).format(
+            boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+        )
+        for chunk in content.stream_data_in_range(first, last):
+            yield chunk
+        yield '\r\n'
+    yield '--{boundary}--\r\n'.format(boundary=boundary)
+
 
 def parse_range_header(header_value, content_length):
     """
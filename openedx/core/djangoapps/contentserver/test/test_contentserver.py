@@ -6,7 +6,11 @@ import copy
 import datetime
 import ddt
 import logging
+import os
+import shutil
+import tempfile
 import unittest
+from io import BytesIO
 from uuid import uuid4
 
 from django.conf import settings
@@ -16,17 +20,20 @@ from django.test.utils import override_settings
 from mock import patch
 
 from xmodule.contentstore.django import contentstore
-from xmodule.contentstore.content import StaticContent, VERSIONED_ASSETS_PREFIX
+from xmodule.contentstore.content import StaticContent, StaticContentStream, VERSIONED_ASSETS_PREFIX
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.xml_importer import import_course_from_xml
 from xmodule.assetstore.assetmgr import AssetManager
 from opaque_keys import InvalidKeyError
+from opaque_keys.edx.locator import CourseLocator
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory, AdminFactory
 
+from ..caching import CONTENT_CACHE, CachedChunkStream, should_cache_chunks
+from ..disk_cache import AssetDiskCache, get_asset_disk_cache
 from ..middleware import parse_range_header, HTTP_DATE_FORMAT, StaticContentServer
 
 log = logging.getLogger(__name__)
@@ -242,17 +249,63 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart message of the ranges.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
         resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
             first=first_byte, last=last_byte))
 
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertNotIn('Content-Range', resp)
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+
+        data = self.contentstore.find(self.unlocked_asset).data
+        boundary = resp['Content-Type'].split('boundary=')[1]
+        parts = resp.content.split('--' + boundary)
+        self.assertEqual(parts[0], '')
+        self.assertEqual(parts[-1], '--\r\n')
+        ranges = [(first_byte, last_byte), (self.length_unlocked - 100, self.length_unlocked - 1)]
+        for part, (first, last) in zip(parts[1:-1], ranges):
+            headers, body = part.split('\r\n\r\n', 1)
+            self.assertIn('Content-Range: bytes {first}-{last}/{length}'.format(
+                first=first, last=last, length=self.length_unlocked), headers)
+            self.assertEqual(body, data[first:last + 1] + '\r\n')
+
+    def test_range_request_multiple_ranges_unsatisfiable(self):
+        """
+        Test that the unsatisfiable ones of multiple ranges are left out.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9, {first}-'.format(
+            first=self.length_unlocked))
+
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertEqual(resp['Content-Range'], 'bytes 0-9/{length}'.format(length=self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], '10')
+
+    def test_range_request_overlapping_ranges(self):
+        """
+        Test that ranges which add up to more than the content output the full content.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-, 0-')
+
         self.assertEqual(resp.status_code, 200)
         self.assertNotIn('Content-Range', resp)
         self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
 
+    def test_range_request_if_range(self):
+        """
+        Test that a range request for another version of the asset outputs the full content.
+        """
+        resp = self.client.get(self.url_unlocked)
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=resp['ETag'])
+        self.assertEqual(resp.status_code, 206)
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"{}"'.format(FAKE_MD5_HASH))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
     @ddt.data(
         'bytes 0-',
         'bits=0-',
@@ -294,6 +347,65 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEquals('Origin', resp['Vary'])
 
+    def test_etag(self):
+        """
+        Tests that assets are sent with an entity tag of their digest.
+        """
+        content = self.contentstore.find(self.unlocked_asset)
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp['ETag'], '"{}"'.format(content.content_digest))
+
+    @ddt.data(
+        ('{etag}', 304),
+        ('W/{etag}', 304),
+        ('"{fake}", {etag}', 304),
+        ('*', 304),
+        ('"{fake}"', 200),
+    )
+    @ddt.unpack
+    def test_if_none_match(self, header_value, expected_status_code):
+        """
+        Tests that assets are only sent when the client doesn't have a version with the same entity tag.
+        """
+        etag = self.client.get(self.url_unlocked)['ETag']
+        resp = self.client.get(
+            self.url_unlocked, HTTP_IF_NONE_MATCH=header_value.format(etag=etag, fake=FAKE_MD5_HASH)
+        )
+        self.assertEqual(resp.status_code, expected_status_code)
+        self.assertEqual(resp['ETag'], etag)
+
+    def test_if_none_match_before_if_modified_since(self):
+        """
+        Tests that If-None-Match takes precedence over If-Modified-Since.
+        """
+        last_modified = self.client.get(self.url_unlocked)['Last-Modified']
+        resp = self.client.get(
+            self.url_unlocked, HTTP_IF_NONE_MATCH='"{}"'.format(FAKE_MD5_HASH), HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    @ddt.data(
+        (datetime.timedelta(0), 304),
+        (datetime.timedelta(days=1), 304),
+        (datetime.timedelta(days=-1), 200),
+    )
+    @ddt.unpack
+    def test_if_modified_since(self, offset, expected_status_code):
+        """
+        Tests that assets are only sent when they changed since the date the client has.
+        """
+        content = self.contentstore.find(self.unlocked_asset)
+        if_modified_since = (content.last_modified_at + offset).strftime(HTTP_DATE_FORMAT)
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=if_modified_since)
+        self.assertEqual(resp.status_code, expected_status_code)
+
+    def test_if_modified_since_invalid(self):
+        """
+        Tests that assets are sent when the client's date can't be parsed.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE='yesterday')
+        self.assertEqual(resp.status_code, 200)
+
     @patch('openedx.core.djangoapps.contentserver.models.CourseAssetCacheTtlConfig.get_cache_ttl')
     def test_cache_headers_with_ttl_unlocked(self, mock_get_cache_ttl):
         """
@@ -403,6 +515,206 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
         self.assertEqual(is_from_cdn, True)
 
 
+@override_settings(CONTENTSTORE=TEST_DATA_CONTENTSTORE)
+class ContentStoreDiskCacheTest(SharedModuleStoreTestCase):
+    """
+    Tests of serving assets from the asset disk cache.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(ContentStoreDiskCacheTest, cls).setUpClass()
+        cls.contentstore = contentstore()
+        cls.modulestore = modulestore()
+        cls.course_key = cls.modulestore.make_course_key('edX', 'toy', '2012_Fall')
+        import_course_from_xml(
+            cls.modulestore, 1, TEST_DATA_DIR, ['toy'],
+            static_content_store=cls.contentstore, verbose=True
+        )
+        cls.asset_key = cls.course_key.make_asset_key('asset', 'another_static.txt')
+        cls.url = unicode(cls.asset_key)
+        cls.data = cls.contentstore.find(cls.asset_key).data
+
+    def setUp(self):
+        super(ContentStoreDiskCacheTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        disk_cache_settings = {'DIRECTORY': self.directory, 'MAX_SIZE': 1024 * 1024, 'MIN_ASSET_SIZE': 0}
+        override = override_settings(COURSE_ASSETS_DISK_CACHE=disk_cache_settings)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        # Serve the asset from the contentstore, rather than from the course_assets cache.
+        patcher = patch.object(
+            StaticContentServer, 'load_asset_from_location',
+            lambda _self, location: AssetManager.find(location, as_stream=True)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_cached_files(self):
+        """
+        Returns the paths of the files in the disk cache.
+        """
+        return [
+            os.path.join(dir_path, file_name)
+            for dir_path, _, file_names in os.walk(self.directory)
+            for file_name in file_names
+        ]
+
+    def get_and_fill(self):
+        """
+        Requests the asset, and waits until it's copied to the disk cache.
+        """
+        resp = self.client.get(self.url)
+        get_asset_disk_cache().wait()
+        return resp
+
+    def test_copied_once(self):
+        # The asset is served from the contentstore while it's copied.
+        resp = self.get_and_fill()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(''.join(resp.streaming_content), self.data)
+        self.assertEqual(len(self.get_cached_files()), 1)
+
+        with patch.object(AssetDiskCache, 'fill') as mock_fill:
+            resp = self.client.get(self.url)
+            self.assertEqual(''.join(resp.streaming_content), self.data)
+        self.assertFalse(mock_fill.called)
+
+    def test_range_request(self):
+        self.get_and_fill()
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=0-9, 20-29')
+        self.assertEqual(resp.status_code, 206)
+        self.assertIn(self.data[0:10], resp.content)
+        self.assertIn(self.data[20:30], resp.content)
+
+    def test_x_accel_redirect(self):
+        disk_cache_settings = dict(settings.COURSE_ASSETS_DISK_CACHE, X_ACCEL_REDIRECT_PREFIX='/cached-assets/')
+        with override_settings(COURSE_ASSETS_DISK_CACHE=disk_cache_settings):
+            self.get_and_fill()
+            resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content, '')
+        cached_file, = self.get_cached_files()
+        self.assertEqual(
+            resp['X-Accel-Redirect'], '/cached-assets/' + os.path.relpath(cached_file, self.directory)
+        )
+
+    def test_too_large(self):
+        disk_cache_settings = dict(settings.COURSE_ASSETS_DISK_CACHE, MAX_SIZE=len(self.data) - 1)
+        with override_settings(COURSE_ASSETS_DISK_CACHE=disk_cache_settings):
+            resp = self.get_and_fill()
+        self.assertEqual(resp.content, self.data)
+        self.assertEqual(self.get_cached_files(), [])
+
+    def test_eviction(self):
+        disk_cache = AssetDiskCache(self.directory, max_size=len(self.data) * 2, min_asset_size=0)
+        content = AssetManager.find(self.asset_key, as_stream=True)
+        old_path = disk_cache.add(content)
+        os.utime(old_path, (0, 0))
+
+        content.content_digest = FAKE_MD5_HASH
+        newer_path = disk_cache.add(content)
+        content.content_digest = FAKE_MD5_HASH[:-1] + '0'
+        newest_path = disk_cache.add(content)
+
+        self.assertEqual(sorted(self.get_cached_files()), sorted([newer_path, newest_path]))
+
+    def test_directory_scanned_once(self):
+        disk_cache = AssetDiskCache(self.directory, max_size=len(self.data) * 2, min_asset_size=0)
+        content = AssetManager.find(self.asset_key, as_stream=True)
+        with patch.object(disk_cache, '_scan', wraps=disk_cache._scan) as mock_scan:  # pylint: disable=protected-access
+            for digest in (FAKE_MD5_HASH, FAKE_MD5_HASH[:-1] + '0', FAKE_MD5_HASH[:-1] + '1'):
+                content.content_digest = digest
+                disk_cache.add(content)
+        self.assertEqual(mock_scan.call_count, 1)
+        self.assertEqual(len(self.get_cached_files()), 2)
+
+    def test_copied_by_lock_holder(self):
+        # An asset whose lock file exists is being copied by another process.
+        disk_cache = AssetDiskCache(self.directory, max_size=len(self.data) * 2, min_asset_size=0)
+        content = AssetManager.find(self.asset_key, as_stream=True)
+        path = disk_cache._path(content)  # pylint: disable=protected-access
+        os.makedirs(os.path.dirname(path))
+        lock_path = os.path.join(os.path.dirname(path), '.tmp-' + os.path.basename(path) + '.lock')
+        open(lock_path, 'w').close()
+
+        self.assertIsNone(disk_cache.add(content))
+        self.assertEqual(self.get_cached_files(), [lock_path])
+
+        os.remove(lock_path)
+        self.assertEqual(disk_cache.add(content), path)
+        self.assertEqual(self.get_cached_files(), [path])
+
+
+@patch('openedx.core.djangoapps.contentserver.caching.CONTENT_CHUNK_SIZE', 10)
+class CachedChunkStreamTest(unittest.TestCase):
+    """
+    Tests of reading large assets in cached chunks.
+    """
+    DATA = ''.join(chr(ord('a') + index % 26) for index in range(95))
+
+    def setUp(self):
+        super(CachedChunkStreamTest, self).setUp()
+        CONTENT_CACHE.clear()
+        self.addCleanup(CONTENT_CACHE.clear)
+
+    def new_content(self, content_digest=FAKE_MD5_HASH):
+        """
+        Returns a StaticContentStream of DATA.
+        """
+        location = CourseLocator('edX', 'toy', '2012_Fall').make_asset_key('asset', 'large.mp4')
+        return StaticContentStream(
+            location, 'large.mp4', 'video/mp4', BytesIO(self.DATA), length=len(self.DATA),
+            content_digest=content_digest,
+        )
+
+    def test_read(self):
+        stream = CachedChunkStream(self.new_content())
+        self.assertEqual(stream.read(25), self.DATA[:25])
+        self.assertEqual(stream.read(), self.DATA[25:])
+        self.assertEqual(stream.read(), '')
+
+    def test_seek(self):
+        stream = CachedChunkStream(self.new_content())
+        stream.seek(42)
+        self.assertEqual(stream.tell(), 42)
+        self.assertEqual(stream.read(20), self.DATA[42:62])
+
+    def test_cached_chunks(self):
+        stream = CachedChunkStream(self.new_content())
+        stream.seek(15)
+        stream.read(10)
+
+        content = self.new_content()
+        with patch.object(content, 'stream_data_in_range', wraps=content.stream_data_in_range) as mock_read:
+            stream = CachedChunkStream(content)
+            stream.seek(15)
+            self.assertEqual(stream.read(), self.DATA[15:])
+        # Only the chunks after the first ones read were read from the content.
+        self.assertEqual(
+            [call[0] for call in mock_read.call_args_list],
+            [(30, 39), (40, 49), (50, 59), (60, 69), (70, 79), (80, 89), (90, 94)]
+        )
+
+    def test_changed_content(self):
+        CachedChunkStream(self.new_content()).read()
+
+        content = self.new_content(content_digest='0' * 32)
+        with patch.object(content, 'stream_data_in_range', wraps=content.stream_data_in_range) as mock_read:
+            CachedChunkStream(content).read()
+        self.assertEqual(mock_read.call_count, 10)
+
+    def test_should_cache_chunks(self):
+        with override_settings(COURSE_ASSETS_CHUNK_CACHE={'ENABLED': True, 'MAX_ASSET_SIZE': 100}):
+            self.assertTrue(should_cache_chunks(self.new_content()))
+            self.assertFalse(should_cache_chunks(self.new_content(content_digest=None)))
+        with override_settings(COURSE_ASSETS_CHUNK_CACHE={'ENABLED': True, 'MAX_ASSET_SIZE': 90}):
+            self.assertFalse(should_cache_chunks(self.new_content()))
+        with override_settings(COURSE_ASSETS_CHUNK_CACHE={'ENABLED': False, 'MAX_ASSET_SIZE': 100}):
+            self.assertFalse(should_cache_chunks(self.new_content()))
+
+
 @ddt.ddt
 class ParseRangeHeaderTestCase(unittest.TestCase):
     """
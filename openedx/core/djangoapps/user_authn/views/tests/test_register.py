@@ -857,6 +857,7 @@ class TestCreateAccountValidation(TestCase):
 @mock.patch.dict("student.models.settings.FEATURES", {"ENABLE_DISCUSSION_SERVICE": True})
 @mock.patch("lms.lib.comment_client.User.base_url", TEST_CS_URL)
 @mock.patch("lms.lib.comment_client.utils.requests.request", return_value=mock.Mock(status_code=200, text='{}'))
+@override_settings(COMMENTS_SERVICE_CONNECTIONS={'POOL_ENABLED': False})
 class TestCreateCommentsServiceUser(TransactionTestCase):
     """ Tests for creating comments service user. """
 
@@ -5,6 +5,9 @@ import collections
 import cPickle as pickle
 import functools
 import itertools
+import sys
+import threading
+import types
 import zlib
 
 from django.utils.encoding import force_text
@@ -151,6 +154,131 @@ class process_cached(object):  # pylint: disable=invalid-name
         return functools.partial(self.__call__, obj)
 
 
+class SizeBoundedLRUCache(object):
+    """
+    A thread-safe, process-local cache that evicts its least recently
+    used entries whenever the total size of its entries exceeds a limit.
+
+    The size of each entry is provided by the caller when the entry is
+    added, in any unit consistent with the limit (e.g., bytes).
+
+    WARNING: Values are shared by all callers within the process; they
+    are not copied when added or returned.  Only use this cache for values
+    that callers do not mutate.
+    """
+    def __init__(self, max_size):
+        """
+        Arguments:
+            max_size (int) - The maximum total size of all entries.
+        """
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def size(self):
+        """
+        Returns the total size of all entries.
+        """
+        return self._size
+
+    def get(self, key, default=None):
+        """
+        Returns the value associated with the given key, marking it as
+        the most recently used entry; returns default if not found.
+        """
+        with self._lock:
+            try:
+                value, size = self._entries.pop(key)
+            except KeyError:
+                return default
+            self._entries[key] = (value, size)
+            return value
+
+    def set(self, key, value, size):
+        """
+        Associates the given key with the given value of the given size,
+        evicting the least recently used entries as needed.  A value that
+        is larger than the limit of the cache is not added.
+        """
+        with self._lock:
+            self._pop(key)
+            if size > self.max_size:
+                return
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key):
+        """
+        Deletes the given key from the cache, if found.
+        """
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        """
+        Deletes all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _pop(self, key):
+        """
+        Removes the given key, if found, while holding the lock.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+
+# Types of objects that are shared rather than owned by the objects that
+# reference them, and are not counted by get_memory_size.
+_SHARED_TYPES = (type, types.ClassType, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+
+
+def get_memory_size(value):
+    """
+    Returns an estimate of the memory, in bytes, used by the given value
+    and all of the objects it references through containers, instance
+    dicts and slots.  Objects referenced more than once are counted once.
+    """
+    size = 0
+    seen = set()
+    pending = [value]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            pending.extend(obj.iterkeys())
+            pending.extend(obj.itervalues())
+        elif isinstance(obj, (list, tuple, set, frozenset, collections.deque)):
+            pending.extend(obj)
+
+        obj_dict = getattr(obj, '__dict__', None)
+        if isinstance(obj_dict, dict):
+            pending.append(obj_dict)
+        for cls in type(obj).__mro__:
+            slots = cls.__dict__.get('__slots__', ())
+            for slot in ((slots,) if isinstance(slots, basestring) else slots):
+                if slot not in ('__dict__', '__weakref__') and hasattr(obj, slot):
+                    pending.append(getattr(obj, slot))
+    return size
+
+
 def zpickle(data):
     """Given any data structure, returns a zlib compressed pickled serialization."""
     return zlib.compress(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
@@ -8,7 +8,7 @@ import ddt
 from mock import Mock
 
 from edx_django_utils.cache import RequestCache
-from openedx.core.lib.cache_utils import request_cached
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache, get_memory_size, request_cached
 
 
 @ddt.ddt
@@ -295,3 +295,82 @@ class TestRequestCachedDecorator(TestCase):
         result = wrapped(3)
         self.assertEqual(result, 2)
         self.assertEqual(to_be_wrapped.call_count, 2)
+
+
+class TestSizeBoundedLRUCache(TestCase):
+    """
+    Test the SizeBoundedLRUCache class.
+    """
+    def setUp(self):
+        super(TestSizeBoundedLRUCache, self).setUp()
+        self.cache = SizeBoundedLRUCache(max_size=10)
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', 1, size=4)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.size, 4)
+
+        self.cache.set('a', 2, size=3)
+        self.assertEqual(self.cache.get('a'), 2)
+        self.assertEqual(self.cache.size, 3)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', 1, size=4)
+        self.cache.set('b', 2, size=4)
+        self.cache.get('a')
+        self.cache.set('c', 3, size=4)
+
+        self.assertNotIn('b', self.cache)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
+        self.assertEqual(self.cache.size, 8)
+
+    def test_oversized_value(self):
+        self.cache.set('a', 1, size=4)
+        self.cache.set('b', 2, size=11)
+        self.assertNotIn('b', self.cache)
+        self.assertEqual(self.cache.get('a'), 1)
+
+    def test_delete_and_clear(self):
+        self.cache.set('a', 1, size=4)
+        self.cache.set('b', 2, size=4)
+        self.cache.delete('a')
+        self.cache.delete('unknown')
+        self.assertNotIn('a', self.cache)
+        self.assertEqual(self.cache.size, 4)
+
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.size, 0)
+
+
+class TestGetMemorySize(TestCase):
+    """
+    Test the get_memory_size function.
+    """
+    def test_containers(self):
+        value = ['a' * 1000]
+        self.assertGreater(get_memory_size(value), 1000)
+        self.assertGreater(get_memory_size({'key': value}), get_memory_size(value))
+        self.assertGreater(get_memory_size((value, 'b' * 1000)), get_memory_size(value) + 1000)
+
+    def test_shared_objects(self):
+        value = 'a' * 1000
+        self.assertLess(get_memory_size([value, value]), get_memory_size([value, 'b' * 1000]))
+
+    def test_objects(self):
+        class WithDict(object):
+            """An object with an instance dict."""
+            def __init__(self, value):
+                self.value = value
+
+        class WithSlots(object):
+            """An object with slots."""
+            __slots__ = ('value',)
+
+            def __init__(self, value):
+                self.value = value
+
+        self.assertGreater(get_memory_size(WithDict('a' * 1000)), 1000)
+        self.assertGreater(get_memory_size(WithSlots('a' * 1000)), 1000)